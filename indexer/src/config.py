@@ -23,6 +23,9 @@ logger = logging.getLogger(__name__)
 # Cache size configurations
 BACKEND_RAW_TRANSACTIONS_CACHE_SIZE = int(os.environ.get("BACKEND_RAW_TRANSACTIONS_CACHE_SIZE", "200000"))
 DESERIALIZED_TX_CACHE_SIZE = int(os.environ.get("DESERIALIZED_TX_CACHE_SIZE", "150000"))  # Increased from 100000
+# Byte budgets for the two backend transaction caches; the *_SIZE entry counts still cap them
+BACKEND_RAW_TRANSACTIONS_CACHE_BYTES = int(os.environ.get("BACKEND_RAW_TRANSACTIONS_CACHE_BYTES", str(128 * 1024 * 1024)))
+DESERIALIZED_TX_CACHE_BYTES = int(os.environ.get("DESERIALIZED_TX_CACHE_BYTES", str(256 * 1024 * 1024)))
 RUST_PARSER_MAX_CACHE_MB = int(os.environ.get("RUST_PARSER_MAX_CACHE_MB", "250"))  # 250MB for raw transaction data
 RUST_PARSER_ENTRIES = int(os.environ.get("RUST_PARSER_ENTRIES", "20000"))  # Match Python cache size
 
@@ -33,6 +36,9 @@ TOTAL_MINTED_CACHE_SIZE = int(os.environ.get("TOTAL_MINTED_CACHE_SIZE", "3000"))
 SUBASSET_CACHE_SIZE = int(os.environ.get("SUBASSET_CACHE_SIZE", "1500"))
 ADDRESS_CACHE_SIZE = int(os.environ.get("ADDRESS_CACHE_SIZE", "15000"))
 SRC721_SUBASSET_CACHE_SIZE = int(os.environ.get("SRC721_SUBASSET_CACHE_SIZE", "256"))  # SRC-721 specific subasset cache
+# Validated SRC-721 layer/background images, keyed by content hash
+SRC721_IMAGE_CACHE_BYTES = int(os.environ.get("SRC721_IMAGE_CACHE_BYTES", str(32 * 1024 * 1024)))
+SRC_BACKGROUND_CACHE_SIZE = int(os.environ.get("SRC_BACKGROUND_CACHE_SIZE", "64"))
 
 # Block and stamp cache sizes
 BLOCK_CACHE_SIZE = int(os.environ.get("BLOCK_CACHE_SIZE", "2"))
@@ -44,6 +50,10 @@ SRC101_DEPLOY_CACHE_SIZE = int(os.environ.get("SRC101_DEPLOY_CACHE_SIZE", str(DE
 # Market data cache size
 MARKET_DATA_CACHE_SIZE = int(os.environ.get("MARKET_DATA_CACHE_SIZE", "5000"))  # Cache for market data operations
 
+# Shards of the caches shared by the block executor, upload and market-data threads
+# (balance, total_minted, address, price, market_data); 1 keeps a single lock per cache
+CACHE_SHARDS = int(os.environ.get("CACHE_SHARDS", "16"))
+
 # Batch processing configurations
 BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "3000"))  # Process one full block per batch (~1.5MB raw data)
 MAX_BATCH_MEMORY = int(os.environ.get("MAX_BATCH_MEMORY", "250"))  # Conservative memory limit for processing
@@ -91,6 +101,11 @@ DB_REBUILD_BATCH_SIZE = int(os.environ.get("DB_REBUILD_BATCH_SIZE", "8000"))  #
 # Memory thresholds
 MEMORY_WARNING_THRESHOLD = float(os.environ.get("MEMORY_WARNING_THRESHOLD", "70.0"))  # Early warning at 70%
 MAX_MEMORY_PERCENT = float(os.environ.get("MAX_MEMORY_PERCENT", "80.0"))  # Critical at 80%
+# Cache governor watermarks (share of system memory used by this process): above the
+# soft one caches are trimmed gradually, cheapest to refill first; above the hard one
+# every cache is cleared
+MEMORY_SOFT_WATERMARK = float(os.environ.get("MEMORY_SOFT_WATERMARK", "0.80"))
+MEMORY_HARD_WATERMARK = float(os.environ.get("MEMORY_HARD_WATERMARK", "0.90"))
 
 # Debug flags
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
@@ -111,12 +126,61 @@ VALIDATION_MODE = os.getenv("VALIDATION_MODE", "db").lower()
 PERF_LOG = os.environ.get("PERF_LOG", "false").lower() == "true"
 PERF_LOG_PATH = os.environ.get("PERF_LOG_PATH", "perf_log.jsonl")
 
+# Hot-path profiler (off by default, consensus-neutral, cheap enough for
+# production). Records p50/p95/p99 histograms for every follow() phase and
+# samples the block thread's stack every HOTPATH_SAMPLE_INTERVAL_MS (0 turns
+# sampling off), keeping collapsed stacks of the HOTPATH_SLOWEST_BLOCKS slowest
+# blocks per HOTPATH_WINDOW_SECONDS. Output goes to a rotating JSONL file; read
+# it with tools/hotpath_report.py.
+HOTPATH_PROFILER = os.environ.get("HOTPATH_PROFILER", "false").lower() == "true"
+HOTPATH_PROFILER_PATH = os.environ.get("HOTPATH_PROFILER_PATH", "hotpath_profile.jsonl")
+HOTPATH_SAMPLE_INTERVAL_MS = float(os.environ.get("HOTPATH_SAMPLE_INTERVAL_MS", "10"))
+HOTPATH_SLOWEST_BLOCKS = int(os.environ.get("HOTPATH_SLOWEST_BLOCKS", "5"))
+HOTPATH_WINDOW_SECONDS = int(os.environ.get("HOTPATH_WINDOW_SECONDS", "3600"))
+HOTPATH_MAX_BYTES = int(os.environ.get("HOTPATH_MAX_BYTES", str(50 * 1024 * 1024)))
+HOTPATH_BACKUP_COUNT = int(os.environ.get("HOTPATH_BACKUP_COUNT", "5"))
+
+# Staged block look-ahead for catch-up sync (off by default). When enabled, a
+# background stage fetches, filters and decodes the next BLOCK_LOOKAHEAD_DEPTH
+# blocks into TxResult lists while follow() writes and hashes the current one.
+# Everything consensus-visible (tx_index, stamp numbering, balances, hashes)
+# still runs in order on the main loop; a prepared block is only used when its
+# block hash, CP issuances and filter height still match at consume time, so a
+# reorg or CP refetch simply falls back to the inline path.
+BLOCK_LOOKAHEAD_ENABLED = os.environ.get("BLOCK_LOOKAHEAD_ENABLED", "false").lower() == "true"
+BLOCK_LOOKAHEAD_DEPTH = int(os.environ.get("BLOCK_LOOKAHEAD_DEPTH", "4"))
+BLOCK_LOOKAHEAD_DECODE_WORKERS = int(os.environ.get("BLOCK_LOOKAHEAD_DECODE_WORKERS", "3"))
+
 # Consensus error handling
 MAX_CONSENSUS_RETRIES = int(os.environ.get("MAX_CONSENSUS_RETRIES", "3"))  # Maximum retries for consensus hash mismatches
 
 # Market Data Configuration
 ENABLE_MARKET_DATA_SCHEDULER = os.getenv("ENABLE_MARKET_DATA_SCHEDULER", "false").lower() == "true"
 
+# Due-time stamp market data queue (off by default). Every write to
+# stamp_market_data stores next_update_at from the stamp's activity level, and
+# the scheduler selects due stamps with one (activity_level, next_update_at)
+# range scan per tier instead of scanning StampTableV4. Stamps without market
+# data are found MARKET_DATA_NEW_STAMP_WINDOW stamp numbers at a time.
+MARKET_DATA_DUE_QUEUE_ENABLED = os.environ.get("MARKET_DATA_DUE_QUEUE_ENABLED", "false").lower() == "true"
+MARKET_DATA_NEW_STAMP_WINDOW = int(os.environ.get("MARKET_DATA_NEW_STAMP_WINDOW", "20000"))
+
+# Batched stamp market data collection (off by default). Each scheduler batch
+# reads the bulk dispenser snapshot once, sums sales volumes for all its stamps
+# in one grouped query, fetches balances on MARKET_DATA_STAMP_FETCH_WORKERS
+# threads (still under the shared Counterparty rate limiter) and writes the
+# stamp_market_data rows with multi-row upserts.
+MARKET_DATA_BATCH_COLLECTION_ENABLED = os.environ.get("MARKET_DATA_BATCH_COLLECTION_ENABLED", "false").lower() == "true"
+MARKET_DATA_STAMP_FETCH_WORKERS = int(os.environ.get("MARKET_DATA_STAMP_FETCH_WORKERS", "4"))
+
+# Set-based collection market data (off by default). The collection job
+# computes floor, volumes, distinct holders and top-holder share with one
+# INSERT ... SELECT per COLLECTION_AGGREGATION_CHUNK collections instead of
+# per-stamp holder queries. The first run covers every collection; later runs
+# only collections whose member stamps changed since the previous run.
+COLLECTION_SET_AGGREGATION_ENABLED = os.environ.get("COLLECTION_SET_AGGREGATION_ENABLED", "false").lower() == "true"
+COLLECTION_AGGREGATION_CHUNK = int(os.environ.get("COLLECTION_AGGREGATION_CHUNK", "500"))
+
 # Single source of truth for the sales-history catchup toggle. Both the sales
 # history processor and the market-data job scheduler read this value so their
 # behavior can never diverge. Public-safe default: disabled (prod sets it
@@ -366,6 +430,110 @@ logger.info(f"Final RPC URL format: {masked_url}")
 # RPC Tuning - can be overridden via environment variables to handle node overload
 RPC_BATCH_SIZE = int(os.environ.get("RPC_BATCH_SIZE", 75))  # Batch size for RPC calls (reduce if getting 503s)
 
+# bitcoind's binary REST interface (needs `-rest=1` on the node). Serves a block
+# as raw bytes from /rest/block/<hash>.bin instead of the hex-in-JSON payload of
+# `getblock <hash> 0`, halving the transfer and skipping the JSON encode/decode.
+# REST is unauthenticated, so the URL defaults to the RPC host/port without
+# credentials; Quicknode has no REST endpoint and always falls back to RPC.
+BACKEND_REST_ENABLED = os.environ.get("BACKEND_REST_ENABLED", "false").lower() == "true"
+BACKEND_REST_URL = os.environ.get("BACKEND_REST_URL") or (
+    f"{'https' if RPC_TLS else 'http'}://{RPC_IP}:{RPC_PORT}" if RPC_IP and RPC_PORT else None
+)
+
+# Bitcoin block prefetch (off by default). Keeps the raw bytes of the next
+# BTC_BLOCK_PREFETCH_DEPTH blocks downloaded ahead of follow(), bounded by
+# BTC_BLOCK_PREFETCH_MAX_BYTES. Buffered blocks are keyed by block hash, so a
+# reorg can never hand out the wrong block; it just turns into a miss.
+BTC_BLOCK_PREFETCH_ENABLED = os.environ.get("BTC_BLOCK_PREFETCH_ENABLED", "false").lower() == "true"
+BTC_BLOCK_PREFETCH_DEPTH = int(os.environ.get("BTC_BLOCK_PREFETCH_DEPTH", "8"))
+BTC_BLOCK_PREFETCH_MAX_BYTES = int(os.environ.get("BTC_BLOCK_PREFETCH_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Local prevout index (off by default). A SQLite file mapping (txid, vout) to
+# (value, scriptPubKey), filled from every block follow() downloads, so fee and
+# source derivation read parent outputs locally instead of fetching and
+# deserializing each parent transaction over RPC. Outputs created before the
+# index was enabled are misses and fall back to RPC. Spent outputs are kept for
+# PREVOUT_INDEX_UNDO_DEPTH blocks so purge_block_db can roll the index back.
+PREVOUT_INDEX_ENABLED = os.environ.get("PREVOUT_INDEX_ENABLED", "false").lower() == "true"
+PREVOUT_INDEX_PATH = os.environ.get("PREVOUT_INDEX_PATH") or None
+PREVOUT_INDEX_UNDO_DEPTH = int(os.environ.get("PREVOUT_INDEX_UNDO_DEPTH", "144"))
+
+# Local CP response archive (off by default). A SQLite file of compressed
+# Counterparty block responses (transactions, issuances, dispenses) written by
+# the CP blocks pipeline once a block has CP_ARCHIVE_MIN_CONFIRMATIONS
+# confirmations and read before any CP API fetch, so restarts, reparses and
+# fallback re-runs over blocks already seen don't hit the API again. Rolled
+# back with purge_block_db on reorgs.
+CP_ARCHIVE_ENABLED = os.environ.get("CP_ARCHIVE_ENABLED", "false").lower() == "true"
+CP_ARCHIVE_PATH = os.environ.get("CP_ARCHIVE_PATH") or None
+CP_ARCHIVE_MIN_CONFIRMATIONS = int(os.environ.get("CP_ARCHIVE_MIN_CONFIRMATIONS", "6"))
+CP_ARCHIVE_COMPRESSION_LEVEL = int(os.environ.get("CP_ARCHIVE_COMPRESSION_LEVEL", "6"))
+
+# Process-pool candidate decoding (off by default). Blocks with at least
+# DECODE_PROCESS_POOL_MIN_CANDIDATES candidates are decoded in
+# DECODE_PROCESS_POOL_WORKERS worker processes instead of the 3-thread pool,
+# which is GIL-bound on large OLGA/multisig blocks. Prevout lookups (fee and
+# source) stay in the main process; results are identical to process_tx.
+DECODE_PROCESS_POOL_ENABLED = os.environ.get("DECODE_PROCESS_POOL_ENABLED", "false").lower() == "true"
+DECODE_PROCESS_POOL_WORKERS = int(os.environ.get("DECODE_PROCESS_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+DECODE_PROCESS_POOL_MIN_CANDIDATES = int(os.environ.get("DECODE_PROCESS_POOL_MIN_CANDIDATES", "200"))
+
+# Range reparse (index_core.reparse.parallel). The stateless stage of each
+# block (node/CP fetch, filtering, decoding) runs on REPARSE_WORKERS processes
+# in chunks of REPARSE_CHUNK_SIZE blocks; progress and blocks/sec are written
+# to the snapshot metadata every REPARSE_CHECKPOINT_INTERVAL blocks so an
+# interrupted run resumes where it stopped.
+REPARSE_WORKERS = int(os.environ.get("REPARSE_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+REPARSE_CHUNK_SIZE = int(os.environ.get("REPARSE_CHUNK_SIZE", "10"))
+REPARSE_CHECKPOINT_INTERVAL = int(os.environ.get("REPARSE_CHECKPOINT_INTERVAL", "1000"))
+
+# SRC-20 balance and SRC-101 owner journal (off by default). Every block's
+# balance and owners changes are journaled with the prior row state, and a
+# (row count, checksum) snapshot of both tables is kept every
+# BALANCE_SNAPSHOT_INTERVAL blocks. Startup then verifies balances and owners
+# against the latest snapshots instead of replaying the whole SRC20Valid and
+# SRC101Valid histories, and purge_block_db reverts both from the journal.
+# Journal rows older than BALANCE_JOURNAL_DEPTH blocks are pruned; rollbacks
+# deeper than that fall back to the full rebuild.
+BALANCE_JOURNAL_ENABLED = os.environ.get("BALANCE_JOURNAL_ENABLED", "false").lower() == "true"
+BALANCE_SNAPSHOT_INTERVAL = int(os.environ.get("BALANCE_SNAPSHOT_INTERVAL", "100"))
+BALANCE_JOURNAL_DEPTH = int(os.environ.get("BALANCE_JOURNAL_DEPTH", "1000"))
+
+# Incremental SRC-20 holder counters (off by default). holder_count,
+# total_minted, progress_percentage and total_mints in src20_market_data are
+# updated from each block's balance deltas in the block's transaction instead
+# of by aggregate UPDATE...JOINs after commit. The counters are reconciled with
+# the aggregate query after rebuild_balances and by HolderCountCatchupJob, which
+# checks SRC20_HOLDER_VERIFY_BATCH ticks per run.
+SRC20_HOLDER_COUNTERS_ENABLED = os.environ.get("SRC20_HOLDER_COUNTERS_ENABLED", "false").lower() == "true"
+SRC20_HOLDER_VERIFY_BATCH = int(os.environ.get("SRC20_HOLDER_VERIFY_BATCH", "200"))
+
+# Streaming balance rebuild (off by default). A full rebuild_balances reads
+# SRC20Valid through an unbuffered server-side cursor and aggregates into
+# fixed-point integers per (tick, address), so memory is bounded by the number
+# of live balances instead of the length of the history.
+BALANCE_REBUILD_STREAMING = os.environ.get("BALANCE_REBUILD_STREAMING", "false").lower() == "true"
+
+# Off-critical-path dispense ingestion (off by default; only with
+# ENABLE_MARKET_DATA_SCHEDULER). Each block's CP dispenses are fetched alongside
+# its CP transactions by the pipeline, and stored into stamp_sales_history by a
+# background writer on its own connection after the block commits, instead of a
+# synchronous API call inside finalize_block. The writer keeps its own
+# checkpoint and backfills up to DISPENSE_WRITER_MAX_BACKFILL missed blocks.
+DISPENSE_PIPELINE_ENABLED = os.environ.get("DISPENSE_PIPELINE_ENABLED", "false").lower() == "true"
+DISPENSE_WRITER_MAX_BACKFILL = int(os.environ.get("DISPENSE_WRITER_MAX_BACKFILL", "100"))
+
+# Bulk historical dispense ingestion (off by default). The full sales history
+# catchup fetches chunks of SALES_HISTORY_BULK_CHUNK_BLOCKS blocks' dispenses on
+# SALES_HISTORY_BULK_WORKERS threads, keeps only stamps via one preloaded
+# cpid -> stamp map, and loads the deduplicated sales with multi-row INSERT
+# IGNORE statements of SALES_HISTORY_BULK_INSERT_BATCH rows. The
+# "dispenser_block" checkpoint commits with each chunk, so a restart resumes.
+SALES_HISTORY_BULK_INGEST_ENABLED = os.environ.get("SALES_HISTORY_BULK_INGEST_ENABLED", "false").lower() == "true"
+SALES_HISTORY_BULK_WORKERS = int(os.environ.get("SALES_HISTORY_BULK_WORKERS", "8"))
+SALES_HISTORY_BULK_CHUNK_BLOCKS = int(os.environ.get("SALES_HISTORY_BULK_CHUNK_BLOCKS", "500"))
+SALES_HISTORY_BULK_INSERT_BATCH = int(os.environ.get("SALES_HISTORY_BULK_INSERT_BATCH", "1000"))
+
 # Add new constants for the V2 CP API endpoints
 # Build XCP_V2_NODES from the parsed node configuration
 XCP_V2_NODES = []
@@ -495,6 +663,10 @@ CP_LOCAL_NODE_LIMIT = float(os.environ.get("CP_LOCAL_NODE_LIMIT", "50"))  # req/
 # this, asyncio.gather() in _fetch_blocks_range_async can burst 100+
 # simultaneous fetches during initial sync.
 CP_MAX_CONCURRENT = int(os.environ.get("CP_MAX_CONCURRENT", "4"))
+# Connection pool of the shared CP client (index_core.cp_client): one
+# keep-alive pool per node, idle connections closed after the timeout.
+CP_CLIENT_CONNECTIONS_PER_NODE = int(os.environ.get("CP_CLIENT_CONNECTIONS_PER_NODE", "10"))
+CP_CLIENT_KEEPALIVE_TIMEOUT = float(os.environ.get("CP_CLIENT_KEEPALIVE_TIMEOUT", "30"))
 # Testing override: when true, force-route every CP call to the public
 # api.counterparty.io endpoint regardless of local-node health. Used to
 # validate rate-limit behavior in non-prod environments.
@@ -524,6 +696,15 @@ try:
 except ValueError:
     STARTUP_CHAIN_INTEGRITY_DEPTH = 100
 
+# Number of recent block headers follow() keeps in memory (index_core.header_chain)
+# to check each block's parent without asking bitcoind. Below the tip a block is
+# verified against the previousblockhash of its fetched raw block; at the tip and
+# on ZMQ notifications bitcoind is still consulted. Set to 0 to always consult it.
+try:
+    HEADER_CHAIN_LENGTH = int(os.environ.get("HEADER_CHAIN_LENGTH", "2016"))
+except ValueError:
+    HEADER_CHAIN_LENGTH = 2016
+
 # Enable background validation of SRC-20 blocks processed with FORCE=True
 ENABLE_SRC20_BACKGROUND_VALIDATION = bool(os.environ.get("ENABLE_SRC20_BACKGROUND_VALIDATION", "true").lower() == "true")
 
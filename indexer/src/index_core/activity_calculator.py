@@ -4,12 +4,22 @@ Activity level calculator for stamp market data optimization.
 This module manages the activity-based update intervals for stamps,
 dramatically reducing API calls by updating active stamps frequently
 and inactive stamps rarely.
+
+get_stamps_needing_update selects due stamps with OR-of-intervals predicates
+over StampTableV4 LEFT JOIN stamp_market_data, which cannot use an index and
+scans every stamp on each scheduler tick. With MARKET_DATA_DUE_QUEUE_ENABLED
+each market data write stores next_update_at (last write plus the interval of
+the stamp's activity level) and get_due_stamps reads the queue instead: one
+(activity_level, next_update_at) range scan per tier with a per-tier quota,
+plus a window of stamp numbers for stamps that have no market data yet.
 """
 
 import logging
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import config
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +34,30 @@ class ActivityLevel(Enum):
     COLD = "COLD"  # No activity
 
 
+# Due stamps of one tier, most overdue first; NULL (never scheduled) sorts first
+DUE_TIER_SQL = """
+    SELECT smd.cpid, s.stamp
+    FROM stamp_market_data smd
+    JOIN StampTableV4 s ON s.cpid = smd.cpid AND s.ident IN ('STAMP', 'SRC-721')
+    WHERE smd.activity_level = %s
+    AND (smd.next_update_at IS NULL OR smd.next_update_at <= NOW())
+    ORDER BY smd.next_update_at ASC
+    LIMIT %s
+"""
+
+# Stamps without a market data row inside a window of stamp numbers
+NEW_STAMPS_SQL = """
+    SELECT s.cpid, s.stamp
+    FROM StampTableV4 s
+    LEFT JOIN stamp_market_data smd ON smd.cpid = s.cpid
+    WHERE s.stamp > %s AND s.stamp <= %s
+    AND s.ident IN ('STAMP', 'SRC-721')
+    AND smd.cpid IS NULL
+    ORDER BY s.stamp ASC
+    LIMIT %s
+"""
+
+
 class StampActivityCalculator:
     """Calculate and manage stamp activity levels"""
 
@@ -36,6 +70,38 @@ class StampActivityCalculator:
         ActivityLevel.COLD: 10080,  # 7 days
     }
 
+    # Share of each due-queue selection per tier, in priority order (None: stamps
+    # without market data). Capacity a tier leaves unused goes to the next tiers.
+    DUE_QUEUE_QUOTAS: Tuple[Tuple[Optional[ActivityLevel], float], ...] = (
+        (ActivityLevel.HOT, 0.3),
+        (ActivityLevel.WARM, 0.2),
+        (ActivityLevel.COOL, 0.15),
+        (None, 0.15),
+        (ActivityLevel.DORMANT, 0.1),
+        (ActivityLevel.COLD, 0.1),
+    )
+
+    # Last stamp number checked for missing market data; the next window starts after it
+    _new_stamp_cursor: Optional[int] = None
+
+    @staticmethod
+    def next_update_sql(base: str = "NOW()", level_column: str = "activity_level") -> str:
+        """
+        SQL expression for when a stamp becomes due again.
+
+        Args:
+            base: SQL expression of the time of the market data write
+            level_column: SQL expression of the stamp's activity level
+
+        Returns:
+            ``base`` plus the update interval of the level, in minutes
+        """
+        cases = " ".join(
+            f"WHEN '{level.value}' THEN {minutes}" for level, minutes in StampActivityCalculator.UPDATE_INTERVALS.items()
+        )
+        cold_minutes = StampActivityCalculator.UPDATE_INTERVALS[ActivityLevel.COLD]
+        return f"DATE_ADD({base}, INTERVAL CASE {level_column} {cases} ELSE {cold_minutes} END MINUTE)"
+
     @staticmethod
     def calculate_activity_level(last_sale_time: Optional[int], has_active_dispensers: bool = False) -> ActivityLevel:
         """
@@ -113,6 +179,9 @@ class StampActivityCalculator:
         Returns:
             Dict of cpid -> (stamp_id, activity_level)
         """
+        if config.MARKET_DATA_DUE_QUEUE_ENABLED:
+            return StampActivityCalculator.get_due_stamps(db, limit)
+
         try:
             results = {}
 
@@ -206,6 +275,84 @@ class StampActivityCalculator:
             logger.error(f"Error getting stamps needing update: {e}")
             return {}
 
+    @staticmethod
+    def get_due_stamps(db, limit: int = 1000) -> Dict[str, Tuple[str, ActivityLevel]]:
+        """
+        Get due stamps from the next_update_at queue with per-tier quotas.
+
+        Every query is an index range scan bounded by its quota, so the cost
+        follows the size of the selection rather than the number of stamps.
+        Stamps without market data are reported as COLD, like the legacy query.
+
+        Args:
+            db: Database connection
+            limit: Maximum stamps to return
+
+        Returns:
+            Dict of cpid -> (stamp_id, activity_level)
+        """
+        try:
+            results: Dict[str, Tuple[str, ActivityLevel]] = {}
+            quotas = [(level, int(limit * share)) for level, share in StampActivityCalculator.DUE_QUEUE_QUOTAS]
+
+            with db.cursor() as cursor:
+                # Every tier up to its own quota
+                filled = []
+                for level, quota in quotas:
+                    rows = StampActivityCalculator._fetch_tier(cursor, level, quota) if quota > 0 else []
+                    for cpid, stamp in rows:
+                        results.setdefault(cpid, (stamp, level or ActivityLevel.COLD))
+                    filled.append((level, quota, len(rows) >= quota))
+
+                # Capacity left by short tiers goes to the full ones, in priority order
+                for level, quota, full in filled:
+                    spare = limit - len(results)
+                    if spare <= 0:
+                        break
+                    if level is None or not full:
+                        continue
+                    for cpid, stamp in StampActivityCalculator._fetch_tier(cursor, level, quota + spare):
+                        if cpid not in results:
+                            results[cpid] = (stamp, level)
+                            if len(results) >= limit:
+                                break
+
+            level_counts: Dict[str, int] = {}
+            for _, level in results.values():
+                level_counts[level.value] = level_counts.get(level.value, 0) + 1
+            logger.debug(f"Found {len(results)} due stamps: {level_counts}")
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Error getting due stamps: {e}")
+            return {}
+
+    @classmethod
+    def _fetch_tier(cls, cursor, level: Optional[ActivityLevel], limit: int) -> List[Tuple[str, str]]:
+        """Due (cpid, stamp) rows of one tier; ``level`` None walks the stamps without market data."""
+        if level is not None:
+            cursor.execute(DUE_TIER_SQL, (level.value, limit))
+            return list(cursor.fetchall())
+
+        cursor.execute("SELECT MIN(stamp), MAX(stamp) FROM StampTableV4")
+        lowest, highest = cursor.fetchone() or (None, None)
+        if lowest is None:
+            return []
+        start = cls._new_stamp_cursor
+        if start is None or start >= highest:
+            start = lowest - 1
+        end = start + config.MARKET_DATA_NEW_STAMP_WINDOW
+
+        cursor.execute(NEW_STAMPS_SQL, (start, end, limit))
+        rows = list(cursor.fetchall())
+        if len(rows) >= limit:
+            # Window not exhausted: continue after the last stamp returned
+            cls._new_stamp_cursor = rows[-1][1]
+        else:
+            cls._new_stamp_cursor = end if end < highest else None
+        return rows
+
     @staticmethod
     def update_activity_on_sale(cpid: str, db) -> None:
         """
@@ -268,7 +415,8 @@ class StampActivityCalculator:
                             last_sale_dispenser_address = %s,
                             last_sale_btc_amount = %s,
                             last_sale_dispenser_tx_hash = %s,
-                            last_updated = CURRENT_TIMESTAMP
+                            last_updated = CURRENT_TIMESTAMP,
+                            next_update_at = DATE_ADD(NOW(), INTERVAL %s MINUTE)
                         WHERE cpid = %s
                     """,
                         (
@@ -283,6 +431,7 @@ class StampActivityCalculator:
                             sales_data[8],
                             sales_data[9],
                             sales_data[10],
+                            StampActivityCalculator.UPDATE_INTERVALS[ActivityLevel.HOT],
                             cpid,
                         ),
                     )
@@ -302,10 +451,11 @@ class StampActivityCalculator:
                         SET
                             activity_level = 'HOT',
                             last_activity_time = UNIX_TIMESTAMP(),
-                            last_updated = CURRENT_TIMESTAMP
+                            last_updated = CURRENT_TIMESTAMP,
+                            next_update_at = DATE_ADD(NOW(), INTERVAL %s MINUTE)
                         WHERE cpid = %s
                     """,
-                        (cpid,),
+                        (StampActivityCalculator.UPDATE_INTERVALS[ActivityLevel.HOT], cpid),
                     )
 
                     if cursor.rowcount > 0:
@@ -326,26 +476,40 @@ class StampActivityCalculator:
         """
         try:
             with db.cursor() as cursor:
+                # next_update_at is assigned first, while activity_level still holds the
+                # old level, and is rescheduled from the last write only on a change
                 if has_dispensers:
                     # Upgrade COLD stamps to DORMANT
                     cursor.execute(
                         """
                         UPDATE stamp_market_data
-                        SET activity_level =
+                        SET next_update_at =
+                            IF(activity_level = 'COLD', DATE_ADD(last_updated, INTERVAL %s MINUTE), next_update_at),
+                        activity_level =
                             CASE
                                 WHEN activity_level = 'COLD' THEN 'DORMANT'
                                 ELSE activity_level
                             END
                         WHERE cpid = %s
                     """,
-                        (cpid,),
+                        (StampActivityCalculator.UPDATE_INTERVALS[ActivityLevel.DORMANT], cpid),
                     )
                 else:
                     # Downgrade DORMANT stamps with no recent sales to COLD
                     cursor.execute(
                         """
                         UPDATE stamp_market_data
-                        SET activity_level =
+                        SET next_update_at =
+                            IF(
+                                activity_level = 'DORMANT' AND NOT EXISTS (
+                                    SELECT 1 FROM stamp_sales_history
+                                    WHERE cpid = %s
+                                    AND block_time > UNIX_TIMESTAMP() - 2592000
+                                ),
+                                DATE_ADD(last_updated, INTERVAL %s MINUTE),
+                                next_update_at
+                            ),
+                        activity_level =
                             CASE
                                 WHEN activity_level = 'DORMANT'
                                 AND NOT EXISTS (
@@ -357,7 +521,7 @@ class StampActivityCalculator:
                             END
                         WHERE cpid = %s
                     """,
-                        (cpid, cpid),
+                        (cpid, StampActivityCalculator.UPDATE_INTERVALS[ActivityLevel.COLD], cpid, cpid),
                     )
 
         except Exception as e:
@@ -2,6 +2,7 @@ import collections
 import concurrent.futures
 import functools
 import gc
+import hashlib
 import importlib
 import json
 import logging
@@ -12,7 +13,7 @@ from typing import Any, Dict, List, Optional
 
 import psutil
 import requests
-from bitcoin.core import CBlock, CTransaction, x
+from bitcoin.core import CBlock, CTransaction, b2lx, x
 from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, Timeout
 from urllib3.util.retry import Retry
@@ -21,6 +22,7 @@ from urllib3.util.ssl_ import create_urllib3_context
 import config
 import index_core.util as util
 from exceptions import BackendRPCError
+from index_core.cache_types import TxByteCache
 from index_core.caching import LRUCache, cache_manager
 from index_core.memory_manager import memory_manager
 from index_core.parser import RUST_PARSER_AVAILABLE, Parser
@@ -31,6 +33,9 @@ gc.set_threshold(25000, 10, 10)  # Adjust primary threshold for less frequent co
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Rough in-memory size of a deserialized transaction per byte of its serialization
+DESERIALIZED_TX_BYTES_PER_RAW_BYTE = 4
+
 
 class Backend:
     """Backend interface for Bitcoin RPC and transaction parsing."""
@@ -77,8 +82,14 @@ class Backend:
             return
 
         # Initialize caches
-        self.raw_transactions_cache = LRUCache[Any](max_size=config.BACKEND_RAW_TRANSACTIONS_CACHE_SIZE)
-        self.deserialized_tx_cache = LRUCache[Any](max_size=config.DESERIALIZED_TX_CACHE_SIZE)
+        # Keyed by 32-byte digests and bounded by bytes: raw transactions are kept as
+        # bytes (keyed by txid), deserialized ones by sha256 of their serialization
+        self.raw_transactions_cache = TxByteCache[bytes](
+            max_bytes=config.BACKEND_RAW_TRANSACTIONS_CACHE_BYTES, max_entries=config.BACKEND_RAW_TRANSACTIONS_CACHE_SIZE
+        )
+        self.deserialized_tx_cache = TxByteCache[Any](
+            max_bytes=config.DESERIALIZED_TX_CACHE_BYTES, max_entries=config.DESERIALIZED_TX_CACHE_SIZE
+        )
 
         # Block count cache with small size (we only need the latest)
         self.blockcount_cache = LRUCache[Any](max_size=1)
@@ -112,6 +123,11 @@ class Backend:
         # Initialize memory manager
         self.memory_manager = memory_manager
 
+        # Optional BlockPrefetcher (index_core.block_prefetch) consulted by
+        # get_tx_list before going to the node; installed by follow().
+        self.block_prefetcher = None
+        self._rest_failures = 0
+
         # Initialize optimized SSL session.
         # ``_session_lock`` guards rotation of the pooled session so that a
         # bitcoind restart (which leaves stale CLOSE-WAIT sockets in the
@@ -513,8 +529,12 @@ class Backend:
         Deserialize a transaction hex string into a CTransaction object.
         Uses Rust parser if available for better performance.
         """
+        raw_tx = x(tx_hex)
+        cache_key = hashlib.sha256(raw_tx).digest()
+        size = len(raw_tx) * DESERIALIZED_TX_BYTES_PER_RAW_BYTE
+
         # Check cache first, get() will track both hits and misses
-        cached_tx = self.deserialized_tx_cache.get(tx_hex)
+        cached_tx = self.deserialized_tx_cache.get(cache_key)
         if cached_tx is not None:
             return cached_tx
 
@@ -522,22 +542,109 @@ class Backend:
             try:
                 # Use Rust parser for better performance
                 tx = self._parser.deserialize_transaction(tx_hex)
-                self.deserialized_tx_cache.set(tx_hex, tx)
+                self.deserialized_tx_cache.set(cache_key, tx, size)
                 return tx
             except Exception as e:
                 logger.warning(f"Rust parser failed: {e}. Falling back to Python parser")
 
         # Fallback to Python parser
-        ctx = CTransaction.deserialize(x(tx_hex))
-        self.deserialized_tx_cache.set(tx_hex, ctx)
+        ctx = CTransaction.deserialize(raw_tx)
+        self.deserialized_tx_cache.set(cache_key, ctx, size)
         return ctx
 
     def serialize(self, ctx):
         return CTransaction.serialize(ctx)
 
+    def getblock_raw(self, block_hash: str) -> bytes:
+        """
+        Return the serialized block as raw bytes.
+
+        Uses bitcoind's binary REST endpoint when BACKEND_REST_ENABLED is set and
+        falls back to ``getblock <hash> 0`` over JSON-RPC otherwise, or whenever
+        the REST fetch fails.
+        """
+        if config.BACKEND_REST_ENABLED and config.BACKEND_REST_URL and self._rest_failures < self.REST_MAX_FAILURES:
+            raw_block = self._getblock_rest(block_hash)
+            if raw_block is not None:
+                return raw_block
+        return bytes.fromhex(self.rpc("getblock", [block_hash, 0]))
+
+    # Consecutive REST failures after which REST is skipped for the process
+    REST_MAX_FAILURES = 3
+
+    def _getblock_rest(self, block_hash: str) -> Optional[bytes]:
+        """Fetch a block from /rest/block/<hash>.bin, returning None on any failure."""
+        url = f"{config.BACKEND_REST_URL.rstrip('/')}/rest/block/{block_hash}.bin"
+        try:
+            response = self._session.get(url, timeout=self._get_rpc_timeout())
+            if response.status_code == 200 and response.content:
+                self._rest_failures = 0
+                return response.content
+            logger.warning(f"REST block fetch for {block_hash} returned {response.status_code}; using RPC")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"REST block fetch for {block_hash} failed: {e}; using RPC")
+
+        self._rest_failures += 1
+        if self._rest_failures >= self.REST_MAX_FAILURES:
+            logger.warning(
+                f"REST block fetch failed {self._rest_failures} times in a row; "
+                f"falling back to RPC for the rest of this run (is bitcoind running with -rest=1?)"
+            )
+        return None
+
+    def parse_raw_block(self, raw_block: bytes):
+        """
+        Parse a serialized block into the tuple returned by get_tx_list.
+
+        The Rust parser takes the bytes directly. The python-bitcoinlib fallback
+        derives the difficulty from nBits the way bitcoind's GetDifficulty does,
+        rounded to the 16 significant digits bitcoind prints in JSON.
+        """
+        if self._parser is not None:
+            try:
+                return self._parser.parse_block_bytes(raw_block)
+            except Exception as e:
+                logger.warning(f"Rust block parser failed: {e}. Falling back to Python parser")
+
+        block = CBlock.deserialize(raw_block)
+        tx_hash_list = []
+        raw_transactions = {}
+        for tx in block.vtx:
+            tx_hash = b2lx(tx.GetTxid())
+            tx_hash_list.append(tx_hash)
+            raw_transactions[tx_hash] = tx.serialize().hex()
+
+        return (
+            tx_hash_list,
+            raw_transactions,
+            block.nTime,
+            b2lx(block.hashPrevBlock),
+            self._difficulty_from_bits(block.nBits),
+        )
+
+    @staticmethod
+    def _difficulty_from_bits(bits: int) -> float:
+        """Port of bitcoind's GetDifficulty() for a compact nBits target."""
+        shift = (bits >> 24) & 0xFF
+        difficulty = float(0x0000FFFF) / float(bits & 0x00FFFFFF)
+        while shift < 29:
+            difficulty *= 256.0
+            shift += 1
+        while shift > 29:
+            difficulty /= 256.0
+            shift -= 1
+        return float(f"{difficulty:.16g}")
+
     def get_tx_list(self, block_hash):
         """Get transaction list from block using Rust parser if available."""
+        if self.block_prefetcher is not None:
+            raw_block = self.block_prefetcher.pop(block_hash)
+            if raw_block is not None:
+                return self.parse_raw_block(raw_block)
+
         if self._parser is not None:
+            if config.BACKEND_REST_ENABLED:
+                return self.parse_raw_block(self.getblock_raw(block_hash))
             try:
                 block_data = self.rpc("getblock", [block_hash, 0])  # Get raw block hex
                 # The Rust parser now returns a tuple directly
@@ -587,9 +694,9 @@ class Backend:
         noncached_txhashes = []
         cached_results = {}
         for tx_hash in txhash_list:
-            cached_tx = self.raw_transactions_cache.get(tx_hash)
+            cached_tx = None if verbose else self.raw_transactions_cache.get(bytes.fromhex(tx_hash))
             if cached_tx is not None:
-                cached_results[tx_hash] = cached_tx
+                cached_results[tx_hash] = cached_tx.hex()
             else:
                 noncached_txhashes.append(tx_hash)
 
@@ -630,7 +737,9 @@ class Backend:
                         else:
                             tx_hash = tx_hash_call_id[result["id"]]
                             tx_result = result["result"]
-                            self.raw_transactions_cache.set(tx_hash, tx_result)
+                            # Only raw hex is cached; verbose results are JSON objects
+                            if isinstance(tx_result, str):
+                                self.raw_transactions_cache.set(bytes.fromhex(tx_hash), bytes.fromhex(tx_result))
                             cached_results[tx_hash] = tx_result
 
                     # Check if garbage collection is needed
@@ -0,0 +1,510 @@
+"""
+SRC-20 balance and SRC-101 owner journals and snapshots.
+
+rebuild_balances replays the entire SRC20Valid history and compares it with the
+balances table. follow() runs it at every startup and after every rollback,
+which costs minutes on a mainnet database. With BALANCE_JOURNAL_ENABLED:
+
+- record_balance_deltas journals every balance row a block changes, with the
+  row's prior state, in the same DB transaction as the block.
+- take_balance_snapshot stores (row count, checksum) of the balances table
+  every BALANCE_SNAPSHOT_INTERVAL blocks, computed from the previous snapshot
+  plus the journal (no table scan).
+- verify_balance_snapshot checks the live balances table against the latest
+  snapshot plus the journal after it, so startup only needs one aggregate query.
+- rollback_balance_journal restores every changed row to its state before the
+  rollback height instead of replaying from genesis.
+
+The checksum is SUM(CRC32(CONCAT_WS('|', id, amt))) over non-zero SRC-20 rows;
+it is additive, so a journal row contributes crc(new) - crc(prev). Zero rows are
+excluded, which keeps clear_zero_balances invisible to the checksum.
+
+rebuild_owners has the same problem with the SRC101Valid history, and the
+owners table gets the same treatment under the same flag: record_owner_deltas
+journals the owners rows a block's update_owner_table call changed (the full
+prior row plus CRC32 of the row before and after) in owner_deltas,
+owner_snapshots holds the (row count, checksum) of the whole owners table, and
+rollback_owner_journal restores the prior rows. The owner checksum covers every
+owners column, and the journal stores the per-row CRCs computed by the same
+OWNER_ROW_CRC expression, so snapshot arithmetic never has to re-derive them.
+"""
+
+import logging
+from collections import defaultdict
+from decimal import Decimal as D
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+BALANCE_DELTAS_TABLE = "balance_deltas"
+BALANCE_SNAPSHOTS_TABLE = "balance_snapshots"
+OWNER_DELTAS_TABLE = "owner_deltas"
+OWNER_SNAPSHOTS_TABLE = "owner_snapshots"
+
+LIVE_CHECKSUM_SQL = """
+    SELECT COUNT(*), COALESCE(SUM(CRC32(CONCAT_WS('|', id, amt))), 0)
+    FROM balances
+    WHERE p = 'SRC-20' AND amt != 0
+"""
+
+# Contribution of journal rows in (after, upto] to the row count and checksum
+JOURNAL_DELTA_SQL = f"""
+    SELECT
+        COALESCE(SUM((new_amt != 0) - (prev_amt IS NOT NULL AND prev_amt != 0)), 0),
+        COALESCE(SUM(
+            CAST(IF(new_amt != 0, CRC32(CONCAT_WS('|', id, new_amt)), 0) AS SIGNED)
+            - CAST(IF(prev_amt IS NOT NULL AND prev_amt != 0, CRC32(CONCAT_WS('|', id, prev_amt)), 0) AS SIGNED)
+        ), 0)
+    FROM {BALANCE_DELTAS_TABLE}
+    WHERE block_index > %s AND block_index <= %s
+"""  # nosec
+
+# First journal row of every balance changed at or after a height: its prev_* columns
+# are the row's state before that height
+FIRST_DELTAS_SQL = f"""
+    SELECT d.id, d.address, d.tick, d.tick_hash, d.prev_amt, d.prev_locked_amt, d.prev_last_update, d.prev_block_time
+    FROM {BALANCE_DELTAS_TABLE} d
+    JOIN (
+        SELECT id, MIN(block_index) AS block_index
+        FROM {BALANCE_DELTAS_TABLE}
+        WHERE block_index >= %s
+        GROUP BY id
+    ) f ON f.id = d.id AND f.block_index = d.block_index
+"""  # nosec
+
+# owners columns besides id, journaled as prev_<column>
+OWNER_COLUMNS = (
+    "index",
+    "p",
+    "deploy_hash",
+    "tokenid",
+    "tokenid_utf8",
+    "img",
+    "preowner",
+    "owner",
+    "prim",
+    "address_btc",
+    "address_eth",
+    "txt_data",
+    "expire_timestamp",
+    "last_update",
+)
+
+# CRC32 of one owners row over every column
+OWNER_ROW_CRC = (
+    "CRC32(CONCAT_WS('|', id, owners.index, p, deploy_hash, tokenid, tokenid_utf8, img, preowner, owner, "
+    "prim, address_btc, address_eth, txt_data, expire_timestamp, last_update))"
+)
+
+OWNER_LIVE_CHECKSUM_SQL = f"""
+    SELECT COUNT(*), COALESCE(SUM({OWNER_ROW_CRC}), 0)
+    FROM owners
+"""  # nosec
+
+# Contribution of owner journal rows in (after, upto]; a NULL crc means the row did not exist
+OWNER_JOURNAL_DELTA_SQL = f"""
+    SELECT
+        COALESCE(SUM((new_crc IS NOT NULL) - (prev_crc IS NOT NULL)), 0),
+        COALESCE(SUM(CAST(COALESCE(new_crc, 0) AS SIGNED) - CAST(COALESCE(prev_crc, 0) AS SIGNED)), 0)
+    FROM {OWNER_DELTAS_TABLE}
+    WHERE block_index > %s AND block_index <= %s
+"""  # nosec
+
+# First owner journal row of every owners row changed at or after a height
+FIRST_OWNER_DELTAS_SQL = f"""
+    SELECT d.*
+    FROM {OWNER_DELTAS_TABLE} d
+    JOIN (
+        SELECT id, MIN(block_index) AS block_index
+        FROM {OWNER_DELTAS_TABLE}
+        WHERE block_index >= %s
+        GROUP BY id
+    ) f ON f.id = d.id AND f.block_index = d.block_index
+"""  # nosec
+
+MAX_BLOCK = 2**31 - 1
+
+
+def record_balance_deltas(db, block_index: int, balance_updates) -> None:
+    """
+    Journal the balance rows a block is about to change.
+
+    Must run before update_balance_table, inside the block's transaction.
+
+    Args:
+        db: Database connection.
+        block_index (int): Height of the block.
+        balance_updates (list): Entries from update_src20_balances (credit/debit per tick and address).
+    """
+    net_changes = defaultdict(D)
+    keys = {}
+    for balance_dict in balance_updates:
+        balance_id = f"{balance_dict['tick']}_{balance_dict['address']}"
+        net_changes[balance_id] += balance_dict.get("credit", D(0)) - balance_dict.get("debit", D(0))
+        keys[balance_id] = (balance_dict["address"], balance_dict["tick"], balance_dict["tick_hash"])
+    if not net_changes:
+        return
+
+    with db.cursor() as cursor:
+        placeholders = ",".join(["%s"] * len(net_changes))
+        cursor.execute(
+            f"SELECT id, amt, locked_amt, last_update, block_time FROM balances WHERE id IN ({placeholders})",  # nosec
+            tuple(net_changes),
+        )
+        previous = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        rows = []
+        for balance_id, net_change in net_changes.items():
+            address, tick, tick_hash = keys[balance_id]
+            prev_amt, prev_locked_amt, prev_last_update, prev_block_time = previous.get(balance_id, (None, None, None, None))
+            new_amt = (D(prev_amt) if prev_amt is not None else D(0)) + net_change
+            rows.append(
+                (
+                    block_index,
+                    balance_id,
+                    address,
+                    tick,
+                    tick_hash,
+                    prev_amt,
+                    prev_locked_amt,
+                    prev_last_update,
+                    prev_block_time,
+                    new_amt,
+                )
+            )
+
+        cursor.executemany(
+            f"""
+            INSERT INTO {BALANCE_DELTAS_TABLE}
+            (block_index, id, address, tick, tick_hash, prev_amt, prev_locked_amt, prev_last_update, prev_block_time, new_amt)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            AS new_row ON DUPLICATE KEY UPDATE
+                prev_amt = new_row.prev_amt,
+                prev_locked_amt = new_row.prev_locked_amt,
+                prev_last_update = new_row.prev_last_update,
+                prev_block_time = new_row.prev_block_time,
+                new_amt = new_row.new_amt
+            """,  # nosec
+            rows,
+        )
+
+
+def _latest_snapshot(
+    cursor, before: Optional[int] = None, table: str = BALANCE_SNAPSHOTS_TABLE
+) -> Optional[Tuple[int, int, int]]:
+    """Return (block_index, row_count, checksum) of the newest snapshot, optionally below ``before``."""
+    cursor.execute(
+        f"""
+        SELECT block_index, row_count, checksum FROM {table}
+        WHERE block_index < %s
+        ORDER BY block_index DESC LIMIT 1
+        """,  # nosec
+        (before if before is not None else MAX_BLOCK + 1,),
+    )
+    row = cursor.fetchone()
+    return (int(row[0]), int(row[1]), int(row[2])) if row else None
+
+
+def _journal_delta(cursor, after: int, upto: int = MAX_BLOCK, sql: str = JOURNAL_DELTA_SQL) -> Tuple[int, int]:
+    cursor.execute(sql, (after, upto))
+    row_count, checksum = cursor.fetchone()
+    return int(row_count), int(checksum)
+
+
+def _live_checksum(cursor, sql: str = LIVE_CHECKSUM_SQL) -> Tuple[int, int]:
+    cursor.execute(sql)
+    row_count, checksum = cursor.fetchone()
+    return int(row_count), int(checksum)
+
+
+def take_balance_snapshot(db, block_index: int) -> bool:
+    """
+    Store the balances (row count, checksum) as of ``block_index`` and prune the journal.
+
+    Computed from the previous snapshot plus the journal, inside the block's
+    transaction. Returns False when there is no snapshot to build on (the
+    journal has not been seeded by rebuild_balances yet).
+    """
+    return _take_snapshot(db, block_index, BALANCE_SNAPSHOTS_TABLE, BALANCE_DELTAS_TABLE, JOURNAL_DELTA_SQL, "Balance")
+
+
+def take_owner_snapshot(db, block_index: int) -> bool:
+    """take_balance_snapshot for the owners table (seeded by rebuild_owners)."""
+    return _take_snapshot(db, block_index, OWNER_SNAPSHOTS_TABLE, OWNER_DELTAS_TABLE, OWNER_JOURNAL_DELTA_SQL, "Owner")
+
+
+def _take_snapshot(db, block_index: int, snapshots_table: str, deltas_table: str, delta_sql: str, label: str) -> bool:
+    with db.cursor() as cursor:
+        latest = _latest_snapshot(cursor, before=block_index, table=snapshots_table)
+        if latest is None:
+            return False
+        latest_block, row_count, checksum = latest
+        delta_count, delta_checksum = _journal_delta(cursor, latest_block, block_index, delta_sql)
+        cursor.execute(
+            f"""
+            INSERT INTO {snapshots_table} (block_index, row_count, checksum)
+            VALUES (%s, %s, %s)
+            AS new_row ON DUPLICATE KEY UPDATE row_count = new_row.row_count, checksum = new_row.checksum
+            """,  # nosec
+            (block_index, row_count + delta_count, checksum + delta_checksum),
+        )
+
+        # Keep one snapshot at or below the horizon so rollbacks up to BALANCE_JOURNAL_DEPTH stay covered
+        horizon = _latest_snapshot(cursor, before=block_index - config.BALANCE_JOURNAL_DEPTH + 1, table=snapshots_table)
+        if horizon is not None:
+            cursor.execute(f"DELETE FROM {snapshots_table} WHERE block_index < %s", (horizon[0],))  # nosec
+            cursor.execute(f"DELETE FROM {deltas_table} WHERE block_index <= %s", (horizon[0],))  # nosec
+    logger.debug(f"{label} snapshot at block {block_index}: {row_count + delta_count} rows")
+    return True
+
+
+def verify_balance_snapshot(db) -> bool:
+    """Return True if the balances table matches the latest snapshot plus the journal after it."""
+    return _verify_snapshot(db, BALANCE_SNAPSHOTS_TABLE, JOURNAL_DELTA_SQL, LIVE_CHECKSUM_SQL, "Balances")
+
+
+def verify_owner_snapshot(db) -> bool:
+    """Return True if the owners table matches the latest owner snapshot plus the journal after it."""
+    return _verify_snapshot(db, OWNER_SNAPSHOTS_TABLE, OWNER_JOURNAL_DELTA_SQL, OWNER_LIVE_CHECKSUM_SQL, "Owners")
+
+
+def _verify_snapshot(db, snapshots_table: str, delta_sql: str, live_sql: str, label: str) -> bool:
+    with db.cursor() as cursor:
+        latest = _latest_snapshot(cursor, table=snapshots_table)
+        if latest is None:
+            logger.info(f"No {label.lower()} snapshot found")
+            return False
+        latest_block, row_count, checksum = latest
+        delta_count, delta_checksum = _journal_delta(cursor, latest_block, sql=delta_sql)
+        live_count, live_checksum = _live_checksum(cursor, live_sql)
+
+    expected = (row_count + delta_count, checksum + delta_checksum)
+    if (live_count, live_checksum) != expected:
+        logger.warning(
+            f"{label} do not match snapshot at block {latest_block}: "
+            f"{live_count} rows / checksum {live_checksum}, expected {expected[0]} rows / checksum {expected[1]}"
+        )
+        return False
+    logger.info(f"{label} match snapshot at block {latest_block} plus journal ({live_count} rows)")
+    return True
+
+
+def seed_balance_snapshot(db) -> None:
+    """Start a fresh journal from the current balances table, keyed by the last stored block."""
+    _seed_snapshot(db, BALANCE_SNAPSHOTS_TABLE, BALANCE_DELTAS_TABLE, LIVE_CHECKSUM_SQL, "balance")
+
+
+def seed_owner_snapshot(db) -> None:
+    """Start a fresh owner journal from the current owners table, keyed by the last stored block."""
+    _seed_snapshot(db, OWNER_SNAPSHOTS_TABLE, OWNER_DELTAS_TABLE, OWNER_LIVE_CHECKSUM_SQL, "owner")
+
+
+def _seed_snapshot(db, snapshots_table: str, deltas_table: str, live_sql: str, label: str) -> None:
+    with db.cursor() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(block_index), 0) FROM blocks")
+        block_index = int(cursor.fetchone()[0])
+        row_count, checksum = _live_checksum(cursor, live_sql)
+        cursor.execute(f"DELETE FROM {deltas_table}")  # nosec
+        cursor.execute(f"DELETE FROM {snapshots_table}")  # nosec
+        cursor.execute(
+            f"INSERT INTO {snapshots_table} (block_index, row_count, checksum) VALUES (%s, %s, %s)",  # nosec
+            (block_index, row_count, checksum),
+        )
+    db.commit()
+    logger.info(f"Seeded {label} snapshot at block {block_index}: {row_count} rows")
+
+
+def rollback_balance_journal(cursor, block_index: int) -> bool:
+    """
+    Revert balances to their state before ``block_index`` using the journal.
+
+    Runs inside purge_block_db's transaction. If no snapshot predates
+    ``block_index`` the journal can't cover the rollback: it is dropped so the
+    following rebuild_balances falls back to a full rebuild and reseeds.
+
+    Returns:
+        bool: True if balances were reverted from the journal.
+    """
+    if _latest_snapshot(cursor, before=block_index) is None:
+        logger.warning(f"Balance journal does not reach block {block_index}; balances need a full rebuild")
+        cursor.execute(f"DELETE FROM {BALANCE_DELTAS_TABLE}")  # nosec
+        cursor.execute(f"DELETE FROM {BALANCE_SNAPSHOTS_TABLE}")  # nosec
+        return False
+
+    cursor.execute(
+        f"""
+        INSERT INTO balances (id, address, tick, tick_hash, amt, locked_amt, last_update, block_time, p)
+        SELECT * FROM (
+            SELECT id, address, tick, tick_hash, prev_amt, prev_locked_amt, prev_last_update, prev_block_time,
+                   'SRC-20' AS p
+            FROM ({FIRST_DELTAS_SQL}) first_deltas
+            WHERE prev_amt IS NOT NULL
+        ) AS prev
+        ON DUPLICATE KEY UPDATE
+            amt = prev.prev_amt,
+            locked_amt = prev.prev_locked_amt,
+            last_update = prev.prev_last_update,
+            block_time = prev.prev_block_time
+        """,  # nosec
+        (block_index,),
+    )
+    restored = cursor.rowcount
+    cursor.execute(
+        f"""
+        DELETE b FROM balances b
+        JOIN ({FIRST_DELTAS_SQL}) first_deltas ON first_deltas.id = b.id
+        WHERE first_deltas.prev_amt IS NULL
+        """,  # nosec
+        (block_index,),
+    )
+    created = cursor.rowcount
+    cursor.execute(f"DELETE FROM {BALANCE_DELTAS_TABLE} WHERE block_index >= %s", (block_index,))  # nosec
+    cursor.execute(f"DELETE FROM {BALANCE_SNAPSHOTS_TABLE} WHERE block_index >= %s", (block_index,))  # nosec
+    logger.warning(f"Reverted balances from journal to block {block_index}: {restored} restored, {created} removed")
+    return True
+
+
+def _owner_keys(owner_updates) -> Tuple[List[str], List[Tuple[Any, ...]], List[Tuple[Any, ...]]]:
+    """The ids, (p, deploy_hash, tokenid_utf8) keys and prim-clearing (address_btc, deploy_hash) pairs of owner updates."""
+    ids: Dict[str, str] = {}
+    name_keys = set()
+    prim_pairs = set()
+    for owner_dict in owner_updates:
+        # Same id as update_owner_table
+        owner_id = owner_dict["p"] + "_" + owner_dict["deploy_hash"] + "_" + owner_dict["tokenid"]
+        ids[owner_id.casefold()] = owner_id
+        if owner_dict["p"] is not None and owner_dict["tokenid_utf8"] is not None:
+            name_keys.add((owner_dict["p"], owner_dict["deploy_hash"], owner_dict["tokenid_utf8"]))
+        if owner_dict["prim"] and owner_dict["address_btc"] is not None:
+            prim_pairs.add((owner_dict["address_btc"], owner_dict["deploy_hash"]))
+    return list(ids.values()), list(name_keys), list(prim_pairs)
+
+
+def read_owner_rows(db, owner_updates) -> Dict[str, Tuple[Any, ...]]:
+    """
+    Read the owners rows update_owner_table may change for ``owner_updates``, before it runs.
+
+    Those are the rows matching an update's id or (p, deploy_hash, tokenid_utf8)
+    key, plus the rows whose prim a primary-name update clears. Returns
+    {casefolded id: (id, *OWNER_COLUMNS, row crc)} for record_owner_deltas.
+    """
+    ids, name_keys, prim_pairs = _owner_keys(owner_updates)
+    if not ids:
+        return {}
+    conditions = [f"id IN ({', '.join(['%s'] * len(ids))})"]
+    params: List[Any] = list(ids)
+    if name_keys:
+        conditions.append(f"(p, deploy_hash, tokenid_utf8) IN ({', '.join(['(%s, %s, %s)'] * len(name_keys))})")
+        params.extend(value for key in name_keys for value in key)
+    if prim_pairs:
+        conditions.append(f"(prim = TRUE AND (address_btc, deploy_hash) IN ({', '.join(['(%s, %s)'] * len(prim_pairs))}))")
+        params.extend(value for pair in prim_pairs for value in pair)
+
+    columns = ", ".join("owners.index" if column == "index" else column for column in OWNER_COLUMNS)
+    with db.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, {columns}, {OWNER_ROW_CRC} FROM owners WHERE {' OR '.join(conditions)}",  # nosec
+            params,
+        )
+        return {row[0].casefold(): tuple(row) for row in cursor.fetchall()}
+
+
+def record_owner_deltas(db, block_index: int, prior_rows: Dict[str, Tuple[Any, ...]], owner_updates) -> None:
+    """
+    Journal the owners rows a block changed.
+
+    Must run right after update_owner_table, inside the block's transaction,
+    with the rows read_owner_rows returned before it.
+
+    Args:
+        db: Database connection.
+        block_index (int): Height of the block.
+        prior_rows (dict): read_owner_rows result from before the update.
+        owner_updates (list): The owner updates passed to update_owner_table.
+    """
+    ids, _, _ = _owner_keys(owner_updates)
+    touched = {owner_id.casefold(): owner_id for owner_id in ids}
+    touched.update({key: row[0] for key, row in prior_rows.items()})
+    if not touched:
+        return
+
+    with db.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, {OWNER_ROW_CRC} FROM owners WHERE id IN ({', '.join(['%s'] * len(touched))})",  # nosec
+            list(touched.values()),
+        )
+        rows = []
+        for owner_id, new_crc in cursor.fetchall():
+            prior = prior_rows.get(owner_id.casefold())
+            prev_crc = prior[-1] if prior else None
+            if prev_crc == new_crc:
+                continue
+            prev_values = prior[1:-1] if prior else (None,) * len(OWNER_COLUMNS)
+            rows.append((block_index, owner_id, *prev_values, prev_crc, new_crc))
+        if not rows:
+            return
+
+        prev_columns = ", ".join(f"prev_{column}" for column in OWNER_COLUMNS)
+        cursor.executemany(
+            f"""
+            INSERT INTO {OWNER_DELTAS_TABLE}
+            (block_index, id, {prev_columns}, prev_crc, new_crc)
+            VALUES ({', '.join(['%s'] * (len(OWNER_COLUMNS) + 4))})
+            AS new_row ON DUPLICATE KEY UPDATE new_crc = new_row.new_crc
+            """,  # nosec
+            rows,
+        )
+
+
+def rollback_owner_journal(cursor, block_index: int) -> bool:
+    """
+    Revert the owners table to its state before ``block_index`` using the owner journal.
+
+    Same contract as rollback_balance_journal: without a snapshot predating
+    ``block_index`` the journal is dropped and the following rebuild_owners
+    does a full rebuild.
+
+    Returns:
+        bool: True if owners were reverted from the journal.
+    """
+    if _latest_snapshot(cursor, before=block_index, table=OWNER_SNAPSHOTS_TABLE) is None:
+        logger.warning(f"Owner journal does not reach block {block_index}; owners need a full rebuild")
+        cursor.execute(f"DELETE FROM {OWNER_DELTAS_TABLE}")  # nosec
+        cursor.execute(f"DELETE FROM {OWNER_SNAPSHOTS_TABLE}")  # nosec
+        return False
+
+    # Rows created since block_index go first, so restored rows can't collide on the name key
+    cursor.execute(
+        f"""
+        DELETE o FROM owners o
+        JOIN ({FIRST_OWNER_DELTAS_SQL}) first_deltas ON first_deltas.id = o.id
+        WHERE first_deltas.prev_crc IS NULL
+        """,  # nosec
+        (block_index,),
+    )
+    created = cursor.rowcount
+    columns = ", ".join("owners.index" if column == "index" else column for column in OWNER_COLUMNS)
+    prev_columns = ", ".join(f"prev_{column}" for column in OWNER_COLUMNS)
+    restore = ",\n            ".join(
+        f"{'owners.index' if column == 'index' else column} = prev.prev_{column}" for column in OWNER_COLUMNS
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO owners (id, {columns})
+        SELECT * FROM (
+            SELECT id, {prev_columns}
+            FROM ({FIRST_OWNER_DELTAS_SQL}) first_deltas
+            WHERE prev_crc IS NOT NULL
+        ) AS prev
+        ON DUPLICATE KEY UPDATE
+            {restore}
+        """,  # nosec
+        (block_index,),
+    )
+    restored = cursor.rowcount
+    cursor.execute(f"DELETE FROM {OWNER_DELTAS_TABLE} WHERE block_index >= %s", (block_index,))  # nosec
+    cursor.execute(f"DELETE FROM {OWNER_SNAPSHOTS_TABLE} WHERE block_index >= %s", (block_index,))  # nosec
+    logger.warning(f"Reverted owners from journal to block {block_index}: {restored} restored, {created} removed")
+    return True
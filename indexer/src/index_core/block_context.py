@@ -0,0 +1,149 @@
+"""
+Per-block lookup indexes shared by the block processing hot path.
+
+Several consumers used to answer "what happened earlier in this block?" by
+scanning a list: tx ordering (txhash_list.index), issuance lookup
+(find_issuance_by_tx_hash), running SRC-20 balances and mint totals (reverse
+scans of processed_src20_in_block), reissue detection (reverse scan of
+valid_stamps_in_block) and SRC-101 name ownership (scan of
+processed_src101_in_block). Each scan is O(block) and runs once per transaction,
+so a mint-storm block with tens of thousands of SRC-20 operations is quadratic.
+
+BlockContext keeps one dict/set per question, updated as results are recorded
+in block order. Every lookup returns exactly what the corresponding scan would
+have returned: the latest recorded value wins.
+"""
+
+import heapq
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class BlockContext:
+    """Indexes over a single block's transactions and processed results."""
+
+    def __init__(self, txhash_list: Optional[Iterable[str]] = None, stamp_issuances: Optional[Iterable[dict]] = None):
+        """
+        Args:
+            txhash_list (list): Candidate tx hashes in block order.
+            stamp_issuances (list): Counterparty issuances for the block.
+        """
+        self.tx_position: Dict[str, int] = {}
+        self.issuances: Dict[str, dict] = {}
+        # (tick, tick_hash, address) -> [(seq, running balance)] in block order
+        self.src20_balances: Dict[Tuple[str, str, str], List[Tuple[int, Any]]] = {}
+        self._src20_seq = 0
+        # tick -> latest running total_minted
+        self.src20_minted: Dict[str, Any] = {}
+        # cpids already issued as a stamp or cursed stamp in this block
+        self.cpids: Set[str] = set()
+        # (deploy_hash, tokenid_utf8) -> latest valid SRC-101 operation on that name
+        self.src101_tokens: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+        if txhash_list is not None:
+            self.set_tx_order(txhash_list)
+        if stamp_issuances:
+            self.set_issuances(stamp_issuances)
+
+    def set_tx_order(self, txhash_list: Iterable[str]) -> None:
+        self.tx_position = {tx_hash: position for position, tx_hash in enumerate(txhash_list)}
+
+    def set_issuances(self, stamp_issuances: Iterable[dict]) -> None:
+        """Index issuances by tx_hash, keeping the first match like find_issuance_by_tx_hash."""
+        issuances: Dict[str, dict] = {}
+        for issuance in stamp_issuances:
+            if issuance and issuance.get("tx_hash") is not None:
+                issuances.setdefault(issuance["tx_hash"], issuance)
+        self.issuances = issuances
+
+    def sort_results(self, tx_results):
+        """Sort decoded results into block order."""
+        return sorted(tx_results, key=lambda x: self.tx_position[x.tx_hash])
+
+    def get_issuance(self, tx_hash: str) -> Optional[dict]:
+        return self.issuances.get(tx_hash)
+
+    def record_src20(self, src20_dict) -> None:
+        """
+        Index a processed SRC-20 operation. Must be called in block order, as
+        the operation is appended to processed_src20_in_block.
+        """
+        tick = src20_dict.get("tick")
+        tick_hash = src20_dict.get("tick_hash")
+        with self._lock:
+            seq = self._src20_seq
+            self._src20_seq += 1
+            if src20_dict.get("op") == "MINT" and "total_minted" in src20_dict:
+                self.src20_minted[tick] = src20_dict["total_minted"]
+            if src20_dict.get("valid") != 1:
+                return
+            # Creator wins over destination for a self-transfer, as in get_running_user_balances
+            matches = {}
+            if "total_balance_destination" in src20_dict:
+                matches[src20_dict.get("destination")] = src20_dict["total_balance_destination"]
+            if "total_balance_creator" in src20_dict:
+                matches[src20_dict.get("creator")] = src20_dict["total_balance_creator"]
+            for address, total_balance in matches.items():
+                self.src20_balances.setdefault((tick, tick_hash, address), []).append((seq, total_balance))
+
+    def get_src20_balances(self, tick: str, tick_hash: str, addresses: List[str]) -> List[Tuple[str, Any]]:
+        """
+        Return the in-block running balances of ``addresses`` as [(address, balance)].
+
+        Replays the reverse scan of get_running_user_balances over the queried
+        addresses' histories only, including its rule that one transaction
+        resolves at most one address (the first in ``addresses`` order); the
+        other address then takes its balance from an earlier transaction.
+        Addresses not touched in this block are left out.
+        """
+        with self._lock:
+            histories = [self.src20_balances.get((tick, tick_hash, address), []) for address in addresses]
+            # Max-heap of each address's latest unconsumed entry; ties on seq (one tx
+            # matching two addresses) pop in ``addresses`` order
+            heap = [(-history[-1][0], order, len(history) - 1) for order, history in enumerate(histories) if history]
+            heapq.heapify(heap)
+            resolved = []
+            while heap:
+                neg_seq, order, pointer = heapq.heappop(heap)
+                resolved.append((addresses[order], histories[order][pointer][1]))
+                while heap and heap[0][0] == neg_seq:
+                    _, other, other_pointer = heapq.heappop(heap)
+                    if other_pointer > 0:
+                        heapq.heappush(heap, (-histories[other][other_pointer - 1][0], other, other_pointer - 1))
+            return resolved
+
+    def get_src20_minted(self, tick: str):
+        """Return the latest in-block total_minted for ``tick``, or None."""
+        return self.src20_minted.get(tick)
+
+    def record_stamp(self, valid_stamp) -> None:
+        """Index a valid stamp as it is appended to valid_stamps_in_block."""
+        if valid_stamp["is_btc_stamp"] or valid_stamp.get("is_cursed"):
+            with self._lock:
+                self.cpids.add(valid_stamp["cpid"])
+
+    def has_reissue(self, cpid: str) -> bool:
+        return cpid in self.cpids
+
+    def record_src101(self, src101_dict) -> None:
+        """Index a processed SRC-101 operation as it is appended to processed_src101_in_block."""
+        if not src101_dict or src101_dict.get("valid", 0) != 1:
+            return
+        tokenids = src101_dict.get("tokenid_utf8")
+        if not tokenids:
+            return
+        if isinstance(tokenids, str):
+            tokenids = [tokenids]
+        elif not isinstance(tokenids, list):
+            return
+        deploy_hash = src101_dict.get("hash")
+        with self._lock:
+            for tokenid_utf8 in tokenids:
+                self.src101_tokens[(deploy_hash, tokenid_utf8)] = src101_dict
+
+    def get_src101_token(self, deploy_hash: str, tokenid_utf8: str) -> Optional[dict]:
+        """Return the latest valid in-block SRC-101 operation on a name, or None."""
+        if isinstance(tokenid_utf8, list):
+            return None
+        return self.src101_tokens.get((deploy_hash, tokenid_utf8))
@@ -0,0 +1,324 @@
+"""
+Staged block look-ahead for catch-up sync.
+
+follow() processes one block at a time: getblockhash, get_tx_list,
+filter_block_transactions, prevout prefetch, process_tx fan-out, then the
+BlockProcessor DB writes and consensus hashing. Only the last part has to run
+in order. Fetching, filtering and decoding a block depend on nothing but the
+chain and that block's CP issuances, so BlockLookahead runs them for the next
+few blocks on a background thread while the main loop writes and hashes the
+current one.
+
+Prepared blocks are keyed by height but are only handed out when the block
+hash, the CP issuances and the filter height still match what the main loop
+sees at consume time. Anything else (reorg, CP refetch, rollback) drops the
+prepared blocks and the main loop falls back to the inline path, so using
+the look-ahead never changes what gets indexed.
+"""
+
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+import config
+from index_core.backend import Backend
+from index_core.block_context import BlockContext
+from index_core.block_validation import filter_block_transactions
+from index_core.transaction_utils import prefetch_source_prevouts, process_tx
+
+logger = logging.getLogger(__name__)
+backend_instance = Backend()
+
+PreparedBlock = namedtuple(
+    "PreparedBlock",
+    [
+        "block_index",
+        "block_hash",
+        "block_time",
+        "previous_block_hash",
+        "difficulty",
+        "txhash_list",
+        "n_txs",
+        "n_candidates",
+        "stamp_issuances",
+        "filter_block_index",
+        "tx_results",
+        "raw_transactions_full",
+        "t_fetch",
+        "t_filter",
+        "t_decode",
+    ],
+)
+
+
+def issuances_for_block(block_data):
+    """Return the stamp issuances follow() would use for a CP pipeline block."""
+    if not isinstance(block_data, dict) or "error" in block_data:
+        return None
+    if block_data.get("fallback_mode"):
+        return []
+    return block_data.get("issuances") or []
+
+
+class BlockLookahead:
+    """Background stage that keeps the next ``depth`` blocks decoded ahead of follow()."""
+
+    # How long take() waits for a block the worker is in the middle of preparing
+    IN_FLIGHT_WAIT_SECONDS = 30
+
+    def __init__(self, cp_pipeline, depth=None, decode_workers=None):
+        """
+        Args:
+            cp_pipeline: CPBlocksPipeline supplying CP issuances for upcoming blocks.
+            depth (int): Number of blocks to keep prepared ahead of the processor.
+            decode_workers (int): Threads used for the per-block process_tx fan-out.
+        """
+        self.cp_pipeline = cp_pipeline
+        self.depth = max(1, depth if depth is not None else config.BLOCK_LOOKAHEAD_DEPTH)
+        self.decode_workers = max(1, decode_workers if decode_workers is not None else config.BLOCK_LOOKAHEAD_DECODE_WORKERS)
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self.shutdown_flag = threading.Event()
+
+        self.prepared: Dict[int, PreparedBlock] = {}
+        self.next_block: Optional[int] = None
+        self.in_flight: Optional[int] = None
+        # Bumped on every reset/invalidation so a block prepared against the
+        # old position is never published after the fact.
+        self.generation = 0
+
+        self.worker_thread: Optional[threading.Thread] = None
+        self.decode_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def start(self, start_block):
+        """Start the background worker preparing blocks from ``start_block``."""
+        if start_block is None:
+            raise ValueError("start_block must be provided")
+
+        with self._lock:
+            self.next_block = start_block
+        self.shutdown_flag.clear()
+        self.decode_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.decode_workers, thread_name_prefix="block-lookahead-decode"
+        )
+        self.worker_thread = threading.Thread(target=self._worker, name="BlockLookahead", daemon=True)
+        self.worker_thread.start()
+        logger.info(f"Block look-ahead started at block {start_block} (depth={self.depth})")
+
+    def stop(self):
+        """Stop the worker thread and drop any prepared blocks."""
+        self.shutdown_flag.set()
+        self._wakeup.set()
+        if self.worker_thread and self.worker_thread.is_alive():
+            self.worker_thread.join(timeout=10)
+            if self.worker_thread.is_alive():
+                logger.warning("Block look-ahead worker did not exit within timeout")
+        if self.decode_executor:
+            self.decode_executor.shutdown(wait=True)
+            self.decode_executor = None
+        with self._cond:
+            self.prepared.clear()
+            self.generation += 1
+            self._cond.notify_all()
+        logger.info(
+            f"Block look-ahead stopped (hits={self.hits}, misses={self.misses}, "
+            f"invalidations={self.invalidations}, errors={self.errors})"
+        )
+
+    def reset(self, new_start_block):
+        """Drop all prepared blocks and restart preparation from ``new_start_block``."""
+        with self._cond:
+            self.prepared.clear()
+            self.next_block = new_start_block
+            self.generation += 1
+            self._cond.notify_all()
+        self._wakeup.set()
+        logger.debug(f"Block look-ahead reset to block {new_start_block}")
+
+    def take(self, block_index, block_hash, stamp_issuances, filter_block_index):
+        """
+        Hand the prepared block for ``block_index`` to the processor.
+
+        The prepared block is only returned when it was built from the same
+        block hash, the same CP issuances and the same filter height the
+        processor is about to use. On any mismatch every prepared block is
+        dropped, since later heights were built on the same stale view.
+
+        Either way the look-ahead window moves to ``block_index + 1``.
+
+        Returns:
+            PreparedBlock or None if the caller has to process the block inline.
+        """
+        with self._cond:
+            deadline = time.monotonic() + self.IN_FLIGHT_WAIT_SECONDS
+            while self.in_flight == block_index and block_index not in self.prepared:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.shutdown_flag.is_set():
+                    break
+                self._cond.wait(remaining)
+
+            prepared = self.prepared.pop(block_index, None)
+            valid = (
+                prepared is not None
+                and prepared.block_hash == block_hash
+                and prepared.filter_block_index == filter_block_index
+                and prepared.stamp_issuances == stamp_issuances
+            )
+            if prepared is not None and not valid:
+                logger.info(f"Discarding prepared block {block_index}: chain or CP data changed since it was prepared")
+                self.invalidations += 1
+                self.prepared.clear()
+                self.generation += 1
+
+            self.next_block = block_index + 1
+            for stale in [idx for idx in self.prepared if idx <= block_index]:
+                del self.prepared[stale]
+
+            if valid:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._wakeup.set()
+        return prepared if valid else None
+
+    def get_stats(self):
+        """Return hit/miss counters and the current window state."""
+        with self._lock:
+            return {
+                "depth": self.depth,
+                "next_block": self.next_block,
+                "prepared": sorted(self.prepared),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+            }
+
+    def _next_target(self):
+        """Return (block_index, generation) of the next block to prepare, or None."""
+        with self._lock:
+            if self.next_block is None:
+                return None
+            for block_index in range(self.next_block, self.next_block + self.depth):
+                if block_index not in self.prepared:
+                    return block_index, self.generation
+            return None
+
+    def _worker(self):
+        """Prepare blocks inside the look-ahead window until stopped."""
+        while not self.shutdown_flag.is_set():
+            target = self._next_target()
+            if target is None:
+                self._wakeup.wait(0.5)
+                self._wakeup.clear()
+                continue
+
+            block_index, generation = target
+            with self._cond:
+                self.in_flight = block_index
+            prepared = None
+            try:
+                prepared = self._prepare_block(block_index)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Block look-ahead failed to prepare block {block_index}: {e}")
+            finally:
+                with self._cond:
+                    self.in_flight = None
+                    if prepared is not None and generation == self.generation and self.next_block is not None:
+                        if self.next_block <= block_index < self.next_block + self.depth:
+                            self.prepared[block_index] = prepared
+                    self._cond.notify_all()
+
+            if prepared is None:
+                # CP data not queued yet, block beyond the tip, or an error:
+                # back off briefly instead of spinning on the same height.
+                self.shutdown_flag.wait(1)
+
+    def _prepare_block(self, block_index):
+        """
+        Fetch, filter and decode ``block_index`` exactly as follow() does inline.
+
+        Returns None when the block cannot be prepared yet (no CP data queued
+        or the block is beyond the current tip).
+        """
+        block_data = self.cp_pipeline.peek_block(block_index) if self.cp_pipeline else None
+        stamp_issuances = issuances_for_block(block_data)
+        if stamp_issuances is None:
+            return None
+
+        block_tip = backend_instance.getblockcount()
+        if block_tip is None or block_index > block_tip:
+            return None
+
+        phase_start = time.perf_counter()
+        block_hash = backend_instance.getblockhash(block_index)
+        txhash_list_full, raw_transactions_full, block_time, previous_block_hash, difficulty = backend_instance.get_tx_list(
+            block_hash
+        )
+        t_fetch = time.perf_counter() - phase_start
+
+        # follow() filters block N while util.CURRENT_BLOCK_INDEX is still N - 1
+        filter_block_index = block_index - 1
+        phase_start = time.perf_counter()
+        txhash_list, raw_transactions = filter_block_transactions(
+            {"tx": [{"txid": tx_hash, "hex": raw_transactions_full[tx_hash]} for tx_hash in txhash_list_full]},
+            stamp_issuances=stamp_issuances,
+            current_block_index=filter_block_index,
+        )
+        t_filter = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        block_context = BlockContext(txhash_list, stamp_issuances)
+        prefetch_source_prevouts(raw_transactions)
+        futures = [
+            self.decode_executor.submit(
+                process_tx,
+                None,
+                tx_hash,
+                block_index,
+                block_context.issuances,
+                raw_transactions,
+                current_block_index=block_index,
+            )
+            for tx_hash in raw_transactions
+        ]
+        tx_results = []
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            if result.data is not None:
+                tx_results.append(result._replace(block_index=block_index, block_hash=block_hash, block_time=block_time))
+        tx_results = block_context.sort_results(tx_results)
+        t_decode = time.perf_counter() - phase_start
+
+        logger.debug(
+            f"Block look-ahead prepared block {block_index}: {len(txhash_list_full)} txs, "
+            f"{len(raw_transactions)} candidates, {len(tx_results)} results"
+        )
+        return PreparedBlock(
+            block_index,
+            block_hash,
+            block_time,
+            previous_block_hash,
+            difficulty,
+            txhash_list,
+            len(txhash_list_full),
+            len(raw_transactions),
+            stamp_issuances,
+            filter_block_index,
+            tx_results,
+            raw_transactions_full,
+            t_fetch,
+            t_filter,
+            t_decode,
+        )
@@ -0,0 +1,238 @@
+"""
+Bitcoin block prefetch queue.
+
+The CP side already has a look-ahead (CPBlocksPipeline); this is the bitcoind
+counterpart. BlockPrefetcher keeps the raw bytes of the next few blocks
+downloaded ahead of follow(), fetched through Backend.getblock_raw (binary REST
+when enabled, ``getblock <hash> 0`` otherwise). Backend.get_tx_list pops a
+buffered block by hash and parses the bytes directly, so the per-block RPC
+round trip leaves the critical path.
+
+The buffer is bounded by a byte budget and keyed by block hash. A consumer can
+only ever receive the exact block it asked for; after a reorg the stale entry
+is a miss, and the worker evicts it once it sees a different hash at that
+height. A block dropped to stay within budget is not fetched again, nor is
+anything above it, until the processor has consumed enough to make it fit.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import config
+from index_core.backend import Backend
+
+logger = logging.getLogger(__name__)
+backend_instance = Backend()
+
+
+class BlockPrefetcher:
+    """Background worker that keeps the next ``depth`` raw blocks buffered."""
+
+    # Buffered heights this close to the tip are re-checked for reorgs
+    REORG_CHECK_DEPTH = 6
+
+    def __init__(self, depth=None, max_bytes=None, backend=None):
+        """
+        Args:
+            depth (int): Number of blocks to keep downloaded ahead of the processor.
+            max_bytes (int): Byte budget for buffered raw blocks.
+            backend: Backend used for fetching (defaults to the singleton).
+        """
+        self.depth = max(1, depth if depth is not None else config.BTC_BLOCK_PREFETCH_DEPTH)
+        self.max_bytes = max_bytes if max_bytes is not None else config.BTC_BLOCK_PREFETCH_MAX_BYTES
+        self.backend = backend if backend is not None else backend_instance
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.shutdown_flag = threading.Event()
+        self.worker_thread: Optional[threading.Thread] = None
+
+        # block_hash -> (height, raw block bytes)
+        self.blocks: Dict[str, Tuple[int, bytes]] = {}
+        # height -> block_hash for every height fetched in the window, including
+        # ones already popped (their bytes are gone but they need no refetch)
+        self.hash_by_height: Dict[int, str] = {}
+        self.buffered_bytes = 0
+        self.position: Optional[int] = None
+        # (height, size) of the lowest block evicted to stay within budget
+        self.over_budget: Optional[Tuple[int, int]] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reorg_evictions = 0
+        self.bytes_fetched = 0
+
+    def start(self, start_block):
+        """Start prefetching from ``start_block``."""
+        if start_block is None:
+            raise ValueError("start_block must be provided")
+        with self._lock:
+            self.position = start_block
+        self.shutdown_flag.clear()
+        self.worker_thread = threading.Thread(target=self._worker, name="BlockPrefetcher", daemon=True)
+        self.worker_thread.start()
+        logger.info(
+            f"Bitcoin block prefetch started at block {start_block} "
+            f"(depth={self.depth}, budget={self.max_bytes / (1024 * 1024):.0f} MiB, "
+            f"rest={'on' if config.BACKEND_REST_ENABLED else 'off'})"
+        )
+
+    def stop(self):
+        """Stop the worker thread and drop the buffer."""
+        self.shutdown_flag.set()
+        self._wakeup.set()
+        if self.worker_thread and self.worker_thread.is_alive():
+            self.worker_thread.join(timeout=10)
+            if self.worker_thread.is_alive():
+                logger.warning("Bitcoin block prefetch worker did not exit within timeout")
+        self.clear()
+        logger.info(f"Bitcoin block prefetch stopped: {self.get_stats()}")
+
+    def clear(self):
+        """Drop every buffered block."""
+        with self._lock:
+            self.blocks.clear()
+            self.hash_by_height.clear()
+            self.buffered_bytes = 0
+            self.over_budget = None
+
+    def advance(self, block_index):
+        """
+        Tell the prefetcher the processor is now at ``block_index``.
+
+        Buffered blocks below it are released and the window moves forward (or
+        back, after a rollback).
+        """
+        with self._lock:
+            self.position = block_index
+            for height in [h for h in self.hash_by_height if h < block_index]:
+                self._evict_height(height)
+        self._wakeup.set()
+
+    def pop(self, block_hash) -> Optional[bytes]:
+        """Remove and return the buffered raw block for ``block_hash``, or None."""
+        with self._lock:
+            entry = self.blocks.pop(block_hash, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            # hash_by_height keeps the height so the worker does not fetch it again
+            height, raw_block = entry
+            self.buffered_bytes -= len(raw_block)
+            self.hits += 1
+        self._wakeup.set()
+        return raw_block
+
+    def get_stats(self):
+        """Return buffer occupancy and hit/miss counters."""
+        with self._lock:
+            return {
+                "position": self.position,
+                "buffered_blocks": len(self.blocks),
+                "buffered_bytes": self.buffered_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "reorg_evictions": self.reorg_evictions,
+                "bytes_fetched": self.bytes_fetched,
+            }
+
+    def _evict_height(self, height):
+        """Drop the buffered block at ``height``. Caller holds the lock."""
+        block_hash = self.hash_by_height.pop(height, None)
+        if block_hash is None:
+            return
+        entry = self.blocks.pop(block_hash, None)
+        if entry is not None:
+            self.buffered_bytes -= len(entry[1])
+            self.evictions += 1
+
+    def _verify_near_tip(self, block_tip):
+        """Evict buffered blocks near the tip whose hash is no longer on the best chain."""
+        with self._lock:
+            candidates = [
+                (h, block_hash) for h, block_hash in self.hash_by_height.items() if block_tip - h < self.REORG_CHECK_DEPTH
+            ]
+        for height, block_hash in candidates:
+            current_hash = self.backend.getblockhash(height)
+            if current_hash != block_hash:
+                logger.info(f"Prefetched block {height} ({block_hash}) was reorged out; evicting")
+                with self._lock:
+                    if self.hash_by_height.get(height) == block_hash:
+                        self._evict_height(height)
+                        self.reorg_evictions += 1
+
+    def _next_height(self, block_tip):
+        """Return the lowest height in the window that still needs fetching, or None."""
+        with self._lock:
+            if self.position is None or self.buffered_bytes >= self.max_bytes:
+                return None
+            end = min(self.position + self.depth, block_tip + 1)
+            if self.over_budget is not None:
+                ceiling, size = self.over_budget
+                if ceiling < self.position or self.buffered_bytes + size <= self.max_bytes:
+                    self.over_budget = None
+                else:
+                    # It would be evicted again as soon as it arrived
+                    end = min(end, ceiling)
+            for height in range(self.position, end):
+                if height not in self.hash_by_height:
+                    return height
+            return None
+
+    def _store(self, height, block_hash, raw_block):
+        """Buffer a fetched block, evicting the furthest-ahead blocks to stay within budget."""
+        with self._lock:
+            if self.position is None or not (self.position <= height < self.position + self.depth):
+                return False
+            self._evict_height(height)
+            self.blocks[block_hash] = (height, raw_block)
+            self.hash_by_height[height] = block_hash
+            self.buffered_bytes += len(raw_block)
+            self.bytes_fetched += len(raw_block)
+            # Blocks the processor needs soonest are the most valuable; the
+            # lowest buffered height always stays so a single oversized block
+            # still gets through.
+            while self.buffered_bytes > self.max_bytes:
+                held = [h for h, held_hash in self.hash_by_height.items() if held_hash in self.blocks]
+                if len(held) <= 1:
+                    break
+                furthest = max(held)
+                self.over_budget = (furthest, len(self.blocks[self.hash_by_height[furthest]][1]))
+                self._evict_height(furthest)
+            return block_hash in self.blocks
+
+    def _worker(self):
+        """Fill the prefetch window until stopped."""
+        while not self.shutdown_flag.is_set():
+            try:
+                block_tip = self.backend.getblockcount()
+                if block_tip is None:
+                    self.shutdown_flag.wait(1)
+                    continue
+
+                self._verify_near_tip(block_tip)
+                height = self._next_height(block_tip)
+                if height is None:
+                    self._wakeup.wait(1)
+                    self._wakeup.clear()
+                    continue
+
+                fetch_start = time.perf_counter()
+                block_hash = self.backend.getblockhash(height)
+                raw_block = self.backend.getblock_raw(block_hash)
+                stored = self._store(height, block_hash, raw_block)
+                logger.debug(
+                    f"Prefetched block {height} ({len(raw_block)} bytes) in "
+                    f"{(time.perf_counter() - fetch_start) * 1000:.1f}ms{'' if stored else ' (discarded)'}"
+                )
+                if not stored:
+                    # Over budget: wait for the processor to consume something
+                    self._wakeup.wait(1)
+                    self._wakeup.clear()
+            except Exception as e:
+                logger.warning(f"Bitcoin block prefetch error: {e}")
+                self.shutdown_flag.wait(2)
@@ -4,6 +4,9 @@ Block validation utilities extracted from blocks.py
 This module contains functions for validating blocks and their transactions,
 including consensus hash calculation and transaction filtering.
 
+Classes:
+    BlockHashState: Previous block's consensus hashes carried forward in memory
+
 Functions:
     create_check_hashes(): Calculate and update consensus hashes for block data
     validate_block_against_production(): Validate block against production database
@@ -31,6 +34,76 @@ from index_core.transaction_utils import backend_instance, quick_filter_src20_tr
 logger = logging.getLogger(__name__)
 
 
+class BlockHashState:
+    """
+    Consensus hashes of the last committed block, carried forward to the next one.
+
+    Without it every block re-reads its predecessor's txlist_hash and
+    messages_hash (one ``SELECT *`` each) and scans ``blocks`` for the latest
+    non-empty ledger_hash. create_check_hashes records the hashes it computes
+    as pending; commit_and_update_block promotes them once the block's
+    transaction is committed. The state is keyed by block index, so a rolled
+    back commit, a reorg or a restart simply leaves it stale and the next
+    block re-seeds it from the database.
+    """
+
+    def __init__(self):
+        self.block_index: Optional[int] = None
+        self.txlist_hash: Optional[str] = None
+        self.messages_hash: Optional[str] = None
+        # Latest non-empty ledger_hash at or below block_index ("" blocks carry it forward)
+        self.ledger_hash: Optional[str] = None
+        self._pending: Optional[Tuple[int, str, str, Optional[str]]] = None
+        self.seeds = 0
+
+    def previous_hashes(self, db, block_index: int) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Return (ledger_hash, txlist_hash, messages_hash) of the chain up to ``block_index - 1``."""
+        if self.block_index != block_index - 1:
+            self._seed(db, block_index)
+        return self.ledger_hash, self.txlist_hash, self.messages_hash
+
+    def _seed(self, db, block_index: int) -> None:
+        field_position = config.BLOCK_FIELDS_POSITION
+        cursor = db.cursor()
+        cursor.execute("""SELECT * FROM blocks WHERE block_index = %s""", (block_index - 1,))
+        results = cursor.fetchall()
+        previous_row = results[0] if results else None
+        cursor.execute(
+            """SELECT ledger_hash FROM blocks
+               WHERE block_index < %s AND ledger_hash IS NOT NULL AND ledger_hash <> ''
+               ORDER BY block_index DESC LIMIT 1""",
+            (block_index,),
+        )
+        result = cursor.fetchone()
+
+        self.block_index = block_index - 1
+        self.txlist_hash = previous_row[field_position["txlist_hash"]] if previous_row else None
+        self.messages_hash = previous_row[field_position["messages_hash"]] if previous_row else None
+        self.ledger_hash = result[0] if result else None
+        self._pending = None
+        self.seeds += 1
+        logger.debug("Seeded block hash state from block %s", block_index - 1)
+
+    def record(self, block_index: int, ledger_hash: str, txlist_hash: str, messages_hash: str) -> None:
+        """Remember the hashes computed for ``block_index`` until its commit succeeds."""
+        self._pending = (block_index, txlist_hash, messages_hash, ledger_hash or self.ledger_hash)
+
+    def commit(self, block_index: int) -> None:
+        """Promote the pending hashes of ``block_index`` after its transaction committed."""
+        if self._pending is None or self._pending[0] != block_index:
+            return
+        self.block_index, self.txlist_hash, self.messages_hash, self.ledger_hash = self._pending
+        self._pending = None
+
+    def reset(self) -> None:
+        """Forget everything; the next block re-seeds from the database."""
+        self.__init__()
+
+
+# Shared by the follow() loop; reparse tools build their own or pass hashes explicitly
+block_hash_state = BlockHashState()
+
+
 def create_check_hashes(
     db,
     block_index,
@@ -40,6 +113,7 @@ def create_check_hashes(
     previous_ledger_hash=None,
     previous_txlist_hash=None,
     previous_messages_hash=None,
+    hash_state: Optional[BlockHashState] = None,
 ):
     """
     Calculate and update the hashes for the given block data. This needs to be modified for a reparse.
@@ -53,6 +127,8 @@ def create_check_hashes(
         previous_ledger_hash (str, optional): The hash of the previous ledger. Defaults to None.
         previous_txlist_hash (str, optional): The hash of the previous transaction list. Defaults to None.
         previous_messages_hash (str, optional): The hash of the previous messages. Defaults to None.
+        hash_state (BlockHashState, optional): Supplies the previous hashes not passed explicitly
+            and records the new ones. Defaults to None (previous hashes are read from the database).
 
     Returns:
         tuple: A tuple containing the new ledger hash, transaction list hash, and messages hash.
@@ -66,22 +142,32 @@ def create_check_hashes(
     block_results = cursor.fetchall()
     block_row = block_results[0] if block_results else None
 
+    if hash_state is not None:
+        state_ledger_hash, state_txlist_hash, state_messages_hash = hash_state.previous_hashes(db, block_index)
+        # The first block and the SRC20 genesis block + 1 are seeded inside consensus_hash,
+        # which rejects a previous hash there.
+        if block_index > config.BLOCK_FIRST:
+            previous_txlist_hash = previous_txlist_hash or state_txlist_hash
+            previous_messages_hash = previous_messages_hash or state_messages_hash
+        if block_index != config.CP_SRC20_GENESIS_BLOCK + 1:
+            previous_ledger_hash = previous_ledger_hash or state_ledger_hash
+
     # Filter out None values before sorting
     filtered_stamps = [stamp for stamp in valid_stamps_in_block if stamp is not None]
     sorted_valid_stamps = sorted(filtered_stamps, key=lambda x: x.get("stamp_number", 0))
     txlist_content = str(sorted_valid_stamps)
     new_txlist_hash, found_txlist_hash = check.consensus_hash(
-        db, block_index, "txlist_hash", previous_txlist_hash, txlist_content, block_row=block_row
+        db, block_index, "txlist_hash", previous_txlist_hash, txlist_content, block_row=block_row, update_field=False
     )
 
     ledger_content = str(processed_src20_in_block)
     new_ledger_hash, found_ledger_hash = check.consensus_hash(
-        db, block_index, "ledger_hash", previous_ledger_hash, ledger_content, block_row=block_row
+        db, block_index, "ledger_hash", previous_ledger_hash, ledger_content, block_row=block_row, update_field=False
     )
 
     messages_content = str(txhash_list)
     new_messages_hash, found_messages_hash = check.consensus_hash(
-        db, block_index, "messages_hash", previous_messages_hash, messages_content, block_row=block_row
+        db, block_index, "messages_hash", previous_messages_hash, messages_content, block_row=block_row, update_field=False
     )
 
     try:
@@ -92,6 +178,9 @@ def create_check_hashes(
             error_message=f"Failed to update block hashes for block {block_index}", exception=e, block_index=block_index
         )
 
+    if hash_state is not None:
+        hash_state.record(block_index, new_ledger_hash, new_txlist_hash, new_messages_hash)
+
     return new_ledger_hash, new_txlist_hash, new_messages_hash
 
 
@@ -295,11 +384,16 @@ def validate_block_against_reference(block_index: int) -> bool:
     return True
 
 
-def filter_block_transactions(block_data, stamp_issuances=None):
+def filter_block_transactions(block_data, stamp_issuances=None, current_block_index=None):
     """
     Filter transactions from a block based on genesis status.
     IMPORTANT: Always maintains complete tx_hash_list for hash calculation.
     Uses Rust parser for efficient batch processing if available.
+
+    ``current_block_index`` overrides util.CURRENT_BLOCK_INDEX for the genesis
+    check. follow() filters block N while the global still holds N - 1, so the
+    block look-ahead stage passes ``block_index - 1`` explicitly instead of
+    touching the global from its worker thread.
     """
     logger.debug(f"Starting filter_block_transactions with {len(block_data['tx'])} transactions")
 
@@ -319,7 +413,9 @@ def filter_block_transactions(block_data, stamp_issuances=None):
 
     # Before SRC20 genesis, only get stamp issuance transactions
     # Handle the case where CURRENT_BLOCK_INDEX is None
-    current_block_index = util.CURRENT_BLOCK_INDEX or 0
+    if current_block_index is None:
+        current_block_index = util.CURRENT_BLOCK_INDEX
+    current_block_index = current_block_index or 0
     if current_block_index < config.BTC_SRC20_GENESIS_BLOCK:
         logger.debug("Pre-genesis block: processing only stamp issuances")
         # Only process issuance transactions (in order)
@@ -505,7 +601,7 @@ def _contiguous_runs(indices: List[int]) -> List[Tuple[int, int]]:
 
 
 def fetch_cp_blocks_skipping_empty(
-    start_block: int, end_block: int, progress_indicator: bool = False
+    start_block: int, end_block: int, progress_indicator: bool = False, include_dispenses: bool = False
 ) -> Dict[int, Dict[str, Any]]:
     """Fetch CP block data for ``[start_block, end_block]``, eliding the CP API
     call for blocks that carry no Counterparty data (issue #756 item 3).
@@ -517,12 +613,20 @@ def fetch_cp_blocks_skipping_empty(
     get the exact empty-fetch shape substituted (no API call), and the CP-
     bearing blocks are fetched in contiguous runs to preserve the concurrent
     range-fetch contract and ordering.
+
+    ``include_dispenses`` adds each block's CP dispenses under ``"dispenses"``
+    (see ``DISPENSE_PIPELINE_ENABLED``); a CP-free block has none, so it gets
+    an empty list without an API call.
     """
     # Lazy import to avoid a module-load import cycle (fetch_utils -> ... -> here).
     from index_core.fetch_utils import fetch_xcp_blocks_concurrent
 
+    fetch_kwargs: Dict[str, Any] = {"progress_indicator": progress_indicator}
+    if include_dispenses:
+        fetch_kwargs["include_dispenses"] = True
+
     if not getattr(config, "CP_SKIP_NO_COUNTERPARTY_BLOCKS", False):
-        return fetch_xcp_blocks_concurrent(start_block, end_block, progress_indicator=progress_indicator)
+        return fetch_xcp_blocks_concurrent(start_block, end_block, **fetch_kwargs)
 
     cp_bearing: List[int] = []
     results: Dict[int, Dict[str, Any]] = {}
@@ -532,9 +636,11 @@ def fetch_cp_blocks_skipping_empty(
         else:
             logger.info(f"Block {idx}: no Counterparty data (issue #756) — skipping CP API fetch")
             results[idx] = _empty_cp_block_data(idx)
+            if include_dispenses:
+                results[idx]["dispenses"] = []
 
     for run_start, run_end in _contiguous_runs(cp_bearing):
-        fetched = fetch_xcp_blocks_concurrent(run_start, run_end, progress_indicator=progress_indicator)
+        fetched = fetch_xcp_blocks_concurrent(run_start, run_end, **fetch_kwargs)
         if fetched:
             results.update(fetched)
 
@@ -28,7 +28,12 @@ import index_core.log as log
 import index_core.server as server
 import index_core.util as util
 from index_core.backend import Backend
+from index_core.balance_journal import take_balance_snapshot, take_owner_snapshot
+from index_core.block_context import BlockContext
+from index_core.block_lookahead import BlockLookahead
+from index_core.block_prefetch import BlockPrefetcher
 from index_core.block_validation import (
+    block_hash_state,
     create_check_hashes,
     fetch_cp_blocks_skipping_empty,
     filter_block_transactions,
@@ -56,6 +61,7 @@ from index_core.database import (  # update_src20_token_stats,  # Now handled by
     update_assets_in_db,
     update_parsed_block,
 )
+from index_core.decode_pool import DecodePool
 from index_core.exceptions import (
     BlockAlreadyExistsError,
     CriticalBlockFetchError,
@@ -63,23 +69,28 @@ from index_core.exceptions import (
     LedgerMismatchError,
 )
 from index_core.fetch_utils import (
+    cp_client,
     get_xcp_assets_by_cpids,
     get_xcp_block_hash,
     is_valid_counterparty_asset,
     verify_cp_block_hash,
 )
+from index_core.header_chain import HeaderChain
+from index_core.hotpath_profiler import get_hotpath_profiler
+from index_core.hotpath_profiler import phase as hotpath_phase
 from index_core.market_data_jobs import start_market_data_jobs
 from index_core.memory_manager import memory_manager
 from index_core.models import StampData, ValidStamp
 from index_core.node_health import is_shutdown_requested, register_shutdown_callback, set_shutdown_flag
 from index_core.perf_log import record_block_perf
 from index_core.pipeline_utils import CPBlocksPipeline
+from index_core.prevout_index import get_prevout_index
 from index_core.profiling import Profiler
 from index_core.resource_manager import cleanup_resources
 
 # Conditional import for sales history processor
 if config.ENABLE_MARKET_DATA_SCHEDULER:
-    from index_core.sales_history_processor import sales_history_processor
+    from index_core.sales_history_processor import dispense_writer, sales_history_processor
 
 from index_core.async_holder_updater import schedule_holder_update
 from index_core.signal_handlers import setup_signal_handler
@@ -91,7 +102,7 @@ from index_core.src20 import (
     update_src20_balances,
     validate_src20_ledger_hash,
 )
-from index_core.src20_holder_updater import get_holder_updater
+from index_core.src20_holder_updater import apply_holder_count_deltas, get_holder_updater, holder_count_deltas
 from index_core.src101 import Src101Dict, parse_src101, update_src101_owners
 from index_core.stamp import parse_stamp
 from index_core.transaction_utils import prefetch_source_prevouts, process_tx
@@ -137,8 +148,9 @@ _sales_catchup_started = False
 
 
 class BlockProcessor:
-    def __init__(self, db):
+    def __init__(self, db, block_context: Optional[BlockContext] = None):
         self.db: Connection = db
+        self.block_context = block_context if block_context is not None else BlockContext()
         self.valid_stamps_in_block: List[ValidStamp] = []
         self.parsed_stamps: List[StampData] = []
         self.processed_src20_in_block: List[Src20Dict] = []
@@ -197,6 +209,7 @@ class BlockProcessor:
                     stamp_data=initial_stamp_data,
                     db=self.db,
                     valid_stamps_in_block=self.valid_stamps_in_block,
+                    block_context=self.block_context,
                 )
 
                 # DEBUG: Log parse results
@@ -233,20 +246,30 @@ class BlockProcessor:
                 if valid_stamp:
                     with self._lock:
                         self.valid_stamps_in_block.append(valid_stamp)
+                    self.block_context.record_stamp(valid_stamp)
 
                 if prevalidated_src and stamp_data and stamp_data.pval_src20:
                     logger.debug(f"\nProcessing SRC20 for tx: {result.tx_hash}")
-                    _, src20_dict = parse_src20(self.db, prevalidated_src, self.processed_src20_in_block, self._lock)
+                    _, src20_dict = parse_src20(
+                        self.db, prevalidated_src, self.processed_src20_in_block, self._lock, block_context=self.block_context
+                    )
                     logger.debug(f"SRC20 dict created: {src20_dict}")
                     with self._lock:
                         self.processed_src20_in_block.append(src20_dict)
+                    self.block_context.record_src20(src20_dict)
                 if prevalidated_src and stamp_data and stamp_data.pval_src101:
                     _, src101_dict = parse_src101(
-                        self.db, prevalidated_src, self.processed_src101_in_block, stamp_data.block_index, self._lock
+                        self.db,
+                        prevalidated_src,
+                        self.processed_src101_in_block,
+                        stamp_data.block_index,
+                        self._lock,
+                        block_context=self.block_context,
                     )
                     logger.debug(f"SRC101 dict created: {src101_dict}")
                     with self._lock:
                         self.processed_src101_in_block.append(src101_dict)
+                    self.block_context.record_src101(src101_dict)
             except Exception as e:
                 logger.error(f"Error in process_transaction_results for tx {result.tx_hash}: {e}", exc_info=True)
                 raise
@@ -273,22 +296,27 @@ class BlockProcessor:
 
     def finalize_block(self, block_index, block_time, txhash_list, block_tip=None):
         if self.processed_src20_in_block:
-            balance_updates = update_src20_balances(self.db, block_index, block_time, self.processed_src20_in_block)
+            with hotpath_phase("update_src20_balances"):
+                balance_updates = update_src20_balances(self.db, block_index, block_time, self.processed_src20_in_block)
             insert_into_src20_tables(self.db, self.processed_src20_in_block)
             valid_src20_str = process_balance_updates(balance_updates)
 
-            # Track affected tokens for holder count updates
-            # But defer the actual update to after the transaction commits
-            holder_updater = get_holder_updater()
-
-            # Track all affected tokens from this block
-            for src20_op in self.processed_src20_in_block:
-                if src20_op.get("op") in ["DEPLOY", "MINT", "TRANSFER"] and src20_op.get("tick"):
-                    holder_updater.track_affected_token(src20_op["tick"])
-                    # Ensure market data entry exists for new tokens
-                    # This is lightweight and can be done in the transaction
-                    if src20_op.get("op") == "DEPLOY":
-                        holder_updater.ensure_market_data_exists(src20_op["tick"], self.db)
+            if config.SRC20_HOLDER_COUNTERS_ENABLED:
+                # Counters move with the block's own balance deltas (rows for new deploys included)
+                apply_holder_count_deltas(self.db, holder_count_deltas(balance_updates, self.processed_src20_in_block))
+            else:
+                # Track affected tokens for holder count updates
+                # But defer the actual update to after the transaction commits
+                holder_updater = get_holder_updater()
+
+                # Track all affected tokens from this block
+                for src20_op in self.processed_src20_in_block:
+                    if src20_op.get("op") in ["DEPLOY", "MINT", "TRANSFER"] and src20_op.get("tick"):
+                        holder_updater.track_affected_token(src20_op["tick"])
+                        # Ensure market data entry exists for new tokens
+                        # This is lightweight and can be done in the transaction
+                        if src20_op.get("op") == "DEPLOY":
+                            holder_updater.ensure_market_data_exists(src20_op["tick"], self.db)
         else:
             valid_src20_str = ""
 
@@ -296,6 +324,10 @@ class BlockProcessor:
             insert_into_src101_tables(self.db, self.processed_src101_in_block)
             update_src101_owners(self.db, block_index, self.processed_src101_in_block)
 
+        if config.BALANCE_JOURNAL_ENABLED and block_index % config.BALANCE_SNAPSHOT_INTERVAL == 0:
+            take_balance_snapshot(self.db, block_index)
+            take_owner_snapshot(self.db, block_index)
+
         if block_index > config.BTC_SRC20_GENESIS_BLOCK and block_index % 100 == 0:
             clear_zero_balances(self.db)
 
@@ -313,17 +345,22 @@ class BlockProcessor:
                 except Exception as e:
                     logger.warning(f"Failed to start sales history catchup: {e}")
 
-            try:
-                dispense_count = sales_history_processor.process_block_dispenses(block_index, self.db)
-                if dispense_count > 0:
-                    logger.info(f"Processed {dispense_count} stamp dispenses in block {block_index}")
-            except Exception as e:
-                logger.error(f"Error processing dispenses for block {block_index}: {e}")
-                # Don't fail the block for dispense processing errors
+            # With DISPENSE_PIPELINE_ENABLED, follow() hands the block's dispenses to
+            # the background dispense writer after commit instead
+            if not config.DISPENSE_PIPELINE_ENABLED:
+                try:
+                    with hotpath_phase("process_block_dispenses"):
+                        dispense_count = sales_history_processor.process_block_dispenses(block_index, self.db)
+                    if dispense_count > 0:
+                        logger.info(f"Processed {dispense_count} stamp dispenses in block {block_index}")
+                except Exception as e:
+                    logger.error(f"Error processing dispenses for block {block_index}: {e}")
+                    # Don't fail the block for dispense processing errors
 
-        new_ledger_hash, new_txlist_hash, new_messages_hash = create_check_hashes(
-            self.db, block_index, self.valid_stamps_in_block, valid_src20_str, txhash_list
-        )
+        with hotpath_phase("create_check_hashes"):
+            new_ledger_hash, new_txlist_hash, new_messages_hash = create_check_hashes(
+                self.db, block_index, self.valid_stamps_in_block, valid_src20_str, txhash_list, hash_state=block_hash_state
+            )
 
         # Only validate ledger hash if both valid_src20_str and new_ledger_hash are non-empty
         if valid_src20_str and new_ledger_hash:
@@ -359,8 +396,15 @@ class BlockProcessor:
         insert_transactions(self.db, tx_results)
 
 
-def commit_and_update_block(db, block_index, block_tip, src20_in_block=0, block_hash=None):
-    """Commit transaction and update block with proper error handling."""
+def commit_and_update_block(
+    db, block_index, block_tip, src20_in_block=0, block_hash=None, header_chain=None, previous_block_hash=None
+):
+    """Commit transaction and update block with proper error handling.
+
+    Once the block is committed its header is appended to ``header_chain``, so
+    every commit path keeps the parent of the next block available to follow()'s
+    orphan check.
+    """
     max_retries = 3
     retry_delay = 2  # seconds
 
@@ -378,6 +422,9 @@ def commit_and_update_block(db, block_index, block_tip, src20_in_block=0, block_
                     # update_src20_token_stats(db)  # Now handled by async holder updater
 
             db.commit()
+            block_hash_state.commit(block_index)
+            if header_chain is not None:
+                header_chain.append(block_index, block_hash, previous_block_hash)
             update_parsed_block(db, block_index)
 
             # Notify API of new block when near chain tip (reduces API cache staleness)
@@ -824,11 +871,21 @@ def rollback_to_block(db: Connection, block_index: int, reason: str) -> int:
         logger.error("XCP node hasn't rolled back properly, finding common ancestor...")
         return find_common_ancestor_with_xcp(db, target_block - 1)
 
+    dispense_pipeline = config.DISPENSE_PIPELINE_ENABLED and config.ENABLE_MARKET_DATA_SCHEDULER
+
     try:
+        if dispense_pipeline:
+            # Let queued blocks land first so the purge removes their sales too
+            dispense_writer.drain()
+
         # Perform the actual database rollback
         purge_block_db(db, target_block)
         # Note: purge_block_db now handles cache clearing internally after database operations
 
+        if dispense_pipeline:
+            # purge_block_db removes target_block itself, so the writer resumes after the block below it
+            dispense_writer.rewind(target_block - 1)
+
         # Rebuild critical database state
         logger.info("Rebuilding database state...")
         rebuild_balances(db)
@@ -893,6 +950,22 @@ def find_common_ancestor_with_xcp(db: Connection, start_index: int) -> int:
     return config.BLOCK_FIRST
 
 
+def lookahead_perf_fields(block_lookahead, prepared_block, wait_seconds):
+    """
+    Extra perf-log fields for blocks processed with the look-ahead stage enabled.
+
+    On a hit, t_fetch/t_filter/t_decode are the stage timings measured on the
+    look-ahead thread (overlapping the previous block), while t_total_ms only
+    includes ``t_lookahead_wait_ms`` for them.
+    """
+    if not block_lookahead:
+        return {}
+    return {
+        "lookahead_hit": prepared_block is not None,
+        "t_lookahead_wait_ms": round(wait_seconds * 1000, 3),
+    }
+
+
 def follow(
     db,
     executor=None,
@@ -943,6 +1016,15 @@ def follow(
         cp_pipeline_instance = None
         global profiler
         profiler = None
+        block_lookahead = None
+        block_prefetcher = None
+        decode_pool = None
+        if config.DECODE_PROCESS_POOL_ENABLED and not single_block:
+            # Worker processes start lazily on the first large block
+            decode_pool = DecodePool()
+        hotpath = get_hotpath_profiler()
+        # Dispenses ride along with the CP fetch and are stored after commit
+        dispense_pipeline = config.DISPENSE_PIPELINE_ENABLED and config.ENABLE_MARKET_DATA_SCHEDULER and not single_block
 
         # Initial database setup
         initialize(db)
@@ -985,6 +1067,13 @@ def follow(
             rollback_to_block(db, divergence_block - 1, f"Startup chain-integrity divergence at {divergence_block}")
             util.CURRENT_BLOCK_INDEX = last_db_index(db)
 
+        # Recent (hash, prev_hash) of indexed blocks for the per-block orphan check
+        header_chain = HeaderChain()
+        try:
+            header_chain.seed(db)
+        except Exception as e:
+            logger.warning(f"Failed to seed header chain, checking parents against bitcoind: {e}")
+
         block_tip = backend_instance.getblockcount()
         if util.CURRENT_BLOCK_INDEX == 0:
             logger.warning("New database.")
@@ -1057,6 +1146,20 @@ def follow(
                 block_index = new_block_index
             stamp_issuances_list = {}  # Initialize empty dict, will be populated by pipeline
 
+            # Raw bitcoind blocks are downloaded ahead of both the look-ahead
+            # stage and the main loop; get_tx_list consumes them by hash.
+            if config.BTC_BLOCK_PREFETCH_ENABLED and not single_block and isinstance(backend_instance, Backend):
+                block_prefetcher = BlockPrefetcher()
+                block_prefetcher.start(block_index)
+                backend_instance.block_prefetcher = block_prefetcher
+
+            # Staged look-ahead: fetch/filter/decode of upcoming blocks overlaps the
+            # DB write and hashing of the current one. Needs the CP pipeline for
+            # issuances; pointless for single-block runs.
+            if config.BLOCK_LOOKAHEAD_ENABLED and not single_block:
+                block_lookahead = BlockLookahead(cp_pipeline_instance)
+                block_lookahead.start(block_index)
+
             # Log fallback mode status
             if config.CP_FALLBACK_MODE:
                 logger.info("Pipeline initialized with fallback mode enabled - will continue processing if CP nodes fail")
@@ -1126,6 +1229,51 @@ def follow(
                 return True
             return False
 
+        def load_block_hash(height):
+            cursor = db.cursor()
+            try:
+                cursor.execute("SELECT block_hash FROM blocks WHERE block_index = %s", (height,))
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+            return rows[0][0] if len(rows) == 1 else None
+
+        def find_orphan_fork(block_index, canonical_parent):
+            """Return (last common height, our hash, canonical hash) if our parent of block_index is orphaned."""
+            return header_chain.find_fork(
+                block_index,
+                canonical_parent,
+                lambda block_hash: backend_instance.getblockheader(block_hash)["previousblockhash"],
+                load_block_hash,
+                first_height=config.BLOCK_FIRST,
+            )
+
+        def rollback_chain_reorg(fork):
+            """Roll back to the last block shared with the canonical chain; returns the block to resume from."""
+            fork_height, old_block_hash, new_block_hash = fork
+            logger.warning(f"Blockchain reorganization at block {fork_height + 1}.")
+
+            if check_rollback_loop(fork_height):
+                logger.error("Exiting due to rollback loop detection")
+                handle_rollback_loop_failure(
+                    error_message=f"Detected rollback loop at block {fork_height}", block_index=fork_height
+                )
+
+            log_reorg_event(
+                db,
+                block_index=fork_height,
+                old_block_hash=old_block_hash,
+                new_block_hash=new_block_hash,
+                rollback_depth=0,
+                detection_method="orphan_block_check",
+            )
+            resume_index = rollback_to_block(db, fork_height, "Chain reorganization detected")
+            header_chain.truncate(resume_index)
+            if cp_pipeline_instance:
+                logger.info(f"Resetting CP pipeline after chain reorg to block {resume_index}")
+                cp_pipeline_instance.reset(resume_index)
+            return resume_index
+
         def send_keepalive(db):
             """Send a lightweight query to keep the connection alive"""
             try:
@@ -1262,6 +1410,10 @@ def follow(
                         perf_t_dbwrite = 0.0
                         perf_n_txs = 0
                         perf_n_candidates = 0
+                        perf_t_lookahead_wait = 0.0
+                    if hotpath:
+                        hotpath.begin_block(block_index)
+                        hotpath.start("cp_wait")
 
                     # Start profiling for this block
                     if profiler:
@@ -1423,7 +1575,10 @@ def follow(
                                 # (substituting the empty-fetch shape). Default off -> identical to
                                 # fetch_xcp_blocks_concurrent.
                                 stamp_issuances_list = fetch_cp_blocks_skipping_empty(
-                                    block_index, end_block, progress_indicator=(block_index + 1 == block_tip)
+                                    block_index,
+                                    end_block,
+                                    progress_indicator=(block_index + 1 == block_tip),
+                                    include_dispenses=dispense_pipeline,
                                 )
 
                                 if stamp_issuances_list or not at_chain_tip:
@@ -1555,79 +1710,81 @@ def follow(
                         logger.debug(f"Block {block_index} has no stamp issuances - this is normal")
 
                     # Check for orphan blocks
-                    requires_rollback = False
-                    while True:
-                        if block_index == config.BLOCK_FIRST:
-                            break
+                    if hotpath:
+                        hotpath.stop("cp_wait")
+                        hotpath.start("orphan_check")
+                    # Below the tip a parent already in the header chain is checked against the
+                    # fetched block's previousblockhash further down; bitcoind is only asked here
+                    # at the tip, on ZMQ notifications, or when the chain does not hold the parent.
+                    reorg = None
+                    if block_index != config.BLOCK_FIRST and (
+                        at_chain_tip or is_zmq_notification or header_chain.hash_at(block_index - 1) is None
+                    ):
                         logger.debug(f"Checking that block {block_index} is not orphan.")
                         # Invalidate blockcount cache to ensure we have latest chain data for orphan check
                         backend_instance.invalidate_blockcount_cache()
                         current_hash = backend_instance.getblockhash(block_index)
-                        block_header = backend_instance.getblockheader(current_hash)
-                        backend_parent = block_header["previousblockhash"]
-                        cursor = db.cursor()
-                        block_query = """
-                        SELECT * FROM blocks WHERE block_index = %s
-                        """
-                        cursor.execute(block_query, (block_index - 1,))
-                        blocks = cursor.fetchall()
-                        columns = [desc[0] for desc in cursor.description]
-                        cursor.close()
-                        blocks_dict = [dict(zip(columns, row)) for row in blocks]
-                        if len(blocks_dict) != 1:
-                            break
-                        db_parent = blocks_dict[0]["block_hash"]
-
-                        if not isinstance(db_parent, str):
-                            raise TypeError("db_parent must be a string")
-                        if not isinstance(backend_parent, str):
-                            raise TypeError("backend_parent must be a string")
-                        if db_parent == backend_parent:
-                            break
-                        else:
-                            block_index -= 1
-                            requires_rollback = True
+                        backend_parent = backend_instance.getblockheader(current_hash)["previousblockhash"]
+                        reorg = find_orphan_fork(block_index, backend_parent)
+                    if hotpath:
+                        hotpath.stop("orphan_check")
 
-                    if requires_rollback:
-                        logger.warning(f"Blockchain reorganization at block {block_index}.")
-                        block_index -= 1
-
-                        if check_rollback_loop(block_index):
-                            logger.error("Exiting due to rollback loop detection")
-                            handle_rollback_loop_failure(
-                                error_message=f"Detected rollback loop at block {block_index}", block_index=block_index
-                            )
-
-                        log_reorg_event(
-                            db,
-                            block_index=block_index,
-                            old_block_hash=db_parent,
-                            new_block_hash=backend_parent,
-                            rollback_depth=0,
-                            detection_method="orphan_block_check",
-                        )
-                        block_index = rollback_to_block(db, block_index, "Chain reorganization detected")
-                        if cp_pipeline_instance:
-                            logger.info(f"Resetting CP pipeline after chain reorg to block {block_index}")
-                            cp_pipeline_instance.reset(block_index)
+                    if reorg:
+                        block_index = rollback_chain_reorg(reorg)
                         stamp_issuances_list = None
                         time.sleep(60)  # delay waiting for CP to catch up
                         continue
 
+                    if block_prefetcher:
+                        block_prefetcher.advance(block_index)
+
                     # Get block hash and verify
                     if perf_enabled:
                         _perf_phase_start = time.perf_counter()
+                    if hotpath:
+                        hotpath.start("fetch")
                     block_hash = backend_instance.getblockhash(block_index)
 
-                    # Get full block data from backend
-                    txhash_list_full, raw_transactions_full, block_time, previous_block_hash, difficulty = (
-                        backend_instance.get_tx_list(block_hash)
-                    )
-                    if perf_enabled:
-                        perf_t_fetch = time.perf_counter() - _perf_phase_start
+                    # Use the look-ahead stage's prepared block if it was built from
+                    # this exact block hash and CP data; otherwise process inline.
+                    prepared_block = None
+                    if block_lookahead:
+                        _lookahead_wait_start = time.perf_counter()
+                        with hotpath_phase("lookahead_wait"):
+                            prepared_block = block_lookahead.take(
+                                block_index, block_hash, stamp_issuances, util.CURRENT_BLOCK_INDEX
+                            )
+                        perf_t_lookahead_wait = time.perf_counter() - _lookahead_wait_start
+
+                    if prepared_block:
+                        block_time = prepared_block.block_time
+                        previous_block_hash = prepared_block.previous_block_hash
+                        difficulty = prepared_block.difficulty
+                        bitcoin_tx_count = prepared_block.n_txs
+                        if perf_enabled:
+                            # Stage timings were spent on the look-ahead thread, overlapping
+                            # the previous block; t_total_ms only carries the wait above.
+                            perf_t_fetch = prepared_block.t_fetch
+                    else:
+                        # Get full block data from backend
+                        txhash_list_full, raw_transactions_full, block_time, previous_block_hash, difficulty = (
+                            backend_instance.get_tx_list(block_hash)
+                        )
+                        if perf_enabled:
+                            perf_t_fetch = time.perf_counter() - _perf_phase_start
+                        bitcoin_tx_count = len(txhash_list_full)
+                    if hotpath:
+                        hotpath.stop("fetch")
+
+                    if header_chain.parent_mismatch(block_index, previous_block_hash):
+                        reorg = find_orphan_fork(block_index, previous_block_hash)
+                        if reorg:
+                            block_index = rollback_chain_reorg(reorg)
+                            stamp_issuances_list = None
+                            time.sleep(60)  # delay waiting for CP to catch up
+                            continue
 
                     # Log transaction counts for debugging
-                    bitcoin_tx_count = len(txhash_list_full)
                     if perf_enabled:
                         perf_n_txs = bitcoin_tx_count
                     cp_tx_count = 0
@@ -1695,16 +1852,35 @@ def follow(
                             stamp_issuances_list = None
                             continue
 
+                    # Record the block's outputs in the local prevout index before decoding,
+                    # so fee and source lookups for later blocks stay off RPC.
+                    prevout_index = get_prevout_index()
+                    if prevout_index:
+                        with hotpath_phase("prevout_index_ingest"):
+                            prevout_index.ingest_block(
+                                block_index,
+                                prepared_block.raw_transactions_full if prepared_block else raw_transactions_full,
+                            )
+
                     # Filter transactions based on genesis status
-                    block_data = {
-                        "tx": [{"txid": tx_hash, "hex": raw_transactions_full[tx_hash]} for tx_hash in txhash_list_full]
-                    }
-                    if perf_enabled:
-                        _perf_phase_start = time.perf_counter()
-                    txhash_list, raw_transactions = filter_block_transactions(block_data, stamp_issuances=stamp_issuances)
-                    if perf_enabled:
-                        perf_t_filter = time.perf_counter() - _perf_phase_start
-                        perf_n_candidates = len(raw_transactions)
+                    if prepared_block:
+                        txhash_list = prepared_block.txhash_list
+                        if perf_enabled:
+                            perf_t_filter = prepared_block.t_filter
+                            perf_n_candidates = prepared_block.n_candidates
+                    else:
+                        block_data = {
+                            "tx": [{"txid": tx_hash, "hex": raw_transactions_full[tx_hash]} for tx_hash in txhash_list_full]
+                        }
+                        if perf_enabled:
+                            _perf_phase_start = time.perf_counter()
+                        with hotpath_phase("filter"):
+                            txhash_list, raw_transactions = filter_block_transactions(
+                                block_data, stamp_issuances=stamp_issuances
+                            )
+                        if perf_enabled:
+                            perf_t_filter = time.perf_counter() - _perf_phase_start
+                            perf_n_candidates = len(raw_transactions)
 
                     util.CURRENT_BLOCK_INDEX = block_index
                     progress_watchdog.tick(label=f"block {block_index}")
@@ -1739,6 +1915,7 @@ def follow(
                         block_index = rollback_to_block(
                             db, rollback_target, "Chain reorganization detected (block already exists)"
                         )
+                        header_chain.truncate(block_index)
                         if cp_pipeline_instance:
                             cp_pipeline_instance.reset(block_index)
                         stamp_issuances_list = None
@@ -1755,13 +1932,15 @@ def follow(
                         valid_src20_str = ""
                         if perf_enabled:
                             _perf_phase_start = time.perf_counter()
-                        new_ledger_hash, new_txlist_hash, new_messages_hash = create_check_hashes(
-                            db,
-                            block_index,
-                            valid_stamps_in_block,
-                            valid_src20_str,
-                            txhash_list,
-                        )
+                        with hotpath_phase("create_check_hashes"):
+                            new_ledger_hash, new_txlist_hash, new_messages_hash = create_check_hashes(
+                                db,
+                                block_index,
+                                valid_stamps_in_block,
+                                valid_src20_str,
+                                txhash_list,
+                                hash_state=block_hash_state,
+                            )
                         if perf_enabled:
                             perf_t_hash = time.perf_counter() - _perf_phase_start
 
@@ -1780,7 +1959,12 @@ def follow(
                         if perf_enabled:
                             _perf_block_index = block_index
                             _perf_phase_start = time.perf_counter()
-                        block_index = commit_and_update_block(db, block_index, block_tip, 0, block_hash)
+                        with hotpath_phase("commit"):
+                            block_index = commit_and_update_block(
+                                db, block_index, block_tip, 0, block_hash, header_chain, previous_block_hash
+                            )
+                        if hotpath:
+                            hotpath.end_block()
                         if perf_enabled:
                             perf_t_dbwrite = time.perf_counter() - _perf_phase_start
                             record_block_perf(
@@ -1796,6 +1980,7 @@ def follow(
                                     "t_dbwrite_ms": round(perf_t_dbwrite * 1000, 3),
                                     "t_total_ms": round((time.perf_counter() - perf_block_start) * 1000, 3),
                                     "version": config.VERSION_STRING,
+                                    **lookahead_perf_fields(block_lookahead, prepared_block, perf_t_lookahead_wait),
                                 },
                             )
                         profiler.end_block_profiling()  # End profiling for this block
@@ -1808,67 +1993,96 @@ def follow(
                         continue
 
                     tx_results = []
+                    block_context = BlockContext(txhash_list, stamp_issuances)
+                    if hotpath:
+                        hotpath.start("decode")
 
-                    # Pre-warm the raw-transaction cache so each candidate's vin[0]
-                    # source lookup in get_tx_info is a cache hit (one batched RPC
-                    # per block instead of N serial round-trips). Output-neutral.
-                    prefetch_source_prevouts(raw_transactions)
+                    if prepared_block:
+                        # Already decoded and sorted by the look-ahead stage
+                        tx_results = list(prepared_block.tx_results)
+                        if perf_enabled:
+                            perf_t_decode = prepared_block.t_decode
+                    elif decode_pool and decode_pool.should_use(len(raw_transactions)):
+                        # Large block: decode candidates in worker processes
+                        if perf_enabled:
+                            _perf_phase_start = time.perf_counter()
+                        for result in decode_pool.decode_block(db, block_index, block_context.issuances, raw_transactions):
+                            if result.data is not None:
+                                tx_results.append(
+                                    result._replace(block_index=block_index, block_hash=block_hash, block_time=block_time)
+                                )
 
-                    # Process transactions in parallel
-                    if perf_enabled:
-                        _perf_phase_start = time.perf_counter()
-                    futures = []
-                    for tx_hash in raw_transactions:  # Only process transactions we have raw data for
-                        future = executor.submit(
-                            process_tx,
-                            db,
-                            tx_hash,
-                            block_index,
-                            stamp_issuances,
-                            raw_transactions,
-                        )
-                        futures.append(future)
-
-                    for future in concurrent.futures.as_completed(futures):
-                        result = future.result()
-                        if result.data is not None:
-                            result = result._replace(
-                                block_index=block_index,
-                                block_hash=block_hash,
-                                block_time=block_time,
+                        tx_results = block_context.sort_results(tx_results)
+                        if perf_enabled:
+                            perf_t_decode = time.perf_counter() - _perf_phase_start
+                    else:
+                        # Pre-warm the raw-transaction cache so each candidate's vin[0]
+                        # source lookup in get_tx_info is a cache hit (one batched RPC
+                        # per block instead of N serial round-trips). Output-neutral.
+                        with hotpath_phase("prevout_prefetch"):
+                            prefetch_source_prevouts(raw_transactions)
+
+                        # Process transactions in parallel
+                        if perf_enabled:
+                            _perf_phase_start = time.perf_counter()
+                        futures = []
+                        for tx_hash in raw_transactions:  # Only process transactions we have raw data for
+                            future = executor.submit(
+                                process_tx,
+                                db,
+                                tx_hash,
+                                block_index,
+                                block_context.issuances,
+                                raw_transactions,
                             )
-                            tx_results.append(result)
+                            futures.append(future)
+
+                        for future in concurrent.futures.as_completed(futures):
+                            result = future.result()
+                            if result.data is not None:
+                                result = result._replace(
+                                    block_index=block_index,
+                                    block_hash=block_hash,
+                                    block_time=block_time,
+                                )
+                                tx_results.append(result)
+
+                        tx_results = block_context.sort_results(tx_results)
+                        if perf_enabled:
+                            perf_t_decode = time.perf_counter() - _perf_phase_start
+                    if hotpath:
+                        hotpath.stop("decode")
 
-                    tx_results = sorted(tx_results, key=lambda x: txhash_list.index(x.tx_hash))
                     # Assign tx_index after sorting
                     for i, result in enumerate(tx_results):
                         tx_results[i] = result._replace(tx_index=tx_index)
                         tx_index += 1
-                    if perf_enabled:
-                        perf_t_decode = time.perf_counter() - _perf_phase_start
 
                     try:
                         if perf_enabled:
                             _perf_phase_start = time.perf_counter()
-                        block_processor = BlockProcessor(db)
-                        block_processor.insert_transactions(tx_results)
-                        block_processor.process_transaction_results(tx_results)
+                        block_processor = BlockProcessor(db, block_context)
+                        with hotpath_phase("insert_transactions"):
+                            block_processor.insert_transactions(tx_results)
+                        with hotpath_phase("process_transaction_results"):
+                            block_processor.process_transaction_results(tx_results)
                         if perf_enabled:
                             perf_t_dbwrite = time.perf_counter() - _perf_phase_start
                             _perf_phase_start = time.perf_counter()
 
-                        (
-                            new_ledger_hash,
-                            new_txlist_hash,
-                            new_messages_hash,
-                            stamps_in_block,
-                            src20_in_block,
-                            src101_in_block,
-                        ) = block_processor.finalize_block(block_index, block_time, txhash_list, block_tip)
+                        with hotpath_phase("finalize_block"):
+                            (
+                                new_ledger_hash,
+                                new_txlist_hash,
+                                new_messages_hash,
+                                stamps_in_block,
+                                src20_in_block,
+                                src101_in_block,
+                            ) = block_processor.finalize_block(block_index, block_time, txhash_list, block_tip)
                         if perf_enabled:
                             perf_t_hash = time.perf_counter() - _perf_phase_start
 
-                        stamp_issuances_list.pop(block_index, None)
+                        block_dispenses = (stamp_issuances_list.pop(block_index, None) or {}).get("dispenses")
                         log_block_info(
                             block_index,
                             start_time,
@@ -1883,7 +2097,15 @@ def follow(
                         if perf_enabled:
                             _perf_block_index = block_index
                             _perf_phase_start = time.perf_counter()
-                        block_index = commit_and_update_block(db, block_index, block_tip, src20_in_block, block_hash)
+                        committed_block_index = block_index
+                        with hotpath_phase("commit"):
+                            block_index = commit_and_update_block(
+                                db, block_index, block_tip, src20_in_block, block_hash, header_chain, previous_block_hash
+                            )
+                        if hotpath:
+                            hotpath.end_block()
+                        if dispense_pipeline:
+                            dispense_writer.enqueue(committed_block_index, block_dispenses)
                         if perf_enabled:
                             perf_t_dbwrite += time.perf_counter() - _perf_phase_start
                             record_block_perf(
@@ -1899,6 +2121,7 @@ def follow(
                                     "t_dbwrite_ms": round(perf_t_dbwrite * 1000, 3),
                                     "t_total_ms": round((time.perf_counter() - perf_block_start) * 1000, 3),
                                     "version": config.VERSION_STRING,
+                                    **lookahead_perf_fields(block_lookahead, prepared_block, perf_t_lookahead_wait),
                                 },
                             )
                         logger.debug(f"After commit: block_index now {block_index}, continuing to next iteration")
@@ -1986,7 +2209,9 @@ def follow(
                             break
                         else:
                             # If handle_ledger_mismatch returns True (FORCE mode), continue processing
-                            block_index = commit_and_update_block(db, block_index, block_tip, src20_in_block, block_hash)
+                            block_index = commit_and_update_block(
+                                db, block_index, block_tip, src20_in_block, block_hash, header_chain, previous_block_hash
+                            )
 
                             # Confirm that the previous block was successfully processed by the pipeline
                             if cp_pipeline_instance:
@@ -2403,6 +2628,43 @@ def follow(
             except Exception as e:
                 logger.debug(f"Error ending profiling: {e}")
 
+        if "block_lookahead" in locals() and block_lookahead is not None:
+            try:
+                block_lookahead.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping block look-ahead: {e}")
+
+        if "block_prefetcher" in locals() and block_prefetcher is not None:
+            backend_instance.block_prefetcher = None
+            try:
+                block_prefetcher.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping Bitcoin block prefetch: {e}")
+
+        if "decode_pool" in locals() and decode_pool is not None:
+            try:
+                decode_pool.shutdown()
+            except Exception as e:
+                logger.debug(f"Error stopping decode pool: {e}")
+
+        if locals().get("dispense_pipeline"):
+            try:
+                dispense_writer.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping dispense writer: {e}")
+
+        try:
+            logger.info(f"CP client stats: {cp_client.get_stats()}")
+            cp_client.close()
+        except Exception as e:
+            logger.debug(f"Error closing CP client: {e}")
+
+        if "hotpath" in locals() and hotpath is not None:
+            try:
+                hotpath.flush()
+            except Exception as e:
+                logger.debug(f"Error flushing hot-path profiler: {e}")
+
         # Cleanup all resources
         cleanup_resources(executor, zmq_notifier, update_cpids_future, db, cp_pipeline_instance, market_data_scheduler_started)
 
@@ -3,7 +3,7 @@
 import logging
 import threading
 from collections import OrderedDict
-from typing import Generic, Iterator, List, Optional, Tuple, TypeVar
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
 
 T = TypeVar("T")
 
@@ -30,7 +30,7 @@ class LRUCache(Generic[T]):
                 return None
             self.hits += 1
             self.cache.move_to_end(key)
-            logger.debug(f"Cache hit for key: {key}")
+            logger.debug("Cache hit for key: %s", key)
             return self.cache[key]
 
     def set(self, key: str, value: T) -> None:
@@ -41,13 +41,13 @@ class LRUCache(Generic[T]):
             self.cache[key] = value
             if len(self.cache) > self.max_size:
                 evicted_key, _ = self.cache.popitem(last=False)
-                logger.debug(f"Evicted key: {evicted_key} due to cache capacity")
+                logger.debug("Evicted key: %s due to cache capacity", evicted_key)
 
     def invalidate(self, key: str) -> None:
         """Remove a specific key from the cache."""
         with self._lock:
             if key in self.cache:
-                logger.debug(f"Invalidating key: {key}")
+                logger.debug("Invalidating key: %s", key)
             self.cache.pop(key, None)
 
     def clear(self) -> None:
@@ -56,6 +56,14 @@ class LRUCache(Generic[T]):
             logger.debug("Clearing all cache entries")
             self.cache.clear()
 
+    def shrink(self, fraction: float) -> int:
+        """Evict the least recently used ``fraction`` of the entries."""
+        with self._lock:
+            evict = min(len(self.cache), int(len(self.cache) * fraction))
+            for _ in range(evict):
+                self.cache.popitem(last=False)
+            return evict
+
     def __iter__(self) -> Iterator[str]:
         """Return an iterator over the cache keys."""
         with self._lock:
@@ -88,3 +96,343 @@ class LRUCache(Generic[T]):
     def get_metrics(self) -> Tuple[int, int]:
         """Return cache hit and miss metrics."""
         return self.hits, self.misses
+
+
+class TxByteCache(Generic[T]):
+    """
+    Thread-safe LRU cache of transaction data bounded by an estimated byte budget.
+
+    Keys are 32-byte digests (txids) rather than hex strings, and entries are
+    evicted once the sum of their sizes exceeds ``max_bytes`` (or their number
+    exceeds ``max_entries``). ``sizeof`` estimates an entry's size in bytes;
+    the default counts ``len(value)``, which suits raw transactions kept as
+    ``bytes``. ``shrink`` trims the coldest entries so memory pressure can be
+    relieved gradually instead of clearing the cache.
+    """
+
+    # Dict slot, key object and OrderedDict link per entry, roughly
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int, max_entries: Optional[int] = None, sizeof: Optional[Callable[[T], int]] = None) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._sizeof = sizeof or len
+        self.cache: OrderedDict[bytes, Tuple[T, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self) -> int:
+        """The byte budget; CacheManager and MemoryManager compare and log caches by ``max_size``."""
+        return self.max_bytes
+
+    def get(self, key: bytes) -> Optional[T]:
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: bytes, value: T, size: Optional[int] = None) -> None:
+        """Cache ``value``; ``size`` overrides the ``sizeof`` estimate."""
+        size = (self._sizeof(value) if size is None else size) + self.ENTRY_OVERHEAD
+        with self._lock:
+            old = self.cache.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            if size > self.max_bytes:
+                # Larger than the whole budget: caching it would only flush everything else
+                return
+            self.cache[key] = (value, size)
+            self.current_bytes += size
+            self._evict_to(self.max_bytes, self.max_entries)
+
+    def _evict_to(self, max_bytes: int, max_entries: Optional[int]) -> int:
+        evicted = 0
+        while self.cache and (self.current_bytes > max_bytes or (max_entries is not None and len(self.cache) > max_entries)):
+            _, (_, size) = self.cache.popitem(last=False)
+            self.current_bytes -= size
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def shrink(self, fraction: float) -> int:
+        """Evict least recently used entries until usage is ``1 - fraction`` of what it is now."""
+        with self._lock:
+            return self._evict_to(int(self.current_bytes * (1 - fraction)), None)
+
+    def invalidate(self, key: bytes) -> None:
+        with self._lock:
+            entry = self.cache.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.cache.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def contains(self, key: bytes) -> bool:
+        with self._lock:
+            return key in self.cache
+
+    def get_metrics(self) -> Tuple[int, int]:
+        """Return cache hit and miss metrics."""
+        return self.hits, self.misses
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        """Return size, budget and hit-rate statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.cache),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "evictions": self.evictions,
+        }
+
+
+class _LRUShard:
+    """One independently locked sub-map of a ShardedLRUCache."""
+
+    __slots__ = ("lock", "data", "sizes", "max_size", "max_bytes", "current_bytes", "hits", "misses", "evictions")
+
+    def __init__(self, max_size: int, max_bytes: Optional[int]) -> None:
+        self.lock = threading.Lock()
+        self.data: OrderedDict[Any, Any] = OrderedDict()
+        # key -> accounted size, only kept when the cache has a byte budget
+        self.sizes: Optional[Dict[Any, int]] = {} if max_bytes is not None else None
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any) -> Any:
+        """Caller holds the lock."""
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.data.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any, size: int) -> None:
+        """Caller holds the lock; ``size`` is ignored without a byte budget."""
+        if key in self.data:
+            self.data.move_to_end(key)
+        if self.sizes is not None:
+            self.current_bytes -= self.sizes.pop(key, 0)
+            if size > self.max_bytes:
+                # Larger than the whole shard budget: caching it would only flush everything else
+                self.data.pop(key, None)
+                return
+            self.sizes[key] = size
+            self.current_bytes += size
+        self.data[key] = value
+        self.evict_to(self.max_size, self.max_bytes)
+
+    def remove(self, key: Any) -> None:
+        """Caller holds the lock."""
+        if self.data.pop(key, None) is not None and self.sizes is not None:
+            self.current_bytes -= self.sizes.pop(key, 0)
+
+    def evict_to(self, max_size: int, max_bytes: Optional[int]) -> int:
+        """Caller holds the lock."""
+        evicted = 0
+        while self.data and (len(self.data) > max_size or (max_bytes is not None and self.current_bytes > max_bytes)):
+            key, _ = self.data.popitem(last=False)
+            if self.sizes is not None:
+                self.current_bytes -= self.sizes.pop(key, 0)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def clear(self) -> None:
+        """Caller holds the lock."""
+        self.data.clear()
+        if self.sizes is not None:
+            self.sizes.clear()
+        self.current_bytes = 0
+
+
+class ShardedLRUCache(Generic[T]):
+    """
+    Drop-in LRUCache split into independently locked shards.
+
+    Keys are spread over ``shards`` sub-maps by hash, each with its own lock,
+    LRU order and counters, so threads working on different keys rarely wait
+    on each other. Capacity is divided evenly between shards, which makes
+    eviction approximately rather than strictly least-recently-used; caches
+    whose few entries must never be evicted early (the stamp counters) should
+    stay on LRUCache. Hit, miss and eviction counters are kept per shard
+    under the shard lock and summed on read. With ``max_bytes`` each entry is also accounted through
+    ``sizeof`` (``len`` by default) and ``shrink`` becomes available to the
+    MemoryManager. ``get_many``/``put_many`` take each shard lock once per
+    batch, for block-level prefetch. ``None`` is not a cacheable value, as in
+    LRUCache.
+    """
+
+    DEFAULT_SHARDS = 16
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        shards: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[T], int]] = None,
+    ) -> None:
+        shard_count = max(1, min(shards or self.DEFAULT_SHARDS, max_size))
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or len
+        shard_size = -(-max_size // shard_count)
+        shard_bytes = -(-max_bytes // shard_count) if max_bytes is not None else None
+        self._shards = [_LRUShard(shard_size, shard_bytes) for _ in range(shard_count)]
+        self._shard_count = shard_count
+
+    def _shard(self, key: Any) -> _LRUShard:
+        return self._shards[hash(key) % self._shard_count]
+
+    def _size(self, value: T) -> int:
+        return self._sizeof(value) if self.max_bytes is not None else 0
+
+    def get(self, key: Any) -> Optional[T]:
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.get(key)
+
+    def set(self, key: Any, value: T) -> None:
+        size = self._size(value)
+        shard = self._shard(key)
+        with shard.lock:
+            shard.put(key, value, size)
+
+    def get_many(self, keys: Iterable[Any]) -> Dict[Any, T]:
+        """Return the cached values of ``keys``, taking each shard lock once."""
+        found: Dict[Any, T] = {}
+        for shard, shard_keys in self._group(keys).items():
+            with shard.lock:
+                for key in shard_keys:
+                    value = shard.get(key)
+                    if value is not None:
+                        found[key] = value
+        return found
+
+    def put_many(self, items: Union[Dict[Any, T], Iterable[Tuple[Any, T]]]) -> None:
+        """Cache every (key, value) pair, taking each shard lock once."""
+        pairs = items.items() if isinstance(items, dict) else items
+        grouped: Dict[_LRUShard, List[Tuple[Any, T, int]]] = {}
+        for key, value in pairs:
+            grouped.setdefault(self._shard(key), []).append((key, value, self._size(value)))
+        for shard, entries in grouped.items():
+            with shard.lock:
+                for key, value, size in entries:
+                    shard.put(key, value, size)
+
+    def _group(self, keys: Iterable[Any]) -> Dict[_LRUShard, List[Any]]:
+        grouped: Dict[_LRUShard, List[Any]] = {}
+        for key in keys:
+            grouped.setdefault(self._shard(key), []).append(key)
+        return grouped
+
+    def invalidate(self, key: Any) -> None:
+        shard = self._shard(key)
+        with shard.lock:
+            shard.remove(key)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.clear()
+
+    def shrink(self, fraction: float) -> int:
+        """Evict the coldest ``fraction`` of each shard's entries (or bytes, with a byte budget)."""
+        evicted = 0
+        for shard in self._shards:
+            with shard.lock:
+                if shard.sizes is not None:
+                    evicted += shard.evict_to(shard.max_size, int(shard.current_bytes * (1 - fraction)))
+                else:
+                    evicted += shard.evict_to(int(len(shard.data) * (1 - fraction)), None)
+        if evicted:
+            logger.debug("Shrunk sharded cache by %d entries", evicted)
+        return evicted
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return sum(len(shard.data) for shard in self._shards)
+
+    def __contains__(self, key: Any) -> bool:
+        return self.contains(key)
+
+    def items(self) -> List[Tuple[Any, T]]:
+        result: List[Tuple[Any, T]] = []
+        for shard in self._shards:
+            with shard.lock:
+                result.extend(shard.data.items())
+        return result
+
+    def keys(self) -> List[Any]:
+        return [key for key, _ in self.items()]
+
+    def values(self) -> List[T]:
+        return [value for _, value in self.items()]
+
+    def contains(self, key: Any) -> bool:
+        shard = self._shard(key)
+        with shard.lock:
+            return key in shard.data
+
+    @property
+    def hits(self) -> int:
+        return sum(shard.hits for shard in self._shards)
+
+    @property
+    def misses(self) -> int:
+        return sum(shard.misses for shard in self._shards)
+
+    @property
+    def evictions(self) -> int:
+        return sum(shard.evictions for shard in self._shards)
+
+    @property
+    def current_bytes(self) -> int:
+        return sum(shard.current_bytes for shard in self._shards)
+
+    def get_metrics(self) -> Tuple[int, int]:
+        """Return cache hit and miss metrics."""
+        return self.hits, self.misses
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        """Return size, hit-rate and eviction statistics summed over the shards."""
+        hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        stats: Dict[str, Union[int, float]] = {
+            "entries": len(self),
+            "max_size": self.max_size,
+            "shards": self._shard_count,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups * 100, 2) if lookups else 0,
+            "evictions": self.evictions,
+        }
+        if self.max_bytes is not None:
+            stats["bytes"] = self.current_bytes
+            stats["max_bytes"] = self.max_bytes
+        return stats
@@ -10,16 +10,19 @@ from config import (
     ADDRESS_CACHE_SIZE,
     BALANCE_CACHE_SIZE,
     BLOCK_CACHE_SIZE,
+    CACHE_SHARDS,
     COLLECTION_CACHE_SIZE,
     DEPLOYMENT_CACHE_SIZE,
     MARKET_DATA_CACHE_SIZE,
     PRICE_CACHE_SIZE,
     SRC101_DEPLOY_CACHE_SIZE,
+    SRC721_IMAGE_CACHE_BYTES,
+    SRC_BACKGROUND_CACHE_SIZE,
     STAMP_CACHE_SIZE,
     SUBASSET_CACHE_SIZE,
     TOTAL_MINTED_CACHE_SIZE,
 )
-from index_core.cache_types import LRUCache
+from index_core.cache_types import LRUCache, ShardedLRUCache, TxByteCache
 from index_core.memory_manager import memory_manager
 from index_core.stamp_types import DeployResult, SRC101DeployResult
 
@@ -53,18 +56,21 @@ class CacheManager:
         try:
             # Create each cache first with explicit typing
             caches_to_register: list[tuple[str, LRUCache[Any]]] = [
-                ("balance", LRUCache[D](max_size=BALANCE_CACHE_SIZE)),
-                ("total_minted", LRUCache[D](max_size=TOTAL_MINTED_CACHE_SIZE)),
+                ("balance", ShardedLRUCache[D](max_size=BALANCE_CACHE_SIZE, shards=CACHE_SHARDS)),
+                ("total_minted", ShardedLRUCache[D](max_size=TOTAL_MINTED_CACHE_SIZE, shards=CACHE_SHARDS)),
                 ("deploy", LRUCache[DeployResult](max_size=DEPLOYMENT_CACHE_SIZE)),
                 ("block", LRUCache[Any](max_size=BLOCK_CACHE_SIZE)),
                 ("stamp", LRUCache[int](max_size=STAMP_CACHE_SIZE)),
                 ("reissue", LRUCache[bool](max_size=DEPLOYMENT_CACHE_SIZE)),
                 ("subasset", LRUCache[str](max_size=SUBASSET_CACHE_SIZE)),
                 ("collection", LRUCache[str](max_size=COLLECTION_CACHE_SIZE)),
-                ("price", LRUCache[Optional[Dict[int, Any]]](max_size=PRICE_CACHE_SIZE)),
+                ("price", ShardedLRUCache[Optional[Dict[int, Any]]](max_size=PRICE_CACHE_SIZE, shards=CACHE_SHARDS)),
                 ("src101_deploy", LRUCache[SRC101DeployResult](max_size=SRC101_DEPLOY_CACHE_SIZE)),
-                ("address", LRUCache[str](max_size=ADDRESS_CACHE_SIZE)),
-                ("market_data", LRUCache[Any](max_size=MARKET_DATA_CACHE_SIZE)),
+                ("address", ShardedLRUCache[str](max_size=ADDRESS_CACHE_SIZE, shards=CACHE_SHARDS)),
+                ("market_data", ShardedLRUCache[Any](max_size=MARKET_DATA_CACHE_SIZE, shards=CACHE_SHARDS)),
+                ("src_background", LRUCache[Any](max_size=SRC_BACKGROUND_CACHE_SIZE)),
+                # sha256(base64) -> validate_base64_image result, bounded by the cleaned data URL size
+                ("src721_image", TxByteCache[Any](max_bytes=SRC721_IMAGE_CACHE_BYTES, sizeof=lambda result: len(result[1]))),
             ]
 
             # Register each cache with minimal locking
@@ -84,8 +90,10 @@ class CacheManager:
             logger.error(f"Error during CacheManager initialization: {e}")
             raise
 
-    def register_cache(self, name: str, cache: LRUCache[Any]) -> None:
-        """Register a cache for management."""
+    def register_cache(
+        self, name: str, cache: LRUCache[Any], priority: Optional[int] = None, refill_cost: Optional[float] = None
+    ) -> None:
+        """Register a cache for management; priority and refill_cost are passed to the MemoryManager."""
         try:
             # Quick check without lock first
             existing_cache = self._caches.get(name)
@@ -110,7 +118,7 @@ class CacheManager:
 
                 # Register the new cache
                 self._caches[name] = cache
-                memory_manager.register_cache(name, cache)
+                memory_manager.register_cache(name, cache, priority=priority, refill_cost=refill_cost)
                 logger.debug(f"Registered cache '{name}' with max_size={cache.max_size}")
         except Exception as e:
             logger.error(f"Error registering cache '{name}': {e}")
@@ -217,9 +225,7 @@ class CacheManager:
             try:
                 self.check_memory_pressure()
                 cache.set(key, value)  # LRUCache has its own thread safety
-                logger.debug(
-                    f"Set value in cache '{cache_name}' for key '{key}' (cache_size={len(cache)}, hits={cache.hits}, misses={cache.misses})"
-                )
+                logger.debug("Set value in cache '%s' for key '%s'", cache_name, key)
             except Exception as e:
                 logger.error(f"Error setting cache value: {e}")
         else:
@@ -232,10 +238,11 @@ class CacheManager:
         if cache is not None:
             try:
                 value = cache.get(key)  # LRUCache has its own thread safety
-                if value is not None:
-                    logger.debug(f"Cache hit in '{cache_name}' for key '{key}' (hits={cache.hits}, misses={cache.misses})")
-                else:
-                    logger.debug(f"Cache miss in '{cache_name}' for key '{key}' (hits={cache.hits}, misses={cache.misses})")
+                if logger.isEnabledFor(logging.DEBUG):
+                    outcome = "hit" if value is not None else "miss"
+                    logger.debug(
+                        f"Cache {outcome} in '{cache_name}' for key '{key}' (hits={cache.hits}, misses={cache.misses})"
+                    )
                 return value
             except Exception as e:
                 logger.error(f"Error getting cache value: {e}")
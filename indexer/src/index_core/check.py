@@ -236,7 +236,9 @@ def handle_consensus_error(error_msg: str) -> None:
 _BLOCK_ROW_NOT_PROVIDED = object()
 
 
-def consensus_hash(db, block_index, field, previous_consensus_hash, content, block_row=_BLOCK_ROW_NOT_PROVIDED):
+def consensus_hash(
+    db, block_index, field, previous_consensus_hash, content, block_row=_BLOCK_ROW_NOT_PROVIDED, update_field=True
+):
     field_position = config.BLOCK_FIELDS_POSITION
     cursor = db.cursor()
 
@@ -322,8 +324,9 @@ def consensus_hash(db, block_index, field, previous_consensus_hash, content, blo
                 field, block_index, calculated_hash, found_hash
             )
             handle_consensus_error(error_msg)
-    else:
-        # Save new hash.
+    elif update_field:
+        # Save new hash. create_check_hashes passes update_field=False and writes all
+        # three fields in one UPDATE instead.
         cursor.execute(
             """UPDATE blocks SET {} = %s WHERE block_index = %s""".format(field),
             (calculated_hash, block_index),
@@ -0,0 +1,173 @@
+"""
+Collection Market Data Aggregator
+
+Set-based replacement for MarketDataJobScheduler._process_collection_update.
+
+The per-collection path reads a collection's stamps and then queries
+stamp_holder_cache once per stamp to build the distinct holder set, so a
+cycle costs one round-trip per member stamp and only covers 50 collections.
+With COLLECTION_SET_AGGREGATION_ENABLED the collection job instead:
+
+- aggregate_collections computes total/listed stamps, floor and average price,
+  the volume sums, distinct holders and the largest holder's share of the held
+  supply for COLLECTION_AGGREGATION_CHUNK collections per INSERT ... SELECT
+  over collection_stamps, stamp_market_data and stamp_holder_cache, so the
+  rows are written by the same statement that computes them.
+- changed_collections limits the following runs to collections with a member
+  stamp whose market data or holder cache was written since the previous run,
+  plus collections without a row yet or whose member count changed. Members
+  are counted through StampTableV4 as in the aggregate, so a collection_stamps
+  row without a stamp does not make its collection look changed on every run.
+
+Floor, average and volume semantics match the per-collection path: prices only
+count when positive, missing volumes count as zero.
+"""
+
+import logging
+from typing import List, Optional
+
+import config
+from config import COLLECTION_MARKET_DATA_TABLE
+from index_core.caching import cache_manager
+from index_core.market_data_service import CACHE_KEY_COLLECTION_MARKET
+
+logger = logging.getLogger(__name__)
+
+# Per-collection market and holder aggregates, upserted into collection_market_data
+COLLECTION_AGGREGATE_SQL = f"""
+    INSERT INTO {COLLECTION_MARKET_DATA_TABLE} (
+        collection_id, total_stamps, listed_stamps, floor_price_btc, avg_price_btc,
+        volume_24h_btc, volume_7d_btc, volume_30d_btc, total_volume_btc,
+        unique_holders, top_holder_percentage, last_updated, created_at
+    )
+    SELECT * FROM (
+        SELECT
+            market.collection_id,
+            market.total_stamps,
+            market.listed_stamps,
+            market.floor_price_btc,
+            market.avg_price_btc,
+            market.volume_24h_btc,
+            market.volume_7d_btc,
+            market.volume_30d_btc,
+            market.total_volume_btc,
+            COALESCE(holders.unique_holders, 0) AS unique_holders,
+            COALESCE(holders.top_holder_percentage, 0) AS top_holder_percentage,
+            NOW() AS last_updated,
+            NOW() AS created_at
+        FROM (
+            SELECT
+                c.collection_id,
+                COUNT(s.stamp) AS total_stamps,
+                COUNT(CASE WHEN smd.floor_price_btc > 0 THEN 1 END) AS listed_stamps,
+                MIN(CASE WHEN smd.floor_price_btc > 0 THEN smd.floor_price_btc END) AS floor_price_btc,
+                AVG(CASE WHEN smd.floor_price_btc > 0 THEN smd.floor_price_btc END) AS avg_price_btc,
+                COALESCE(SUM(smd.volume_24h_btc), 0) AS volume_24h_btc,
+                COALESCE(SUM(smd.volume_7d_btc), 0) AS volume_7d_btc,
+                COALESCE(SUM(smd.volume_30d_btc), 0) AS volume_30d_btc,
+                COALESCE(SUM(smd.total_volume_btc), 0) AS total_volume_btc
+            FROM collections c
+            LEFT JOIN collection_stamps cs ON cs.collection_id = c.collection_id
+            LEFT JOIN StampTableV4 s ON s.stamp = cs.stamp
+            LEFT JOIN stamp_market_data smd ON smd.cpid = s.cpid
+            WHERE c.collection_id IN ({{collection_ids}})
+            GROUP BY c.collection_id
+        ) market
+        LEFT JOIN (
+            SELECT collection_id, COUNT(*) AS unique_holders, ROUND(MAX(held) * 100 / SUM(held), 2) AS top_holder_percentage
+            FROM (
+                SELECT members.collection_id, shc.address, SUM(shc.quantity) AS held
+                FROM (
+                    SELECT DISTINCT cs.collection_id, s.cpid
+                    FROM collection_stamps cs
+                    JOIN StampTableV4 s ON s.stamp = cs.stamp
+                    WHERE cs.collection_id IN ({{collection_ids}})
+                ) members
+                JOIN stamp_holder_cache shc ON shc.cpid = members.cpid AND shc.quantity > 0
+                GROUP BY members.collection_id, shc.address
+            ) per_holder
+            GROUP BY collection_id
+        ) holders ON holders.collection_id = market.collection_id
+    ) AS agg
+    ON DUPLICATE KEY UPDATE
+        total_stamps = agg.total_stamps,
+        listed_stamps = agg.listed_stamps,
+        floor_price_btc = agg.floor_price_btc,
+        avg_price_btc = agg.avg_price_btc,
+        volume_24h_btc = agg.volume_24h_btc,
+        volume_7d_btc = agg.volume_7d_btc,
+        volume_30d_btc = agg.volume_30d_btc,
+        total_volume_btc = agg.total_volume_btc,
+        unique_holders = agg.unique_holders,
+        top_holder_percentage = agg.top_holder_percentage,
+        last_updated = NOW()
+"""
+
+# Collections whose aggregates may be stale since %s (a database timestamp)
+CHANGED_COLLECTIONS_SQL = f"""
+    SELECT HEX(cs.collection_id)
+    FROM stamp_market_data smd
+    JOIN StampTableV4 s ON s.cpid = smd.cpid
+    JOIN collection_stamps cs ON cs.stamp = s.stamp
+    WHERE smd.last_updated >= %s
+    UNION
+    SELECT HEX(cs.collection_id)
+    FROM stamp_holder_cache shc
+    JOIN StampTableV4 s ON s.cpid = shc.cpid
+    JOIN collection_stamps cs ON cs.stamp = s.stamp
+    WHERE shc.last_updated >= %s
+    UNION
+    SELECT HEX(c.collection_id)
+    FROM collections c
+    LEFT JOIN (
+        SELECT cs.collection_id, COUNT(s.stamp) AS members
+        FROM collection_stamps cs
+        JOIN StampTableV4 s ON s.stamp = cs.stamp
+        GROUP BY cs.collection_id
+    ) m ON m.collection_id = c.collection_id
+    LEFT JOIN {COLLECTION_MARKET_DATA_TABLE} cmd ON cmd.collection_id = c.collection_id
+    WHERE cmd.collection_id IS NULL OR cmd.total_stamps <> COALESCE(m.members, 0)
+"""
+
+
+def database_time(db):
+    """Current database timestamp, used as the change watermark so app and DB clocks never mix."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT NOW()")
+        return cursor.fetchone()[0]
+
+
+def changed_collections(db, since) -> List[str]:
+    """Hex ids of the collections whose member stamps changed since ``since`` (see CHANGED_COLLECTIONS_SQL)."""
+    with db.cursor() as cursor:
+        cursor.execute(CHANGED_COLLECTIONS_SQL, (since, since))
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def aggregate_collections(db, collection_ids: Optional[List[str]] = None) -> int:
+    """
+    Recompute and upsert collection_market_data for ``collection_ids`` (hex), or for every collection.
+
+    Runs one INSERT ... SELECT per COLLECTION_AGGREGATION_CHUNK collections and
+    commits once. Returns the number of collections recomputed.
+    """
+    with db.cursor() as cursor:
+        if collection_ids is None:
+            cursor.execute("SELECT HEX(collection_id) FROM collections ORDER BY collection_id")
+            collection_ids = [row[0] for row in cursor.fetchall()]
+        if not collection_ids:
+            return 0
+
+        chunk_size = max(1, config.COLLECTION_AGGREGATION_CHUNK)
+        for start in range(0, len(collection_ids), chunk_size):
+            chunk = collection_ids[start : start + chunk_size]
+            placeholders = ", ".join(["UNHEX(%s)"] * len(chunk))
+            cursor.execute(COLLECTION_AGGREGATE_SQL.format(collection_ids=placeholders), [*chunk, *chunk])
+
+    db.commit()
+
+    cache_manager.invalidate_cache_entries(
+        "market_data", [f"{CACHE_KEY_COLLECTION_MARKET}:{collection_id}" for collection_id in collection_ids]
+    )
+    logger.debug(f"Aggregated market data for {len(collection_ids)} collections")
+    return len(collection_ids)
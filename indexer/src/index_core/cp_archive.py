@@ -0,0 +1,224 @@
+"""
+Local archive of Counterparty block responses.
+
+Every restart, reparse and fallback re-run used to fetch /blocks/N/transactions
+(25 per page with the verbose workaround), the completeness probe and the
+block's dispenses from the CP API again, although that data never changes once
+the block is buried. CPArchive is an optional SQLite file holding those
+responses, keyed by (block_index, endpoint) and tagged with the block hash
+they were fetched for. CPBlocksPipeline writes blocks with at least
+CP_ARCHIVE_MIN_CONFIRMATIONS confirmations, and fetch_xcp_blocks_concurrent
+reads the archive before going to the network, so catch-ups and reparses over
+ranges already seen (or CI replays of a fixed range) run without the API.
+
+Payloads are stored content-addressed: each response is serialized as compact
+JSON, zlib-compressed and stored once under its sha256, so identical responses
+(empty dispense lists, repeated writes) share a blob. Rows are only ever added;
+purge_block_db calls rollback() so a reorg drops every response at or above the
+fork, exactly like the rest of the database.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+CP_ARCHIVE_DB = "cp_archive.db"
+
+# Endpoint names under which the parts of one fetched block are stored
+BLOCK_ENDPOINT = "transactions"
+DISPENSES_ENDPOINT = "dispenses"
+
+
+def _encode(payload: Any) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class CPArchive:
+    """Compressed, content-addressed (block_index, endpoint) -> CP response store with rollback."""
+
+    def __init__(self, db_path: Optional[str] = None, compression_level: Optional[int] = None):
+        """
+        Args:
+            db_path (str): Path of the SQLite file (defaults to CP_ARCHIVE_PATH).
+            compression_level (int): zlib level used for new payloads.
+        """
+        if db_path is None:
+            db_path = config.CP_ARCHIVE_PATH
+        if db_path is None:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            db_path = os.path.abspath(os.path.join(base_dir, "..", "..", CP_ARCHIVE_DB))
+
+        self.db_path = db_path
+        self.compression_level = compression_level if compression_level is not None else config.CP_ARCHIVE_COMPRESSION_LEVEL
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        self.hits = 0
+        self.misses = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+        logger.info(f"Initializing CP response archive at: {self.db_path}")
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Create the blob and response tables if they don't exist."""
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cp_blobs (
+                    digest BLOB PRIMARY KEY,
+                    data BLOB NOT NULL
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS cp_responses (
+                    block_index INTEGER NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    block_hash TEXT,
+                    digest BLOB NOT NULL,
+                    PRIMARY KEY (block_index, endpoint)
+                ) WITHOUT ROWID;
+            """)
+            self.conn.commit()
+
+    def put_blocks(self, blocks: Dict[int, Dict[str, Any]]) -> int:
+        """
+        Archive blocks in the shape returned by fetch_xcp_blocks_concurrent.
+
+        Responses already archived for a block are left untouched, and a
+        ``dispenses`` of None (fetch failed) is not stored.
+
+        Args:
+            blocks (dict): {block_index: block_data}.
+
+        Returns:
+            int: Number of responses added.
+        """
+        entries = []
+        for block_index, block_data in blocks.items():
+            block_hash = block_data.get("xcp_block_hash")
+            block_part = {key: value for key, value in block_data.items() if key != "dispenses"}
+            entries.append((block_index, BLOCK_ENDPOINT, block_hash, block_part))
+            if block_data.get("dispenses") is not None:
+                entries.append((block_index, DISPENSES_ENDPOINT, block_hash, block_data["dispenses"]))
+        if not entries:
+            return 0
+
+        with self.lock:
+            present = self._present(min(blocks), max(blocks))
+            rows, blobs = [], {}
+            for block_index, endpoint, block_hash, payload in entries:
+                if (block_index, endpoint) in present:
+                    continue
+                try:
+                    raw = _encode(payload)
+                except (TypeError, ValueError) as e:
+                    logger.debug(f"Not archiving {endpoint} of block {block_index}: {e}")
+                    continue
+                digest = hashlib.sha256(raw).digest()
+                if digest not in blobs:
+                    blobs[digest] = zlib.compress(raw, self.compression_level)
+                    self.raw_bytes += len(raw)
+                    self.stored_bytes += len(blobs[digest])
+                rows.append((block_index, endpoint, block_hash, digest))
+            with self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO cp_blobs VALUES (?, ?)", blobs.items())
+                self.conn.executemany("INSERT OR IGNORE INTO cp_responses VALUES (?, ?, ?, ?)", rows)
+        if rows:
+            logger.debug(f"Archived {len(rows)} CP responses for blocks {min(blocks)}-{max(blocks)}")
+        return len(rows)
+
+    def _present(self, start_block, end_block):
+        """(block_index, endpoint) pairs already archived in a range. Caller holds the lock."""
+        cursor = self.conn.execute(
+            "SELECT block_index, endpoint FROM cp_responses WHERE block_index BETWEEN ? AND ?", (start_block, end_block)
+        )
+        return set(cursor.fetchall())
+
+    def get_blocks(self, start_block: int, end_block: int, include_dispenses: bool = False) -> Dict[int, Dict[str, Any]]:
+        """
+        Rebuild archived blocks in ``[start_block, end_block]``.
+
+        A block is only returned when every part the caller asked for is
+        archived, so a hit can stand in for a full fetch.
+
+        Returns:
+            dict: {block_index: block_data} for the blocks found.
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                """
+                SELECT r.block_index, r.endpoint, b.data
+                FROM cp_responses r JOIN cp_blobs b ON b.digest = r.digest
+                WHERE r.block_index BETWEEN ? AND ?
+                """,
+                (start_block, end_block),
+            )
+            responses: Dict[int, Dict[str, bytes]] = {}
+            for block_index, endpoint, data in cursor.fetchall():
+                responses.setdefault(block_index, {})[endpoint] = data
+
+        found = {}
+        for block_index, parts in responses.items():
+            if BLOCK_ENDPOINT not in parts or (include_dispenses and DISPENSES_ENDPOINT not in parts):
+                continue
+            block_data = json.loads(zlib.decompress(parts[BLOCK_ENDPOINT]))
+            if include_dispenses:
+                block_data["dispenses"] = json.loads(zlib.decompress(parts[DISPENSES_ENDPOINT]))
+            found[block_index] = block_data
+
+        with self.lock:
+            self.hits += len(found)
+            self.misses += end_block - start_block + 1 - len(found)
+        return found
+
+    def rollback(self, block_index: int) -> None:
+        """Drop every response at or above ``block_index``; blobs they shared with older blocks stay."""
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM cp_responses WHERE block_index >= ?", (block_index,))
+                self.conn.execute("DELETE FROM cp_blobs WHERE digest NOT IN (SELECT digest FROM cp_responses)")
+        logger.warning(f"Rolled back CP response archive from block {block_index}")
+
+    def get_stats(self):
+        """Return lookup counters and the compression ratio of payloads written by this process."""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "compression_ratio": self.raw_bytes / self.stored_bytes if self.stored_bytes else 0.0,
+            }
+
+    def close(self):
+        """Close the SQLite connection."""
+        with self.lock:
+            self.conn.close()
+
+
+_cp_archive: Optional[CPArchive] = None
+_cp_archive_lock = threading.Lock()
+
+
+def get_cp_archive() -> Optional[CPArchive]:
+    """Return the shared CPArchive, or None when CP_ARCHIVE_ENABLED is off."""
+    global _cp_archive
+    if not config.CP_ARCHIVE_ENABLED:
+        return None
+    if _cp_archive is None:
+        with _cp_archive_lock:
+            if _cp_archive is None:
+                _cp_archive = CPArchive()
+    return _cp_archive
@@ -0,0 +1,217 @@
+"""
+Long-lived HTTP client for Counterparty API traffic.
+
+fetch_xcp_async used to build a ClientSession and connector per request,
+fetch_xcp_blocks_concurrent a fresh event loop per call, and fetch_xcp went
+through bare requests.get, so every batch paid DNS, TCP and TLS setup again.
+CPClient runs one event loop on a dedicated daemon thread and keeps one
+keep-alive ClientSession per node origin on it. Coroutines on any loop can
+await get_async (the request hops onto the client loop when needed); sync
+callers use get or run. Rate limiting and per-node circuit breakers are
+applied to every request, and connection reuse is counted through aiohttp
+tracing so get_stats shows whether keep-alive is actually working.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the node's circuit breaker is open."""
+
+
+class CPResponse:
+    """A fully read response; the connection is back in the pool by the time callers see it."""
+
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class CPClient:
+    """Pooled aiohttp sessions on one background event loop, with a sync facade."""
+
+    def __init__(
+        self,
+        connections_per_node: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        rate_limiter_for: Optional[Callable[[str], Any]] = None,
+        circuit_breakers=None,
+    ):
+        """
+        Args:
+            connections_per_node (int): Connection pool size per node origin.
+            keepalive_timeout (float): Seconds an idle pooled connection is kept.
+            rate_limiter_for (callable): url -> RateLimiter awaited before each request.
+            circuit_breakers (EndpointCircuitBreakers): Breakers keyed by the
+                ``breaker_key`` passed with a request (the node name).
+        """
+        self.connections_per_node = connections_per_node or config.CP_CLIENT_CONNECTIONS_PER_NODE
+        self.keepalive_timeout = keepalive_timeout if keepalive_timeout is not None else config.CP_CLIENT_KEEPALIVE_TIMEOUT
+        self.rate_limiter_for = rate_limiter_for
+        self.circuit_breakers = circuit_breakers
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        # origin (scheme://host:port) -> session; only touched on the client loop
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rejected": 0, "connections_created": 0, "connections_reused": 0}
+
+    # ------------------------------------------------------------------
+    # Event loop thread
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._run_loop, args=(loop,), name="cp-client", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+                self._sessions = {}
+                logger.debug("CP client event loop started")
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def in_client_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run ``coro`` on the client loop and block until it finishes."""
+        if self.in_client_thread():
+            coro.close()
+            raise RuntimeError("CPClient.run() would deadlock on the client loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Close the pooled sessions and stop the loop thread; the next request starts a new one."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or thread is None or not thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_sessions(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Error closing CP client sessions: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    async def _close_sessions(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            await session.close()
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    async def _on_connection_create_end(self, session, context, params) -> None:
+        self._count("connections_created")
+
+    async def _on_connection_reuseconn(self, session, context, params) -> None:
+        self._count("connections_reused")
+
+    def _session(self, url: str) -> aiohttp.ClientSession:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(origin)
+        if session is None or session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_create_end)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+            connector = aiohttp.TCPConnector(
+                limit=self.connections_per_node,
+                ttl_dns_cache=300,
+                keepalive_timeout=self.keepalive_timeout,
+                enable_cleanup_closed=True,
+            )
+            session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+            self._sessions[origin] = session
+        return session
+
+    async def _get(self, url: str, params, timeout: float, breaker_key: Optional[str]) -> CPResponse:
+        breakers = self.circuit_breakers if breaker_key is not None else None
+        if breakers is not None and not breakers.can_proceed(breaker_key):
+            self._count("rejected")
+            raise CircuitOpenError(f"Circuit breaker open for {breaker_key}")
+        if self.rate_limiter_for is not None:
+            await self.rate_limiter_for(url).acquire_async()
+
+        self._count("requests")
+        try:
+            timeout_obj = aiohttp.ClientTimeout(total=timeout, connect=5)
+            async with self._session(url).get(url, params=params, timeout=timeout_obj) as response:
+                result = CPResponse(response.status, response.headers, await response.read())
+        except Exception:
+            self._count("errors")
+            if breakers is not None:
+                breakers.record_failure(breaker_key)
+            raise
+        if breakers is not None:
+            if result.status == 200:
+                breakers.record_success(breaker_key)
+            else:
+                breakers.record_failure(breaker_key)
+        return result
+
+    async def get_async(
+        self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10, breaker_key: Optional[str] = None
+    ) -> CPResponse:
+        """GET ``url`` from a coroutine on any event loop."""
+        loop = self._ensure_loop()
+        if asyncio.get_running_loop() is loop:
+            return await self._get(url, params, timeout, breaker_key)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._get(url, params, timeout, breaker_key), loop))
+
+    def get(
+        self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10, breaker_key: Optional[str] = None
+    ) -> CPResponse:
+        """Blocking GET for sync callers."""
+        return self.run(self._get(url, params, timeout, breaker_key))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats: Dict[str, Any] = dict(self.stats)
+        connections = stats["connections_created"] + stats["connections_reused"]
+        stats["reuse_ratio"] = round(stats["connections_reused"] / connections * 100, 2) if connections else 0.0
+        stats["sessions"] = len(self._sessions)
+        return stats
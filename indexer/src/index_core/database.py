@@ -7,6 +7,7 @@ import sys
 import time
 from collections import Counter, defaultdict
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
@@ -18,9 +19,10 @@ try:
 except ImportError:
     Connection = Any  # type: ignore
 try:
-    from pymysql.cursors import Cursor
+    from pymysql.cursors import Cursor, SSCursor
 except ImportError:
     Cursor = Any  # type: ignore
+    SSCursor = None  # type: ignore
 
 import config
 import index_core.exceptions as exceptions
@@ -42,10 +44,22 @@ from config import (
     STAMP_VIEWS_TABLE,
     TRANSACTIONS_TABLE,
 )
+from index_core.activity_calculator import ActivityLevel, StampActivityCalculator
+from index_core.balance_journal import (
+    rollback_balance_journal,
+    rollback_owner_journal,
+    seed_balance_snapshot,
+    seed_owner_snapshot,
+    verify_balance_snapshot,
+    verify_owner_snapshot,
+)
 from index_core.caching import SRC101DeployResult, cache_manager, clear_all_caches
+from index_core.cp_archive import get_cp_archive
 from index_core.database_manager import DatabaseManager
 from index_core.exceptions import BlockAlreadyExistsError, BlockUpdateError, DatabaseInsertError
 from index_core.memory_manager import memory_manager
+from index_core.prevout_index import get_prevout_index
+from index_core.src20_holder_updater import reconcile_holder_counts
 from index_core.stamp_types import NO_DEPLOY, DeployResult
 
 from .reprocessing_queue import ReprocessingQueue
@@ -64,6 +78,11 @@ CACHE_DIR = (
 )
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+# balances.amt is DECIMAL(38,18); the streaming rebuild keeps amounts as integer 1e-18 units
+BALANCE_AMT_SCALE = 18
+STREAM_FETCH_SIZE = 10000
+STREAM_MEMORY_CHECK_ROWS = 100000
+
 
 def initialize(db: Connection) -> None:
     """Initialize data, create and populate the database."""
@@ -655,25 +674,56 @@ def get_existing_balances(cursor: Cursor) -> List[Tuple[Any, ...]]:
     return [tuple(row) for row in cursor.fetchall()]
 
 
-def get_src20_valid_list(cursor: Cursor, block_index: Optional[int] = None) -> List[Tuple[Any, ...]]:
-    """Get valid SRC-20 transactions up to the specified block index."""
+def _src20_valid_query(block_index: Optional[int] = None) -> Tuple[str, Tuple[Any, ...]]:
     query = f"""
     SELECT op, creator, destination, tick, tick_hash, amt, block_time, block_index
     FROM {SRC20_VALID_TABLE}
     WHERE (op = 'TRANSFER' OR op = 'MINT') AND amt > 0
-    """
+    """  # nosec
+    params: Tuple[Any, ...] = ()
     if block_index is not None:
         query += " AND block_index <= %s"
+        params = (block_index,)
     query += " ORDER by block_index"
+    return query, params
 
-    if block_index is not None:
-        cursor.execute(query, (block_index,))
+
+def get_src20_valid_list(cursor: Cursor, block_index: Optional[int] = None) -> List[Tuple[Any, ...]]:
+    """Get valid SRC-20 transactions up to the specified block index."""
+    query, params = _src20_valid_query(block_index)
+
+    if params:
+        cursor.execute(query, params)
     else:
         cursor.execute(query)
 
     return list(cursor.fetchall())
 
 
+def _iter_unbuffered(db: Connection, query: str, params: Tuple[Any, ...] = ()):
+    """
+    Yield the rows of ``query`` through an unbuffered server-side cursor.
+
+    The connection can't run other queries until the generator is exhausted or closed.
+    """
+    cursor = db.cursor(SSCursor)
+    try:
+        cursor.execute(query, params or None)
+        while True:
+            rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def iter_src20_valid_rows(db: Connection, block_index: Optional[int] = None):
+    """Stream the rows of get_src20_valid_list in block_index order without buffering them."""
+    query, params = _src20_valid_query(block_index)
+    return _iter_unbuffered(db, query, params)
+
+
 def get_existing_owners(cursor: Cursor) -> List[Tuple[Any, ...]]:
     """Get existing owners from the database."""
     query = """
@@ -868,6 +918,104 @@ def calculate_balances(src20_valid_list: List[Tuple[Any, ...]]) -> Dict[str, Dic
     return all_balances
 
 
+def _amt_to_units(amt) -> int:
+    """Convert a DECIMAL(38,18) amount to an exact integer count of 1e-18 units."""
+    sign, digits, exponent = D(amt).as_tuple()
+    units = int("".join(map(str, digits)))
+    shift = exponent + BALANCE_AMT_SCALE
+    units = units * 10**shift if shift >= 0 else units // 10**-shift
+    return -units if sign else units
+
+
+def _units_to_amt(units: int) -> D:
+    return D(f"{units}E-{BALANCE_AMT_SCALE}")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def calculate_balances_streaming(src20_valid_rows) -> Dict[str, Dict[str, List[Any]]]:
+    """
+    Aggregate SRC-20 rows, in block order, into compact per-tick balances.
+
+    Same result as calculate_balances, consumed one row at a time so the
+    history is never held in memory. Returns
+    {tick: {address: [units, tick_hash, last_update, block_time]}} where units
+    is the amount in integer 1e-18 units; addresses and tick hashes are interned
+    and rows of one block share one block_time object.
+    """
+    balances: Dict[str, Dict[str, List[Any]]] = defaultdict(dict)
+    last_block, last_block_time = None, None
+
+    for count, (op, creator, destination, tick, tick_hash, amt, block_time, block_index) in enumerate(src20_valid_rows, 1):
+        if block_index == last_block:
+            block_time = last_block_time
+        else:
+            last_block, last_block_time = block_index, block_time
+        units = _amt_to_units(amt)
+        tick_hash = _intern(tick_hash)
+        tick_balances = balances[tick]
+
+        changes = ((destination, units), (creator, -units)) if op == "TRANSFER" else ((destination, units),)
+        for address, change in changes:
+            entry = tick_balances.get(address)
+            if entry is None:
+                tick_balances[_intern(address)] = [change, tick_hash, block_index, block_time]
+            else:
+                entry[0] += change
+                entry[1] = tick_hash
+                entry[2] = block_index
+                entry[3] = block_time
+
+        if count % STREAM_MEMORY_CHECK_ROWS == 0:
+            memory_manager.clear_caches_if_needed()
+
+    return balances
+
+
+def count_live_balances(balances: Dict[str, Dict[str, List[Any]]]) -> int:
+    return sum(1 for tick_balances in balances.values() for entry in tick_balances.values() if entry[0])
+
+
+def iter_balance_rows(balances: Dict[str, Dict[str, List[Any]]]):
+    """Yield balances table rows for the non-zero entries of calculate_balances_streaming."""
+    for tick, tick_balances in balances.items():
+        for address, (units, tick_hash, last_update, block_time) in tick_balances.items():
+            if units:
+                yield (f"{tick}_{address}", tick, tick_hash, address, _units_to_amt(units), last_update, block_time, "SRC-20")
+
+
+def streamed_balances_need_update(db: Connection, balances: Dict[str, Dict[str, List[Any]]]) -> bool:
+    """
+    Compare the balances table with calculate_balances_streaming's result.
+
+    Same comparison as balances_need_update on (tick, tick_hash, address, amt),
+    but existing rows are streamed and checked one by one instead of both sides
+    being materialized as sets.
+    """
+    expected = count_live_balances(balances)
+    matched = mismatched = 0
+    for tick, tick_hash, address, amt in _iter_unbuffered(
+        db, "SELECT tick, tick_hash, address, amt FROM balances WHERE p = 'SRC-20' AND amt != 0"
+    ):
+        entry = balances.get(tick, {}).get(address)
+        if entry is not None and entry[1] == tick_hash and entry[0] == _amt_to_units(amt):
+            matched += 1
+        else:
+            mismatched += 1
+            if mismatched <= 5:
+                logger.debug(f"Balance differs from calculated: {(tick, tick_hash, address, amt)}")
+
+    logger.info(f"Compared {matched + mismatched} non-zero existing balances with {expected} non-zero calculated balances")
+    if mismatched or matched != expected:
+        logger.info(
+            f"Found {mismatched} differing balances in database and {expected - matched} calculated balances not in database"
+        )
+        return True
+    return False
+
+
 def owners_need_update(existing_owners, all_owners):
     """Compare existing owners with calculated owners"""
     try:
@@ -991,6 +1139,25 @@ def insert_owners(cursor, all_owners):
 
 
 def rebuild_owners(db, block_index=None):
+    """
+    Rebuild the owners table from the SRC101Valid history.
+
+    With BALANCE_JOURNAL_ENABLED the replay of the current state is skipped
+    when the table matches the latest owner snapshot, and a fresh snapshot is
+    seeded after any full rebuild.
+    """
+    if config.BALANCE_JOURNAL_ENABLED and block_index is None:
+        if verify_owner_snapshot(db):
+            logger.info("Owners verified against snapshot. Skipping full rebuild.")
+        else:
+            _rebuild_owners(db)
+            seed_owner_snapshot(db)
+    else:
+        _rebuild_owners(db, block_index)
+
+
+def _rebuild_owners(db, block_index=None):
+    """Replay the SRC101Valid history and rewrite the owners table if it differs."""
     cursor = db.cursor()
 
     try:
@@ -1019,11 +1186,35 @@ def rebuild_owners(db, block_index=None):
 
 
 def rebuild_balances(db, block_index=None):
-    """Rebuild the balances table with optimized performance for large datasets."""
+    """
+    Rebuild the balances table with optimized performance for large datasets.
+
+    With BALANCE_JOURNAL_ENABLED a full rebuild of the current state is skipped
+    when the table matches the latest balance snapshot, and a fresh snapshot is
+    seeded after any full rebuild. With SRC20_HOLDER_COUNTERS_ENABLED the holder
+    counters are then reconciled with the (possibly rolled back) balances.
+    """
     if DEBUG_SKIP_REBUILD_BALANCES:
         logger.warning("DEBUG MODE: Skipping rebuild_balances due to DEBUG_SKIP_REBUILD_BALANCES flag")
         return
 
+    if config.BALANCE_JOURNAL_ENABLED and block_index is None:
+        if verify_balance_snapshot(db):
+            logger.info("Balances verified against snapshot. Skipping full rebuild.")
+        else:
+            _rebuild_balances(db)
+            seed_balance_snapshot(db)
+    else:
+        _rebuild_balances(db, block_index)
+
+    if config.SRC20_HOLDER_COUNTERS_ENABLED:
+        repaired = reconcile_holder_counts(db)
+        db.commit()
+        logger.info(f"SRC-20 holder counters reconciled ({len(repaired)} ticks repaired)")
+
+
+def _rebuild_balances(db, block_index=None):
+    """Replay the SRC20Valid history and rewrite the balances table if it differs."""
     # Use dedicated connection for long operation
     long_db = db_manager.get_long_running_connection()
     cursor = long_db.cursor()
@@ -1041,41 +1232,48 @@ def rebuild_balances(db, block_index=None):
         BATCH_SIZE = config.DB_REBUILD_BATCH_SIZE
         COMMIT_INTERVAL = 25
 
-        # Get all data first to maintain exact same logic
-        existing_balances = get_existing_balances(cursor)
-        src20_valid_list = get_src20_valid_list(cursor, block_index)
-        all_balances = calculate_balances(src20_valid_list)
+        if config.BALANCE_REBUILD_STREAMING:
+            balances = calculate_balances_streaming(iter_src20_valid_rows(long_db, block_index))
+            if not streamed_balances_need_update(long_db, balances):
+                logger.info("No changes in balances. Skipping deletion and insertion.")
+                return
+            total_rows = count_live_balances(balances)
+            values = iter_balance_rows(balances)
+        else:
+            # Get all data first to maintain exact same logic
+            existing_balances = get_existing_balances(cursor)
+            src20_valid_list = get_src20_valid_list(cursor, block_index)
+            all_balances = calculate_balances(src20_valid_list)
 
-        if not balances_need_update(existing_balances, all_balances):
-            logger.info("No changes in balances. Skipping deletion and insertion.")
-            return
+            if not balances_need_update(existing_balances, all_balances):
+                logger.info("No changes in balances. Skipping deletion and insertion.")
+                return
+
+            rows = [
+                (
+                    key,
+                    value["tick"],
+                    value["tick_hash"],
+                    value["address"],
+                    value["amt"],
+                    value["last_update"],
+                    value["block_time"],
+                    "SRC-20",
+                )
+                for key, value in all_balances.items()
+                if value["amt"] != 0  # Skip zero balances
+            ]
+            total_rows = len(rows)
+            values = iter(rows)
 
         # Create temp table
         temp_table = "temp_balances_" + str(int(time.time()))
         logger.debug(f"Creating temporary table: {temp_table}")
         cursor.execute(f"CREATE TABLE {temp_table} LIKE balances")
 
-        # Insert into temp table in batches
-        values = [
-            (
-                key,
-                value["tick"],
-                value["tick_hash"],
-                value["address"],
-                value["amt"],
-                value["last_update"],
-                value["block_time"],
-                "SRC-20",
-            )
-            for key, value in all_balances.items()
-            if value["amt"] != 0  # Skip zero balances
-        ]
-
-        # Use smaller batch size for inserts to prevent timeouts
-        total_rows = len(values)
-
+        # Insert into temp table in batches, using smaller batch size for inserts to prevent timeouts
         for i in range(0, total_rows, BATCH_SIZE):
-            batch = values[i : i + BATCH_SIZE]
+            batch = list(islice(values, BATCH_SIZE))
             logger.info(
                 f"Processing balance rebuild batch {i // BATCH_SIZE + 1}/{(total_rows + BATCH_SIZE - 1) // BATCH_SIZE}"
             )
@@ -1173,6 +1371,8 @@ def purge_block_db(db: Connection, block_index: int) -> None:
     - All stamps (StampTableV4, collection_stamps)
     - All token data (SRC20, SRC101)
     - All market data (stamp_sales_history)
+    - SRC-20 balances and SRC-101 owners, reverted from their journals when enabled
+    - The local prevout index, when enabled
     - All caches
 
     Args:
@@ -1219,9 +1419,21 @@ def purge_block_db(db: Connection, block_index: int) -> None:
             (block_index,),
         )  # nosec
 
+    if config.BALANCE_JOURNAL_ENABLED:
+        rollback_balance_journal(cursor, block_index)
+        rollback_owner_journal(cursor, block_index)
+
     db.commit()
     cursor.close()
 
+    prevout_index = get_prevout_index()
+    if prevout_index:
+        prevout_index.rollback(block_index)
+
+    cp_archive = get_cp_archive()
+    if cp_archive:
+        cp_archive.rollback(block_index)
+
     # CRITICAL: Clear all caches AFTER database purge is complete
     # This ensures stamp counter is recalculated from the correct database state
     clear_all_caches()
@@ -1680,14 +1892,24 @@ def get_next_stamp_number(db, identifier):
     return next_number
 
 
-def check_reissue(db: Connection, cpid: str, valid_stamps_in_block: List[Dict[str, Any]]) -> bool:
-    """Check for reissue with caching."""
+def check_reissue(
+    db: Connection, cpid: str, valid_stamps_in_block: List[Dict[str, Any]], block_context: Optional[Any] = None
+) -> bool:
+    """Check for reissue with caching.
+
+    ``block_context`` (BlockContext), when given, answers the in-block check from
+    its cpid set instead of scanning valid_stamps_in_block.
+    """
     # If the CPID is already in the cache, it's a reissue
     reissue_cache = cache_manager.get_cache("reissue")
     if reissue_cache is not None and cpid in reissue_cache:
         return True
 
-    if check_reissue_in_block(valid_stamps_in_block, cpid):
+    if block_context is not None:
+        reissued_in_block = block_context.has_reissue(cpid)
+    else:
+        reissued_in_block = check_reissue_in_block(valid_stamps_in_block, cpid)
+    if reissued_in_block:
         cache_manager.set_cache_value("reissue", cpid, True)
         return True
 
@@ -2259,8 +2481,15 @@ def insert_stamp_market_data(db: Connection, market_data: Dict[str, Any]) -> Non
             values.extend([None, None])  # Will be replaced by NOW()
             update_fields.append("last_updated = NOW()")
 
+            # Next due time from the stored activity level (new rows start COLD)
+            fields.append("next_update_at")
+            update_fields.append(f"next_update_at = {StampActivityCalculator.next_update_sql()}")
+            cold_minutes = StampActivityCalculator.UPDATE_INTERVALS[ActivityLevel.COLD]
+
             # Build query
-            placeholders = ", ".join(["%s"] * (len(fields) - 2)) + ", NOW(), NOW()"
+            placeholders = (
+                ", ".join(["%s"] * (len(fields) - 3)) + f", NOW(), NOW(), DATE_ADD(NOW(), INTERVAL {cold_minutes} MINUTE)"
+            )
             field_list = ", ".join(fields)
             update_clause = ", ".join(update_fields)
 
@@ -2700,9 +2929,11 @@ def apply_schema_updates(db, cursor):
                     "Activity level based on trading frequency for optimization",
                 ),
                 ("last_activity_time", "INT", "Unix timestamp of last trading activity"),
+                ("next_update_at", "TIMESTAMP NULL", "When the activity level makes this stamp due for a refresh"),
             ],
             "indexes": [
                 ("idx_activity_level", ["activity_level", "last_updated"]),  # For activity-based update scheduling
+                ("idx_next_update", ["activity_level", "next_update_at"]),  # Due-time queue, one range scan per tier
             ],
         },
         "src20_market_data": {
@@ -2710,6 +2941,11 @@ def apply_schema_updates(db, cursor):
                 ("progress_percentage", "DECIMAL(5,2) DEFAULT 0.00", "Minting progress as percentage (0.00-100.00)"),
                 ("total_minted", "BIGINT DEFAULT 0", "Total amount minted from balances table sum"),
                 ("total_mints", "INTEGER DEFAULT 0", "Total count of MINT operations from SRC20Valid table"),
+                (
+                    "minted_supply",
+                    "DECIMAL(38,18) DEFAULT 0",
+                    "Exact sum of positive balances, kept by the incremental holder counters",
+                ),
                 (
                     "price_source_type",
                     "ENUM('last_traded', 'floor_ask', 'composite', 'unknown') DEFAULT 'unknown'",
@@ -2721,6 +2957,16 @@ def apply_schema_updates(db, cursor):
                 ("idx_total_minted", ["total_minted"]),  # For minted amount sorting
             ],
         },
+        "collection_market_data": {
+            "columns": [
+                (
+                    "top_holder_percentage",
+                    "DECIMAL(5,2) DEFAULT 0",
+                    "Share of the held supply owned by the largest holder",
+                ),
+            ],
+            "indexes": [],
+        },
         "SRC20Valid": {
             "columns": [],
             "indexes": [
@@ -3142,6 +3388,10 @@ def initialize_tables(db):
             "stamp_views",
             "node_version_history",
             "reorg_events",
+            "balance_deltas",
+            "balance_snapshots",
+            "owner_deltas",
+            "owner_snapshots",
         ]
 
         # Only include market data tables if the scheduler is enabled
@@ -0,0 +1,222 @@
+"""
+Process-pool candidate decoding.
+
+follow() decodes a block's stamp candidates with process_tx on a small thread
+pool. That work is CPU-bound Python (deserialization, script parsing, ARC4,
+size calculation), so the threads mostly take turns on the GIL. DecodePool runs
+the pure part of the decode (process_vout + decode_tx_core) in worker
+processes instead.
+
+All RPC and DB access stays in the parent. Before dispatching, the inputs of
+every candidate are resolved in one pass (local prevout index first, then one
+batched getrawtransaction for the rest), so a worker only receives
+(tx_hash, tx_hex, input total, vin[0] scriptPubKey) and returns a compact
+TxResult. A candidate whose vin[0] prevout could not be resolved is decoded
+with process_tx in the parent, exactly like the thread-pool path.
+"""
+
+import concurrent.futures
+import logging
+import multiprocessing
+import time
+from typing import Dict, List, Optional, Tuple
+
+import config
+from index_core.exceptions import BTCOnlyError, DecodeError
+from index_core.fetch_utils import find_issuance_by_tx_hash
+from index_core.prevout_index import get_prevout_index, parse_prevouts_and_outputs
+from index_core.transaction_utils import (
+    EMPTY_TRANSACTION_INFO,
+    TxResult,
+    backend_instance,
+    build_tx_result,
+    decode_tx_core,
+    empty_tx_result,
+    list_tx_fields,
+    process_tx,
+    process_vout,
+)
+
+logger = logging.getLogger(__name__)
+
+NULL_HASH = b"\x00" * 32
+
+
+def decode_candidate(task) -> Optional[TxResult]:
+    """
+    Worker entry point: decode one candidate from pre-resolved prevout data.
+
+    Mirrors process_tx -> list_tx -> get_tx_info with the RPC lookups replaced
+    by ``total_input_value`` and ``source_script_pubkey``. Returns None when
+    the transaction carries data but its source could not be resolved, so the
+    parent decodes it inline. ``decoded_tx`` is not sent back.
+    """
+    tx_hash, tx_hex, block_index, stamp_issuance, total_input_value, source_script_pubkey = task
+    try:
+        try:
+            ctx = backend_instance.deserialize(tx_hex)
+            vout_info = process_vout(ctx, block_index, stamp_issuance=stamp_issuance, total_input_value=total_input_value)
+            transaction_info = decode_tx_core(
+                ctx, vout_info, block_index, stamp_issuance=stamp_issuance, source_script_pubkey=source_script_pubkey
+            )
+        except (DecodeError, BTCOnlyError):
+            transaction_info = EMPTY_TRANSACTION_INFO
+
+        if transaction_info.data and transaction_info.source is None:
+            return None
+
+        result = build_tx_result(tx_hash, block_index, list_tx_fields(tx_hash, transaction_info, stamp_issuance))
+    except Exception:
+        return empty_tx_result(tx_hash, block_index)
+    return result._replace(decoded_tx=None)
+
+
+def resolve_candidate_prevouts(raw_transactions: Dict[str, str]) -> Dict[str, Tuple[int, Optional[bytes]]]:
+    """
+    Resolve the input total and vin[0] scriptPubKey of every candidate.
+
+    The input total follows calculate_total_inputs: 0 for coinbase inputs, a
+    missing parent or an out-of-range output index.
+
+    Args:
+        raw_transactions (dict): ``{tx_hash: tx_hex}`` of the block's candidates.
+
+    Returns:
+        dict: ``{tx_hash: (total_input_value, source_script_pubkey or None)}``.
+    """
+    candidate_inputs = {}
+    outpoints = set()
+    for tx_hash, tx_hex in raw_transactions.items():
+        try:
+            prevouts, _ = parse_prevouts_and_outputs(bytes.fromhex(tx_hex))
+        except Exception:
+            prevouts = None
+        candidate_inputs[tx_hash] = prevouts
+        if prevouts and all(prev_hash != NULL_HASH for prev_hash, _ in prevouts):
+            outpoints.update((prev_hash[::-1].hex(), prev_vout) for prev_hash, prev_vout in prevouts)
+
+    prevout_index = get_prevout_index()
+    resolved = prevout_index.get_many(outpoints) if prevout_index else {}
+
+    missing_txids = list(dict.fromkeys(outpoint[0] for outpoint in outpoints if outpoint not in resolved))
+    if missing_txids:
+        try:
+            parent_txs = backend_instance.getrawtransaction_batch(missing_txids, verbose=False, skip_missing=True)
+        except Exception as e:
+            logger.debug(f"Prevout batch fetch failed, leaving {len(missing_txids)} parents unresolved: {e}")
+            parent_txs = {}
+        for parent_hash, parent_hex in parent_txs.items():
+            if not parent_hex:
+                continue
+            _, parent_outputs = parse_prevouts_and_outputs(bytes.fromhex(parent_hex))
+            for vout, value, script_pubkey in parent_outputs:
+                if (parent_hash, vout) in outpoints:
+                    resolved[(parent_hash, vout)] = (value, script_pubkey)
+
+    results = {}
+    for tx_hash, prevouts in candidate_inputs.items():
+        if not prevouts or any(prev_hash == NULL_HASH for prev_hash, _ in prevouts):
+            results[tx_hash] = (0, None)
+            continue
+        keys = [(prev_hash[::-1].hex(), prev_vout) for prev_hash, prev_vout in prevouts]
+        total_input_value = sum(resolved[key][0] for key in keys) if all(key in resolved for key in keys) else 0
+        source = resolved.get(keys[0])
+        results[tx_hash] = (total_input_value, source[1] if source else None)
+    return results
+
+
+class DecodePool:
+    """Persistent process pool for decoding large blocks' stamp candidates."""
+
+    def __init__(self, workers=None, min_candidates=None):
+        """
+        Args:
+            workers (int): Worker processes (defaults to DECODE_PROCESS_POOL_WORKERS).
+            min_candidates (int): Smallest candidate count worth dispatching to the pool.
+        """
+        self.workers = max(1, workers if workers is not None else config.DECODE_PROCESS_POOL_WORKERS)
+        self.min_candidates = min_candidates if min_candidates is not None else config.DECODE_PROCESS_POOL_MIN_CANDIDATES
+        # spawn rather than fork: follow() already runs several threads whose
+        # locks a forked child could inherit in a held state
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+        self.blocks = 0
+        self.pooled = 0
+        self.inline = 0
+
+    def should_use(self, n_candidates):
+        """Whether a block with ``n_candidates`` candidates is worth the IPC overhead."""
+        return n_candidates >= self.min_candidates
+
+    def decode_block(self, db, block_index, stamp_issuances, raw_transactions) -> List[TxResult]:
+        """
+        Decode every candidate of a block.
+
+        Returns one TxResult per candidate, in no particular order, just like
+        collecting process_tx futures. Results that carry data get their
+        ``decoded_tx`` re-attached from the parent's deserialize cache.
+        """
+        start = time.perf_counter()
+        if not isinstance(stamp_issuances, (list, dict)):
+            stamp_issuances = []
+
+        prevouts = resolve_candidate_prevouts(raw_transactions)
+        tasks = [
+            (
+                tx_hash,
+                tx_hex,
+                block_index,
+                find_issuance_by_tx_hash(stamp_issuances, tx_hash),
+                *prevouts[tx_hash],
+            )
+            for tx_hash, tx_hex in raw_transactions.items()
+        ]
+
+        try:
+            chunksize = max(1, len(tasks) // (self.workers * 4))
+            pool_results = list(self.executor.map(decode_candidate, tasks, chunksize=chunksize))
+        except Exception as e:
+            logger.warning(f"Decode pool failed for block {block_index}, decoding inline: {e}")
+            self._restart()
+            pool_results = [None] * len(tasks)
+
+        results = []
+        n_inline = 0
+        for task, result in zip(tasks, pool_results):
+            tx_hash = task[0]
+            if result is None:
+                n_inline += 1
+                result = process_tx(db, tx_hash, block_index, stamp_issuances, raw_transactions)
+            elif result.data is not None:
+                result = result._replace(decoded_tx=backend_instance.deserialize(raw_transactions[tx_hash]))
+            results.append(result)
+
+        self.blocks += 1
+        self.pooled += len(tasks) - n_inline
+        self.inline += n_inline
+        logger.debug(
+            f"Decode pool block {block_index}: {len(tasks)} candidates ({n_inline} inline) "
+            f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        return results
+
+    def _restart(self):
+        """Replace a broken executor."""
+        try:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def get_stats(self):
+        """Return block and candidate counters."""
+        return {"workers": self.workers, "blocks": self.blocks, "pooled": self.pooled, "inline": self.inline}
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        logger.info(f"Decode pool stopped: {self.get_stats()}")
@@ -21,6 +21,8 @@ from index_core.node_health import (
 
 from .cache_utils import cache_manager, cached_api_call
 from .circuit_breaker import endpoint_circuit_breakers
+from .cp_archive import get_cp_archive
+from .cp_client import CircuitOpenError, CPClient
 
 logger = logging.getLogger(__name__)
 
@@ -146,6 +148,11 @@ def get_rate_limiter_for_url(url: str) -> RateLimiter:
     return limiter
 
 
+# Shared connection pools for all CP API traffic (fetch_xcp, fetch_xcp_async and
+# the block range fetch), rate limited and circuit-broken per node.
+cp_client = CPClient(rate_limiter_for=get_rate_limiter_for_url, circuit_breakers=endpoint_circuit_breakers)
+
+
 def _parse_retry_after(value) -> float:
     """Parse a Retry-After header value into seconds. Accepts integer
     seconds or HTTP-date format; returns 60s default on failure."""
@@ -174,9 +181,15 @@ def _parse_retry_after(value) -> float:
 
 
 def find_issuance_by_tx_hash(issuances, tx_hash):
-    """Find an issuance by transaction hash."""
+    """Find an issuance by transaction hash.
+
+    ``issuances`` is either the block's issuance list or a ``{tx_hash: issuance}``
+    index (BlockContext.issuances).
+    """
     if not issuances:
         return None
+    if isinstance(issuances, dict):
+        return issuances.get(tx_hash)
     for issuance in issuances:
         if issuance and issuance.get("tx_hash") == tx_hash:
             return issuance
@@ -641,133 +654,76 @@ async def fetch_xcp_async(
         nodes_to_try = healthy_nodes
 
     for node in nodes_to_try:
+        url = f"{node['url'].rstrip('/')}{endpoint}"
+        logger.debug(f"Async fetch from {node['name']} at URL: {url} with params: {params}")
+        failure = None
         try:
-            # Check circuit breaker before attempting request
-            if not endpoint_circuit_breakers.can_proceed(node["name"]):
-                logger.debug(f"Circuit breaker OPEN for {node['name']}, skipping")
-                continue
-
-            url = f"{node['url'].rstrip('/')}{endpoint}"
-            logger.debug(f"Async fetch from {node['name']} at URL: {url} with params: {params}")
-
-            try:
-                # Check if we're in a shutdown state first
-                try:
-                    loop = asyncio.get_running_loop()
-                    if loop.is_closed():
-                        logger.warning(f"Event loop is closed, skipping {node['name']}")
-                        continue
-                except RuntimeError:
-                    logger.warning(f"No running event loop, skipping {node['name']}")
-                    continue
-
-                # Create timeout and connector configuration for aiohttp
-                timeout_obj = aiohttp.ClientTimeout(total=timeout, connect=5)
-
-                try:
-                    connector = aiohttp.TCPConnector(
-                        limit=20,  # Reduced total connection pool size
-                        limit_per_host=10,  # Reduced connections per host for external APIs
-                        ttl_dns_cache=300,  # DNS cache TTL
-                        use_dns_cache=True,
-                        keepalive_timeout=30,  # Keep connections alive
-                        enable_cleanup_closed=True,
-                    )
-
-                    async with aiohttp.ClientSession(
-                        timeout=timeout_obj, connector=connector, headers={"Connection": "keep-alive"}
-                    ) as session:
-                        # Proactive rate limit — keeps us under the CDN's
-                        # per-IP budget instead of waiting for 429 retries.
-                        await get_rate_limiter_for_url(url).acquire_async()
-                        async with session.get(url, params=params) as response:
-                            logger.debug(f"Response status from {node['name']}: {response.status}")
-                            if response.status == 200:
-                                data = await response.json()
-                                health_tracker = node_health_tracker.get(node["name"])
-                                if health_tracker:
-                                    health_tracker.mark_success()
-                                endpoint_circuit_breakers.record_success(node["name"])
-                                return data
-                            else:
-                                error_text = await response.text()
-                                # Truncate to avoid dumping raw HTML error pages into logs
-                                error_preview = error_text[:200] if error_text else ""
-
-                                # Verbose logging for all non-200 responses to help with debugging
-                                if response.status == 429:
-                                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
-                                    logger.warning(
-                                        f"⏳ Node {node['name']} returned 429 (Too Many Requests) for {endpoint}; "
-                                        f"backing off {retry_after:.0f}s"
-                                    )
-                                    set_rate_limit_backoff(retry_after)
-                                elif response.status == 503:
-                                    logger.warning(
-                                        f"⏳ Node {node['name']} returned 503 (Service Unavailable) for {endpoint}\n"
-                                        f"   URL: {url}\n"
-                                        f"   Params: {params}\n"
-                                        f"   Response: {error_preview}\n"
-                                        f"   This typically means Counterparty is still catching up to this block"
-                                    )
-                                else:
-                                    # Verbose logging for all other non-200 errors
-                                    logger.warning(
-                                        f"❌ Node {node['name']} returned HTTP {response.status} for {endpoint}\n"
-                                        f"   URL: {url}\n"
-                                        f"   Params: {params}\n"
-                                        f"   Response: {error_preview}"
-                                    )
-
-                                health_tracker = node_health_tracker.get(node["name"])
-                                if health_tracker:
-                                    health_tracker.mark_failure(f"HTTP {response.status}: {error_preview}")
-                                endpoint_circuit_breakers.record_failure(node["name"])
-
-                except RuntimeError as re:
-                    if "cannot schedule new futures after shutdown" in str(re):
-                        logger.warning(f"Event loop shutting down, cannot connect to {node['name']}")
-                        health_tracker = node_health_tracker.get(node["name"])
-                        if health_tracker:
-                            health_tracker.mark_failure("Event loop shutdown")
-                        continue
-                    else:
-                        raise  # Re-raise if it's a different RuntimeError
-
-            except asyncio.TimeoutError:
-                logger.warning(f"Timeout fetching from {node['name']} (during session.get for {url})")
-                health_tracker = node_health_tracker.get(node["name"])
-                if health_tracker:
-                    health_tracker.mark_failure("Timeout during session.get")
-                endpoint_circuit_breakers.record_failure(node["name"])
-            except aiohttp.ServerDisconnectedError as sde:
-                logger.warning(f"Server disconnected from {node['name']} for {url}: {sde}")
-                health_tracker = node_health_tracker.get(node["name"])
-                if health_tracker:
-                    health_tracker.mark_failure(f"ServerDisconnectedError: {sde}")
-                endpoint_circuit_breakers.record_failure(node["name"])
-            except aiohttp.ClientConnectorError as cce:
-                logger.warning(f"Connection failed to {node['name']} for {url}: {cce}")
+            # The shared client applies the per-node circuit breaker and the
+            # proactive rate limit that keeps us under the CDN's per-IP budget.
+            response = await cp_client.get_async(url, params=params, timeout=timeout, breaker_key=node["name"])
+            logger.debug(f"Response status from {node['name']}: {response.status}")
+            if response.status == 200:
+                data = response.json()
                 health_tracker = node_health_tracker.get(node["name"])
                 if health_tracker:
-                    health_tracker.mark_failure(f"ClientConnectorError: {cce}")
-                endpoint_circuit_breakers.record_failure(node["name"])
-            except Exception as inner_get_exc:
-                logger.error(
-                    f"Exception during session.get for {url}. Error: {type(inner_get_exc).__name__}: {inner_get_exc}",
-                    exc_info=True,
+                    health_tracker.mark_success()
+                return data
+
+            # Truncate to avoid dumping raw HTML error pages into logs
+            error_preview = response.text[:200]
+
+            # Verbose logging for all non-200 responses to help with debugging
+            if response.status == 429:
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                logger.warning(
+                    f"⏳ Node {node['name']} returned 429 (Too Many Requests) for {endpoint}; "
+                    f"backing off {retry_after:.0f}s"
                 )
-                health_tracker = node_health_tracker.get(node["name"])
-                if health_tracker:
-                    health_tracker.mark_failure(f"Exception during session.get: {type(inner_get_exc).__name__}")
-                endpoint_circuit_breakers.record_failure(node["name"])
+                set_rate_limit_backoff(retry_after)
+            elif response.status == 503:
+                logger.warning(
+                    f"⏳ Node {node['name']} returned 503 (Service Unavailable) for {endpoint}\n"
+                    f"   URL: {url}\n"
+                    f"   Params: {params}\n"
+                    f"   Response: {error_preview}\n"
+                    f"   This typically means Counterparty is still catching up to this block"
+                )
+            else:
+                # Verbose logging for all other non-200 errors
+                logger.warning(
+                    f"❌ Node {node['name']} returned HTTP {response.status} for {endpoint}\n"
+                    f"   URL: {url}\n"
+                    f"   Params: {params}\n"
+                    f"   Response: {error_preview}"
+                )
+            failure = f"HTTP {response.status}: {error_preview}"
 
-        except Exception as e:
-            logger.error(f"Outer exception for node {node['name']} in fetch_xcp_async: {type(e).__name__}: {e}", exc_info=True)
-            health_tracker = node_health_tracker.get(node["name"])
-            if health_tracker:
-                health_tracker.mark_failure(str(e))
+        except CircuitOpenError:
+            logger.debug(f"Circuit breaker OPEN for {node['name']}, skipping")
+            continue
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout fetching from {node['name']} (during session.get for {url})")
+            failure = "Timeout during session.get"
+        except aiohttp.ServerDisconnectedError as sde:
+            logger.warning(f"Server disconnected from {node['name']} for {url}: {sde}")
+            failure = f"ServerDisconnectedError: {sde}"
+        except aiohttp.ClientConnectorError as cce:
+            logger.warning(f"Connection failed to {node['name']} for {url}: {cce}")
+            failure = f"ClientConnectorError: {cce}"
+        except json.JSONDecodeError as jde:
+            logger.warning(f"Invalid JSON from {node['name']} for {url}: {jde}")
+            failure = f"JSONDecodeError: {jde}"
             endpoint_circuit_breakers.record_failure(node["name"])
+        except Exception as inner_get_exc:
+            logger.error(
+                f"Exception during session.get for {url}. Error: {type(inner_get_exc).__name__}: {inner_get_exc}",
+                exc_info=True,
+            )
+            failure = f"Exception during session.get: {type(inner_get_exc).__name__}"
+
+        health_tracker = node_health_tracker.get(node["name"])
+        if health_tracker:
+            health_tracker.mark_failure(failure)
 
     logger.error("All nodes failed in async fetch")
 
@@ -882,11 +838,10 @@ def fetch_xcp(
         url = f"{node['url'].rstrip('/')}{endpoint}"
         try:
             logger.debug(f"Fetching from {node['name']} at URL: {url}")
-            # Proactive rate limit — same chokepoint as the async path
-            # to keep us under the CDN budget.
-            get_rate_limiter_for_url(url).acquire()
-            response = requests.get(url, params=params, timeout=10)
-            logger.debug(f"Response status from {node['name']}: {response.status_code}")
+            # Proactive rate limit and circuit breaker are applied by the
+            # shared client, same as the async path.
+            response = cp_client.get(url, params=params, timeout=10, breaker_key=node["name"])
+            logger.debug(f"Response status from {node['name']}: {response.status}")
 
             if response.ok:
                 data = response.json()
@@ -899,17 +854,20 @@ def fetch_xcp(
             else:
                 # Truncate to avoid dumping raw HTML error pages into logs
                 error_body = response.text[:200] if response.text else ""
-                if response.status_code == 429:
+                if response.status == 429:
                     retry_after = _parse_retry_after(response.headers.get("Retry-After"))
                     logger.warning(f"⏳ Node {node['name']} returned 429 (Too Many Requests); backing off {retry_after:.0f}s")
                     set_rate_limit_backoff(retry_after)
                 else:
-                    logger.warning(f"Error response from {node['name']}: HTTP {response.status_code}: {error_body}")
-                last_error = f"HTTP {response.status_code}: {error_body}"
+                    logger.warning(f"Error response from {node['name']}: HTTP {response.status}: {error_body}")
+                last_error = f"HTTP {response.status}: {error_body}"
                 # Mark node failure
                 health_tracker = node_health_tracker.get(node["name"])
                 if health_tracker:
-                    health_tracker.mark_failure(f"HTTP {response.status_code}: {error_body}")
+                    health_tracker.mark_failure(f"HTTP {response.status}: {error_body}")
+        except CircuitOpenError as e:
+            logger.debug(f"Circuit breaker OPEN for {node['name']}, skipping")
+            last_error = str(e)
         except Exception as e:
             logger.error(f"Fetch error for {node['name']} at {url}: {e}")
             last_error = str(e)
@@ -928,8 +886,6 @@ def fetch_xcp(
     # This prevents the 30-second delay before fallback mode detection
     logger.warning("🚨 ALL NODES FAILED - triggering immediate health update")
     try:
-        from index_core.node_health import update_healthy_nodes
-
         update_healthy_nodes()
         logger.info("Emergency health update completed after total node failure")
     except Exception as e:
@@ -1541,7 +1497,7 @@ async def _fetch_block_transactions_original(block_index: int, node_url: Optiona
 
 
 def fetch_xcp_blocks_concurrent(
-    start_block: int, end_block: int, progress_indicator: bool = False
+    start_block: int, end_block: int, progress_indicator: bool = False, include_dispenses: bool = False
 ) -> Dict[int, Dict[str, Any]]:
     """
     Fetch a range of blocks from the CP API with concurrent processing.
@@ -1553,11 +1509,14 @@ def fetch_xcp_blocks_concurrent(
         - "xcp_block_hash": The block hash from XCP
         - "transactions": List of all transactions in original order
         - "issuances": List of issuance transactions (sorted by tx_index)
+        - "dispenses": The block's dispenses, only with include_dispenses
+          (None if that request failed)
 
     Args:
         start_block: First block to fetch
         end_block: Last block to fetch (inclusive)
         progress_indicator: Whether to show progress indicators for blocks
+        include_dispenses: Also fetch each block's dispenses in the same pass
 
     Returns:
         Dictionary mapping block indices to block data
@@ -1573,16 +1532,25 @@ def fetch_xcp_blocks_concurrent(
     if num_blocks > 100:
         logger.warning(f"Attempting to fetch a large range of {num_blocks} blocks, this may take some time")
 
-    # Create an async event loop and run the collection
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(_fetch_blocks_range_async(start_block, end_block, progress_indicator))
-    finally:
-        loop.close()
+    # Buried blocks seen before come from the local archive instead of the API
+    cp_archive = get_cp_archive()
+    archived = cp_archive.get_blocks(start_block, end_block, include_dispenses) if cp_archive else {}
+    if len(archived) == num_blocks:
+        logger.debug(f"Blocks {start_block} to {end_block} served from the CP archive")
+        return archived
+
+    # Run on the shared CP client loop so the pooled connections are reused across batches
+    return cp_client.run(
+        _fetch_blocks_range_async(start_block, end_block, progress_indicator, include_dispenses, archived=archived)
+    )
 
 
 async def _fetch_blocks_range_async(
-    start_block: int, end_block: int, progress_indicator: bool = False
+    start_block: int,
+    end_block: int,
+    progress_indicator: bool = False,
+    include_dispenses: bool = False,
+    archived: Optional[Dict[int, Dict[str, Any]]] = None,
 ) -> Dict[int, Dict[str, Any]]:
     """
     Async implementation to fetch a range of blocks with robust retry logic.
@@ -1591,11 +1559,13 @@ async def _fetch_blocks_range_async(
         start_block: First block to fetch
         end_block: Last block to fetch (inclusive)
         progress_indicator: Whether to show progress indicators for blocks
+        include_dispenses: Attach each block's dispenses as block_data["dispenses"]
+        archived: Blocks already read from the CP archive; these are not fetched
 
     Returns:
         Dictionary mapping block indices to block data
     """
-    results = {}
+    results = dict(archived) if archived else {}
     max_retries_per_block = 3
 
     # Cap concurrent in-flight block fetches. Without this, a 100-block
@@ -1604,6 +1574,17 @@ async def _fetch_blocks_range_async(
     # even with the per-request rate limiter.
     sem = asyncio.BoundedSemaphore(config.CP_MAX_CONCURRENT)
 
+    async def fetch_block_dispenses(block_idx):
+        # Best effort: None tells the dispense writer to fetch the block itself
+        try:
+            response = await fetch_xcp_async(f"/blocks/{block_idx}/dispenses", {"verbose": "true"})
+        except Exception as e:
+            logger.debug(f"Dispense fetch for block {block_idx} failed: {e}")
+            return None
+        if not response or "result" not in response:
+            return None
+        return response["result"]
+
     async def fetch_block_with_retry(block_idx):
         async with sem:
             for attempt in range(max_retries_per_block):
@@ -1613,6 +1594,8 @@ async def _fetch_blocks_range_async(
                     if block_data:
                         if progress_indicator and block_idx % 10 == 0:
                             logger.debug(f"Progress: Fetched block {block_idx}")
+                        if include_dispenses:
+                            block_data["dispenses"] = await fetch_block_dispenses(block_idx)
                         return block_idx, block_data
                     else:
                         logger.warning(
@@ -1642,7 +1625,7 @@ async def _fetch_blocks_range_async(
                 logger.error(f"Block {block_idx} will need manual intervention or cleanup mechanism to retry")
                 return block_idx, None  # Final failure
 
-    tasks = [fetch_block_with_retry(i) for i in range(start_block, end_block + 1)]
+    tasks = [fetch_block_with_retry(i) for i in range(start_block, end_block + 1) if i not in results]
 
     # Wait for all tasks to complete
     blocks_data_results = await asyncio.gather(*tasks)
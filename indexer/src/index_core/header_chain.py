@@ -0,0 +1,123 @@
+"""
+In-memory header chain for orphan / reorg detection.
+
+follow() used to check every block for an orphaned parent by asking bitcoind
+for the block's hash and header and reading the previous ``blocks`` row with
+``SELECT *``: three round trips per block, even during catch-up years below
+the tip. HeaderChain mirrors the last N (height, hash, prev_hash) rows of the
+``blocks`` table instead. It is seeded from the table at startup and extended
+as blocks are committed, so checking a fetched block's previousblockhash
+against our own parent is a dict lookup. bitcoind is only consulted at the
+tip, on ZMQ notifications, or once a mismatch has been seen and the fork point
+has to be found by walking the canonical chain back through prev hashes.
+"""
+
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class HeaderChain:
+    """The last ``max_length`` indexed block headers, keyed by height."""
+
+    def __init__(self, max_length: Optional[int] = None):
+        """
+        Args:
+            max_length (int): Number of headers kept; 0 keeps none, so every
+                lookup misses and callers fall back to bitcoind and the database.
+        """
+        self.max_length = max(0, max_length if max_length is not None else config.HEADER_CHAIN_LENGTH)
+        # height -> (block_hash, previous_block_hash)
+        self.headers: Dict[int, Tuple[str, Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.headers)
+
+    def seed(self, db) -> int:
+        """Load the newest headers from the blocks table, replacing the current contents."""
+        self.headers.clear()
+        if not self.max_length:
+            return 0
+        cursor = db.cursor()
+        try:
+            cursor.execute(
+                """
+                SELECT block_index, block_hash, previous_block_hash FROM blocks
+                ORDER BY block_index DESC LIMIT %s
+                """,
+                (self.max_length,),
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        for height, block_hash, previous_block_hash in reversed(rows):
+            self.headers[height] = (block_hash, previous_block_hash)
+        logger.info(f"Header chain seeded with {len(self.headers)} blocks")
+        return len(self.headers)
+
+    def append(self, height: int, block_hash: str, previous_block_hash: Optional[str]) -> None:
+        """Record a committed block; any headers at or above ``height`` are replaced."""
+        if not self.max_length:
+            return
+        self.truncate(height)
+        self.headers[height] = (block_hash, previous_block_hash)
+        # Heights are only ever inserted above everything kept, so dict order is height order
+        while len(self.headers) > self.max_length:
+            del self.headers[next(iter(self.headers))]
+
+    def truncate(self, height: int) -> None:
+        """Forget the headers at ``height`` and above, as after a rollback to ``height``."""
+        for stale in [h for h in self.headers if h >= height]:
+            del self.headers[stale]
+
+    def hash_at(self, height: int) -> Optional[str]:
+        header = self.headers.get(height)
+        return header[0] if header else None
+
+    def parent_mismatch(self, height: int, previous_block_hash: str) -> bool:
+        """True if the chain knows ``height - 1`` and it is not ``previous_block_hash``."""
+        parent = self.hash_at(height - 1)
+        return parent is not None and parent != previous_block_hash
+
+    def find_fork(
+        self,
+        height: int,
+        canonical_parent: str,
+        get_previous_hash: Callable[[str], str],
+        load_hash: Callable[[int], Optional[str]],
+        first_height: int = 0,
+    ) -> Optional[Tuple[int, Optional[str], str]]:
+        """
+        Find where our chain leaves the canonical one below block ``height``.
+
+        Walks the canonical chain back from ``canonical_parent`` (the canonical
+        hash at ``height - 1``) via ``get_previous_hash`` until it meets our own
+        hash at the same height; heights the chain does not hold are read with
+        ``load_hash``. A height with no stored block, or ``first_height``, ends
+        the walk like a match.
+
+        Returns:
+            None if our block at ``height - 1`` is canonical, otherwise
+            (last common height, our hash, canonical hash) with the hashes taken
+            at the first mismatching height.
+        """
+        mismatch = None
+        parent_height, canonical_hash = height - 1, canonical_parent
+        while parent_height >= first_height:
+            local_hash = self.hash_at(parent_height)
+            if local_hash is None:
+                local_hash = load_hash(parent_height)
+                if local_hash is None:
+                    break
+            if local_hash == canonical_hash:
+                break
+            if mismatch is None:
+                mismatch = (local_hash, canonical_hash)
+            canonical_hash = get_previous_hash(canonical_hash)
+            parent_height -= 1
+        if mismatch is None:
+            return None
+        return parent_height, mismatch[0], mismatch[1]
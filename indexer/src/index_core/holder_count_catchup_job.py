@@ -13,7 +13,7 @@ from typing import Any, Dict, List, Optional
 
 import config
 from index_core.database_manager import DatabaseManager
-from index_core.src20_holder_updater import SRC20HolderCountUpdater
+from index_core.src20_holder_updater import SRC20HolderCountUpdater, reconcile_holder_counts
 
 logger = logging.getLogger(__name__)
 
@@ -33,12 +33,18 @@ class HolderCountCatchupJob:
 
     This job runs periodically to find and update tokens with missing or outdated
     holder count, total_minted, or progress_percentage data.
+
+    With SRC20_HOLDER_COUNTERS_ENABLED the block path keeps those columns
+    current, so the job only reconciles the counters against the aggregate
+    query, walking the deployed ticks SRC20_HOLDER_VERIFY_BATCH at a time.
     """
 
     def __init__(self):
         self.database_manager = DatabaseManager()
         self.last_run_time: Optional[datetime] = None
         self.running = False
+        # Last tick reconciled; the next run continues after it
+        self._verify_cursor = ""
 
     def should_run(self, current_block: int, tip_block: int) -> bool:
         """
@@ -95,6 +101,11 @@ class HolderCountCatchupJob:
         total_updated = 0
 
         try:
+            if config.SRC20_HOLDER_COUNTERS_ENABLED:
+                total_updated = self._reconcile_next_batch()
+                self.last_run_time = datetime.now()
+                return total_updated
+
             logger.info("Starting holder count catchup job")
 
             # Get tokens needing updates
@@ -214,6 +225,40 @@ class HolderCountCatchupJob:
         finally:
             db.close()
 
+    def _reconcile_next_batch(self) -> int:
+        """
+        Reconcile the holder counters of the next SRC20_HOLDER_VERIFY_BATCH deployed ticks.
+
+        Returns:
+            Number of ticks whose counters had drifted and were repaired
+        """
+        db = self.database_manager.connect()
+        try:
+            with db.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT tick FROM SRC20Valid
+                    WHERE op = 'DEPLOY' AND tick > %s
+                    ORDER BY tick
+                    LIMIT %s
+                """,
+                    (self._verify_cursor, config.SRC20_HOLDER_VERIFY_BATCH),
+                )
+                ticks = [row[0] for row in cursor.fetchall()]
+
+            # Start over from the first tick once the last page has been checked
+            self._verify_cursor = ticks[-1] if len(ticks) == config.SRC20_HOLDER_VERIFY_BATCH else ""
+            repaired = reconcile_holder_counts(db, ticks)
+            db.commit()
+            logger.debug(f"Reconciled holder counters for {len(ticks)} ticks, {len(repaired)} repaired")
+            return len(repaired)
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
     def _process_batch(self, tokens: List[str], current_block: int) -> int:
         """
         Process a batch of tokens for holder count updates.
@@ -0,0 +1,312 @@
+"""
+Low-overhead, always-on hot-path profiling for the follow() loop.
+
+perf_log records a handful of coarse per-block timers and profiling.Profiler
+is a full cProfile session for debugging. HotPathProfiler sits between them
+and is cheap enough to leave enabled in production:
+
+- Every named phase of a block (orphan check, CP wait, fetch, prevout
+  prefetch, decode, process_transaction_results, update_src20_balances,
+  create_check_hashes, process_block_dispenses, commit, ...) is timed with
+  perf_counter into a log-bucketed histogram, so p50/p95/p99 per phase cost a
+  dict increment per sample. Phases may nest; each is timed inclusively.
+- A daemon thread samples the block-processing thread's stack every
+  HOTPATH_SAMPLE_INTERVAL_MS while a block is in progress and collapses the
+  samples into "module:function;module:function" stacks. The collapsed stacks
+  of the HOTPATH_SLOWEST_BLOCKS slowest blocks of each window are kept.
+
+At the end of each HOTPATH_WINDOW_SECONDS window (and on shutdown) the phase
+histograms and the slowest blocks' stacks are written as JSON lines to a
+rotating file at HOTPATH_PROFILER_PATH, along with one short line per block.
+tools/hotpath_report.py reads them back. Like perf_log this is consensus-neutral:
+output errors are logged at DEBUG and swallowed.
+"""
+
+import heapq
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets are 2**(1/BUCKETS_PER_OCTAVE) wide (~9% resolution)
+BUCKETS_PER_OCTAVE = 8
+MAX_STACK_DEPTH = 64
+
+
+class PhaseHistogram:
+    """Log-bucketed latency histogram over milliseconds."""
+
+    __slots__ = ("count", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets: Dict[int, int] = defaultdict(int)
+
+    @staticmethod
+    def bucket_of(ms: float) -> int:
+        return math.floor(math.log2(ms) * BUCKETS_PER_OCTAVE) if ms > 0 else -(2**31)
+
+    @staticmethod
+    def bucket_upper_ms(bucket: int) -> float:
+        return 0.0 if bucket == -(2**31) else 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE)
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.buckets[self.bucket_of(ms)] += 1
+
+    def merge(self, other: "PhaseHistogram") -> None:
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the ``pct`` percentile, capped at the observed max."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * pct / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.bucket_upper_ms(bucket), self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "buckets": {str(bucket): count for bucket, count in sorted(self.buckets.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PhaseHistogram":
+        histogram = cls()
+        histogram.count = data["count"]
+        histogram.total_ms = data["total_ms"]
+        histogram.max_ms = data["max_ms"]
+        for bucket, count in data["buckets"].items():
+            histogram.buckets[int(bucket)] = count
+        return histogram
+
+
+def collapse_stack(frame) -> str:
+    """Collapse a frame chain into "module:function;..." from outermost to innermost."""
+    names: List[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class HotPathProfiler:
+    """Per-phase histograms and slow-block stack samples for the block loop."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        sample_interval_ms: Optional[float] = None,
+        slowest_blocks: Optional[int] = None,
+        window_seconds: Optional[int] = None,
+    ):
+        self.path = path or config.HOTPATH_PROFILER_PATH
+        self.sample_interval = (config.HOTPATH_SAMPLE_INTERVAL_MS if sample_interval_ms is None else sample_interval_ms) / 1000
+        self.slowest_blocks = config.HOTPATH_SLOWEST_BLOCKS if slowest_blocks is None else slowest_blocks
+        self.window_seconds = config.HOTPATH_WINDOW_SECONDS if window_seconds is None else window_seconds
+
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, PhaseHistogram] = defaultdict(PhaseHistogram)
+        # Min-heap of (t_total_ms, block_index, stacks) for the window's slowest blocks
+        self._slowest: list = []
+        self._window_start = self._window_of(time.time())
+
+        self._block_index: Optional[int] = None
+        self._block_start = 0.0
+        self._phases: Dict[str, float] = {}
+        self._open: Dict[str, float] = {}
+        self._stacks: Counter = Counter()
+        self._target_thread: Optional[int] = None
+        self._sampling = threading.Event()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+        self._output = logging.getLogger(f"{__name__}.output.{id(self)}")
+        self._output.propagate = False
+        self._output.setLevel(logging.INFO)
+        try:
+            handler = RotatingFileHandler(
+                self.path, maxBytes=config.HOTPATH_MAX_BYTES, backupCount=config.HOTPATH_BACKUP_COUNT, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._output.addHandler(handler)
+        except Exception as e:  # noqa: BLE001 - profiling must never raise
+            logger.debug(f"hot-path profiler output unavailable (ignored): {e}")
+
+        if self.sample_interval > 0:
+            self._sampler = threading.Thread(target=self._sample_loop, name="hotpath-sampler", daemon=True)
+            self._sampler.start()
+
+    def _window_of(self, now: float) -> int:
+        return int(now // self.window_seconds * self.window_seconds)
+
+    def begin_block(self, block_index: int) -> None:
+        """Start timing a block on the calling thread; an unfinished previous block is discarded."""
+        with self._lock:
+            self._block_index = block_index
+            self._block_start = time.perf_counter()
+            self._phases = {}
+            self._open = {}
+            self._stacks = Counter()
+            self._target_thread = threading.get_ident()
+        self._sampling.set()
+
+    def start(self, name: str) -> None:
+        self._open[name] = time.perf_counter()
+
+    def stop(self, name: str) -> None:
+        started = self._open.pop(name, None)
+        if started is not None:
+            self._phases[name] = self._phases.get(name, 0.0) + (time.perf_counter() - started)
+
+    @contextmanager
+    def phase(self, name: str):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def end_block(self) -> None:
+        """Record the current block's phases and stacks; flush if the window has rolled over."""
+        self._sampling.clear()
+        with self._lock:
+            if self._block_index is None:
+                return
+            total_ms = (time.perf_counter() - self._block_start) * 1000
+            phases_ms = {name: seconds * 1000 for name, seconds in self._phases.items()}
+            phases_ms["total"] = total_ms
+            for name, ms in phases_ms.items():
+                self._histograms[name].record(ms)
+
+            block_index, stacks = self._block_index, self._stacks
+            self._block_index = None
+            if self.slowest_blocks > 0 and stacks:
+                entry = (total_ms, block_index, stacks)
+                if len(self._slowest) < self.slowest_blocks:
+                    heapq.heappush(self._slowest, entry)
+                elif total_ms > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)
+
+        self._write(
+            {
+                "type": "block",
+                "block_index": block_index,
+                "ts": round(time.time(), 3),
+                "phases_ms": {name: round(ms, 3) for name, ms in phases_ms.items()},
+            }
+        )
+        if self._window_of(time.time()) != self._window_start:
+            self.flush()
+
+    def _sample_loop(self) -> None:
+        while not self._stop.is_set():
+            if not self._sampling.wait(timeout=1.0):
+                continue
+            frame = sys._current_frames().get(self._target_thread)
+            if frame is not None:
+                stack = collapse_stack(frame)
+                del frame
+                with self._lock:
+                    if self._block_index is not None:
+                        self._stacks[stack] += 1
+            time.sleep(self.sample_interval)
+
+    def flush(self) -> None:
+        """Write the window's phase histograms and slowest blocks, then start a new window."""
+        with self._lock:
+            histograms, self._histograms = self._histograms, defaultdict(PhaseHistogram)
+            slowest, self._slowest = sorted(self._slowest, reverse=True), []
+            window_start, self._window_start = self._window_start, self._window_of(time.time())
+        if not histograms:
+            return
+
+        self._write(
+            {
+                "type": "histogram",
+                "window_start": window_start,
+                "window_seconds": self.window_seconds,
+                "phases": {name: histogram.to_dict() for name, histogram in sorted(histograms.items())},
+            }
+        )
+        for rank, (total_ms, block_index, stacks) in enumerate(slowest, 1):
+            self._write(
+                {
+                    "type": "flamegraph",
+                    "window_start": window_start,
+                    "rank": rank,
+                    "block_index": block_index,
+                    "total_ms": round(total_ms, 3),
+                    "sample_interval_ms": self.sample_interval * 1000,
+                    "stacks": dict(stacks.most_common()),
+                }
+            )
+
+    def close(self) -> None:
+        self._stop.set()
+        self._sampling.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=2)
+        self.flush()
+        for handler in list(self._output.handlers):
+            handler.close()
+            self._output.removeHandler(handler)
+
+    def _write(self, record: dict) -> None:
+        try:
+            self._output.info(json.dumps(record, separators=(",", ":")))
+        except Exception as e:  # noqa: BLE001 - profiling must never raise
+            logger.debug(f"hot-path profiler write failed (ignored): {e}")
+
+
+_hotpath_profiler: Optional[HotPathProfiler] = None
+_hotpath_profiler_lock = threading.Lock()
+
+
+def get_hotpath_profiler() -> Optional[HotPathProfiler]:
+    """Return the shared HotPathProfiler, or None when HOTPATH_PROFILER is off."""
+    global _hotpath_profiler
+    if not config.HOTPATH_PROFILER:
+        return None
+    if _hotpath_profiler is None:
+        with _hotpath_profiler_lock:
+            if _hotpath_profiler is None:
+                _hotpath_profiler = HotPathProfiler()
+    return _hotpath_profiler
+
+
+def phase(name: str):
+    """Time ``name`` on the shared profiler; a no-op context when profiling is off."""
+    hotpath = get_hotpath_profiler()
+    return hotpath.phase(name) if hotpath else nullcontext()
@@ -16,6 +16,7 @@ from datetime import datetime
 from typing import Dict, List, Optional, Set
 
 import config
+from index_core.collection_aggregator import aggregate_collections, changed_collections, database_time
 from index_core.database_manager import DatabaseManager
 from index_core.fetch_utils import RateLimiter, is_rate_limited
 from index_core.holder_count_catchup_job import holder_count_catchup_job
@@ -67,6 +68,12 @@ class MarketDataJobScheduler:
         self.last_run_times: Dict[str, datetime] = {}
         self._lock = threading.Lock()
         self.database_manager = DatabaseManager()
+        # Latency of the queries that select due work, per job
+        self.selection_metrics: Dict[str, Dict[str, float]] = {}
+        # Items written per minute of update cycle, per job
+        self.throughput_metrics: Dict[str, Dict[str, float]] = {}
+        # Database time the last set-based collection aggregation started (None: next run is full)
+        self._collection_watermark: Optional[datetime] = None
 
     def start(self, max_workers: int = MAX_WORKERS):
         """Start the job scheduler with the specified number of workers."""
@@ -187,6 +194,11 @@ class MarketDataJobScheduler:
                 # TODO: Re-enable after optimizing query performance
                 # if self._is_job_due("holder_count_catchup", HOLDER_COUNT_UPDATE_INTERVAL, current_time):
                 #     self._submit_job("holder_count_catchup", self._update_holder_count_catchup_job)
+                # With incremental holder counters the job only reconciles drift (read-mostly)
+                if config.SRC20_HOLDER_COUNTERS_ENABLED and self._is_job_due(
+                    "holder_count_catchup", HOLDER_COUNT_UPDATE_INTERVAL, current_time
+                ):
+                    self._submit_job("holder_count_catchup", self._update_holder_count_catchup_job)
 
                 # Clean up completed jobs
                 self._cleanup_completed_jobs()
@@ -337,6 +349,7 @@ class MarketDataJobScheduler:
                 total_batches = len(batches)
                 logger.debug(f"🔄 Processing {len(stamps_to_update)} stamps in {total_batches} batches")
 
+                processed_total = 0
                 for batch_num, batch in enumerate(batches, 1):
                     if self.shutdown_event.is_set():
                         logger.info("🛑 Shutdown requested, stopping stamp updates")
@@ -344,15 +357,19 @@ class MarketDataJobScheduler:
 
                     if batch_num % 10 == 0 or batch_num == 1 or batch_num == total_batches:
                         logger.debug(f"📈 Stamp update progress: {batch_num}/{total_batches} batches")
-                    self._process_stamp_batch(task_db, batch)
+                    processed_total += self._process_stamp_batch(task_db, batch) or 0
 
                     # Rate limiting between batches
                     if not self.shutdown_event.is_set():
                         time.sleep(0.1)  # Small delay to prevent CPU spinning
 
                 elapsed_time = time.time() - start_time
+                self._record_throughput(
+                    "stamp_update", elapsed_time, processed_total, batched=config.MARKET_DATA_BATCH_COLLECTION_ENABLED
+                )
                 logger.debug(
-                    f"✅ Stamp market data update complete: {len(stamps_to_update)} stamps processed in {elapsed_time:.1f}s"
+                    f"✅ Stamp market data update complete: {processed_total}/{len(stamps_to_update)} stamps processed "
+                    f"in {elapsed_time:.1f}s ({self.throughput_metrics['stamp_update']['last_per_minute']:.0f} stamps/min)"
                 )
 
             finally:
@@ -636,6 +653,10 @@ class MarketDataJobScheduler:
                 task_db = self.database_manager.connect()
 
                 try:
+                    if config.COLLECTION_SET_AGGREGATION_ENABLED:
+                        self._aggregate_collection_market_data(task_db)
+                        return
+
                     # Get collections that need market data updates
                     collections_to_update = self._get_collections_needing_update(task_db)
 
@@ -671,6 +692,36 @@ class MarketDataJobScheduler:
         finally:
             coordinator.end_task("market_data_collections", is_heavy=False)
 
+    def _aggregate_collection_market_data(self, db) -> int:
+        """
+        Recompute collection market data with set-based SQL (see index_core.collection_aggregator).
+
+        The first run covers every collection; later runs only the collections
+        whose member stamps changed since the previous run started.
+        """
+        start_time = time.time()
+        run_started = database_time(db)
+
+        if self._collection_watermark is None:
+            collection_ids = None
+        else:
+            collection_ids = changed_collections(db, self._collection_watermark)
+            if not collection_ids:
+                logger.debug("No collections changed since the last aggregation")
+                self._collection_watermark = run_started
+                return 0
+
+        updated = aggregate_collections(db, collection_ids)
+        self._collection_watermark = run_started
+
+        elapsed_time = time.time() - start_time
+        self._record_throughput("collection_update", elapsed_time, updated, batched=True)
+        logger.debug(
+            f"Collection aggregation complete: {updated} collections "
+            f"({'full' if collection_ids is None else 'changed'}) in {elapsed_time:.1f}s"
+        )
+        return updated
+
     def _update_holder_count_catchup_job(self):
         """
         Background job to update SRC-20 holder counts that are missing or outdated.
@@ -715,13 +766,71 @@ class MarketDataJobScheduler:
             if not config.FORCE:
                 raise
 
+    def _record_selection(self, job_name: str, elapsed: float, selected: int) -> None:
+        """Record the latency of one due-work selection for ``job_name``."""
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            metrics = self.selection_metrics.setdefault(
+                job_name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0, "last_selected": 0}
+            )
+            metrics["count"] += 1
+            metrics["total_ms"] += elapsed_ms
+            metrics["max_ms"] = max(metrics["max_ms"], elapsed_ms)
+            metrics["last_ms"] = elapsed_ms
+            metrics["last_selected"] = selected
+
+    def get_selection_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Selection latency per job: count, last/avg/max milliseconds and the size of the last selection."""
+        with self._lock:
+            return {
+                job_name: {
+                    "count": metrics["count"],
+                    "last_ms": round(metrics["last_ms"], 2),
+                    "avg_ms": round(metrics["total_ms"] / metrics["count"], 2),
+                    "max_ms": round(metrics["max_ms"], 2),
+                    "last_selected": metrics["last_selected"],
+                }
+                for job_name, metrics in self.selection_metrics.items()
+            }
+
+    def _record_throughput(self, job_name: str, elapsed: float, processed: int, batched: bool = False) -> None:
+        """Record one update cycle of ``job_name`` that wrote ``processed`` items in ``elapsed`` seconds."""
+        per_minute = processed * 60 / elapsed if elapsed > 0 else 0.0
+        with self._lock:
+            metrics = self.throughput_metrics.setdefault(
+                job_name, {"cycles": 0, "processed": 0, "elapsed_s": 0.0, "last_per_minute": 0.0}
+            )
+            metrics["cycles"] += 1
+            metrics["processed"] += processed
+            metrics["elapsed_s"] += elapsed
+            metrics["last_per_minute"] = per_minute
+            metrics["batched"] = batched
+
+    def get_throughput_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Update throughput per job: cycles, items written, last/avg items per minute and the collection mode."""
+        with self._lock:
+            return {
+                job_name: {
+                    "cycles": metrics["cycles"],
+                    "processed": metrics["processed"],
+                    "last_per_minute": round(metrics["last_per_minute"], 1),
+                    "avg_per_minute": (
+                        round(metrics["processed"] * 60 / metrics["elapsed_s"], 1) if metrics["elapsed_s"] > 0 else 0.0
+                    ),
+                    "batched": metrics["batched"],
+                }
+                for job_name, metrics in self.throughput_metrics.items()
+            }
+
     def _get_stamps_needing_update(self, db) -> List[str]:
         """Get list of stamp CPIDs that need market data updates using activity-based intervals."""
         from index_core.activity_calculator import StampActivityCalculator
 
         try:
             # Use the activity calculator to get stamps prioritized by activity level
+            selection_start = time.perf_counter()
             stamps_dict = StampActivityCalculator.get_stamps_needing_update(db, limit=STAMP_SELECTION_LIMIT)
+            self._record_selection("stamp_update", time.perf_counter() - selection_start, len(stamps_dict))
 
             # Extract just the CPIDs for processing
             cpids = list(stamps_dict.keys())
@@ -736,7 +845,7 @@ class MarketDataJobScheduler:
 
                 logger.debug(
                     f"Found {len(cpids)} stamps needing activity-based updates: {activity_counts} "
-                    f"(limit: {STAMP_SELECTION_LIMIT})"
+                    f"(limit: {STAMP_SELECTION_LIMIT}, selected in {self.selection_metrics['stamp_update']['last_ms']:.1f}ms)"
                 )
             else:
                 logger.debug("No stamps need market data updates at this time")
@@ -781,8 +890,12 @@ class MarketDataJobScheduler:
             logger.error(f"Error getting collections needing update: {e}")
             return []
 
-    def _process_stamp_batch(self, db, stamp_cpids: List[str]):
-        """Process a batch of stamps for market data updates with detailed analysis."""
+    def _process_stamp_batch(self, db, stamp_cpids: List[str]) -> int:
+        """Process a batch of stamps for market data updates with detailed analysis; returns the stamps written."""
+        if config.MARKET_DATA_BATCH_COLLECTION_ENABLED:
+            return self._process_stamp_batch_collected(db, stamp_cpids)
+
+        processed_count = 0
         try:
             # All CPIDs are now pre-filtered as valid Counterparty assets in the SQL query
             # No need for additional Python-side filtering!
@@ -792,7 +905,6 @@ class MarketDataJobScheduler:
             # This provides comprehensive analysis: dispensers, dispenses, balances, volume metrics, etc.
             # StampWorker now uses a shared processor instance to avoid repeated initialization
             stamp_worker = StampWorker()
-            processed_count = 0
             error_count = 0
 
             for cpid in stamp_cpids:
@@ -843,6 +955,46 @@ class MarketDataJobScheduler:
         except Exception as e:
             logger.error(f"Error processing stamp batch: {e}")
 
+        return processed_count
+
+    def _process_stamp_batch_collected(self, db, stamp_cpids: List[str]) -> int:
+        """
+        Process a batch of stamps with StampWorker.collect_market_data and one batched write.
+
+        Collection fans the Counterparty requests out over MARKET_DATA_STAMP_FETCH_WORKERS
+        threads; the rows are then written with multi-row upserts and a single commit.
+        """
+        if self.shutdown_event.is_set():
+            logger.info("Shutdown requested, stopping stamp processing")
+            return 0
+
+        try:
+            results = StampWorker().collect_market_data(stamp_cpids, max_workers=config.MARKET_DATA_STAMP_FETCH_WORKERS)
+
+            rows: Dict[str, Dict] = {}
+            holder_caches: Dict[str, List[Dict]] = {}
+            for cpid, market_data in results.items():
+                if not market_data:
+                    logger.debug(f"No market data generated for {cpid}")
+                    continue
+                holder_cache_data = market_data.pop("_holder_cache_data", None)
+                if holder_cache_data and isinstance(holder_cache_data, list):
+                    holder_caches[cpid] = holder_cache_data
+                rows[cpid] = market_data
+
+            processed_count = market_data_service.update_stamp_market_data_batch(rows, db)
+
+            for cpid, holder_cache_data in holder_caches.items():
+                logger.debug(f"Populating holder cache for {cpid} with {len(holder_cache_data)} holders")
+                self._populate_holder_cache(db, cpid, holder_cache_data)
+
+            logger.debug(f"Batch complete: {processed_count}/{len(stamp_cpids)} stamps processed (batched)")
+            return processed_count
+
+        except Exception as e:
+            logger.error(f"Error processing stamp batch: {e}")
+            return 0
+
     def _process_src20_batch(self, db, token_ticks: List[str], src20_worker: Optional["SRC20Worker"] = None):
         """Process a batch of SRC-20 tokens for market data updates."""
         try:
@@ -8,6 +8,7 @@ The service is designed to eliminate external API calls and improve performance
 from 10+ seconds to <2 seconds by implementing a comprehensive caching system.
 """
 
+import json
 import logging
 from datetime import datetime
 from decimal import Decimal
@@ -21,6 +22,7 @@ from config import (
     STAMP_HOLDER_CACHE_TABLE,
     STAMP_MARKET_DATA_TABLE,
 )
+from index_core.activity_calculator import ActivityLevel, StampActivityCalculator
 from index_core.caching import cache_manager
 from index_core.database_manager import DatabaseManager
 
@@ -48,6 +50,37 @@ DEFAULT_CACHE_EXPIRY = 1800  # 30 minutes
 HOLDER_CACHE_EXPIRY = 3600  # 1 hour
 SOURCE_CACHE_EXPIRY = 300  # 5 minutes
 
+# Stamp market data fields accepted by the stamp_market_data upserts, mapped to their columns
+STAMP_MARKET_DATA_FIELDS = {
+    "floor_price_btc": "floor_price_btc",
+    "recent_sale_price_btc": "recent_sale_price_btc",
+    "open_dispensers_count": "open_dispensers_count",
+    "closed_dispensers_count": "closed_dispensers_count",
+    "total_dispensers_count": "total_dispensers_count",
+    "holder_count": "holder_count",
+    "unique_holder_count": "unique_holder_count",
+    "top_holder_percentage": "top_holder_percentage",
+    "holder_distribution_score": "holder_distribution_score",
+    "volume_24h_btc": "volume_24h_btc",
+    "volume_7d_btc": "volume_7d_btc",
+    "volume_30d_btc": "volume_30d_btc",
+    "total_volume_btc": "total_volume_btc",
+    "price_source": "price_source",
+    "volume_sources": "volume_sources",
+    "data_quality_score": "data_quality_score",
+    "confidence_level": "confidence_level",
+    "last_dispenser_block": "last_dispenser_block",
+    "last_balance_block": "last_balance_block",
+    "last_price_update": "last_price_update",
+    "last_sale_block_index": "last_sale_block_index",
+    "last_sale_tx_hash": "last_sale_tx_hash",
+    "last_sale_buyer_address": "last_sale_buyer_address",
+    "last_sale_dispenser_address": "last_sale_dispenser_address",
+    "last_sale_btc_amount": "last_sale_btc_amount",
+    "last_sale_dispenser_tx_hash": "last_sale_dispenser_tx_hash",
+    "update_frequency_minutes": "update_frequency_minutes",
+}
+
 
 class MarketDataService:
     """
@@ -286,36 +319,7 @@ class MarketDataService:
                 db = self.db_manager.connect()
             try:
                 with db.cursor() as cursor:
-                    # Map of allowed fields to database columns
-                    field_mapping = {
-                        "floor_price_btc": "floor_price_btc",
-                        "recent_sale_price_btc": "recent_sale_price_btc",
-                        "open_dispensers_count": "open_dispensers_count",
-                        "closed_dispensers_count": "closed_dispensers_count",
-                        "total_dispensers_count": "total_dispensers_count",
-                        "holder_count": "holder_count",
-                        "unique_holder_count": "unique_holder_count",
-                        "top_holder_percentage": "top_holder_percentage",
-                        "holder_distribution_score": "holder_distribution_score",
-                        "volume_24h_btc": "volume_24h_btc",
-                        "volume_7d_btc": "volume_7d_btc",
-                        "volume_30d_btc": "volume_30d_btc",
-                        "total_volume_btc": "total_volume_btc",
-                        "price_source": "price_source",
-                        "volume_sources": "volume_sources",
-                        "data_quality_score": "data_quality_score",
-                        "confidence_level": "confidence_level",
-                        "last_dispenser_block": "last_dispenser_block",
-                        "last_balance_block": "last_balance_block",
-                        "last_price_update": "last_price_update",
-                        "last_sale_block_index": "last_sale_block_index",
-                        "last_sale_tx_hash": "last_sale_tx_hash",
-                        "last_sale_buyer_address": "last_sale_buyer_address",
-                        "last_sale_dispenser_address": "last_sale_dispenser_address",
-                        "last_sale_btc_amount": "last_sale_btc_amount",
-                        "last_sale_dispenser_tx_hash": "last_sale_dispenser_tx_hash",
-                        "update_frequency_minutes": "update_frequency_minutes",
-                    }
+                    field_mapping = STAMP_MARKET_DATA_FIELDS
 
                     # Filter data to only include valid fields
                     valid_fields = {k: v for k, v in data.items() if k in field_mapping}
@@ -326,21 +330,10 @@ class MarketDataService:
 
                     # Build column names and update fields
                     columns = [field_mapping[f] for f in valid_fields.keys()]
-                    update_fields = [f"{col} = new_row.{col}" for col in columns]
-
-                    # Always update last_updated timestamp
-                    update_fields.append("last_updated = NOW()")
-
-                    query = f"""
-                        INSERT INTO {STAMP_MARKET_DATA_TABLE} (cpid, {', '.join(columns)}, last_updated, created_at)
-                        VALUES (%s, {', '.join(['%s'] * len(columns))}, NOW(), NOW())
-                        AS new_row ON DUPLICATE KEY UPDATE {', '.join(update_fields)}
-                    """
+                    query = self._stamp_market_data_upsert(columns)
 
                     # Prepare values for INSERT only
                     # Convert JSON fields to strings
-                    import json
-
                     values = [cpid]
                     for field, value in valid_fields.items():
                         if field == "volume_sources" and isinstance(value, dict):
@@ -375,6 +368,110 @@ class MarketDataService:
             logger.error(f"Error updating stamp market data for {cpid}: {e}")
             raise exceptions.DatabaseError(f"Failed to update stamp market data: {e}")
 
+    @staticmethod
+    def _stamp_market_data_upsert(columns: List[str], row_count: int = 1) -> str:
+        """Build the stamp_market_data upsert for ``row_count`` rows of cpid plus ``columns``."""
+        update_fields = [f"{col} = new_row.{col}" for col in columns]
+
+        # Always update last_updated timestamp
+        update_fields.append("last_updated = NOW()")
+        # Next due time from the stored activity level (new rows start COLD)
+        update_fields.append(f"next_update_at = {StampActivityCalculator.next_update_sql()}")
+        cold_minutes = StampActivityCalculator.UPDATE_INTERVALS[ActivityLevel.COLD]
+
+        row = f"(%s, {', '.join(['%s'] * len(columns))}, NOW(), NOW(), DATE_ADD(NOW(), INTERVAL {cold_minutes} MINUTE))"
+        return f"""
+            INSERT INTO {STAMP_MARKET_DATA_TABLE} (cpid, {', '.join(columns)}, last_updated, created_at, next_update_at)
+            VALUES {', '.join([row] * row_count)}
+            AS new_row ON DUPLICATE KEY UPDATE {', '.join(update_fields)}
+        """
+
+    def update_stamp_market_data_batch(self, rows: Dict[str, Dict[str, Any]], db=None) -> int:
+        """
+        Update market data for many stamps with multi-row upserts and one commit.
+
+        Rows are grouped by the set of fields they carry, since a field missing
+        from a row must leave its column untouched; a batch from
+        StampWorker.collect_market_data has only a few such shapes. If the batched
+        write fails it is rolled back and retried one row at a time, so a bad row
+        only loses its own stamp.
+
+        Args:
+            rows: Dictionary mapping CPIDs to market data fields
+            db: Optional database connection to reuse (if None, creates new connection)
+
+        Returns:
+            Number of stamps written
+
+        Raises:
+            DatabaseError: If database operation fails
+        """
+        shapes: Dict[Tuple[str, ...], List[List[Any]]] = {}
+        for cpid, data in rows.items():
+            fields = tuple(f for f in STAMP_MARKET_DATA_FIELDS if f in data)
+            if not fields:
+                logger.warning(f"No valid fields provided for stamp market data update: {cpid}")
+                continue
+            values: List[Any] = [cpid]
+            for field in fields:
+                value = data[field]
+                values.append(json.dumps(value) if field == "volume_sources" and isinstance(value, dict) else value)
+            shapes.setdefault(fields, []).append(values)
+
+        if not shapes:
+            return 0
+
+        written = 0
+        try:
+            # Use provided connection or create a new one
+            own_connection = db is None
+            if own_connection:
+                db = self.db_manager.connect()
+            try:
+                try:
+                    with db.cursor() as cursor:
+                        for fields, shape_rows in shapes.items():
+                            columns = [STAMP_MARKET_DATA_FIELDS[f] for f in fields]
+                            query = self._stamp_market_data_upsert(columns, len(shape_rows))
+                            cursor.execute(query, [value for values in shape_rows for value in values])
+                            written += len(shape_rows)
+                    db.commit()
+                except Exception as e:
+                    # Drop the shapes already upserted so they don't ride along with the
+                    # next commit on a shared connection, then retry row by row so one
+                    # bad row only costs its own stamp
+                    db.rollback()
+                    logger.warning(f"Batched stamp market data write failed for {len(rows)} stamps, retrying per row: {e}")
+                    cpids = [values[0] for shape_rows in shapes.values() for values in shape_rows]
+                    return self._update_stamp_market_data_rows(cpids, rows, db)
+
+                for shape_rows in shapes.values():
+                    for values in shape_rows:
+                        cache_manager.invalidate_cache_entry("market_data", f"{CACHE_KEY_STAMP_MARKET}:{values[0]}")
+
+                logger.debug(f"Updated stamp market data for {written} stamps in {len(shapes)} upserts")
+                return written
+
+            finally:
+                # Only close if we created the connection
+                if own_connection:
+                    db.close()
+
+        except Exception as e:
+            logger.error(f"Error updating stamp market data for {len(rows)} stamps: {e}")
+            raise exceptions.DatabaseError(f"Failed to update stamp market data: {e}")
+
+    def _update_stamp_market_data_rows(self, cpids: List[str], rows: Dict[str, Dict[str, Any]], db) -> int:
+        """Write ``cpids`` one upsert and commit at a time, skipping the rows that fail."""
+        written = 0
+        for cpid in cpids:
+            try:
+                self.update_stamp_market_data(cpid, rows[cpid], db)
+                written += 1
+            except exceptions.DatabaseError:
+                db.rollback()
+        return written
+
     def update_src20_market_data(self, tick: str, data: Dict[str, Any], db=None) -> None:
         """
         Update market data for a specific SRC-20 token.
@@ -1,43 +1,120 @@
-"""Memory management utilities."""
+"""Memory management utilities.
+
+MemoryManager is a two-level governor. Between the soft and hard watermarks it
+trims caches gradually: every cache has a priority tier and a relative cost to
+refill an evicted entry, pressure above the soft watermark opens the tiers from
+the lowest priority up, and each eligible cache loses a share of its coldest
+entries inversely proportional to its refill cost. Only above the hard
+watermark is everything cleared. Each trim is appended to the perf log as a
+``cache_trim`` event when PERF_LOG is on.
+"""
 
 import logging
+import math
 import os
 import time
+from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import psutil
 
+import config
 from index_core.cache_types import LRUCache
+from index_core.perf_log import record_block_perf
 
 logger = logging.getLogger(__name__)
 
+# Share of the cheapest cache released per check at full soft pressure
+PRESSURE_SHRINK_FRACTION = 0.5
+
+# Priority 0 caches are only cleared at the hard watermark; tiers 1..MAX_PRIORITY
+# become eligible for trimming one by one as pressure rises
+PINNED_PRIORITY = 0
+MAX_PRIORITY = 3
+
+
+@dataclass(frozen=True)
+class CacheProfile:
+    """How readily a cache is trimmed under memory pressure."""
+
+    priority: int = 2
+    # Relative cost of refilling one evicted entry (1 = recomputed in-process)
+    refill_cost: float = 1.0
+
+
+# Profiles of the caches registered by CacheManager and Backend
+DEFAULT_CACHE_PROFILES: Dict[str, CacheProfile] = {
+    "address": CacheProfile(priority=1, refill_cost=1.0),
+    "src721_image": CacheProfile(priority=1, refill_cost=1.0),
+    "market_data": CacheProfile(priority=1, refill_cost=2.0),
+    "price": CacheProfile(priority=1, refill_cost=2.0),
+    "deserialized_tx": CacheProfile(priority=1, refill_cost=2.0),
+    "balance": CacheProfile(priority=2, refill_cost=3.0),
+    "total_minted": CacheProfile(priority=2, refill_cost=3.0),
+    "reissue": CacheProfile(priority=2, refill_cost=3.0),
+    "collection": CacheProfile(priority=2, refill_cost=3.0),
+    "subasset": CacheProfile(priority=2, refill_cost=4.0),
+    "raw_transactions": CacheProfile(priority=2, refill_cost=5.0),
+    "deploy": CacheProfile(priority=3, refill_cost=3.0),
+    "src101_deploy": CacheProfile(priority=3, refill_cost=3.0),
+    "src_background": CacheProfile(priority=3, refill_cost=3.0),
+    # A handful of entries each (stamp counters, block info, chain height)
+    "stamp": CacheProfile(priority=PINNED_PRIORITY),
+    "block": CacheProfile(priority=PINNED_PRIORITY),
+    "blockcount": CacheProfile(priority=PINNED_PRIORITY),
+}
+
 
 class MemoryManager:
     """Manages memory usage and cache clearing."""
 
-    def __init__(self, memory_threshold: float = 0.85):
+    def __init__(self, memory_threshold: Optional[float] = None, soft_watermark: Optional[float] = None):
         """Initialize the memory manager.
 
         Args:
-            memory_threshold: The memory usage threshold (0.0 to 1.0) that triggers cache clearing
+            memory_threshold: Hard watermark (0.0 to 1.0) above which every cache is cleared
+            soft_watermark: Usage above which caches are trimmed gradually
         """
-        self.memory_threshold = memory_threshold
+        self.memory_threshold = memory_threshold if memory_threshold is not None else config.MEMORY_HARD_WATERMARK
+        soft = soft_watermark if soft_watermark is not None else config.MEMORY_SOFT_WATERMARK
+        self.soft_watermark = min(soft, self.memory_threshold)
         self._registered_caches: Dict[str, LRUCache[Any]] = {}
+        self._cache_profiles: Dict[str, CacheProfile] = {}
         self._process = psutil.Process(os.getpid())
         self._last_check = 0.0
         self._check_interval = 5.0  # Check memory every 5 seconds at most
         self._last_log = 0.0
         self._log_interval = 60.0  # Log memory usage every 60 seconds
 
-    def register_cache(self, name: str, cache: LRUCache[Any]) -> None:
-        """Register a cache for memory management."""
+    def register_cache(
+        self, name: str, cache: LRUCache[Any], priority: Optional[int] = None, refill_cost: Optional[float] = None
+    ) -> None:
+        """Register a cache for memory management.
+
+        Args:
+            name: Cache name
+            cache: The cache; it is trimmed under soft pressure if it supports ``shrink``
+            priority: Trim tier (PINNED_PRIORITY = only cleared at the hard watermark);
+                defaults to DEFAULT_CACHE_PROFILES, then CacheProfile()
+            refill_cost: Relative cost of refilling an evicted entry
+        """
+        profile = DEFAULT_CACHE_PROFILES.get(name, CacheProfile())
+        profile = CacheProfile(
+            priority=profile.priority if priority is None else priority,
+            refill_cost=profile.refill_cost if refill_cost is None else refill_cost,
+        )
         self._registered_caches[name] = cache
-        logger.debug(f"Registered cache: {name} (max_size={cache.max_size})")
+        self._cache_profiles[name] = profile
+        logger.debug(
+            f"Registered cache: {name} (max_size={cache.max_size}, priority={profile.priority}, "
+            f"refill_cost={profile.refill_cost})"
+        )
 
     def unregister_cache(self, name: str) -> None:
         """Unregister a cache from memory management."""
         if name in self._registered_caches:
             del self._registered_caches[name]
+            self._cache_profiles.pop(name, None)
             logger.info(f"Unregistered cache: {name}")
         else:
             logger.warning(f"Attempted to unregister non-existent cache: {name}")
@@ -68,19 +145,89 @@ class MemoryManager:
             self._last_log = current_time
 
     def clear_caches_if_needed(self) -> None:
-        """Clear all registered caches if memory usage is above threshold."""
+        """Relieve memory pressure.
+
+        Above the hard watermark (``memory_threshold``) every registered cache
+        is cleared; between the soft and hard watermarks caches are trimmed by
+        ``trim_caches``.
+        """
         if not self.should_check_memory():
             return
 
         memory_usage = self.get_memory_usage()
         if memory_usage > self.memory_threshold:
             logger.warning(
-                f"Memory usage ({memory_usage:.1%}) above threshold ({self.memory_threshold:.1%}), clearing caches. "
+                f"Memory usage ({memory_usage:.1%}) above hard watermark ({self.memory_threshold:.1%}), clearing caches. "
                 f"Cache sizes: {self.get_cache_stats()}"
             )
+            sizes = self.get_cache_stats()
             self.clear_all()
+            for name, size in sizes.items():
+                cache = self._registered_caches.get(name)
+                if cache is not None and size:
+                    self._record_trim("hard", name, memory_usage, 1.0, size - len(cache), len(cache))
             new_usage = self.get_memory_usage()
             logger.info(f"Memory usage after clearing caches: {new_usage:.1%}")
+        elif memory_usage > self.soft_watermark:
+            self.trim_caches(memory_usage)
+
+    def trim_caches(self, memory_usage: float) -> Dict[str, int]:
+        """Shrink the cheapest-to-refill caches in proportion to pressure above the soft watermark.
+
+        Pressure is how far usage has climbed from the soft towards the hard
+        watermark (0..1). Priority tiers up to ``ceil(pressure * MAX_PRIORITY)``
+        are eligible, and each eligible cache releases
+        ``PRESSURE_SHRINK_FRACTION * pressure * cheapest_cost / refill_cost`` of
+        its coldest entries, so cheap caches give up the most.
+
+        Returns:
+            dict: {cache name: entries evicted} for the caches trimmed.
+        """
+        span = self.memory_threshold - self.soft_watermark
+        pressure = min(1.0, (memory_usage - self.soft_watermark) / span) if span > 0 else 1.0
+        if pressure <= 0:
+            return {}
+        tier = math.ceil(pressure * MAX_PRIORITY)
+
+        eligible = [
+            (name, cache, self._cache_profiles.get(name, CacheProfile()))
+            for name, cache in self._registered_caches.items()
+            if hasattr(cache, "shrink") and len(cache)
+        ]
+        eligible = [entry for entry in eligible if PINNED_PRIORITY < entry[2].priority <= tier]
+        if not eligible:
+            return {}
+        cheapest = min(profile.refill_cost for _, _, profile in eligible)
+
+        trimmed = {}
+        for name, cache, profile in sorted(eligible, key=lambda entry: (entry[2].priority, entry[2].refill_cost)):
+            fraction = PRESSURE_SHRINK_FRACTION * pressure * cheapest / profile.refill_cost
+            evicted = cache.shrink(fraction)
+            if evicted:
+                trimmed[name] = evicted
+                self._record_trim("soft", name, memory_usage, fraction, evicted, len(cache))
+
+        logger.warning(
+            f"Memory usage ({memory_usage:.1%}) above soft watermark ({self.soft_watermark:.1%}), "
+            f"trimmed priority <= {tier} caches: {trimmed}"
+        )
+        return trimmed
+
+    def _record_trim(self, level: str, name: str, memory_usage: float, fraction: float, evicted: int, size: int) -> None:
+        if config.PERF_LOG:
+            record_block_perf(
+                config.PERF_LOG_PATH,
+                {
+                    "event": "cache_trim",
+                    "ts": round(time.time(), 3),
+                    "level": level,
+                    "cache": name,
+                    "memory_usage": round(memory_usage, 4),
+                    "fraction": round(fraction, 4),
+                    "evicted": evicted,
+                    "size": size,
+                },
+            )
 
     def clear_all(self) -> None:
         """Clear all registered caches including stamp counters.
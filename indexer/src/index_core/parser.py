@@ -238,6 +238,14 @@ class Parser:
             logger.error(f"Failed to parse block: {e}")
             raise ParserError(f"Block parsing failed: {e}")
 
+    def parse_block_bytes(self, block_bytes: bytes) -> Tuple[List[str], Dict[str, str], int, Optional[str], Optional[float]]:
+        """Parse a serialized block given as raw bytes (no hex round trip)."""
+        try:
+            return tuple(self._parser.parse_block_bytes(block_bytes))
+        except Exception as e:
+            logger.error(f"Failed to parse block bytes: {e}")
+            raise ParserError(f"Block parsing failed: {e}")
+
     def _convert_to_ctransaction(self, tx_info: Any) -> CTransaction:
         """Convert Rust TransactionInfo to Python CTransaction."""
         try:
@@ -13,6 +13,7 @@ import weakref
 import config
 from index_core.backend import Backend
 from index_core.block_validation import fetch_cp_blocks_skipping_empty
+from index_core.cp_archive import get_cp_archive
 from index_core.fetch_utils import wait_for_cp_block_processed
 from index_core.node_health import get_healthy_nodes, is_shutdown_requested, update_healthy_nodes
 from index_core.reprocess_safety import (
@@ -673,6 +674,24 @@ class CPBlocksPipeline:
 
                 return None
 
+    def peek_block(self, block_index):
+        """
+        Return a queued block without any of get_block()'s side effects.
+
+        get_block() may rewind the pipeline position or synthesize fallback
+        blocks for the processor. Readers that run ahead of the processor (the
+        block look-ahead stage) must not do either, so they only look at what
+        is already queued.
+
+        Args:
+            block_index: The block index to look up
+
+        Returns:
+            Block data dictionary or None if not queued
+        """
+        with self._lock:
+            return self.queue.get(block_index)
+
     def create_fallback_block(self, block_index):
         """
         Create a fallback block data structure for processing Bitcoin transactions only.
@@ -1453,6 +1472,18 @@ class CPBlocksPipeline:
                 for block in blocks_in_future:
                     self.blocks_fetch_timestamps.pop(block, None)
 
+    def _archive_blocks(self, blocks):
+        """Store fetched blocks that are buried deep enough in the CP response archive."""
+        cp_archive = get_cp_archive()
+        if cp_archive is None or not blocks:
+            return
+        try:
+            buried_tip = backend_instance.getblockcount() - config.CP_ARCHIVE_MIN_CONFIRMATIONS
+            cp_archive.put_blocks({idx: data for idx, data in blocks.items() if data and idx <= buried_tip})
+        except Exception as e:
+            # The archive is only a cache; a failed write never fails the fetch
+            logger.warning(f"Could not archive CP blocks: {e}")
+
     def _fetch_blocks_batch(self, block_indices, node_url=None):
         """
         Fetch a batch of blocks synchronously using fetch_utils functions with retry logic.
@@ -1507,7 +1538,13 @@ class CPBlocksPipeline:
                 # concurrent fetching. When CP_SKIP_NO_COUNTERPARTY_BLOCKS is on,
                 # the wrapper elides the CP API call for blocks the #754 predicate
                 # marks CP-free; default off -> identical pass-through.
-                blocks_data = fetch_cp_blocks_skipping_empty(start_block, end_block)
+                # With DISPENSE_PIPELINE_ENABLED each block also carries its dispenses
+                # for the background dispense writer.
+                blocks_data = fetch_cp_blocks_skipping_empty(
+                    start_block,
+                    end_block,
+                    include_dispenses=config.DISPENSE_PIPELINE_ENABLED and config.ENABLE_MARKET_DATA_SCHEDULER,
+                )
 
                 if start_block <= 781141 <= end_block:
                     if 781141 in blocks_data:
@@ -1563,6 +1600,8 @@ class CPBlocksPipeline:
                         f"Fetched {len(result)} out of {len(block_indices)} requested blocks. Missing: {sorted(list(missing))}"
                     )
 
+                self._archive_blocks(result)
+
                 # This method should NOT modify the pipeline's state. It only returns data.
                 return result
 
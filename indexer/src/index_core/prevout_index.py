@@ -0,0 +1,290 @@
+"""
+Local prevout index: (txid, vout) -> (value, scriptPubKey).
+
+Fee calculation (calculate_total_inputs) and source derivation (get_tx_info)
+need the outputs spent by a candidate's inputs. Without an index each of those
+is a getrawtransaction round trip plus a full deserialization of the parent
+transaction, just to read one nValue / scriptPubKey.
+
+PrevoutIndex is an optional SQLite file filled from the blocks follow() already
+downloads. Every spendable output of an ingested block is stored; the spends of
+a block are recorded as pending and only removed once the next block is
+ingested, so transactions in the block being decoded can still find their own
+inputs. Removed outputs are kept in an undo journal for PREVOUT_INDEX_UNDO_DEPTH
+blocks so purge_block_db can roll the index back with the rest of the database.
+
+An outpoint's value and script are fixed by its txid, so a hit is always the
+exact data bitcoind would return. Anything not in the index (outputs created
+before it was enabled, pruned undo data) is a miss and the caller falls back
+to RPC unchanged.
+"""
+
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+PREVOUT_INDEX_DB = "prevout_index.db"
+
+OP_RETURN = 0x6A
+
+
+def _read_varint(raw, offset):
+    """Read a Bitcoin CompactSize integer, returning (value, new_offset)."""
+    prefix = raw[offset]
+    if prefix < 0xFD:
+        return prefix, offset + 1
+    if prefix == 0xFD:
+        return struct.unpack_from("<H", raw, offset + 1)[0], offset + 3
+    if prefix == 0xFE:
+        return struct.unpack_from("<I", raw, offset + 1)[0], offset + 5
+    return struct.unpack_from("<Q", raw, offset + 1)[0], offset + 9
+
+
+def parse_prevouts_and_outputs(raw_tx: bytes) -> Tuple[List[Tuple[bytes, int]], List[Tuple[int, int, bytes]]]:
+    """
+    Extract the spent outpoints and created outputs of a serialized transaction.
+
+    Only the parts the index needs are walked; witness data is never read.
+
+    Args:
+        raw_tx (bytes): Serialized transaction (legacy or segwit).
+
+    Returns:
+        tuple: ([(prev_txid_bytes, prev_vout), ...], [(vout, value, script_pubkey), ...]).
+        prev_txid_bytes is in internal (little-endian) byte order.
+    """
+    offset = 4
+    if raw_tx[offset] == 0x00 and raw_tx[offset + 1] == 0x01:
+        offset += 2  # segwit marker and flag
+
+    n_inputs, offset = _read_varint(raw_tx, offset)
+    prevouts = []
+    for _ in range(n_inputs):
+        prev_hash = raw_tx[offset : offset + 32]
+        prev_vout = struct.unpack_from("<I", raw_tx, offset + 32)[0]
+        script_len, offset = _read_varint(raw_tx, offset + 36)
+        offset += script_len + 4  # scriptSig + nSequence
+        prevouts.append((bytes(prev_hash), prev_vout))
+
+    n_outputs, offset = _read_varint(raw_tx, offset)
+    outputs = []
+    for vout in range(n_outputs):
+        value = struct.unpack_from("<q", raw_tx, offset)[0]
+        script_len, offset = _read_varint(raw_tx, offset + 8)
+        outputs.append((vout, value, bytes(raw_tx[offset : offset + script_len])))
+        offset += script_len
+
+    return prevouts, outputs
+
+
+class PrevoutIndex:
+    """SQLite-backed (txid, vout) -> (value, scriptPubKey) index with block-level rollback."""
+
+    def __init__(self, db_path: Optional[str] = None, undo_depth: Optional[int] = None):
+        """
+        Args:
+            db_path (str): Path of the SQLite file (defaults to PREVOUT_INDEX_PATH).
+            undo_depth (int): Blocks of spent outputs kept for rollback.
+        """
+        if db_path is None:
+            db_path = config.PREVOUT_INDEX_PATH
+        if db_path is None:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            db_path = os.path.abspath(os.path.join(base_dir, "..", "..", PREVOUT_INDEX_DB))
+
+        self.db_path = db_path
+        self.undo_depth = undo_depth if undo_depth is not None else config.PREVOUT_INDEX_UNDO_DEPTH
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        self.hits = 0
+        self.misses = 0
+
+        logger.info(f"Initializing prevout index at: {self.db_path}")
+        self._ensure_tables_exist()
+
+    def _ensure_tables_exist(self):
+        """Create the index, pending-spend and undo tables if they don't exist."""
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS prevouts (
+                    txid BLOB NOT NULL,
+                    vout INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    script BLOB NOT NULL,
+                    block_index INTEGER NOT NULL,
+                    PRIMARY KEY (txid, vout)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_prevouts_block ON prevouts (block_index);
+
+                CREATE TABLE IF NOT EXISTS pending_spends (
+                    txid BLOB NOT NULL,
+                    vout INTEGER NOT NULL,
+                    spend_block INTEGER NOT NULL,
+                    PRIMARY KEY (txid, vout)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_pending_spends_block ON pending_spends (spend_block);
+
+                CREATE TABLE IF NOT EXISTS prevout_undo (
+                    txid BLOB NOT NULL,
+                    vout INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    script BLOB NOT NULL,
+                    created_block INTEGER NOT NULL,
+                    spend_block INTEGER NOT NULL,
+                    PRIMARY KEY (txid, vout)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_prevout_undo_block ON prevout_undo (spend_block);
+            """)
+            self.conn.commit()
+
+    def ingest_block(self, block_index: int, raw_transactions: Dict[str, str]) -> None:
+        """
+        Add a block's outputs and record its spends.
+
+        Spends recorded for earlier blocks are applied first (moved to the undo
+        journal); the spends of ``block_index`` itself stay pending so the
+        block's own transactions can still be decoded against the index.
+
+        Args:
+            block_index (int): Height of the block.
+            raw_transactions (dict): The block's full ``{txid: tx_hex}`` mapping.
+        """
+        start = time.perf_counter()
+        outputs = []
+        spends = []
+        for tx_hash, tx_hex in raw_transactions.items():
+            prevouts, tx_outputs = parse_prevouts_and_outputs(bytes.fromhex(tx_hex))
+            txid = bytes.fromhex(tx_hash)
+            for prev_hash, prev_vout in prevouts:
+                if prev_hash != b"\x00" * 32:
+                    spends.append((prev_hash[::-1], prev_vout, block_index))
+            for vout, value, script_pubkey in tx_outputs:
+                # OP_RETURN outputs can never be spent
+                if script_pubkey[:1] != bytes([OP_RETURN]):
+                    outputs.append((txid, vout, value, script_pubkey, block_index))
+
+        with self.lock:
+            with self.conn:
+                self._apply_pending_spends(block_index)
+                self.conn.execute("DELETE FROM pending_spends WHERE spend_block >= ?", (block_index,))
+                self.conn.executemany("INSERT OR REPLACE INTO prevouts VALUES (?, ?, ?, ?, ?)", outputs)
+                self.conn.executemany("INSERT OR REPLACE INTO pending_spends VALUES (?, ?, ?)", spends)
+                self.conn.execute("DELETE FROM prevout_undo WHERE spend_block < ?", (block_index - self.undo_depth,))
+
+        logger.debug(
+            f"Prevout index ingested block {block_index}: {len(outputs)} outputs, {len(spends)} spends "
+            f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+
+    def _apply_pending_spends(self, block_index):
+        """Move outputs spent before ``block_index`` to the undo journal. Caller holds the lock."""
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO prevout_undo (txid, vout, value, script, created_block, spend_block)
+            SELECT p.txid, p.vout, p.value, p.script, p.block_index, s.spend_block
+            FROM pending_spends s JOIN prevouts p ON p.txid = s.txid AND p.vout = s.vout
+            WHERE s.spend_block < ?
+            """,
+            (block_index,),
+        )
+        self.conn.execute(
+            """
+            DELETE FROM prevouts WHERE (txid, vout) IN (
+                SELECT txid, vout FROM pending_spends WHERE spend_block < ?
+            )
+            """,
+            (block_index,),
+        )
+        self.conn.execute("DELETE FROM pending_spends WHERE spend_block < ?", (block_index,))
+
+    def get_many(self, outpoints: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], Tuple[int, bytes]]:
+        """
+        Look up outpoints in the index.
+
+        Args:
+            outpoints: Iterable of (txid_hex, vout) pairs.
+
+        Returns:
+            dict: {(txid_hex, vout): (value, script_pubkey)} for the outpoints found.
+        """
+        found = {}
+        with self.lock:
+            for tx_hash, vout in outpoints:
+                row = self.conn.execute(
+                    "SELECT value, script FROM prevouts WHERE txid = ? AND vout = ?", (bytes.fromhex(tx_hash), vout)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    found[(tx_hash, vout)] = (row[0], bytes(row[1]))
+        return found
+
+    def get(self, tx_hash: str, vout: int) -> Optional[Tuple[int, bytes]]:
+        """Look up a single outpoint, returning (value, script_pubkey) or None."""
+        return self.get_many([(tx_hash, vout)]).get((tx_hash, vout))
+
+    def rollback(self, block_index: int) -> None:
+        """
+        Undo every block from ``block_index`` onwards.
+
+        Outputs created at or above ``block_index`` are dropped, and outputs
+        those blocks spent are restored from the undo journal.
+        """
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM pending_spends WHERE spend_block >= ?", (block_index,))
+                self.conn.execute(
+                    """
+                    INSERT OR REPLACE INTO prevouts (txid, vout, value, script, block_index)
+                    SELECT txid, vout, value, script, created_block FROM prevout_undo
+                    WHERE spend_block >= ? AND created_block < ?
+                    """,
+                    (block_index, block_index),
+                )
+                self.conn.execute("DELETE FROM prevout_undo WHERE spend_block >= ?", (block_index,))
+                self.conn.execute("DELETE FROM prevouts WHERE block_index >= ?", (block_index,))
+        logger.warning(f"Rolled back prevout index from block {block_index}")
+
+    def get_stats(self):
+        """Return lookup counters."""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def close(self):
+        """Close the SQLite connection."""
+        with self.lock:
+            self.conn.close()
+
+
+_prevout_index: Optional[PrevoutIndex] = None
+_prevout_index_lock = threading.Lock()
+
+
+def get_prevout_index() -> Optional[PrevoutIndex]:
+    """Return the shared PrevoutIndex, or None when PREVOUT_INDEX_ENABLED is off."""
+    global _prevout_index
+    if not config.PREVOUT_INDEX_ENABLED:
+        return None
+    if _prevout_index is None:
+        with _prevout_index_lock:
+            if _prevout_index is None:
+                _prevout_index = PrevoutIndex()
+    return _prevout_index
@@ -0,0 +1,395 @@
+"""
+Binary reparse snapshot format.
+
+JSON snapshots (reference_hashes.json) keep every block's hashes as hex text in
+one document, so reading a single block, checking continuity or comparing two
+snapshots means parsing the whole file. A binary snapshot holds the same data
+as fixed-width records sorted by height in a file that is memory-mapped:
+
+    header      64 bytes   magic, version, record size, record count,
+                           sparse index stride/offset, metadata offset/length
+    records     144 bytes  height, field flags, block/ledger/txlist/messages
+                           hashes as raw 32-byte digests, stamp_counter_before
+    index       4 bytes    height of every INDEX_STRIDE-th record
+    metadata    JSON       the snapshot's metadata section
+
+Lookups bisect the sparse index and then the records of one stride, so only
+a few pages are touched. first_divergence walks two snapshots in order,
+comparing whole runs of records as raw bytes and decoding records only inside
+a run that differs, and stops at the first mismatch. to_json / from_json
+convert to and from the SnapshotManager JSON layout; fields other than the
+four hashes and stamp_counter_before (``reason``, ``source``, the derived
+``prev_*`` copies) are not kept.
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BSTSNAP\x00"
+VERSION = 1
+INDEX_STRIDE = 256
+# Records compared as raw bytes at a time by first_divergence
+COMPARE_RUN = 4096
+
+HASH_FIELDS = ("block_hash", "ledger_hash", "txlist_hash", "messages_hash")
+STAMP_COUNTER_FLAG = 1 << len(HASH_FIELDS)
+
+# magic, version, record_size, count, index_stride, index_offset, metadata_offset, metadata_length
+_HEADER = struct.Struct("<8sHHQIQQQ")
+HEADER_SIZE = 64
+# height, flags, reserved, 4 x 32-byte hashes, stamp_counter_before
+_RECORD = struct.Struct("<IHH32s32s32s32sq")
+RECORD_SIZE = _RECORD.size
+_HEIGHT = struct.Struct("<I")
+
+_EMPTY_HASH = bytes(32)
+
+
+class SnapshotFormatError(ValueError):
+    """Raised for files that are not valid binary snapshots or values that cannot be stored in one."""
+
+
+class Divergence(NamedTuple):
+    """First block at which two snapshots differ."""
+
+    block_index: int
+    field: str  # a hash field, or "missing" when only one snapshot has the block
+    left: Optional[str]
+    right: Optional[str]
+
+
+def is_binary_snapshot(path: Union[str, os.PathLike]) -> bool:
+    """Whether ``path`` exists and starts with the binary snapshot magic."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _pack_record(block_index: int, entry: Dict[str, Any]) -> bytes:
+    flags = 0
+    digests = []
+    for bit, field in enumerate(HASH_FIELDS):
+        value = entry.get(field)
+        if value:
+            try:
+                digest = bytes.fromhex(value)
+            except (TypeError, ValueError):
+                digest = b""
+            if len(digest) != 32:
+                raise SnapshotFormatError(f"{field} of block {block_index} is not a 32-byte hex digest: {value!r}")
+            flags |= 1 << bit
+            digests.append(digest)
+        else:
+            digests.append(_EMPTY_HASH)
+    stamp_counter = entry.get("stamp_counter_before")
+    if stamp_counter is not None:
+        flags |= STAMP_COUNTER_FLAG
+    return _RECORD.pack(block_index, flags, 0, *digests, int(stamp_counter or 0))
+
+
+def _unpack_record(raw) -> Tuple[int, Dict[str, Any]]:
+    block_index, flags, _, *digests, stamp_counter = _RECORD.unpack(raw)
+    entry: Dict[str, Any] = {
+        field: digest.hex() if flags & (1 << bit) else "" for bit, (field, digest) in enumerate(zip(HASH_FIELDS, digests))
+    }
+    if flags & STAMP_COUNTER_FLAG:
+        entry["stamp_counter_before"] = stamp_counter
+    return block_index, entry
+
+
+def write_snapshot(
+    path: Union[str, os.PathLike],
+    hashes: Union[Dict[Any, Dict[str, Any]], Iterable[Tuple[int, Dict[str, Any]]]],
+    metadata: Optional[Dict[str, Any]] = None,
+    index_stride: int = INDEX_STRIDE,
+) -> int:
+    """
+    Write a binary snapshot atomically.
+
+    Args:
+        path: Destination file.
+        hashes: ``{block_index: entry}`` as in a JSON snapshot (string keys are
+            accepted), or ``(block_index, entry)`` pairs.
+        metadata (dict): Stored as JSON after the records.
+        index_stride (int): Records per sparse index entry.
+
+    Returns:
+        int: Number of records written.
+    """
+    items = hashes.items() if isinstance(hashes, dict) else hashes
+    # Sort on the height alone: entries are dicts and don't compare
+    records = sorted(((int(block_index), entry) for block_index, entry in items), key=lambda record: record[0])
+    for (previous, _), (current, _) in zip(records, records[1:]):
+        if previous == current:
+            raise SnapshotFormatError(f"Duplicate block {current} in snapshot")
+
+    index = b"".join(_HEIGHT.pack(block_index) for block_index, _ in records[::index_stride])
+    metadata_blob = json.dumps(metadata or {}, sort_keys=True).encode("utf-8")
+    index_offset = HEADER_SIZE + RECORD_SIZE * len(records)
+    metadata_offset = index_offset + len(index)
+    header = _HEADER.pack(
+        MAGIC, VERSION, RECORD_SIZE, len(records), index_stride, index_offset, metadata_offset, len(metadata_blob)
+    )
+
+    tmp_path = f"{os.fspath(path)}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\x00"))
+        for block_index, entry in records:
+            f.write(_pack_record(block_index, entry))
+        f.write(index)
+        f.write(metadata_blob)
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class BinarySnapshot:
+    """Read-only, memory-mapped view of a binary snapshot."""
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = os.fspath(path)
+        self._file = open(self.path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < HEADER_SIZE:
+                raise SnapshotFormatError(f"{self.path} is too short to be a binary snapshot")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        magic, version, record_size, count, stride, index_offset, metadata_offset, metadata_length = _HEADER.unpack_from(
+            self._map, 0
+        )
+        if magic != MAGIC:
+            self.close()
+            raise SnapshotFormatError(f"{self.path} is not a binary snapshot")
+        if version != VERSION or record_size != RECORD_SIZE:
+            self.close()
+            raise SnapshotFormatError(f"Unsupported snapshot version {version} (record size {record_size}) in {self.path}")
+        if metadata_offset + metadata_length > size:
+            self.close()
+            raise SnapshotFormatError(f"{self.path} is truncated")
+
+        self.count = count
+        self.index_stride = stride
+        # The sparse index is small (one height per stride) and kept in memory
+        self._index = [_HEIGHT.unpack_from(self._map, index_offset + 4 * i)[0] for i in range((count + stride - 1) // stride)]
+        self._metadata_span = (metadata_offset, metadata_length)
+        self._metadata: Optional[Dict[str, Any]] = None
+
+    def __enter__(self) -> "BinarySnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the file."""
+        if getattr(self, "_map", None) is not None and not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            offset, length = self._metadata_span
+            self._metadata = json.loads(self._map[offset : offset + length] or b"{}")
+        return dict(self._metadata)
+
+    @property
+    def first_block(self) -> Optional[int]:
+        return self.height_at(0) if self.count else None
+
+    @property
+    def last_block(self) -> Optional[int]:
+        return self.height_at(self.count - 1) if self.count else None
+
+    def height_at(self, position: int) -> int:
+        return _HEIGHT.unpack_from(self._map, HEADER_SIZE + position * RECORD_SIZE)[0]
+
+    def record_at(self, position: int) -> Tuple[int, Dict[str, Any]]:
+        offset = HEADER_SIZE + position * RECORD_SIZE
+        return _unpack_record(self._map[offset : offset + RECORD_SIZE])
+
+    def _raw(self, start: int, stop: int) -> memoryview:
+        return memoryview(self._map)[HEADER_SIZE + start * RECORD_SIZE : HEADER_SIZE + stop * RECORD_SIZE]
+
+    def position(self, block_index: int) -> int:
+        """Position of the first record with height >= ``block_index`` (``len(self)`` if none)."""
+        stride_number = bisect.bisect_right(self._index, block_index) - 1
+        if stride_number < 0:
+            return 0
+        low = stride_number * self.index_stride
+        high = min(low + self.index_stride, self.count)
+        while low < high:
+            middle = (low + high) // 2
+            if self.height_at(middle) < block_index:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, block_index: int) -> Optional[Dict[str, Any]]:
+        """The entry for ``block_index`` in JSON snapshot form, or None."""
+        position = self.position(block_index)
+        if position < self.count and self.height_at(position) == block_index:
+            return self.record_at(position)[1]
+        return None
+
+    def __contains__(self, block_index: int) -> bool:
+        position = self.position(block_index)
+        return position < self.count and self.height_at(position) == block_index
+
+    def iter_range(self, start_block: Optional[int] = None, end_block: Optional[int] = None) -> Iterator[Tuple[int, Dict]]:
+        """Yield ``(block_index, entry)`` for the records in ``[start_block, end_block]``."""
+        position = 0 if start_block is None else self.position(start_block)
+        while position < self.count:
+            block_index, entry = self.record_at(position)
+            if end_block is not None and block_index > end_block:
+                return
+            yield block_index, entry
+            position += 1
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        return self.iter_range()
+
+    def missing_blocks(self) -> list:
+        """Heights absent between the first and last record."""
+        missing = []
+        previous = None
+        for position in range(self.count):
+            height = self.height_at(position)
+            if previous is not None and height != previous + 1:
+                missing.extend(range(previous + 1, height))
+            previous = height
+        return missing
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The snapshot in SnapshotManager JSON form."""
+        return {"metadata": self.metadata, "hashes": {str(block_index): entry for block_index, entry in self}}
+
+
+def first_divergence(
+    left: BinarySnapshot,
+    right: BinarySnapshot,
+    start_block: Optional[int] = None,
+    end_block: Optional[int] = None,
+    fields: Sequence[str] = HASH_FIELDS,
+) -> Optional[Divergence]:
+    """
+    Find the first block in ``[start_block, end_block]`` where two snapshots differ.
+
+    A block present in only one snapshot is a divergence (``field="missing"``).
+    Runs of identical records are skipped by comparing raw bytes.
+
+    Returns:
+        Divergence or None when the range matches.
+    """
+    i = 0 if start_block is None else left.position(start_block)
+    j = 0 if start_block is None else right.position(start_block)
+    while i < left.count or j < right.count:
+        run = min(COMPARE_RUN, left.count - i, right.count - j)
+        if run > 0 and left._raw(i, i + run) == right._raw(j, j + run):
+            if end_block is not None and left.height_at(i + run - 1) >= end_block:
+                return None
+            i += run
+            j += run
+            continue
+
+        left_height = left.height_at(i) if i < left.count else None
+        right_height = right.height_at(j) if j < right.count else None
+        current = min(height for height in (left_height, right_height) if height is not None)
+        if end_block is not None and current > end_block:
+            return None
+        if left_height != right_height:
+            present_left = left_height == current
+            return Divergence(current, "missing", "present" if present_left else None, None if present_left else "present")
+
+        _, left_entry = left.record_at(i)
+        _, right_entry = right.record_at(j)
+        for field in fields:
+            if left_entry.get(field) != right_entry.get(field):
+                return Divergence(current, field, left_entry.get(field), right_entry.get(field))
+        i += 1
+        j += 1
+    return None
+
+
+def from_json(json_path: Union[str, os.PathLike], binary_path: Union[str, os.PathLike]) -> int:
+    """Convert a JSON snapshot to a binary one. Returns the number of records."""
+    with open(json_path) as f:
+        snapshot = json.load(f)
+    return write_snapshot(binary_path, snapshot.get("hashes", {}), snapshot.get("metadata"))
+
+
+def to_json(binary_path: Union[str, os.PathLike], json_path: Union[str, os.PathLike]) -> int:
+    """Convert a binary snapshot to the JSON layout. Returns the number of records."""
+    with BinarySnapshot(binary_path) as snapshot:
+        data = snapshot.to_dict()
+    with open(json_path, "w") as f:
+        json.dump(data, f, indent=4)
+    return len(data["hashes"])
+
+
+def _open(path: str) -> BinarySnapshot:
+    if is_binary_snapshot(path):
+        return BinarySnapshot(path)
+    # Compare JSON snapshots through a temporary binary copy
+    tmp_path = f"{path}.cmp.bin"
+    from_json(path, tmp_path)
+    snapshot = BinarySnapshot(tmp_path)
+    os.unlink(tmp_path)  # the mapping stays valid until closed
+    return snapshot
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Convert and compare reparse snapshots."""
+    parser = argparse.ArgumentParser(description="Binary reparse snapshot tool")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Convert a JSON snapshot to binary")
+    import_parser.add_argument("json_path")
+    import_parser.add_argument("binary_path")
+    export_parser = subparsers.add_parser("export", help="Convert a binary snapshot to JSON")
+    export_parser.add_argument("binary_path")
+    export_parser.add_argument("json_path")
+    diff_parser = subparsers.add_parser("diff", help="Report the first block where two snapshots differ")
+    diff_parser.add_argument("left")
+    diff_parser.add_argument("right")
+    diff_parser.add_argument("--start", type=int)
+    diff_parser.add_argument("--end", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if args.command == "import":
+        logger.info(f"Wrote {from_json(args.json_path, args.binary_path)} records to {args.binary_path}")
+    elif args.command == "export":
+        logger.info(f"Wrote {to_json(args.binary_path, args.json_path)} records to {args.json_path}")
+    else:
+        with _open(args.left) as left, _open(args.right) as right:
+            divergence = first_divergence(left, right, args.start, args.end)
+        if divergence is not None:
+            logger.error(
+                f"First divergence at block {divergence.block_index} ({divergence.field}): "
+                f"{divergence.left} vs {divergence.right}"
+            )
+            return 1
+        logger.info("Snapshots match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Parallel, resumable range reparse.
+
+ReparseValidator.validate_block does everything for one block at a time: a
+getblock, a CP fetch, filtering, a serial process_tx loop and then the
+stateful stamp numbering / ledger / consensus hash stage. Only that last stage
+depends on earlier blocks. ParallelReparser splits the range into chunks of
+consecutive blocks and runs the stateless stage (decode_chunk: one CP fetch
+per chunk, served from the local CP archive when enabled, then decode_block
+per block) on a spawn process pool, while the parent consumes the chunks in
+chain order and runs hash_decoded_block / the snapshot comparison serially on
+an InMemoryBlockProcessor.
+
+Progress (last validated block, blocks validated, blocks/sec) is written to
+the snapshot metadata under ``reparse_progress`` every
+REPARSE_CHECKPOINT_INTERVAL blocks and when the run stops, so a rerun over
+the same range resumes after the last validated block.
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import logging
+import multiprocessing
+import time
+from contextlib import closing
+from typing import Any, Dict, Iterator, List, Optional
+
+import config
+from index_core.fetch_utils import fetch_xcp_blocks_concurrent
+from index_core.reparse.validator import DecodedBlock, ReparseValidator, decode_block
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY = "reparse_progress"
+
+
+def decode_chunk(block_indices: List[int]) -> List[DecodedBlock]:
+    """Worker entry point: decode consecutive blocks with a single CP fetch for the chunk."""
+    cp_blocks = fetch_xcp_blocks_concurrent(block_indices[0], block_indices[-1])
+    return [decode_block(block_index, cp_blocks) for block_index in block_indices]
+
+
+class ParallelReparser:
+    """Validate a block range against the snapshot with a parallel decode stage and a serial hash stage."""
+
+    def __init__(
+        self,
+        validator: ReparseValidator,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        checkpoint_interval: Optional[int] = None,
+    ):
+        """
+        Args:
+            validator (ReparseValidator): Runs the stateful stage and owns the snapshot.
+            workers (int): Decode processes (defaults to REPARSE_WORKERS); 1 decodes inline.
+            chunk_size (int): Consecutive blocks per decode task (defaults to REPARSE_CHUNK_SIZE).
+            checkpoint_interval (int): Validated blocks between progress writes
+                (defaults to REPARSE_CHECKPOINT_INTERVAL).
+        """
+        self.validator = validator
+        self.snapshot_manager = validator.snapshot_manager
+        self.workers = max(1, workers if workers is not None else config.REPARSE_WORKERS)
+        self.chunk_size = max(1, chunk_size or config.REPARSE_CHUNK_SIZE)
+        self.checkpoint_interval = max(1, checkpoint_interval or config.REPARSE_CHECKPOINT_INTERVAL)
+
+        self.blocks_validated = 0
+        self.last_validated_block: Optional[int] = None
+        self._started_at = 0.0
+
+    def resume_point(self, start_block: int, end_block: int) -> int:
+        """First block still to validate, from the progress recorded for the same range."""
+        progress = self.snapshot_manager.get_metadata().get(PROGRESS_KEY)
+        if not progress or progress.get("start_block") != start_block or progress.get("end_block") != end_block:
+            return start_block
+        last_validated = progress.get("last_validated_block")
+        if last_validated is None:
+            return start_block
+        return max(start_block, last_validated + 1)
+
+    def run(self, start_block: int, end_block: int, resume: bool = True) -> bool:
+        """
+        Validate ``[start_block, end_block]``.
+
+        Returns:
+            bool: True if every block matched the snapshot, False at the first mismatch.
+        """
+        first_block = self.resume_point(start_block, end_block) if resume else start_block
+        if first_block > end_block:
+            logger.info(f"Blocks {start_block}-{end_block} already validated")
+            return True
+        if first_block > start_block:
+            logger.info(f"Resuming reparse of {start_block}-{end_block} at block {first_block}")
+
+        block_indices = [b for b in range(first_block, end_block + 1) if not self.validator.is_skipped_checkpoint(b)]
+        chunks = [block_indices[i : i + self.chunk_size] for i in range(0, len(block_indices), self.chunk_size)]
+        logger.info(
+            f"Reparsing {len(block_indices)} blocks ({first_block}-{end_block}) "
+            f"with {self.workers} decode workers, {len(chunks)} chunks"
+        )
+
+        self.blocks_validated = 0
+        self.last_validated_block = first_block - 1
+        self._started_at = time.monotonic()
+        checkpointed = 0
+        failed_block = None
+        try:
+            with closing(self._decoded_chunks(chunks)) as decoded_chunks:
+                for decoded_chunk in decoded_chunks:
+                    for decoded in decoded_chunk:
+                        if not self.validator.validate_decoded_block(decoded):
+                            failed_block = decoded.block_index
+                            break
+                        self.blocks_validated += 1
+                        self.last_validated_block = decoded.block_index
+                        if self.blocks_validated - checkpointed >= self.checkpoint_interval:
+                            self._checkpoint(start_block, end_block, "running")
+                            checkpointed = self.blocks_validated
+                    if failed_block is not None:
+                        break
+        except BaseException:
+            self._checkpoint(start_block, end_block, "interrupted")
+            raise
+
+        if failed_block is None:
+            # Trailing skipped checkpoint blocks count as validated
+            self.last_validated_block = end_block
+        progress = self._checkpoint(start_block, end_block, "completed" if failed_block is None else "failed", failed_block)
+        logger.info(
+            f"Reparse {progress['status']}: {self.blocks_validated} blocks in {progress['elapsed_seconds']}s "
+            f"({progress['blocks_per_sec']} blocks/sec)"
+        )
+        return failed_block is None
+
+    def _decoded_chunks(self, chunks: List[List[int]]) -> Iterator[List[DecodedBlock]]:
+        """Yield decoded chunks in order, keeping up to two chunks per worker in flight."""
+        if self.workers == 1:
+            for chunk in chunks:
+                yield decode_chunk(chunk)
+            return
+
+        # spawn rather than fork, as in DecodePool: the parent runs the CP client
+        # loop thread and backend sessions a forked child would inherit mid-use
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        try:
+            remaining = iter(chunks)
+            pending = collections.deque(
+                executor.submit(decode_chunk, chunk) for chunk in itertools.islice(remaining, self.workers * 2)
+            )
+            while pending:
+                decoded_chunk = pending.popleft().result()
+                next_chunk = next(remaining, None)
+                if next_chunk is not None:
+                    pending.append(executor.submit(decode_chunk, next_chunk))
+                yield decoded_chunk
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _checkpoint(self, start_block: int, end_block: int, status: str, failed_block: Optional[int] = None) -> Dict[str, Any]:
+        """Write the progress of this run to the snapshot metadata."""
+        elapsed = time.monotonic() - self._started_at
+        progress: Dict[str, Any] = {
+            "start_block": start_block,
+            "end_block": end_block,
+            "last_validated_block": self.last_validated_block,
+            "status": status,
+            "blocks_validated": self.blocks_validated,
+            "elapsed_seconds": round(elapsed, 2),
+            "blocks_per_sec": round(self.blocks_validated / elapsed, 2) if elapsed > 0 else 0.0,
+            "workers": self.workers,
+            "updated_at": int(time.time()),
+        }
+        if failed_block is not None:
+            progress["failed_block"] = failed_block
+        try:
+            self.snapshot_manager.update_metadata({PROGRESS_KEY: progress})
+        except Exception as e:
+            logger.warning(f"Could not record reparse progress: {e}")
+        return progress
@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 import config
 from index_core import check
 from index_core.database_manager import DatabaseManager
+from index_core.reparse.binary_snapshot import BinarySnapshot, is_binary_snapshot, write_snapshot
 from index_core.util import dhash_string, shash_string
 
 logger = logging.getLogger(__name__)
@@ -25,11 +26,34 @@ class DBConnection(Protocol):
 
 
 class SnapshotManager:
-    """Manages snapshots of block hashes for reparse validation."""
+    """Manages snapshots of block hashes for reparse validation.
+
+    Snapshots are JSON documents, or binary snapshots (see binary_snapshot)
+    when the path ends in ``.bin`` or the file carries the binary magic. Binary
+    snapshots answer get_expected_hash from the memory-mapped file without
+    loading the whole snapshot.
+    """
 
     def __init__(self, snapshot_path: str):
         self.snapshot_path = Path(snapshot_path)
         self._hashes: Optional[Dict] = None
+        self._binary: Optional[BinarySnapshot] = None
+
+    @property
+    def is_binary(self) -> bool:
+        return self.snapshot_path.suffix == ".bin" or is_binary_snapshot(self.snapshot_path)
+
+    def open_binary(self) -> Optional[BinarySnapshot]:
+        """Return the mapped binary snapshot, or None for JSON / missing snapshots."""
+        if self._binary is None and self.is_binary and self.snapshot_path.exists():
+            self._binary = BinarySnapshot(self.snapshot_path)
+        return self._binary
+
+    def _reset(self) -> None:
+        if self._binary is not None:
+            self._binary.close()
+        self._binary = None
+        self._hashes = None
 
     def compute_hash(self, data: Dict[str, Any]) -> str:
         """
@@ -70,7 +94,11 @@ class SnapshotManager:
                 self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
 
                 # Try to load existing snapshot
-                if self.snapshot_path.exists():
+                binary = self.open_binary()
+                if binary is not None:
+                    self._hashes = binary.to_dict()
+                    logger.info(f"Loaded {len(binary)} reference hashes from {self.snapshot_path}")
+                elif self.snapshot_path.exists():
                     with open(self.snapshot_path) as f:
                         self._hashes = json.load(f)
                     logger.info(f"Loaded {len(self._hashes)} reference hashes from {self.snapshot_path}")
@@ -90,6 +118,12 @@ class SnapshotManager:
         if metadata is None:
             metadata = {}
 
+        if self.is_binary:
+            self._reset()
+            write_snapshot(self.snapshot_path, block_hashes, metadata)
+            logger.info(f"Saved {len(block_hashes)} block hashes to {self.snapshot_path}")
+            return
+
         snapshot_data = {
             "metadata": metadata,
             "hashes": block_hashes,
@@ -100,8 +134,48 @@ class SnapshotManager:
 
         logger.info(f"Saved {len(block_hashes)} block hashes to {self.snapshot_path}")
 
+    def get_metadata(self) -> Dict[str, Any]:
+        """Return the snapshot's metadata section."""
+        binary = self.open_binary()
+        if binary is not None:
+            return binary.metadata
+        return dict(self.load_snapshot().get("metadata") or {})
+
+    def update_metadata(self, updates: Dict[str, Any]) -> None:
+        """
+        Merge ``updates`` into the snapshot metadata and rewrite the file.
+
+        The file is replaced atomically so an interrupted run never leaves a
+        truncated snapshot behind.
+        """
+        binary = self.open_binary()
+        if binary is not None:
+            metadata = binary.metadata
+            hashes: Any = list(binary)
+        else:
+            snapshot = self.load_snapshot()
+            metadata = dict(snapshot.get("metadata") or {})
+            hashes = snapshot.get("hashes", {})
+        metadata.update(updates)
+
+        if self.is_binary:
+            self._reset()
+            write_snapshot(self.snapshot_path, hashes, metadata)
+            return
+
+        snapshot["metadata"] = metadata
+        snapshot["hashes"] = hashes
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, indent=4)
+        os.replace(tmp_path, self.snapshot_path)
+
     def get_expected_hash(self, block_index: int) -> Optional[Dict[str, str]]:
         """Get expected hash for a block from snapshot."""
+        if self._hashes is None:
+            binary = self.open_binary()
+            if binary is not None:
+                return binary.get(block_index)
         hashes = self.load_snapshot()
         if not hashes or "hashes" not in hashes:
             return None
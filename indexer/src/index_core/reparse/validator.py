@@ -8,7 +8,7 @@ import sys
 os.environ["USE_TEST_DB"] = "1"
 os.environ["MOCK_DB"] = "1"
 os.environ["TESTING"] = "1"
-from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional, Union
 from unittest.mock import MagicMock
 
 if TYPE_CHECKING:
@@ -72,6 +72,11 @@ def main() -> None:
     parser.add_argument("--save-snapshot", action="store_true", help="Save DB state to snapshot and exit")
     parser.add_argument("--block-index", type=int, help="In-memory validate one block")
     parser.add_argument("--sequence", action="store_true", help="Validate snapshot continuity")
+    parser.add_argument(
+        "--range", nargs=2, type=int, metavar=("START", "END"), help="Validate a block range with parallel decoding"
+    )
+    parser.add_argument("--workers", type=int, help="Decode processes for --range (default REPARSE_WORKERS)")
+    parser.add_argument("--no-resume", action="store_true", help="Restart --range instead of resuming from the snapshot")
     parser.add_argument("-v", "--verbose", action="store_true", help="Debug logging")
     args = parser.parse_args()
     if args.verbose:
@@ -96,6 +101,11 @@ def main() -> None:
         sys.exit(0 if validator.validate_block(args.block_index) else 1)
     if args.sequence:
         sys.exit(0 if validator.validate_sequence() else 1)
+    if args.range:
+        from index_core.reparse.parallel import ParallelReparser
+
+        reparser = ParallelReparser(validator, workers=args.workers)
+        sys.exit(0 if reparser.run(*args.range, resume=not args.no_resume) else 1)
     hashes = validator.snapshot_manager.load_snapshot().get("hashes", {})
     for blk in sorted(int(i) for i in hashes):
         start = time.time()
@@ -542,6 +552,85 @@ class InMemoryBlockProcessor:
             # Note: collections and metadata tracked via collection_operations as needed
 
 
+class DecodedBlock(NamedTuple):
+    """Output of the stateless reparse stage for one block; picklable so it can come from a worker process."""
+
+    block_index: int
+    block_hash: str
+    block_time: Any
+    txhash_list: List[str]
+    tx_results: List[Any]
+
+
+def decode_block(
+    block_index: int, cp_blocks: Optional[Dict[int, Any]] = None, decode_transactions: bool = True
+) -> DecodedBlock:
+    """Run the stateless part of a block's reparse: node and CP fetch, filtering and decoding.
+
+    Nothing here reads or writes cross-block state (stamp counters, reissue and
+    balance caches), so blocks may be decoded in any order and in worker
+    processes; ``ReparseValidator.hash_decoded_block`` does the rest in chain
+    order. ``cp_blocks`` is a ``fetch_xcp_blocks_concurrent`` result covering
+    the block (fetched here when omitted). The returned tx results are in
+    on-chain order and carry no ``decoded_tx``, which the hashing stage never reads.
+    """
+    # Sync util so that filtering treats our reparse genesis as post-genesis
+    util.CURRENT_BLOCK_INDEX = block_index
+    import config as _cfg
+
+    # See _force_post_genesis_filter: force every tx through the Rust
+    # parser (post-genesis filter branch) for uniform in-memory reparse.
+    with _force_post_genesis_filter():
+        # Get block data from Bitcoin node
+        block_hash = backend_instance.getblockhash(block_index)
+        block_data = backend_instance.getblock(block_hash, 2)
+        if not block_data:
+            raise ValidationError(f"Failed to get block data for block {block_index}")
+
+        # Get CP block data
+        if cp_blocks is None:
+            cp_blocks = fetch_xcp_blocks_concurrent(block_index, block_index)
+        stamp_issuances = cp_blocks[block_index]["issuances"] if block_index in cp_blocks else []
+
+        # Filter transactions
+        txhash_list, raw_transactions = filter_block_transactions(block_data, stamp_issuances=stamp_issuances)
+        # For CP genesis block, only include stamp issuance transactions in memory reparse
+        if block_index == _cfg.CP_STAMP_GENESIS_BLOCK:
+            raw_transactions = {
+                issuance["tx_hash"]: raw_transactions[issuance["tx_hash"]]
+                for issuance in stamp_issuances
+                if issuance.get("tx_hash") in raw_transactions
+            }
+
+    tx_results = []
+    if decode_transactions:
+        # Pre-warm the raw-transaction cache so each candidate's vin[0]
+        # source lookup in get_tx_info is a cache hit (one batched RPC per
+        # block instead of N serial round-trips). Output-neutral.
+        prefetch_source_prevouts(raw_transactions)
+        for tx_hash in raw_transactions.keys():
+            result = process_tx(None, tx_hash, block_index, stamp_issuances, raw_transactions)
+            if getattr(result, "data", None) is not None:
+                result = result._replace(
+                    block_index=block_index, block_hash=block_hash, block_time=block_data["time"], decoded_tx=None
+                )
+                tx_results.append(result)
+        # Number stamps in on-chain (block) order, exactly as production does:
+        # ``blocks.py`` sorts tx_results by ``txhash_list.index`` before
+        # ``process_transaction_results`` (global stamp numbers are assigned in
+        # that order). ``filter_block_transactions`` returns raw_transactions
+        # with ALL CP issuances first and native SRC-20 after, so for a mixed
+        # SRC-20 + image block the unsorted order would mis-number every stamp.
+        # A position map keeps the first-occurrence semantics of list.index
+        # without its O(n) scan per tx.
+        position: Dict[str, int] = {}
+        for i, tx_hash in enumerate(txhash_list):
+            position.setdefault(tx_hash, i)
+        tx_results.sort(key=lambda r: position[r.tx_hash])
+
+    return DecodedBlock(block_index, block_hash, block_data.get("time"), txhash_list, tx_results)
+
+
 class ReparseValidator:
     """Validator for reparse operations."""
 
@@ -804,33 +893,29 @@ class ReparseValidator:
     ) -> Dict[str, str]:
         """Compute hashes for a block using the same logic as production."""
         try:
-            # Sync util so that filtering treats our reparse genesis as post-genesis
-            util.CURRENT_BLOCK_INDEX = block_index
-            import config as _cfg
+            decoded = decode_block(block_index, decode_transactions=block_processor is None)
+        except Exception as e:
+            logger.error(f"Error computing hashes for block {block_index}: {e}")
+            raise
+        return self.hash_decoded_block(decoded, block_processor)
+
+    def hash_decoded_block(
+        self,
+        decoded: DecodedBlock,
+        block_processor: Optional[Union[BlockProcessor, InMemoryBlockProcessor]] = None,
+    ) -> Dict[str, str]:
+        """Run the stateful stage (stamp numbering, ledger, consensus hashes) for a decoded block.
 
-            # See _force_post_genesis_filter: force every tx through the Rust
-            # parser (post-genesis filter branch) for uniform in-memory reparse.
-            with _force_post_genesis_filter():
-                # Get block data from Bitcoin node
-                block_hash = backend_instance.getblockhash(block_index)
-                block_data = backend_instance.getblock(block_hash, 2)
-                if not block_data:
-                    raise ValidationError(f"Failed to get block data for block {block_index}")
-
-                # Get CP block data
-                cp_blocks = fetch_xcp_blocks_concurrent(block_index, block_index)
-                stamp_issuances = cp_blocks[block_index]["issuances"] if block_index in cp_blocks else []
-
-                # Filter transactions
-                txhash_list, raw_transactions = filter_block_transactions(block_data, stamp_issuances=stamp_issuances)
-                # For CP genesis block, only include stamp issuance transactions in memory reparse
-                if block_index == _cfg.CP_STAMP_GENESIS_BLOCK:
-                    raw_transactions = {
-                        issuance["tx_hash"]: raw_transactions[issuance["tx_hash"]]
-                        for issuance in stamp_issuances
-                        if issuance.get("tx_hash") in raw_transactions
-                    }
+        Blocks must be passed in chain order: this stage reads and advances the
+        stamp counters and the reissue/balance caches.
+        """
+        block_index = decoded.block_index
+        block_hash = decoded.block_hash
+        txhash_list = decoded.txhash_list
+        try:
+            import config as _cfg
 
+            util.CURRENT_BLOCK_INDEX = block_index
             # Process transactions using BlockProcessor if not provided
             # Initialize an in-memory processor if none provided
             if block_processor is None:
@@ -844,24 +929,7 @@ class ReparseValidator:
                 # Inject the cross-block reissue lookup so a cpid first stamped in an
                 # earlier block is excluded (dev-DB backed; None-safe off-host).
                 block_processor._reissue_lookup = self._is_cross_block_reissue
-                tx_results = []
-                # Pre-warm the raw-transaction cache so each candidate's vin[0]
-                # source lookup in get_tx_info is a cache hit (one batched RPC per
-                # block instead of N serial round-trips). Output-neutral.
-                prefetch_source_prevouts(raw_transactions)
-                for tx_hash in raw_transactions.keys():
-                    result = process_tx(None, tx_hash, block_index, stamp_issuances, raw_transactions)
-                    if getattr(result, "data", None) is not None:
-                        result = result._replace(block_index=block_index, block_hash=block_hash, block_time=block_data["time"])
-                        tx_results.append(result)
-                # Number stamps in on-chain (block) order, exactly as production does:
-                # ``blocks.py`` sorts tx_results by ``txhash_list.index`` before
-                # ``process_transaction_results`` (global stamp numbers are assigned in
-                # that order). ``filter_block_transactions`` returns raw_transactions
-                # with ALL CP issuances first and native SRC-20 after, so for a mixed
-                # SRC-20 + image block the unsorted order would mis-number every stamp.
-                tx_results = sorted(tx_results, key=lambda r: txhash_list.index(r.tx_hash))
-                block_processor.process_transaction_results(tx_results)
+                block_processor.process_transaction_results(decoded.tx_results)
             # Ensure block_processor is not None for type checking
             assert block_processor is not None
 
@@ -976,10 +1044,9 @@ class ReparseValidator:
         try:
             # Determine checkpoint behavior: skip re-validation for designated checkpoints, but still process genesis
             import config as _cfg
-            from index_core import check
 
             # Skip only non-genesis checkpoint blocks
-            if block_index in check.CHECKPOINTS_MAINNET and block_index != _cfg.CP_STAMP_GENESIS_BLOCK:
+            if self.is_skipped_checkpoint(block_index):
                 logger.info(f"Block {block_index} is a checkpoint; skipping re-validation.")
                 return True
             # Identify genesis to include in-memory processing but skip hash comparison
@@ -989,51 +1056,90 @@ class ReparseValidator:
             if is_genesis:
                 logger.info(f"Genesis block {block_index} processed; skipping hash comparison.")
                 return True
-            # Get expected hash from snapshot
-            expected_hashes = self.snapshot_manager.get_expected_hash(block_index)
-            if not expected_hashes:
-                raise ValidationError(f"No expected hashes found for block {block_index}")
-
-            # Compare hashes
-            for hash_type in ["messages_hash", "txlist_hash"]:  # Skip ledger_hash if empty
-                if computed_hashes[hash_type] != expected_hashes[hash_type]:
-                    logger.error(
-                        f"Hash mismatch for block {block_index} ({hash_type}):\n"
-                        f"  Computed: {computed_hashes[hash_type]}\n"
-                        f"  Expected: {expected_hashes[hash_type]}"
-                    )
-                    # Dump full computed vs expected for debugging
-                    logger.debug(f"Full computed hashes: {json.dumps(computed_hashes, indent=2)}")
-                    logger.debug(f"Full expected hashes: {json.dumps(expected_hashes, indent=2)}")
-                    return False
-
-            # Only compare ledger_hash if it's not empty in the snapshot
-            if expected_hashes["ledger_hash"]:
-                if computed_hashes["ledger_hash"] != expected_hashes["ledger_hash"]:
-                    logger.error(
-                        f"Hash mismatch for block {block_index} (ledger_hash):\n"
-                        f"  Computed: {computed_hashes['ledger_hash']}\n"
-                        f"  Expected: {expected_hashes['ledger_hash']}"
-                    )
-                    # Dump full computed vs expected for debugging
-                    logger.debug(f"Full computed hashes: {json.dumps(computed_hashes, indent=2)}")
-                    logger.debug(f"Full expected hashes: {json.dumps(expected_hashes, indent=2)}")
-                    return False
+            return self._compare_hashes(block_index, computed_hashes)
 
-            return True
+        except Exception as e:
+            logger.error(f"Error validating block {block_index}: {e}")
+            raise
+
+    def is_skipped_checkpoint(self, block_index: int) -> bool:
+        """Whether ``block_index`` is a designated checkpoint that validation skips (genesis is still processed)."""
+        import config as _cfg
+        from index_core import check
+
+        return block_index in check.CHECKPOINTS_MAINNET and block_index != _cfg.CP_STAMP_GENESIS_BLOCK
 
+    def validate_decoded_block(self, decoded: DecodedBlock) -> bool:
+        """``validate_block`` for a block whose stateless stage already ran (see ``reparse.parallel``)."""
+        import config as _cfg
+
+        block_index = decoded.block_index
+        try:
+            if self.is_skipped_checkpoint(block_index):
+                logger.info(f"Block {block_index} is a checkpoint; skipping re-validation.")
+                return True
+            computed_hashes = self.hash_decoded_block(decoded)
+            if block_index == _cfg.CP_STAMP_GENESIS_BLOCK:
+                logger.info(f"Genesis block {block_index} processed; skipping hash comparison.")
+                return True
+            return self._compare_hashes(block_index, computed_hashes)
         except Exception as e:
             logger.error(f"Error validating block {block_index}: {e}")
             raise
 
+    def _compare_hashes(self, block_index: int, computed_hashes: Dict[str, str]) -> bool:
+        """Compare computed hashes with the snapshot; raises ValidationError when the block is missing from it."""
+        # Get expected hash from snapshot
+        expected_hashes = self.snapshot_manager.get_expected_hash(block_index)
+        if not expected_hashes:
+            raise ValidationError(f"No expected hashes found for block {block_index}")
+
+        # Compare hashes
+        for hash_type in ["messages_hash", "txlist_hash"]:  # Skip ledger_hash if empty
+            if computed_hashes[hash_type] != expected_hashes[hash_type]:
+                logger.error(
+                    f"Hash mismatch for block {block_index} ({hash_type}):\n"
+                    f"  Computed: {computed_hashes[hash_type]}\n"
+                    f"  Expected: {expected_hashes[hash_type]}"
+                )
+                # Dump full computed vs expected for debugging
+                logger.debug(f"Full computed hashes: {json.dumps(computed_hashes, indent=2)}")
+                logger.debug(f"Full expected hashes: {json.dumps(expected_hashes, indent=2)}")
+                return False
+
+        # Only compare ledger_hash if it's not empty in the snapshot
+        if expected_hashes["ledger_hash"]:
+            if computed_hashes["ledger_hash"] != expected_hashes["ledger_hash"]:
+                logger.error(
+                    f"Hash mismatch for block {block_index} (ledger_hash):\n"
+                    f"  Computed: {computed_hashes['ledger_hash']}\n"
+                    f"  Expected: {expected_hashes['ledger_hash']}"
+                )
+                # Dump full computed vs expected for debugging
+                logger.debug(f"Full computed hashes: {json.dumps(computed_hashes, indent=2)}")
+                logger.debug(f"Full expected hashes: {json.dumps(expected_hashes, indent=2)}")
+                return False
+
+        return True
+
     def validate_sequence(self) -> bool:
         """Validate that snapshot block indices form a continuous sequence."""
+        binary = self.snapshot_manager.open_binary() if getattr(self.snapshot_manager, "is_binary", False) else None
+        if binary is not None:
+            # Heights are read straight from the mapped records
+            if not len(binary):
+                raise ValidationError("No hashes found in snapshot for sequence validation")
+            missing = binary.missing_blocks()
+            if missing:
+                raise ValidationError(f"Missing blocks in snapshot: {missing}")
+            return True
         data = self.snapshot_manager.load_snapshot()
         hashes = data.get("hashes") if isinstance(data, dict) else None
         if not hashes:
             raise ValidationError("No hashes found in snapshot for sequence validation")
         indices = sorted(int(i) for i in hashes.keys())
-        missing = [i for i in range(indices[0], indices[-1] + 1) if i not in indices]
+        present = set(indices)
+        missing = [i for i in range(indices[0], indices[-1] + 1) if i not in present]
         if missing:
             raise ValidationError(f"Missing blocks in snapshot: {missing}")
         return True
@@ -8,9 +8,9 @@ import queue
 import threading
 import time
 import traceback
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import config
 from config import CP_STAMP_GENESIS_BLOCK
@@ -116,6 +116,71 @@ class SalesHistoryProcessor:
             if close_db:
                 db.close()
 
+    def fetch_block_dispenses(self, block_index: int) -> Optional[List[Dict[str, Any]]]:
+        """Fetch a block's dispenses from the Counterparty API; None if none were returned."""
+        from index_core.fetch_utils import fetch_xcp
+
+        # No show_unconfirmed: CP v11.2 rejects it on the dispenses endpoint
+        # (confirmed-only dispenses table); harmless on v11.1.x too.
+        response = fetch_xcp(f"/blocks/{block_index}/dispenses", {"verbose": "true"})
+
+        if not response or "result" not in response:
+            return None
+        return response["result"]
+
+    def store_block_dispenses(self, block_index: int, dispenses: List[Dict[str, Any]], db) -> int:
+        """Insert a block's stamp dispenses into stamp_sales_history. The caller commits."""
+        assets = list({dispense.get("asset") for dispense in dispenses if dispense.get("asset")})
+        if not assets:
+            return 0
+
+        dispense_count = 0
+        with db.cursor() as cursor:
+            # Check which assets are stamps in one query
+            placeholders = ",".join(["%s"] * len(assets))
+            cursor.execute(f"SELECT cpid, stamp FROM StampTableV4 WHERE cpid IN ({placeholders})", tuple(assets))  # nosec
+            stamp_cpids = {row[0] for row in cursor.fetchall()}
+
+        for dispense in dispenses:
+            # Only process if it's a stamp
+            if dispense.get("asset") not in stamp_cpids:
+                continue
+
+            # Insert into sales history
+            self._insert_sale(db, self.dispense_to_sale(block_index, dispense))
+            dispense_count += 1
+
+        return dispense_count
+
+    @staticmethod
+    def dispense_to_sale(block_index: int, dispense: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the stamp_sales_history row for a CP API dispense."""
+        # Extract dispense data from API response
+        quantity = dispense.get("dispense_quantity", 0)
+        btc_amount = dispense.get("btc_amount", 0)
+
+        # Get satoshirate from dispenser data if available
+        satoshirate = 0
+        if "dispenser" in dispense and isinstance(dispense["dispenser"], dict):
+            satoshirate = dispense["dispenser"].get("satoshirate", 0)
+        elif btc_amount and quantity:
+            # Calculate satoshirate from btc_amount if not provided
+            satoshirate = btc_amount // quantity if quantity > 0 else 0
+
+        return {
+            "tx_hash": dispense.get("tx_hash"),
+            "block_index": block_index,
+            "block_time": dispense.get("block_time"),
+            "cpid": dispense.get("asset"),
+            "buyer_address": dispense.get("source"),  # source is the buyer
+            "seller_address": dispense.get("destination"),  # destination is the dispenser
+            "btc_amount": btc_amount if btc_amount else 0,  # raw satoshis (BIGINT column)
+            "sale_type": "dispenser",  # lowercase to match ENUM
+            "dispenser_tx_hash": dispense.get("dispenser_tx_hash"),
+            "quantity": quantity,
+            "unit_price_sats": satoshirate,
+        }
+
     def process_block_dispenses(self, block_index: int, db=None) -> int:
         """Process dispenses from a specific block in real-time by fetching from Counterparty API."""
         if self.catchup_running:
@@ -129,69 +194,12 @@ class SalesHistoryProcessor:
 
         dispense_count = 0
         try:
-            # Fetch dispenses from Counterparty API
-            from index_core.fetch_utils import fetch_xcp
-
-            # No show_unconfirmed: CP v11.2 rejects it on the dispenses endpoint
-            # (confirmed-only dispenses table); harmless on v11.1.x too.
-            response = fetch_xcp(f"/blocks/{block_index}/dispenses", {"verbose": "true"})
-
-            if not response or "result" not in response:
+            dispenses = self.fetch_block_dispenses(block_index)
+            if not dispenses:
                 logger.debug(f"No dispenses found in block {block_index}")
                 return 0
 
-            dispenses = response["result"]
-
-            with db.cursor() as cursor:
-                for dispense in dispenses:
-                    # Extract dispense data from API response
-                    tx_hash = dispense.get("tx_hash")
-                    asset = dispense.get("asset")
-                    source = dispense.get("source")  # This is the buyer
-                    destination = dispense.get("destination")  # This is the dispenser address
-                    quantity = dispense.get("dispense_quantity", 0)
-                    btc_amount = dispense.get("btc_amount", 0)
-                    dispenser_tx_hash = dispense.get("dispenser_tx_hash")
-                    block_time = dispense.get("block_time")
-
-                    # Check if this asset is a stamp
-                    cursor.execute("SELECT cpid, stamp FROM StampTableV4 WHERE cpid = %s", (asset,))
-                    stamp_data = cursor.fetchone()
-
-                    # Only process if it's a stamp
-                    if stamp_data:
-                        cpid, stamp_num = stamp_data
-
-                        # Get satoshirate from dispenser data if available
-                        satoshirate = 0
-                        if "dispenser" in dispense and isinstance(dispense["dispenser"], dict):
-                            satoshirate = dispense["dispenser"].get("satoshirate", 0)
-                        elif btc_amount and quantity:
-                            # Calculate satoshirate from btc_amount if not provided
-                            satoshirate = btc_amount // quantity if quantity > 0 else 0
-
-                        # Store btc_amount as raw satoshis (BIGINT column)
-                        btc_amount_sats = btc_amount if btc_amount else 0
-
-                        # Insert into sales history
-                        self._insert_sale(
-                            db,
-                            {
-                                "tx_hash": tx_hash,
-                                "block_index": block_index,
-                                "block_time": block_time,
-                                "cpid": cpid,
-                                "buyer_address": source,  # source is the buyer
-                                "seller_address": destination,  # destination is the dispenser
-                                "btc_amount": btc_amount_sats,
-                                "sale_type": "dispenser",  # lowercase to match ENUM
-                                "dispenser_tx_hash": dispenser_tx_hash,
-                                "quantity": quantity,
-                                "unit_price_sats": satoshirate,
-                            },
-                        )
-                        dispense_count += 1
-
+            dispense_count = self.store_block_dispenses(block_index, dispenses, db)
             db.commit()
 
             if dispense_count > 0:
@@ -400,6 +408,10 @@ class SalesHistoryProcessor:
                 )
                 logger.warning("Proceeding anyway... (press Ctrl+C to cancel)")
 
+            if config.SALES_HISTORY_BULK_INGEST_ENABLED:
+                ingester = BulkDispenseIngester(self)
+                return ingester.run(last_block + 1, current_block, should_continue=lambda: self.catchup_running)
+
             # Get a database connection for bulk processing
             db = self.db_manager.connect()
             try:
@@ -686,6 +698,410 @@ class SalesHistoryProcessor:
         finally:
             db.close()
 
+    def calculate_volumes_for_cpids(self, cpids: List[str], hours: List[int]) -> Dict[str, List[float]]:
+        """
+        Calculate volumes for many stamps in one grouped query.
+
+        Returns, per cpid with sales, the volume in satoshis over each window in
+        ``hours`` (same order). Stamps without sales in the longest window are absent.
+        """
+        if not cpids or not hours:
+            return {}
+
+        window_sums = ", ".join(
+            ["COALESCE(SUM(CASE WHEN block_time >= UNIX_TIMESTAMP(NOW() - INTERVAL %s HOUR) THEN btc_amount END), 0)"]
+            * len(hours)
+        )
+        db = self.db_manager.connect()
+        try:
+            with db.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT cpid, {window_sums}
+                    FROM stamp_sales_history
+                    WHERE cpid IN ({', '.join(['%s'] * len(cpids))})
+                    AND block_time >= UNIX_TIMESTAMP(NOW() - INTERVAL %s HOUR)
+                    GROUP BY cpid
+                """,
+                    [*hours, *cpids, max(hours)],
+                )
+                return {row[0]: [float(volume) if volume else 0.0 for volume in row[1:]] for row in cursor.fetchall()}
+
+        finally:
+            db.close()
+
+    def get_latest_sales(self, cpids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the most recent sale of each stamp in ``cpids`` with one query."""
+        if not cpids:
+            return {}
+
+        db = self.db_manager.connect()
+        try:
+            with db.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT ssh.cpid, ssh.tx_hash, ssh.block_index, ssh.block_time,
+                           ssh.buyer_address, ssh.seller_address, ssh.btc_amount
+                    FROM stamp_sales_history ssh
+                    JOIN (
+                        SELECT cpid, MAX(block_time) AS block_time
+                        FROM stamp_sales_history
+                        WHERE cpid IN ({', '.join(['%s'] * len(cpids))})
+                        GROUP BY cpid
+                    ) latest ON ssh.cpid = latest.cpid AND ssh.block_time = latest.block_time
+                """,
+                    list(cpids),
+                )
+
+                sales: Dict[str, Dict[str, Any]] = {}
+                for row in cursor.fetchall():
+                    # Same-second sales tie like ORDER BY block_time DESC LIMIT 1 does: keep one
+                    sales.setdefault(
+                        row[0],
+                        {
+                            "tx_hash": row[1],
+                            "block_index": row[2],
+                            "block_time": row[3],
+                            "cpid": row[0],
+                            "buyer_address": row[4],
+                            "seller_address": row[5],
+                            "btc_amount": float(row[6]) if row[6] else 0,
+                        },
+                    )
+                return sales
+
+        finally:
+            db.close()
+
+
+class DispenseWriter:
+    """
+    Store committed blocks' dispenses into stamp_sales_history off the block loop.
+
+    With DISPENSE_PIPELINE_ENABLED the CP pipeline fetches each block's
+    dispenses alongside its transactions and follow() hands them over here
+    after the block commits. The writer runs on its own thread and connection,
+    so a slow CP API or a slow sales insert never holds up consensus work.
+    Sales and the "realtime_dispense_block" checkpoint commit in one transaction;
+    blocks missed since the checkpoint (restart, failed write) are backfilled
+    from the API, at most DISPENSE_WRITER_MAX_BACKFILL of them per block.
+    """
+
+    CHECKPOINT = "realtime_dispense_block"
+
+    def __init__(self, processor: SalesHistoryProcessor, max_backfill: Optional[int] = None):
+        self.processor = processor
+        self.max_backfill = config.DISPENSE_WRITER_MAX_BACKFILL if max_backfill is None else max_backfill
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._db = None
+        self.last_block: Optional[int] = None
+        self.stats: Dict[str, int] = {"blocks": 0, "sales": 0, "api_fetches": 0, "backfilled": 0, "errors": 0}
+
+    def start(self):
+        """Start the writer thread if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="DispenseWriter", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, block_index: int, dispenses: Optional[List[Dict[str, Any]]] = None):
+        """Queue a committed block; ``dispenses`` None means the writer fetches them itself."""
+        self.start()
+        self._queue.put((block_index, dispenses))
+
+    def drain(self):
+        """Block until every queued block has been written (or has failed)."""
+        self._queue.join()
+
+    def rewind(self, block_index: int):
+        """
+        Move the writer back to ``block_index`` after a rollback purged the blocks above it.
+
+        Call drain() before the purge so no queued block is written after it.
+        """
+        if self.processor.get_checkpoint(self.CHECKPOINT) > block_index:
+            self.processor.update_checkpoint(self.CHECKPOINT, block_index)
+        if self.last_block is not None and self.last_block > block_index:
+            self.last_block = block_index
+
+    def stop(self, timeout: float = 10.0):
+        """Write what is queued, then stop the thread and close the connection."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=timeout)
+            if thread.is_alive():
+                logger.warning("Dispense writer did not exit within timeout")
+        self._close_db()
+        logger.info(f"Dispense writer stopped: {self.stats}")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Dispense writer failed on block {item[0]}: {e}")
+                self._close_db()
+            finally:
+                self._queue.task_done()
+
+    def _connection(self):
+        if self._db is None:
+            self._db = self.processor.db_manager.connect()
+        return self._db
+
+    def _close_db(self):
+        if self._db is not None:
+            try:
+                self._db.rollback()
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+
+    def _write(self, block_index: int, dispenses: Optional[List[Dict[str, Any]]]):
+        if self.processor.catchup_running:
+            # Catchup covers these blocks; the checkpoint gap is backfilled afterwards
+            return
+
+        db = self._connection()
+        if self.last_block is None:
+            self.last_block = self.processor.get_checkpoint(self.CHECKPOINT) or None
+
+        if self.last_block is not None:
+            for missed in range(max(self.last_block + 1, block_index - self.max_backfill), block_index):
+                self._store(db, missed, None)
+                self.stats["backfilled"] += 1
+
+        self._store(db, block_index, dispenses)
+
+    def _store(self, db, block_index: int, dispenses: Optional[List[Dict[str, Any]]]):
+        if dispenses is None:
+            self.stats["api_fetches"] += 1
+            dispenses = self.processor.fetch_block_dispenses(block_index)
+            if dispenses is None:
+                raise RuntimeError(f"no dispense response for block {block_index}")
+
+        try:
+            count = self.processor.store_block_dispenses(block_index, dispenses, db) if dispenses else 0
+            # update_checkpoint commits, so the sales and the checkpoint land together
+            self.processor.update_checkpoint(self.CHECKPOINT, block_index, db)
+        except Exception:
+            db.rollback()
+            raise
+
+        self.last_block = block_index
+        self.stats["blocks"] += 1
+        self.stats["sales"] += count
+        if count:
+            logger.debug(f"Stored {count} dispenser sales in block {block_index}")
+
+
+class BulkDispenseIngester:
+    """
+    Backfill stamp_sales_history from the Counterparty API in bulk.
+
+    The block-by-block catchup fetches one block at a time, looks its assets
+    up in StampTableV4 and inserts each sale with a SELECT-then-INSERT. With
+    SALES_HISTORY_BULK_INGEST_ENABLED _fetch_all_dispenses runs this instead:
+
+    - the range is split into chunks of SALES_HISTORY_BULK_CHUNK_BLOCKS blocks
+      whose dispenses are fetched on SALES_HISTORY_BULK_WORKERS threads, paging
+      through /blocks/{n}/dispenses; the next chunk is fetched while the current
+      one is written;
+    - dispenses are kept only if their asset is in a cpid -> stamp map that is
+      loaded once and reloaded only when a chunk passes the stamps it covers;
+    - sales are deduplicated in memory on the table's unique key and loaded
+      with multi-row INSERT IGNORE statements;
+    - a chunk's sales and the "dispenser_block" checkpoint commit together,
+      so an interrupted run resumes after the last committed chunk.
+
+    A block whose dispenses cannot be fetched fails the run before its chunk
+    commits, rather than being skipped.
+    """
+
+    CHECKPOINT = "dispenser_block"
+    INSERT_SQL = """
+        INSERT IGNORE INTO stamp_sales_history
+        (tx_hash, block_index, block_time, cpid, buyer_address,
+         seller_address, btc_amount, sale_type, quantity, unit_price_sats,
+         dispenser_tx_hash, processed_at)
+        VALUES {rows}
+    """
+    ROW_SQL = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())"
+
+    def __init__(
+        self,
+        processor: SalesHistoryProcessor,
+        workers: Optional[int] = None,
+        chunk_blocks: Optional[int] = None,
+        insert_batch: Optional[int] = None,
+    ):
+        self.processor = processor
+        self.workers = max(1, workers or config.SALES_HISTORY_BULK_WORKERS)
+        self.chunk_blocks = max(1, chunk_blocks or config.SALES_HISTORY_BULK_CHUNK_BLOCKS)
+        self.insert_batch = max(1, insert_batch or config.SALES_HISTORY_BULK_INSERT_BATCH)
+        self.stamp_map: Dict[str, int] = {}
+        self.stamps_through_block = -1
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "chunks": 0,
+            "blocks": 0,
+            "api_requests": 0,
+            "dispenses": 0,
+            "sales": 0,
+            "duplicates": 0,
+            "inserted": 0,
+        }
+
+    def run(self, start_block: int, end_block: int, should_continue: Optional[Callable[[], bool]] = None) -> bool:
+        """Ingest the dispenses of blocks start_block..end_block; False if stopped before the end."""
+        chunks = [
+            (first, min(first + self.chunk_blocks - 1, end_block))
+            for first in range(start_block, end_block + 1, self.chunk_blocks)
+        ]
+        if not chunks:
+            return True
+
+        start_time = time.time()
+        db = self.processor.db_manager.connect()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="BulkDispenses")
+        pending: List[Future] = []
+        try:
+            pending = self._submit(executor, chunks[0])
+            for position, chunk in enumerate(chunks):
+                if should_continue is not None and not should_continue():
+                    logger.debug(f"Bulk dispense ingestion stopped before block {chunk[0]}")
+                    return False
+
+                blocks = [future.result() for future in pending]
+                # Fetch the next chunk while this one is written
+                pending = self._submit(executor, chunks[position + 1]) if position + 1 < len(chunks) else []
+                self._commit_chunk(db, chunk, blocks)
+
+            elapsed = time.time() - start_time
+            logger.info(
+                f"✅ Bulk dispense ingestion of blocks {start_block}-{end_block} complete in {elapsed:.1f}s: "
+                f"{self.stats['sales']} sales ({self.stats['inserted']} new) from {self.stats['dispenses']} dispenses, "
+                f"{self.stats['blocks'] / elapsed if elapsed > 0 else 0:.0f} blocks/s"
+            )
+            return True
+
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            db.close()
+
+    def _submit(self, executor: ThreadPoolExecutor, chunk: Tuple[int, int]) -> List[Future]:
+        return [executor.submit(self._fetch_block, block_index) for block_index in range(chunk[0], chunk[1] + 1)]
+
+    def _fetch_block(self, block_index: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Fetch every page of a block's dispenses."""
+        from index_core.fetch_utils import fetch_xcp
+
+        dispenses: List[Dict[str, Any]] = []
+        params: Dict[str, Any] = {"verbose": "true", "limit": PAGE_SIZE}
+        while True:
+            response = fetch_xcp(f"/blocks/{block_index}/dispenses", params)
+            with self._lock:
+                self.stats["api_requests"] += 1
+            if not response or "result" not in response:
+                raise RuntimeError(f"no dispense response for block {block_index}")
+
+            page = response["result"] or []
+            dispenses.extend(page)
+            if not page or not response.get("next_cursor"):
+                return block_index, dispenses
+            params = {**params, "cursor": response["next_cursor"]}
+
+    def _load_stamp_map(self, db):
+        with db.cursor() as cursor:
+            cursor.execute("SELECT cpid, stamp FROM StampTableV4 WHERE stamp IS NOT NULL")
+            self.stamp_map = {cpid: stamp for cpid, stamp in cursor.fetchall()}
+            cursor.execute("SELECT MAX(block_index) FROM StampTableV4")
+            row = cursor.fetchone()
+            self.stamps_through_block = row[0] if row and row[0] is not None else -1
+        logger.debug(f"Loaded {len(self.stamp_map)} stamp cpids (through block {self.stamps_through_block})")
+
+    def _commit_chunk(self, db, chunk: Tuple[int, int], blocks: List[Tuple[int, List[Dict[str, Any]]]]):
+        """Insert a chunk's stamp sales and advance the checkpoint in one transaction."""
+        if chunk[1] > self.stamps_through_block:
+            self._load_stamp_map(db)
+
+        sales: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        dispense_count = 0
+        for block_index, dispenses in blocks:
+            dispense_count += len(dispenses)
+            for dispense in dispenses:
+                if dispense.get("asset") not in self.stamp_map:
+                    continue
+                sale = self.processor.dispense_to_sale(block_index, dispense)
+                # Same key as the unique_sale index, which INSERT IGNORE would enforce anyway
+                key = (sale["tx_hash"], sale["sale_type"], sale["cpid"])
+                if key in sales:
+                    self.stats["duplicates"] += 1
+                    continue
+                sales[key] = sale
+
+        try:
+            inserted = self._insert_sales(db, list(sales.values()))
+            # update_checkpoint commits, so the sales and the checkpoint land together
+            self.processor.update_checkpoint(self.CHECKPOINT, chunk[1], db)
+        except Exception:
+            db.rollback()
+            raise
+
+        self.stats["chunks"] += 1
+        self.stats["blocks"] += len(blocks)
+        self.stats["dispenses"] += dispense_count
+        self.stats["sales"] += len(sales)
+        self.stats["inserted"] += inserted
+        self.processor.progress["api_requests"] = self.stats["api_requests"]
+        self.processor.progress["db_inserts"] += inserted
+        self.processor.progress["total_sales"] += inserted
+        logger.debug(
+            f"Committed dispense chunk {chunk[0]}-{chunk[1]}: {len(sales)} sales ({inserted} new) "
+            f"from {dispense_count} dispenses"
+        )
+
+    def _insert_sales(self, db, sales: List[Dict[str, Any]]) -> int:
+        """Multi-row INSERT IGNORE of ``sales`` in batches; returns the rows inserted. The caller commits."""
+        inserted = 0
+        with db.cursor() as cursor:
+            for start in range(0, len(sales), self.insert_batch):
+                batch = sales[start : start + self.insert_batch]
+                values: List[Any] = []
+                for sale in batch:
+                    values.extend(
+                        (
+                            sale["tx_hash"],
+                            sale["block_index"],
+                            sale["block_time"],
+                            sale["cpid"],
+                            sale["buyer_address"],
+                            sale["seller_address"],
+                            sale["btc_amount"],
+                            sale["sale_type"],
+                            sale.get("quantity", 1),
+                            sale.get("unit_price_sats", 0),
+                            sale.get("dispenser_tx_hash"),
+                        )
+                    )
+                cursor.execute(self.INSERT_SQL.format(rows=", ".join([self.ROW_SQL] * len(batch))), values)
+                inserted += cursor.rowcount
+        return inserted
+
 
 # Global instance for easy access
 sales_history_processor = SalesHistoryProcessor()
+dispense_writer = DispenseWriter(sales_history_processor)
@@ -15,8 +15,10 @@ from cryptography.hazmat.primitives.asymmetric import ec
 from eth_account import Account
 from eth_account.messages import encode_defunct
 
+import config
 import index_core.log as log
 from config import BTC_SRC101_IMG_OPTIONAL_BLOCK, SRC101_OWNERS_TABLE
+from index_core.balance_journal import read_owner_rows, record_owner_deltas
 from index_core.database import get_src101_deploy, get_src101_price
 from index_core.util import (
     check_contains_special,
@@ -352,13 +354,14 @@ class Src101Processor:
         "UE": ("UNEXPECTED ERROR : {error}", False),
     }
 
-    def __init__(self, db, src101_dict, processed_src101_in_block, block_index, lock=None):
+    def __init__(self, db, src101_dict, processed_src101_in_block, block_index, lock=None, block_context=None):
         self.db = db
         self.src101_dict = src101_dict
         self.processed_src101_in_block = processed_src101_in_block
         self.block_index = block_index
         self.is_valid = True
         self._lock = lock
+        self.block_context = block_context
 
     def update_valid_src101_list(
         self,
@@ -611,6 +614,7 @@ class Src101Processor:
                     self.processed_src101_in_block,
                     self.src101_dict.get("deploy_hash"),
                     self.src101_dict.get("tokenid_utf8")[index],
+                    block_context=self.block_context,
                 )
                 # src101_preowner = result[0]
                 src101_owner = result[1]
@@ -674,6 +678,7 @@ class Src101Processor:
                 self.processed_src101_in_block,
                 self.src101_dict.get("deploy_hash"),
                 self.src101_dict.get("tokenid_utf8"),
+                block_context=self.block_context,
             )
             # src101_preowner = result[0]
             src101_owner = result[1]
@@ -736,6 +741,7 @@ class Src101Processor:
                 self.processed_src101_in_block,
                 self.src101_dict.get("deploy_hash"),
                 self.src101_dict.get("tokenid_utf8"),
+                block_context=self.block_context,
             )
             src101_preowner = result[0]
             src101_owner = result[1]
@@ -847,6 +853,7 @@ class Src101Processor:
                 self.processed_src101_in_block,
                 self.src101_dict.get("deploy_hash"),
                 self.src101_dict.get("tokenid_utf8"),
+                block_context=self.block_context,
             )
             src101_preowner = result[0]
             src101_owner = result[1]
@@ -1004,8 +1011,14 @@ class Src101Processor:
             logger.warning(f"exception: {e}")
 
 
-def parse_src101(db, src101_dict, processed_src101_in_block, block_index, lock=None):
-    processor = Src101Processor(db, src101_dict, processed_src101_in_block, block_index, lock)
+def parse_src101(db, src101_dict, processed_src101_in_block, block_index, lock=None, block_context=None):
+    """
+    Validate and process one SRC-101 operation.
+
+    ``block_context`` (BlockContext) replaces the scans of processed_src101_in_block
+    for in-block name ownership; the caller records the result with record_src101.
+    """
+    processor = Src101Processor(db, src101_dict, processed_src101_in_block, block_index, lock, block_context=block_context)
     processor.process()
 
     return processor.is_valid, src101_dict
@@ -1110,19 +1123,24 @@ def check_src101_inputs(input_string, tx_hash, block_index):
         return None
 
 
+def _owner_key(deploy_hash, tokenid):
+    # A MINT carries a list of tokenids; it only ever matches an entry keyed by an equal list
+    return deploy_hash, tuple(tokenid) if isinstance(tokenid, list) else tokenid
+
+
 def update_src101_owners(db, block_index, src101_processed_in_block):
     owner_updates = []
+    # (deploy_hash, tokenid) -> first owner entry for it, in block order
+    owner_index = {}
+
+    def add_owner(owner_dict):
+        owner_updates.append(owner_dict)
+        owner_index.setdefault(_owner_key(owner_dict["deploy_hash"], owner_dict["tokenid"]), owner_dict)
+
     for src101_dict in src101_processed_in_block:
         if src101_dict.get("valid") == 1 and src101_dict.get("tokenid") and src101_dict.get("deploy_hash"):
             try:
-                owner_dict = next(
-                    (
-                        item
-                        for item in owner_updates
-                        if item["tokenid"] == src101_dict["tokenid"] and item["deploy_hash"] == src101_dict["deploy_hash"]
-                    ),
-                    None,
-                )
+                owner_dict = owner_index.get(_owner_key(src101_dict["deploy_hash"], src101_dict["tokenid"]))
                 if src101_dict["op"] == "MINT":
                     if owner_dict is None:
                         for index in range(len(src101_dict["tokenid"])):
@@ -1140,7 +1158,7 @@ def update_src101_owners(db, block_index, src101_processed_in_block):
                                 "prim": src101_dict["prim"],
                                 "img": src101_dict["img"][index],
                             }
-                            owner_updates.append(owner_dict)
+                            add_owner(owner_dict)
                     else:
                         raise ValueError("cannot mint the same tokenid")
                 elif src101_dict["op"] == "TRANSFER":
@@ -1159,7 +1177,7 @@ def update_src101_owners(db, block_index, src101_processed_in_block):
                             "prim": False,
                             "img": None,
                         }
-                        owner_updates.append(owner_dict)
+                        add_owner(owner_dict)
                     else:
                         owner_dict["owner"] = (src101_dict["src101_owner"],)
                         owner_dict["preowner"] = src101_dict["src101_preowner"]
@@ -1179,7 +1197,7 @@ def update_src101_owners(db, block_index, src101_processed_in_block):
                             "prim": src101_dict["prim"],
                             "img": None,
                         }
-                        owner_updates.append(owner_dict)
+                        add_owner(owner_dict)
                     else:
                         owner_dict["expire_timestamp"] = (src101_dict["expire_timestamp"],)
                 elif src101_dict["op"] == "SETRECORD":
@@ -1198,7 +1216,7 @@ def update_src101_owners(db, block_index, src101_processed_in_block):
                             "prim": src101_dict["prim"],
                             "img": None,
                         }
-                        owner_updates.append(owner_dict)
+                        add_owner(owner_dict)
                     else:
                         owner_dict["txt_data"] = src101_dict["txt_data"]
                         owner_dict["address_btc"] = src101_dict["address_btc"]
@@ -1208,73 +1226,185 @@ def update_src101_owners(db, block_index, src101_processed_in_block):
                 logger.error(f"Error updating SRC101 owners: {e}")
                 raise e
     if owner_updates:
+        prior_rows = read_owner_rows(db, owner_updates) if config.BALANCE_JOURNAL_ENABLED else None
         update_owner_table(db, owner_updates, block_index)
+        if prior_rows is not None:
+            record_owner_deltas(db, block_index, prior_rows, owner_updates)
     return owner_updates
 
 
+OWNER_UPSERT_COLUMNS = (
+    "index",
+    "id",
+    "last_update",
+    "p",
+    "deploy_hash",
+    "tokenid",
+    "tokenid_utf8",
+    "img",
+    "preowner",
+    "owner",
+    "txt_data",
+    "expire_timestamp",
+    "address_btc",
+    "address_eth",
+    "prim",
+)
+# Columns the upsert overwrites on an existing row; the rest keep their first value
+OWNER_UPDATE_COLUMNS = (
+    "last_update",
+    "preowner",
+    "owner",
+    "txt_data",
+    "address_btc",
+    "address_eth",
+    "prim",
+    "expire_timestamp",
+)
+OWNER_UPSERT_BATCH_SIZE = 1000
+
+
+def _ci(value):
+    # id, p and deploy_hash compare case-insensitively in the owners table collation
+    return value.casefold() if isinstance(value, str) else value
+
+
 def update_owner_table(db, owner_updates, block_index):
+    """
+    Write a block's owner updates with a few set-based statements.
+
+    Equivalent to upserting the rows one at a time in order, where each new row
+    takes MAX(index) + 1 of its deploy and a row with prim set first clears prim
+    on the deploy's other rows for the same address_btc. Index allocation and
+    prim clearing are replayed in memory from one MAX(index) per deploy and one
+    lookup of the rows that already exist; the database then gets a single
+    prim-clearing UPDATE and multi-row upserts with one row per owners row.
+    """
+    if not owner_updates:
+        return
     cursor = db.cursor()
-    for owner_dict in owner_updates:
-        try:
-            querystr = (
-                f"SELECT COALESCE(MAX({SRC101_OWNERS_TABLE}.index), 0) FROM {SRC101_OWNERS_TABLE} WHERE deploy_hash = %s"
+    try:
+        rows = []
+        for owner_dict in owner_updates:
+            rows.append(
+                {
+                    "id": owner_dict["p"] + "_" + owner_dict["deploy_hash"] + "_" + owner_dict["tokenid"],
+                    "last_update": block_index,
+                    "p": owner_dict["p"],
+                    "deploy_hash": owner_dict["deploy_hash"],
+                    "tokenid": owner_dict["tokenid"],
+                    "tokenid_utf8": owner_dict["tokenid_utf8"],
+                    "img": owner_dict["img"],
+                    "preowner": owner_dict["preowner"],
+                    "owner": owner_dict["owner"],
+                    "txt_data": json.dumps(owner_dict["txt_data"]) if owner_dict["txt_data"] else None,
+                    "expire_timestamp": owner_dict["expire_timestamp"],
+                    "address_btc": owner_dict["address_btc"],
+                    "address_eth": owner_dict["address_eth"],
+                    "prim": owner_dict["prim"],
+                }
             )
-            cursor.execute(querystr, (owner_dict["deploy_hash"],))
-            max_index = cursor.fetchone()[0]
-            id_field = owner_dict["p"] + "_" + owner_dict["deploy_hash"] + "_" + owner_dict["tokenid"]
-            imgurl = owner_dict["img"]
-            if owner_dict["prim"]:
-                cursor.execute(
-                    f"""
-                    UPDATE {SRC101_OWNERS_TABLE}
-                    SET prim = FALSE
-                    WHERE address_btc = %s AND deploy_hash = %s AND prim = TRUE;
-                    """,
-                    (
-                        owner_dict["address_btc"],
-                        owner_dict["deploy_hash"],
-                    ),
-                )
+
+        deploy_hashes = list({_ci(row["deploy_hash"]): row["deploy_hash"] for row in rows}.values())
+        placeholders = ", ".join(["%s"] * len(deploy_hashes))
+        cursor.execute(
+            f"SELECT deploy_hash, COALESCE(MAX({SRC101_OWNERS_TABLE}.index), 0) FROM {SRC101_OWNERS_TABLE} "
+            f"WHERE deploy_hash IN ({placeholders}) GROUP BY deploy_hash",
+            deploy_hashes,
+        )  # nosec
+        max_index = {_ci(deploy_hash): 0 for deploy_hash in deploy_hashes}
+        for deploy_hash, index in cursor.fetchall():
+            max_index[_ci(deploy_hash)] = max(max_index.get(_ci(deploy_hash), 0), index)
+
+        # A row is an update if its id or its (p, deploy_hash, tokenid_utf8) unique key already exists
+        ids = list({_ci(row["id"]): row["id"] for row in rows}.values())
+        name_keys = list({(row["p"], row["deploy_hash"], row["tokenid_utf8"]) for row in rows})
+        cursor.execute(
+            f"SELECT id, p, deploy_hash, tokenid_utf8 FROM {SRC101_OWNERS_TABLE} "
+            f"WHERE id IN ({', '.join(['%s'] * len(ids))}) "
+            f"OR (p, deploy_hash, tokenid_utf8) IN ({', '.join(['(%s, %s, %s)'] * len(name_keys))})",
+            ids + [value for key in name_keys for value in key],
+        )  # nosec
+        target_by_id = {}
+        target_by_name = {}
+        for existing_id, p, deploy_hash, tokenid_utf8 in cursor.fetchall():
+            target_by_id[_ci(existing_id)] = existing_id
+            if p is not None and tokenid_utf8 is not None:
+                target_by_name[(_ci(p), _ci(deploy_hash), tokenid_utf8)] = existing_id
+
+        # Replay the row-at-a-time upserts: one merged row per target owners row
+        merged = {}
+        # (address_btc, deploy_hash) -> merged targets currently holding prim
+        prim_holders = {}
+        cleared_prim = {}
+        for row in rows:
+            name_key = None
+            if row["p"] is not None and row["tokenid_utf8"] is not None:
+                name_key = (_ci(row["p"]), _ci(row["deploy_hash"]), row["tokenid_utf8"])
+            target = target_by_id.get(_ci(row["id"]))
+            if target is None and name_key is not None:
+                target = target_by_name.get(name_key)
+            if target is None:
+                target = row["id"]
+                max_index[_ci(row["deploy_hash"])] += 1
+                row["index"] = max_index[_ci(row["deploy_hash"])]
+                target_by_id[_ci(target)] = target
+                if name_key is not None:
+                    target_by_name[name_key] = target
+
+            if target in merged:
+                current = merged[target]
+                prim_holders.get((current["address_btc"], _ci(current["deploy_hash"])), set()).discard(target)
+
+            address_key = (row["address_btc"], _ci(row["deploy_hash"]))
+            if row["prim"] and row["address_btc"] is not None:
+                # UPDATE ... SET prim = FALSE WHERE address_btc = %s AND deploy_hash = %s AND prim = TRUE
+                cleared_prim[address_key] = (row["address_btc"], row["deploy_hash"])
+                for other in prim_holders.pop(address_key, ()):
+                    merged[other]["prim"] = False
+
+            if target in merged:
+                current.update({column: row[column] for column in OWNER_UPDATE_COLUMNS})
+            else:
+                current = merged[target] = dict(row, index=row.get("index", max_index[_ci(row["deploy_hash"])] + 1))
+            if current["prim"] and current["address_btc"] is not None:
+                prim_holders.setdefault((current["address_btc"], _ci(current["deploy_hash"])), set()).add(target)
+
+        if cleared_prim:
+            pairs = list(cleared_prim.values())
+            cursor.execute(
+                f"""
+                UPDATE {SRC101_OWNERS_TABLE}
+                SET prim = FALSE
+                WHERE prim = TRUE AND (address_btc, deploy_hash) IN ({', '.join(['(%s, %s)'] * len(pairs))});
+                """,
+                [value for pair in pairs for value in pair],
+            )  # nosec
+
+        column_list = ", ".join(
+            f"{SRC101_OWNERS_TABLE}.index" if column == "index" else column for column in OWNER_UPSERT_COLUMNS
+        )
+        row_placeholder = "(" + ", ".join(["%s"] * len(OWNER_UPSERT_COLUMNS)) + ")"
+        update_clause = ",\n                    ".join(f"{column} = new_row.{column}" for column in OWNER_UPDATE_COLUMNS)
+        merged_rows = list(merged.values())
+        for start in range(0, len(merged_rows), OWNER_UPSERT_BATCH_SIZE):
+            batch = merged_rows[start : start + OWNER_UPSERT_BATCH_SIZE]
             cursor.execute(
                 f"""
                 INSERT INTO {SRC101_OWNERS_TABLE}
-                ({SRC101_OWNERS_TABLE}.index, id, last_update, p, deploy_hash, tokenid, tokenid_utf8, img, preowner, owner, txt_data, expire_timestamp, address_btc, address_eth, prim)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ({column_list})
+                VALUES {", ".join([row_placeholder] * len(batch))}
                 AS new_row ON DUPLICATE KEY UPDATE
-                    last_update = new_row.last_update,
-                    preowner = new_row.preowner,
-                    owner = new_row.owner,
-                    txt_data = new_row.txt_data,
-                    address_btc = new_row.address_btc,
-                    address_eth = new_row.address_eth,
-                    prim = new_row.prim,
-                    expire_timestamp = new_row.expire_timestamp
-            """,
-                (
-                    max_index + 1,
-                    id_field,
-                    block_index,
-                    owner_dict["p"],
-                    owner_dict["deploy_hash"],
-                    owner_dict["tokenid"],
-                    owner_dict["tokenid_utf8"],
-                    imgurl,
-                    owner_dict["preowner"],
-                    owner_dict["owner"],
-                    json.dumps(owner_dict["txt_data"]) if owner_dict["txt_data"] else None,
-                    owner_dict["expire_timestamp"],
-                    owner_dict["address_btc"],
-                    owner_dict["address_eth"],
-                    owner_dict["prim"],
-                ),
-            )
-
-        except Exception as e:
-            logger.error("Error updating owners table:", e)
-            raise e
+                    {update_clause}
+                """,
+                [row[column] for row in batch for column in OWNER_UPSERT_COLUMNS],
+            )  # nosec
 
-    cursor.close()
-    return
+    except Exception as e:
+        logger.error(f"Error updating owners table: {e}")
+        raise e
+    finally:
+        cursor.close()
 
 
 # def get_owner_from_owners(db, deploy_hash, tokenid):
@@ -1291,7 +1421,21 @@ def update_owner_table(db, owner_updates, block_index):
 #     return result
 
 
-def get_owner_expire_data_from_running(db, processed_src101_in_block, deploy_hash, tokenid_utf8):
+def get_owner_expire_data_from_running(db, processed_src101_in_block, deploy_hash, tokenid_utf8, block_context=None):
+    if block_context is not None:
+        d = block_context.get_src101_token(deploy_hash, tokenid_utf8)
+        if d and d.get("src101_owner") and d.get("expire_timestamp"):
+            return [
+                d.get("src101_preowner"),
+                d.get("src101_owner"),
+                d.get("expire_timestamp"),
+                d.get("address_btc"),
+                d.get("address_eth"),
+                json.dumps(d.get("txt_data")),
+                d.get("prim"),
+            ]
+        return get_owner_expire_data_from_db(db, deploy_hash, tokenid_utf8)
+
     preowner = None
     owner = None
     expire_timestamp = None
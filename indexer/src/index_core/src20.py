@@ -17,6 +17,7 @@ import config
 import index_core.log as log
 from config import CP_P2WSH_FEAT_BLOCK_START  # SRC_VALIDATION_API1,
 from config import SRC20_BALANCES_TABLE, SRC20_VALID_TABLE, SRC_VALIDATION_API2, SRC_VALIDATION_SECRET_API2, TICK_PATTERN_SET
+from index_core.balance_journal import record_balance_deltas
 from index_core.caching import cache_manager  # Use CacheManager
 from index_core.database import get_src20_deploy, get_srcbackground_data, get_total_src20_minted_from_db
 from index_core.util import decode_unicode_escapes, escape_non_ascii_characters
@@ -134,10 +135,13 @@ class Src20Processor:
         "ID": ("INVALID DECIMAL {tick} - decimal len {dec_length} > {dec}", True),
     }
 
-    def __init__(self, db, src20_dict, processed_src20_in_block, lock=None, block_index=None, block_time=None):
+    def __init__(
+        self, db, src20_dict, processed_src20_in_block, lock=None, block_index=None, block_time=None, block_context=None
+    ):
         self.db = db
         self.src20_dict = src20_dict
         self.processed_src20_in_block = processed_src20_in_block
+        self.block_context = block_context
         self.is_valid = True
         self.dec: Optional[Union[str, int]] = src20_dict.get("dec", 0)
         self.deploy_lim: Optional[Union[str, D]] = src20_dict.get("deploy_lim", 0)
@@ -275,7 +279,11 @@ class Src20Processor:
         self.deploy_lim = min(D(self.deploy_lim), D(self.deploy_max)) if self.deploy_lim and self.deploy_max else D(0)
 
         try:
-            total_minted = D(get_running_mint_total(self.db, self.processed_src20_in_block, self.src20_dict["tick"]))
+            total_minted = D(
+                get_running_mint_total(
+                    self.db, self.processed_src20_in_block, self.src20_dict["tick"], block_context=self.block_context
+                )
+            )
             mint_available = D(self.deploy_max) - total_minted if self.deploy_max else D(0)
 
             if total_minted >= D(self.deploy_max) if self.deploy_max else D(0):
@@ -312,6 +320,7 @@ class Src20Processor:
                 self.src20_dict["tick_hash"],
                 self.src20_dict["destination"],
                 self.processed_src20_in_block,
+                block_context=self.block_context,
             )
             if running_user_balance_tuple:
                 running_user_balance = running_user_balance_tuple[0].total_balance
@@ -335,6 +344,7 @@ class Src20Processor:
                     self.src20_dict["tick_hash"],
                     [self.src20_dict["creator"]],
                     self.processed_src20_in_block,
+                    block_context=self.block_context,
                 )
             else:
                 addresses = [self.src20_dict["creator"], self.src20_dict["destination"]]
@@ -344,6 +354,7 @@ class Src20Processor:
                     self.src20_dict["tick_hash"],
                     addresses,
                     self.processed_src20_in_block,
+                    block_context=self.block_context,
                 )
             running_user_balance_dict = self.create_running_user_balance_dict(running_user_balance_tuple)
 
@@ -402,6 +413,7 @@ class Src20Processor:
             self.src20_dict["tick_hash"],
             addresses,
             self.processed_src20_in_block,
+            block_context=self.block_context,
         )
         running_user_balance_creator = getattr(running_user_balance_tuple, "total_balance", D("0"))
 
@@ -433,6 +445,7 @@ class Src20Processor:
             self.src20_dict["tick_hash"],
             tick_holders,
             self.processed_src20_in_block,
+            block_context=self.block_context,
         )
         running_dest_balance_dict = self.create_running_user_balance_dict(running_dest_balances_tuple)
 
@@ -451,6 +464,9 @@ class Src20Processor:
                 self.processed_src20_in_block.extend(new_dicts)
         else:
             self.processed_src20_in_block.extend(new_dicts)
+        if self.block_context is not None:
+            for new_dict in new_dicts:
+                self.block_context.record_src20(new_dict)
 
         self.src20_dict["total_balance_creator"] = D(running_user_balance_creator) - D(total_send_amt)
         self.src20_dict["status"] = f'New Balance: {self.src20_dict["total_balance_creator"]}'
@@ -496,13 +512,16 @@ class Src20Processor:
         self.validate_and_process_operation()
 
 
-def parse_src20(db, src20_dict, processed_src20_in_block, lock=None):
+def parse_src20(db, src20_dict, processed_src20_in_block, lock=None, block_context=None):
     """
     Process all SRC-20 tokens that pass check_format.
     Thread-safe processing of SRC-20 transactions with proper transaction tracking.
+
+    ``block_context`` (BlockContext) replaces the scans of processed_src20_in_block;
+    the caller records each returned dict into it in block order.
     """
     try:
-        processor = Src20Processor(db, src20_dict, processed_src20_in_block, lock)
+        processor = Src20Processor(db, src20_dict, processed_src20_in_block, lock, block_context=block_context)
         processor.process()
 
         if not processor.is_valid:
@@ -730,13 +749,19 @@ def check_format(input_string, tx_hash, block_index):
     return None
 
 
-def get_running_mint_total(db, src20_processed_in_block, tick):
+def get_running_mint_total(db, src20_processed_in_block, tick, block_context=None):
     """Get the running mint total for a given tick with caching."""
     total_minted = D(0)
     logger.debug(f"Getting running mint total for tick {tick}")
 
     # First check in-block transactions
-    if len(src20_processed_in_block) > 0:
+    if block_context is not None:
+        in_block_total = block_context.get_src20_minted(tick)
+        if in_block_total is not None:
+            total_minted = D(in_block_total)
+            logger.debug(f"Found in-block total_minted: {total_minted}")
+            cache_manager.set_cache_value("total_minted", tick, total_minted)
+    elif len(src20_processed_in_block) > 0:
         logger.debug(f"Checking in-block transactions for tick {tick}")
         for item in reversed(src20_processed_in_block):
             if item["tick"] == tick and item["op"] == "MINT" and "total_minted" in item:
@@ -764,11 +789,12 @@ def get_running_mint_total(db, src20_processed_in_block, tick):
     return total_minted
 
 
-def get_running_user_balances(db, tick, tick_hash, addresses, src20_processed_in_block):
+def get_running_user_balances(db, tick, tick_hash, addresses, src20_processed_in_block, block_context=None):
     """Calculate the running balance of multiple users based on the processed transactions
     in current and prior blocks from the db. This is only called once for each mint,
     bulk_xfer, or transfer transaction. It may get many addresses from the bulk_xfer list.
     The bulk_xfer list is assumed to have only unique addresses.
+    When ``block_context`` is given its index replaces the scan of src20_processed_in_block.
     """
     if isinstance(addresses, str):
         addresses = [addresses]
@@ -782,7 +808,12 @@ def get_running_user_balances(db, tick, tick_hash, addresses, src20_processed_in
     addresses_to_process = list(addresses)  # Make a copy to modify
 
     # First check for balances in current block's processed transactions
-    if any(item["tick"] == tick for item in src20_processed_in_block):
+    if block_context is not None:
+        for address, total_balance in block_context.get_src20_balances(tick, tick_hash, addresses_to_process):
+            logger.debug(f"Adding balance for {address}: {total_balance}")
+            balances.append(BalanceCurrent(tick, address, total_balance, None))
+            addresses_to_process.remove(address)
+    elif any(item["tick"] == tick for item in src20_processed_in_block):
         try:
             logger.debug(f"Found transactions in current block for tick {tick}")
             for prior_tx in reversed(src20_processed_in_block):
@@ -1040,6 +1071,7 @@ def get_tick_holders_from_balances(db, tick):
 def update_src20_balances(db, block_index, block_time, processed_src20_in_block):
     """Update balances for SRC20 transactions"""
     balance_updates = []
+    balance_index = {}  # (tick, tick_hash, address) -> entry in balance_updates
 
     logger.debug(f"Processing balance updates for block {block_index}")
 
@@ -1053,9 +1085,9 @@ def update_src20_balances(db, block_index, block_time, processed_src20_in_block)
             amt = D(str(src20_dict["amt"]))
 
             if src20_dict["op"] == "MINT":
-                _process_mint_operation(balance_updates, src20_dict, amt)
+                _process_mint_operation(balance_updates, src20_dict, amt, balance_index)
             elif src20_dict["op"] == "TRANSFER":
-                _process_transfer_operation(balance_updates, src20_dict, amt)
+                _process_transfer_operation(balance_updates, src20_dict, amt, balance_index)
 
         except Exception as e:
             logger.error(f"Error updating SRC20 balances for transaction: {src20_dict}")
@@ -1063,52 +1095,64 @@ def update_src20_balances(db, block_index, block_time, processed_src20_in_block)
             raise
 
     # Update database and cache
+    if config.BALANCE_JOURNAL_ENABLED:
+        record_balance_deltas(db, block_index, balance_updates)
     update_balance_table(db, balance_updates, block_index, block_time)
     _update_balance_caches(balance_updates)
 
     return balance_updates
 
 
-def _process_mint_operation(balance_updates, src20_dict, amt):
+def _process_mint_operation(balance_updates, src20_dict, amt, balance_index=None):
     """Process a MINT operation and update the balance_updates list."""
 
     # Find or create balance entry for destination
     balance_dict = _get_or_create_balance_entry(
-        balance_updates, src20_dict["tick"], src20_dict["tick_hash"], src20_dict["destination"]
+        balance_updates, src20_dict["tick"], src20_dict["tick_hash"], src20_dict["destination"], balance_index
     )
 
     balance_dict["credit"] += amt
 
 
-def _process_transfer_operation(balance_updates, src20_dict, amt):
+def _process_transfer_operation(balance_updates, src20_dict, amt, balance_index=None):
     """Process a TRANSFER operation and update the balance_updates list."""
     # Debit from source
     source_balance = _get_or_create_balance_entry(
-        balance_updates, src20_dict["tick"], src20_dict["tick_hash"], src20_dict["creator"]
+        balance_updates, src20_dict["tick"], src20_dict["tick_hash"], src20_dict["creator"], balance_index
     )
     source_balance["debit"] += amt
 
     # Credit to destination
     dest_balance = _get_or_create_balance_entry(
-        balance_updates, src20_dict["tick"], src20_dict["tick_hash"], src20_dict["destination"]
+        balance_updates, src20_dict["tick"], src20_dict["tick_hash"], src20_dict["destination"], balance_index
     )
     dest_balance["credit"] += amt
 
 
-def _get_or_create_balance_entry(balance_updates, tick, tick_hash, address):
-    """Find or create a balance entry for the given tick/address combination."""
-    balance_dict = next(
-        (
-            item
-            for item in balance_updates
-            if item["tick"] == tick and item["tick_hash"] == tick_hash and item["address"] == address
-        ),
-        None,
-    )
+def _get_or_create_balance_entry(balance_updates, tick, tick_hash, address, balance_index=None):
+    """Find or create a balance entry for the given tick/address combination.
+
+    ``balance_index`` maps (tick, tick_hash, address) to the entries already in
+    balance_updates; without it the list is scanned.
+    """
+    key = (tick, tick_hash, address)
+    if balance_index is not None:
+        balance_dict = balance_index.get(key)
+    else:
+        balance_dict = next(
+            (
+                item
+                for item in balance_updates
+                if item["tick"] == tick and item["tick_hash"] == tick_hash and item["address"] == address
+            ),
+            None,
+        )
 
     if balance_dict is None:
         balance_dict = {"tick": tick, "tick_hash": tick_hash, "address": address, "credit": D(0), "debit": D(0)}
         balance_updates.append(balance_dict)
+        if balance_index is not None:
+            balance_index[key] = balance_dict
 
     return balance_dict
 
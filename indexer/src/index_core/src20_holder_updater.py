@@ -3,12 +3,29 @@ SRC-20 Holder Count Updater
 
 Efficiently tracks and updates holder counts for SRC-20 tokens
 affected by operations in each block.
+
+SRC20HolderCountUpdater.update_holder_counts recomputes holder_count,
+total_minted, progress_percentage and total_mints with aggregate
+UPDATE...JOIN statements over balances and SRC20Valid, which is why it runs
+off the block path behind a lock. With SRC20_HOLDER_COUNTERS_ENABLED those
+columns are instead maintained as counters in the block's own transaction:
+
+- holder_count_deltas derives per-tick changes from the balance updates the
+  block applied (addresses crossing zero, net supply change, valid MINTs).
+- apply_holder_count_deltas adds them to src20_market_data. The exact supply
+  is kept in minted_supply (DECIMAL) and total_minted / progress_percentage
+  are derived from it, so fractional amounts do not accumulate rounding.
+- reconcile_holder_counts compares the counters with the aggregate query and
+  rewrites only the ticks that drifted. It runs after rebuild_balances
+  (startup and rollbacks) and periodically from HolderCountCatchupJob.
 """
 
 import logging
 import threading
 import time
-from typing import Optional, Set
+from collections import defaultdict
+from decimal import Decimal as D
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from index_core.database_manager import DatabaseManager
 
@@ -17,6 +34,176 @@ logger = logging.getLogger(__name__)
 # Global lock to prevent concurrent holder updates
 _holder_update_lock = threading.Lock()
 
+# Per-tick aggregates the counters must match: holders, exact supply, mint count and deploy max
+HOLDER_AGGREGATE_SQL = """
+    SELECT
+        d.tick,
+        COALESCE(h.holder_count, 0),
+        COALESCE(h.minted_supply, 0),
+        COALESCE(m.mint_count, 0),
+        d.max
+    FROM SRC20Valid d
+    LEFT JOIN (
+        SELECT tick, COUNT(DISTINCT address) AS holder_count, SUM(amt) AS minted_supply
+        FROM balances
+        WHERE amt > 0 {balance_filter}
+        GROUP BY tick
+    ) h ON h.tick = d.tick
+    LEFT JOIN (
+        SELECT tick, COUNT(*) AS mint_count
+        FROM SRC20Valid
+        WHERE op = 'MINT' {mint_filter}
+        GROUP BY tick
+    ) m ON m.tick = d.tick
+    WHERE d.op = 'DEPLOY' {deploy_filter}
+"""
+
+
+def holder_count_deltas(balance_updates: Iterable[dict], processed_src20: Iterable[dict]) -> Dict[str, Tuple[int, D, int]]:
+    """
+    Per-tick (holder delta, supply delta, mint delta) of one block.
+
+    Args:
+        balance_updates: Entries returned by update_src20_balances, with original_amt and net_change set.
+        processed_src20: The block's processed SRC-20 operations.
+
+    Returns:
+        dict: Upper-cased tick -> (holders gained - holders lost, net supply change, valid MINTs).
+            Ticks deployed in the block are included even without balance changes.
+    """
+    balances: Dict[Tuple[str, str], List[D]] = {}
+    for balance_dict in balance_updates:
+        key = (balance_dict["tick"].upper(), balance_dict["address"])
+        net_change = balance_dict.get("credit", D(0)) - balance_dict.get("debit", D(0))
+        if key in balances:
+            balances[key][1] += net_change
+        else:
+            balances[key] = [D(balance_dict.get("original_amt", D(0))), net_change]
+
+    holders: Dict[str, int] = defaultdict(int)
+    supply: Dict[str, D] = defaultdict(D)
+    for (tick, _address), (original_amt, net_change) in balances.items():
+        holders[tick] += int(original_amt + net_change > 0) - int(original_amt > 0)
+        supply[tick] += net_change
+
+    mints: Dict[str, int] = defaultdict(int)
+    deployed: Set[str] = set()
+    for src20_op in processed_src20:
+        if src20_op.get("valid") != 1 or not src20_op.get("tick"):
+            continue
+        if src20_op.get("op") == "MINT":
+            mints[src20_op["tick"].upper()] += 1
+        elif src20_op.get("op") == "DEPLOY":
+            deployed.add(src20_op["tick"].upper())
+
+    return {tick: (holders[tick], supply[tick], mints[tick]) for tick in set(supply) | set(mints) | deployed}
+
+
+def apply_holder_count_deltas(db, deltas: Dict[str, Tuple[int, D, int]]) -> None:
+    """
+    Add one block's deltas to the src20_market_data counters.
+
+    Must run inside the block's transaction, after the DEPLOYs of the block are in SRC20Valid.
+
+    Args:
+        db: Database connection.
+        deltas (dict): Output of holder_count_deltas.
+    """
+    if not deltas:
+        return
+    ticks = sorted(deltas)
+    with db.cursor() as cursor:
+        cursor.executemany(
+            """
+            INSERT INTO src20_market_data
+            (tick, holder_count, minted_supply, total_minted, total_mints, progress_percentage, price_source_type, last_updated)
+            VALUES (%s, %s, %s, ROUND(%s), %s, 0.00, 'unknown', NOW())
+            AS new_row ON DUPLICATE KEY UPDATE
+                holder_count = src20_market_data.holder_count + new_row.holder_count,
+                minted_supply = src20_market_data.minted_supply + new_row.minted_supply,
+                total_minted = ROUND(src20_market_data.minted_supply),
+                total_mints = src20_market_data.total_mints + new_row.total_mints,
+                last_updated = NOW()
+            """,
+            [(tick, deltas[tick][0], deltas[tick][1], deltas[tick][1], deltas[tick][2]) for tick in ticks],
+        )
+        placeholders = ",".join(["%s"] * len(ticks))
+        cursor.execute(
+            f"""
+            UPDATE src20_market_data smd
+            JOIN SRC20Valid d ON d.tick = smd.tick AND d.op = 'DEPLOY'
+            SET smd.progress_percentage = COALESCE(ROUND(smd.minted_supply / NULLIF(d.max, 0) * 100, 2), 0)
+            WHERE smd.tick IN ({placeholders})
+            """,  # nosec B608
+            ticks,
+        )
+
+
+def reconcile_holder_counts(db, ticks: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Check the counters against the aggregate query and repair the ticks that drifted.
+
+    Args:
+        db: Database connection (the caller commits).
+        ticks: Ticks to check; all deployed ticks when None.
+
+    Returns:
+        list: Ticks whose counters were rewritten.
+    """
+    if ticks is not None and not ticks:
+        return []
+    with db.cursor() as cursor:
+        if ticks is None:
+            filters = {"balance_filter": "", "mint_filter": "", "deploy_filter": ""}
+            params: List[str] = []
+            cursor.execute("SELECT tick, holder_count, minted_supply, total_mints FROM src20_market_data")
+        else:
+            placeholders = ",".join(["%s"] * len(ticks))
+            filters = {
+                "balance_filter": f"AND tick IN ({placeholders})",
+                "mint_filter": f"AND tick IN ({placeholders})",
+                "deploy_filter": f"AND d.tick IN ({placeholders})",
+            }
+            params = list(ticks) * 3
+            cursor.execute(
+                f"SELECT tick, holder_count, minted_supply, total_mints FROM src20_market_data WHERE tick IN ({placeholders})",  # nosec B608
+                list(ticks),
+            )
+        stored = {row[0].upper(): (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+        cursor.execute(HOLDER_AGGREGATE_SQL.format(**filters), params)  # nosec B608
+        repairs = []
+        for tick, holder_count, minted_supply, mint_count, max_supply in cursor.fetchall():
+            expected = (int(holder_count), D(minted_supply), int(mint_count))
+            current = stored.get(tick.upper())
+            if current is not None and current[0] is not None and current[2] is not None:
+                if (int(current[0]), D(current[1] or 0), int(current[2])) == expected:
+                    continue
+            repairs.append((tick.upper(), *expected, max_supply))
+
+        if repairs:
+            cursor.executemany(
+                """
+                INSERT INTO src20_market_data
+                (tick, holder_count, minted_supply, total_minted, total_mints, progress_percentage, price_source_type, last_updated)
+                VALUES (%s, %s, %s, ROUND(%s), %s, COALESCE(ROUND(%s / NULLIF(%s, 0) * 100, 2), 0), 'unknown', NOW())
+                AS new_row ON DUPLICATE KEY UPDATE
+                    holder_count = new_row.holder_count,
+                    minted_supply = new_row.minted_supply,
+                    total_minted = new_row.total_minted,
+                    total_mints = new_row.total_mints,
+                    progress_percentage = new_row.progress_percentage,
+                    last_updated = NOW()
+                """,
+                [
+                    (tick, holders, supply, supply, mints, supply, max_supply)
+                    for tick, holders, supply, mints, max_supply in repairs
+                ],
+            )
+            logger.warning(f"Repaired SRC-20 holder counters for {len(repairs)} ticks: {[r[0] for r in repairs[:10]]}")
+
+    return [r[0] for r in repairs]
+
 
 class SRC20HolderCountUpdater:
     """Updates holder counts for SRC-20 tokens affected in each block."""
@@ -1,8 +1,8 @@
-import copy
+import hashlib
 import json
 import logging
 import re
-from typing import Any
+from typing import Any, Dict, Iterable
 
 import config
 from index_core.base64_utils import lenient_b64decode
@@ -13,6 +13,9 @@ logger = logging.getLogger(__name__)
 
 MAX_LAYERS = 10  # Define a maximum number of layers
 
+# Images shorter than this are validated directly; hashing them costs about as much as decoding
+IMAGE_MEMO_MIN_LENGTH = 1024
+
 # Compiled regex pattern for recursive SRC-721 references
 RECURSIVE_SRC721_PATTERN = re.compile(r"/s/(A\d{20})(?!\d)")
 
@@ -116,6 +119,55 @@ def fetch_src721_subasset_base64(asset_name: str, valid_src721_in_block: list, d
     return base64_string
 
 
+def resolve_src721_subassets(asset_names: Iterable[str], valid_src721_in_block: list, db: Any) -> Dict[str, str]:
+    """
+    Resolve the base64 of many SRC-721 layer assets at once.
+
+    Each name is looked up in the same order as fetch_src721_subasset_base64
+    (subasset cache, first matching in-block stamp, StampTable), but every name
+    the cache and the block cannot answer is loaded by a single
+    ``WHERE cpid IN (...)`` query. Resolved values are written to the subasset
+    cache; names found nowhere are left out of the result.
+    """
+    cache = cache_manager.get_cache("subasset")
+    resolved: Dict[str, str] = {}
+    in_block = None
+    missing = []
+    for asset_name in dict.fromkeys(asset_names):
+        cached = cache.get(asset_name) if cache is not None else None
+        if cached is not None:
+            resolved[asset_name] = cached
+            continue
+        if in_block is None:
+            in_block = {}
+            for item in valid_src721_in_block:
+                in_block.setdefault(item["cpid"], item)
+        item = in_block.get(asset_name)
+        if item is not None and item["stamp_base64"] is not None:
+            resolved[asset_name] = item["stamp_base64"]
+        else:
+            missing.append(asset_name)
+
+    if missing:
+        with db.cursor() as cursor:
+            placeholders = ",".join(["%s"] * len(missing))
+            sql = f"SELECT cpid, stamp_base64 FROM {config.STAMP_TABLE} WHERE cpid IN ({placeholders})"  # nosec
+            cursor.execute(sql, missing)
+            # cpid compares case-insensitively in MySQL; keep the first row per cpid like fetchone()
+            rows: Dict[str, str] = {}
+            for cpid, stamp_base64 in cursor.fetchall():
+                rows.setdefault(cpid.upper(), stamp_base64)
+        for asset_name in missing:
+            if asset_name.upper() in rows:
+                resolved[asset_name] = rows[asset_name.upper()]
+
+    if cache is not None:
+        for asset_name, base64_string in resolved.items():
+            if base64_string is not None:
+                cache.set(asset_name, base64_string)
+    return resolved
+
+
 def fetch_src721_collection(tmp_collection_object, valid_src721_in_block, db):
     """
     Fetches the src721 collection by adding the tx-img key to the collection object.
@@ -128,7 +180,17 @@ def fetch_src721_collection(tmp_collection_object, valid_src721_in_block, db):
     Returns:
         dict: The updated collection object with the tx-img key.
     """
-    output_object = copy.deepcopy(tmp_collection_object)
+    # Only tN-img keys are added, so a shallow copy leaves the caller's object untouched
+    output_object = dict(tmp_collection_object)
+
+    layer_keys = [f"t{i}" for i in range(10) if f"t{i}" in output_object]
+    try:
+        # Warm the subasset cache for every layer with one query; the lookups below then hit it
+        resolve_src721_subassets(
+            (asset_name for key in layer_keys for asset_name in output_object[key]), valid_src721_in_block, db
+        )
+    except Exception as e:
+        logger.debug("Bulk SRC-721 layer lookup failed, resolving layers one by one: %s", e)
 
     for i in range(10):
         key = f"t{i}"
@@ -141,7 +203,7 @@ def fetch_src721_collection(tmp_collection_object, valid_src721_in_block, db):
                     output_object[img_key].append(img_data)
                 except Exception as e:
                     logging.exception(
-                        "An error occurred during execution",
+                        "An error occurred during execution: %s",
                         e,
                         stack_info=True,
                         exc_info=True,
@@ -163,8 +225,8 @@ def get_src721_svg_string(src721_title, src721_desc, db):
     Returns:
     str: The SVG string representing the SRC721.
     """
-    custom_background_result, _, _ = get_srcbackground_data(db, "SRC721")
-    is_valid, cleaned_image_data = validate_base64_image(custom_background_result)
+    custom_background_result, _, _ = get_src_background(db, "SRC721")
+    is_valid, cleaned_image_data = validate_base64_image_cached(custom_background_result)
 
     if not is_valid:
         logger.warning("Invalid base64 image data for SRC721 background")
@@ -216,7 +278,7 @@ def build_src721_stacked_svg(tmp_nft_object, tmp_collection_object):
         img_key = f"t{i}-img"
         if img_key in tmp_collection_object and t < len(tmp_collection_object[img_key]):
             image_src_base64 = tmp_collection_object[img_key][t]
-            is_valid, cleaned_image_data = validate_base64_image(image_src_base64)
+            is_valid, cleaned_image_data = validate_base64_image_cached(image_src_base64)
 
             if not is_valid:
                 logger.warning(f"Invalid base64 image data for layer {i}")
@@ -297,6 +359,33 @@ def fetch_collection_details(collection_cpid: str, db: Any) -> str:
     return collection_asset_item
 
 
+def get_src_background(db: Any, tick: str):
+    """get_srcbackground_data with caching; the srcbackground table only changes at bootstrap."""
+    cached_result = cache_manager.get_cache_value("src_background", tick)
+    if cached_result is not None:
+        return cached_result
+
+    result = get_srcbackground_data(db, tick)
+    cache_manager.set_cache_value("src_background", tick, result)
+    return result
+
+
+def validate_base64_image_cached(base64_string: str) -> tuple[bool, str]:
+    """validate_base64_image memoized by the sha256 of the image, so a layer reused by many mints is decoded once."""
+    if not isinstance(base64_string, str) or len(base64_string) < IMAGE_MEMO_MIN_LENGTH:
+        return validate_base64_image(base64_string)
+
+    cache = cache_manager.get_cache("src721_image")
+    if cache is None:
+        return validate_base64_image(base64_string)
+    key = hashlib.sha256(base64_string.encode("utf-8", "surrogatepass")).digest()
+    result = cache.get(key)
+    if result is None:
+        result = validate_base64_image(base64_string)
+        cache.set(key, result)
+    return result
+
+
 def validate_base64_image(base64_string: str) -> tuple[bool, str]:
     """
     Validates and cleans a base64 image string.
@@ -20,11 +20,15 @@ log.set_logger(logger)
 
 
 class StampProcessor:
-    def __init__(self, db, valid_stamps_in_block):
+    def __init__(self, db, valid_stamps_in_block, block_context=None):
         self.db = db
         self.valid_stamps_in_block = valid_stamps_in_block
+        self.block_context = block_context
         self._lock = threading.Lock()
 
+    def check_reissue(self, db, cpid, valid_stamps_in_block):
+        return check_reissue(db, cpid, valid_stamps_in_block, block_context=self.block_context)
+
     def process_stamp(self, stamp_data: StampData):
         stamp_results = src_dict = prevalidated_src = None
         valid_stamp: Optional[ValidStamp] = None
@@ -40,7 +44,7 @@ class StampProcessor:
                 get_src_or_img_from_data,
                 convert_to_dict_or_string,
                 encode_and_store_file,
-                check_reissue,
+                self.check_reissue,
                 decode_base64,
                 self.db,
                 self.valid_stamps_in_block,
@@ -354,9 +358,9 @@ def append_stamp_data_to_src101_dict(stamp_data: StampData, src101_dict):
     return src101_dict
 
 
-def parse_stamp(*, stamp_data: StampData, db, valid_stamps_in_block: list[ValidStamp]):
+def parse_stamp(*, stamp_data: StampData, db, valid_stamps_in_block: list[ValidStamp], block_context=None):
     if not stamp_data.data and not stamp_data.p2wsh_data:
         return None, None, None, None
 
-    processor = StampProcessor(db, valid_stamps_in_block)
+    processor = StampProcessor(db, valid_stamps_in_block, block_context=block_context)
     return processor.process_stamp(stamp_data)
@@ -8,8 +8,9 @@ dispensers and dispenses data for floor price and volume calculations.
 
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from index_core.dispenser_bulk_fetcher import dispenser_bulk_fetcher
 from index_core.fetch_utils import RateLimiter, fetch_xcp, is_valid_counterparty_asset
@@ -98,6 +99,91 @@ class StampWorker:
             logger.error(f"Error processing stamp market data for {cpid}: {e}")
             return None
 
+    def collect_market_data(self, cpids: List[str], max_workers: int = 4) -> Dict[str, Optional[Dict]]:
+        """
+        Process market data for a batch of stamps.
+
+        Produces the same rows as process_stamp_market_data, but the bulk
+        dispenser snapshot is checked once, sales history volumes come from two
+        grouped queries for the whole batch, and balances are fetched on
+        ``max_workers`` threads. The threads share the Counterparty rate limiter,
+        so request starts stay within the configured rate while their latencies
+        overlap, and fetch_xcp spreads them over the healthy nodes.
+
+        Args:
+            cpids: Counterparty asset IDs
+            max_workers: Concurrent balance fetches
+
+        Returns:
+            Dictionary mapping CPIDs to their market data (or None if failed)
+        """
+        results: Dict[str, Optional[Dict]] = dict.fromkeys(cpids)
+        valid_cpids = [cpid for cpid in cpids if is_valid_counterparty_asset(cpid)]
+        for cpid in set(cpids) - set(valid_cpids):
+            logger.warning(f"Skipping invalid CPID format: {cpid} (should have been filtered by DB)")
+        if not valid_cpids:
+            return results
+
+        start_time = time.time()
+        dispensers_by_cpid = self._fetch_dispensers_bulk(valid_cpids)
+        try:
+            volumes_by_cpid: Dict[str, Dict[str, Any]] = self._calculate_volume_metrics_batch(valid_cpids)
+        except Exception as e:
+            logger.error(f"Batch volume calculation failed, falling back to per-stamp queries: {e}")
+            volumes_by_cpid = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(valid_cpids)))) as executor:
+            balances_by_cpid = dict(zip(valid_cpids, executor.map(self._fetch_balances, valid_cpids)))
+        logger.debug(f"Fetched balances for {len(valid_cpids)} stamps in {time.time() - start_time:.1f}s")
+
+        for cpid in valid_cpids:
+            try:
+                dispensers = dispensers_by_cpid[cpid] if cpid in dispensers_by_cpid else self._fetch_dispensers(cpid)
+                market_data = self._calculate_market_metrics(
+                    cpid, dispensers, None, balances_by_cpid[cpid], volume_metrics=volumes_by_cpid.get(cpid)
+                )
+                if not market_data:
+                    logger.debug(f"No market data calculated for {cpid}")
+                    continue
+
+                # The batch shares its fetch time; report each stamp's share of it
+                market_data["processing_time_ms"] = int((time.time() - start_time) * 1000 / len(valid_cpids))
+                market_data["last_updated"] = datetime.now()
+
+                results[cpid] = self.processor.validate_stamp_market_data(market_data)
+                if not results[cpid]:
+                    logger.warning(f"Market data validation failed for {cpid}")
+
+            except Exception as e:
+                logger.error(f"Error processing stamp market data for {cpid}: {e}")
+
+        return results
+
+    def _fetch_dispensers_bulk(self, cpids: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Look up dispensers for a batch of stamps in the bulk dispenser snapshot.
+
+        The snapshot is refreshed at most once for the batch. If that fails the
+        result is empty and callers fall back to _fetch_dispensers per stamp.
+
+        Args:
+            cpids: Counterparty asset IDs
+
+        Returns:
+            Dictionary mapping CPIDs to their dispensers
+        """
+        try:
+            if dispenser_bulk_fetcher.should_fetch(time.time()):
+                logger.debug("Refreshing bulk dispenser cache...")
+                dispenser_bulk_fetcher.fetch_all_open_dispensers()
+
+            cache = dispenser_bulk_fetcher.dispenser_cache
+            return {cpid: cache.get(cpid, []) for cpid in cpids}
+
+        except Exception as e:
+            logger.error(f"Error reading bulk dispenser cache for {len(cpids)} stamps: {e}")
+            return {}
+
     def _fetch_dispensers(self, cpid: str) -> Optional[List[Dict]]:
         """
         Fetch dispenser data for a stamp using the optimized bulk fetcher.
@@ -234,7 +320,12 @@ class StampWorker:
             return None
 
     def _calculate_market_metrics(
-        self, cpid: str, dispensers: Optional[List[Dict]], dispenses: Optional[List[Dict]], balances: Optional[List[Dict]]
+        self,
+        cpid: str,
+        dispensers: Optional[List[Dict]],
+        dispenses: Optional[List[Dict]],
+        balances: Optional[List[Dict]],
+        volume_metrics: Optional[Dict[str, Any]] = None,
     ) -> Optional[Dict]:
         """
         Calculate comprehensive market metrics from raw Counterparty data.
@@ -244,6 +335,7 @@ class StampWorker:
             dispensers: List of dispenser data
             dispenses: List of dispense data
             balances: List of balance data
+            volume_metrics: Precomputed sales history volume metrics (queried per stamp if None)
 
         Returns:
             Dictionary with calculated market metrics
@@ -280,7 +372,8 @@ class StampWorker:
 
             # Calculate volume metrics from sales history table instead of API dispenses
             # This ensures we get accurate volume data that matches what's stored in the database
-            volume_metrics = self._calculate_volume_metrics_from_history(cpid)
+            if volume_metrics is None:
+                volume_metrics = self._calculate_volume_metrics_from_history(cpid)
             market_data.update(volume_metrics)
 
             # Debug logging for volume calculations
@@ -511,46 +604,9 @@ class StampWorker:
             # Get recent sales for the most recent sale info
             recent_sales = sales_history_processor.get_recent_sales(limit=1, cpid=cpid)
 
-            volume_metrics: Dict[str, Any] = {
-                "volume_24h_btc": volume_24h,
-                "volume_7d_btc": volume_7d,
-                "volume_30d_btc": volume_30d,
-                "total_volume_btc": volume_total,
-                "total_dispenses_count": 0,  # TODO: Implement trade count from sales history
-                "recent_dispenses_count": 0,  # TODO: Implement trade count from sales history
-            }
-
-            # Add most recent sale details if available
-            if recent_sales:
-                most_recent = recent_sales[0]
-                sale_updates = {
-                    "last_price_update": (
-                        datetime.fromtimestamp(most_recent.get("block_time", 0)).isoformat()
-                        if most_recent.get("block_time")
-                        else None
-                    ),
-                    "last_sale_block_index": most_recent.get("block_index"),
-                    "last_sale_tx_hash": most_recent.get("tx_hash"),
-                    "last_sale_buyer_address": most_recent.get("buyer_address"),
-                    "last_sale_dispenser_address": most_recent.get("seller_address"),
-                    "last_sale_btc_amount": most_recent.get("btc_amount"),
-                    "last_sale_dispenser_tx_hash": most_recent.get("dispenser_tx_hash"),
-                }
-
-                # Only add recent_sale_price_btc if we have a valid non-zero price
-                unit_price_sats = most_recent.get("unit_price_sats", 0)
-                if unit_price_sats and unit_price_sats > 0:
-                    sale_updates["recent_sale_price_btc"] = float(unit_price_sats) / 100000000
-
-                volume_metrics.update(sale_updates)
-
-                # Log when we successfully capture recent sale data
-                if most_recent.get("tx_hash"):
-                    logger.debug(
-                        f"Captured recent sale from history: tx={most_recent.get('tx_hash')}, "
-                        f"buyer={most_recent.get('buyer_address')}, "
-                        f"amount={most_recent.get('btc_amount')} sats"
-                    )
+            volume_metrics = self._build_volume_metrics(
+                (volume_24h, volume_7d, volume_30d, volume_total), recent_sales[0] if recent_sales else None
+            )
 
             return volume_metrics
 
@@ -558,6 +614,84 @@ class StampWorker:
             logger.error(f"Error calculating volume metrics from history: {e}")
             return {}
 
+    def _calculate_volume_metrics_batch(self, cpids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Calculate sales history volume metrics for a batch of stamps.
+
+        Two grouped queries (window sums and latest sale) replace the five
+        queries and connections per stamp of _calculate_volume_metrics_from_history.
+
+        Args:
+            cpids: Counterparty asset IDs
+
+        Returns:
+            Dictionary mapping each CPID to its volume metrics
+        """
+        hours = [24, 24 * 7, 24 * 30, 24 * 365 * 10]
+        volumes = sales_history_processor.calculate_volumes_for_cpids(cpids, hours)
+        latest_sales = sales_history_processor.get_latest_sales(cpids)
+
+        return {
+            cpid: self._build_volume_metrics(
+                [sats / 1e8 for sats in volumes.get(cpid, [0.0] * len(hours))], latest_sales.get(cpid)
+            )
+            for cpid in cpids
+        }
+
+    def _build_volume_metrics(self, volumes: Sequence[float], most_recent: Optional[Dict]) -> Dict[str, Any]:
+        """
+        Assemble volume metrics from the 24h/7d/30d/total volumes (BTC) and the most recent sale.
+
+        Args:
+            volumes: Volumes in BTC, in 24h, 7d, 30d, total order
+            most_recent: Most recent sales history row, if any
+
+        Returns:
+            Dictionary with volume metrics
+        """
+        volume_24h, volume_7d, volume_30d, volume_total = volumes
+        volume_metrics: Dict[str, Any] = {
+            "volume_24h_btc": volume_24h,
+            "volume_7d_btc": volume_7d,
+            "volume_30d_btc": volume_30d,
+            "total_volume_btc": volume_total,
+            "total_dispenses_count": 0,  # TODO: Implement trade count from sales history
+            "recent_dispenses_count": 0,  # TODO: Implement trade count from sales history
+        }
+
+        # Add most recent sale details if available
+        if most_recent:
+            sale_updates = {
+                "last_price_update": (
+                    datetime.fromtimestamp(most_recent.get("block_time", 0)).isoformat()
+                    if most_recent.get("block_time")
+                    else None
+                ),
+                "last_sale_block_index": most_recent.get("block_index"),
+                "last_sale_tx_hash": most_recent.get("tx_hash"),
+                "last_sale_buyer_address": most_recent.get("buyer_address"),
+                "last_sale_dispenser_address": most_recent.get("seller_address"),
+                "last_sale_btc_amount": most_recent.get("btc_amount"),
+                "last_sale_dispenser_tx_hash": most_recent.get("dispenser_tx_hash"),
+            }
+
+            # Only add recent_sale_price_btc if we have a valid non-zero price
+            unit_price_sats = most_recent.get("unit_price_sats", 0)
+            if unit_price_sats and unit_price_sats > 0:
+                sale_updates["recent_sale_price_btc"] = float(unit_price_sats) / 100000000
+
+            volume_metrics.update(sale_updates)
+
+            # Log when we successfully capture recent sale data
+            if most_recent.get("tx_hash"):
+                logger.debug(
+                    f"Captured recent sale from history: tx={most_recent.get('tx_hash')}, "
+                    f"buyer={most_recent.get('buyer_address')}, "
+                    f"amount={most_recent.get('btc_amount')} sats"
+                )
+
+        return volume_metrics
+
     def _calculate_holder_metrics(self, balances: List[Dict]) -> Dict:
         """
         Calculate holder distribution metrics and populate holder cache.
@@ -8,6 +8,7 @@ handle transaction parsing, validation, and data extraction.
 Functions:
     process_vout(): Process transaction outputs for stamp data
     get_tx_info(): Extract comprehensive transaction information
+    decode_tx_core(): Side-effect-free part of get_tx_info (no RPC/DB access)
     decode_checkmultisig(): Decode CHECKMULTISIG script data
     list_tx(): List transaction data for block processing
     process_tx(): Process individual transactions with stamp issuances
@@ -19,6 +20,8 @@ import json
 import logging
 from collections import namedtuple
 
+from bitcoin.core.script import CScript
+
 import config
 import index_core.arc4 as arc4
 import index_core.script as script
@@ -26,6 +29,7 @@ import index_core.util as util
 from index_core.backend import Backend
 from index_core.exceptions import BTCOnlyError, DecodeError
 from index_core.fetch_utils import find_issuance_by_tx_hash
+from index_core.prevout_index import get_prevout_index
 
 # Module logger
 logger = logging.getLogger(__name__)
@@ -58,6 +62,28 @@ TxResult = namedtuple(
     ],
 )
 
+# Transaction information returned by get_tx_info / decode_tx_core
+TransactionInfo = namedtuple(
+    "TransactionInfo",
+    [
+        "source",
+        "prev_tx_hash",
+        "destinations",
+        "destination_nvalue",
+        "btc_amount",
+        "fee",
+        "data",
+        "ctx",
+        "keyburn",
+        "is_op_return",
+        "p2wsh_data",
+        "is_olga",
+    ],
+)
+
+# Returned for transactions that carry no stamp data
+EMPTY_TRANSACTION_INFO = TransactionInfo(b"", None, None, None, None, None, None, None, None, None, None, False)
+
 # vOut information structure
 vOutInfo = namedtuple(
     "vOutInfo",
@@ -87,6 +113,7 @@ def calculate_total_inputs(ctx):
         - Coinbase transactions (first transaction in block) have no real inputs, returns 0
         - Gracefully handles errors by returning 0 to preserve consensus behavior
         - Uses batch fetching for efficiency when multiple inputs exist
+        - Inputs found in the local prevout index (PREVOUT_INDEX_ENABLED) skip the RPC entirely
     """
     try:
         if not hasattr(ctx, "vin") or not ctx.vin:
@@ -119,13 +146,26 @@ def calculate_total_inputs(ctx):
             return 0
 
         try:
+            # Outputs already in the local prevout index need no RPC or parent deserialization
+            prevout_index = get_prevout_index()
+            local_prevouts = prevout_index.get_many(input_refs) if prevout_index else {}
+            tx_hashes_to_fetch = [
+                tx_hash for tx_hash, output_index in input_refs if (tx_hash, output_index) not in local_prevouts
+            ]
+
             # Use batch fetching for efficiency
-            prev_txs = backend_instance.getrawtransaction_batch(tx_hashes_to_fetch, verbose=False)
+            prev_txs = (
+                backend_instance.getrawtransaction_batch(tx_hashes_to_fetch, verbose=False) if tx_hashes_to_fetch else {}
+            )
 
             total_input_value = 0
 
             # Process each input with its fetched transaction
             for tx_hash, output_index in input_refs:
+                if (tx_hash, output_index) in local_prevouts:
+                    total_input_value += local_prevouts[(tx_hash, output_index)][0]
+                    continue
+
                 if tx_hash not in prev_txs or prev_txs[tx_hash] is None:
                     logger.debug(f"Could not fetch previous transaction {tx_hash}")
                     return 0
@@ -178,6 +218,7 @@ def prefetch_source_prevouts(raw_transactions):
     try:
         hashes = []
         seen = set()
+        prevout_index = get_prevout_index()
 
         for tx_hex in raw_transactions.values():
             ctx = backend_instance.deserialize(tx_hex)
@@ -193,6 +234,8 @@ def prefetch_source_prevouts(raw_transactions):
                 continue
 
             prev_tx_hash = util.ib2h(vin.prevout.hash)
+            if prevout_index and prevout_index.get(prev_tx_hash, vin.prevout.n) is not None:
+                continue  # get_tx_info will read this prevout from the local index
             if prev_tx_hash not in seen:
                 seen.add(prev_tx_hash)
                 hashes.append(prev_tx_hash)
@@ -389,13 +432,15 @@ def calculate_virtual_size(ctx):
         return 0
 
 
-def process_vout(ctx, block_index, stamp_issuance=None):
+def process_vout(ctx, block_index, stamp_issuance=None, total_input_value=None):
     """Process a decoded transaction's outputs, capturing relevant data and addresses.
 
     Args:
         ctx (ctx): The decoded transaction context.
         block_index (int): The block index.
         stamp_issuance (dict, optional): Stamp issuance information. Defaults to None.
+        total_input_value (int, optional): Sum of the spent outputs, if already known.
+            Defaults to None, which looks it up with calculate_total_inputs.
 
     Returns:
         namedtuple: vOutInfo containing pubkeys_compiled, keyburn, is_op_return, fee, is_olga, p2wsh_data_chunks
@@ -438,7 +483,8 @@ def process_vout(ctx, block_index, stamp_issuance=None):
                 logger.debug(f"Found P2WSH output at index {idx} with bytes: {data_bytes.hex()[:20]}...")
 
     # Calculate actual transaction fee: inputs - outputs
-    total_input_value = calculate_total_inputs(ctx)
+    if total_input_value is None:
+        total_input_value = calculate_total_inputs(ctx)
     fee = total_input_value - total_output_value
 
     # Validate fee calculation
@@ -467,6 +513,10 @@ def get_tx_info(tx_hex, block_index=None, db=None, stamp_issuance=None):
     """
     Get transaction information.
 
+    Fetches what decode_tx_core needs from bitcoind (or the local prevout index):
+    the input total for the fee, and the scriptPubKey spent by vin[0] for the
+    source address, which is only looked up once the transaction carries data.
+
     Args:
         tx_hex (str): The hexadecimal representation of the transaction.
         block_index (int, optional): The index of the block.
@@ -476,32 +526,63 @@ def get_tx_info(tx_hex, block_index=None, db=None, stamp_issuance=None):
     Returns:
         TransactionInfo: A named tuple containing the transaction information.
     """
-    TransactionInfo = namedtuple(
-        "TransactionInfo",
-        [
-            "source",
-            "prev_tx_hash",
-            "destinations",
-            "destination_nvalue",
-            "btc_amount",
-            "fee",
-            "data",
-            "ctx",
-            "keyburn",
-            "is_op_return",
-            "p2wsh_data",
-            "is_olga",
-        ],
-    )
-
     try:
         if not block_index:
             block_index = util.CURRENT_BLOCK_INDEX
 
-        destinations, src_destination_nvalue, btc_amount, data, p2wsh_data = [], 0, 0, b"", b""
-
         ctx = backend_instance.deserialize(tx_hex)
         vout_info = process_vout(ctx, block_index, stamp_issuance=stamp_issuance)
+        transaction_info = decode_tx_core(ctx, vout_info, block_index, stamp_issuance=stamp_issuance)
+
+        if transaction_info.data and transaction_info.source is None:
+            prev_tx_hash = transaction_info.prev_tx_hash
+            prev_tx_index = ctx.vin[0].prevout.n
+
+            prevout_index = get_prevout_index()
+            local_prevout = prevout_index.get(util.ib2h(prev_tx_hash), prev_tx_index) if prevout_index else None
+            if local_prevout is not None:
+                prev_vout_script_pubkey = CScript(local_prevout[1])
+            else:
+                # Get the full transaction data for the previous transaction.
+                prev_tx = backend_instance.getrawtransaction(util.ib2h(prev_tx_hash))
+                prev_ctx = backend_instance.deserialize(prev_tx)
+
+                # Get the output being spent by the input.
+                prev_vout = prev_ctx.vout[prev_tx_index]
+                prev_vout_script_pubkey = prev_vout.scriptPubKey
+
+            # Decode the address associated with the output.
+            source = util.decode_address(prev_vout_script_pubkey)
+            transaction_info = transaction_info._replace(source=str(source))
+
+        return transaction_info
+
+    except (DecodeError, BTCOnlyError):
+        return EMPTY_TRANSACTION_INFO
+
+
+def decode_tx_core(ctx, vout_info, block_index, stamp_issuance=None, source_script_pubkey=None):
+    """
+    Decode stamp data from a deserialized transaction without any RPC or DB access.
+
+    This is the pure part of get_tx_info, so it can also run in a worker process
+    (see index_core.decode_pool). The source address needs the output spent by
+    vin[0]; when ``source_script_pubkey`` is not supplied a data-carrying result
+    is returned with ``source=None`` for the caller to fill in.
+
+    Args:
+        ctx: The deserialized transaction.
+        vout_info (vOutInfo): Result of process_vout for ``ctx``.
+        block_index (int): The index of the block.
+        stamp_issuance (dict, optional): The CP issuance for this transaction, if any.
+        source_script_pubkey (bytes, optional): scriptPubKey of the output spent by vin[0].
+
+    Returns:
+        TransactionInfo: A named tuple containing the transaction information.
+    """
+    try:
+        destinations, src_destination_nvalue, btc_amount, data, p2wsh_data = [], 0, 0, b"", b""
+
         pubkeys_compiled = vout_info.pubkeys_compiled
         keyburn = vout_info.keyburn
         is_op_return = vout_info.is_op_return
@@ -588,22 +669,14 @@ def get_tx_info(tx_hex, block_index=None, db=None, stamp_issuance=None):
         vin = ctx.vin[0]
 
         prev_tx_hash = vin.prevout.hash
-        prev_tx_index = vin.prevout.n
-
-        # Get the full transaction data for the previous transaction.
-        # TODO: Can we batch process these for all calls from trx in the block
-        prev_tx = backend_instance.getrawtransaction(util.ib2h(prev_tx_hash))
-        prev_ctx = backend_instance.deserialize(prev_tx)
 
-        # Get the output being spent by the input.
-        prev_vout = prev_ctx.vout[prev_tx_index]
-        prev_vout_script_pubkey = prev_vout.scriptPubKey
-
-        # Decode the address associated with the output.
-        source = util.decode_address(prev_vout_script_pubkey)
+        # Decode the address associated with the output spent by vin[0].
+        source = None
+        if source_script_pubkey is not None:
+            source = str(util.decode_address(CScript(source_script_pubkey)))
 
         return TransactionInfo(
-            str(source),
+            source,
             prev_tx_hash,
             destinations,
             src_destination_nvalue,
@@ -618,7 +691,7 @@ def get_tx_info(tx_hex, block_index=None, db=None, stamp_issuance=None):
         )
 
     except (DecodeError, BTCOnlyError):
-        return TransactionInfo(b"", None, None, None, None, None, None, None, None, None, None, False)
+        return EMPTY_TRANSACTION_INFO
 
 
 def decode_checkmultisig(ctx, chunk):
@@ -653,7 +726,16 @@ def decode_checkmultisig(ctx, chunk):
         return None, None, None
 
 
-def list_tx(db, block_index: int, tx_hash: str, tx_hex=None, stamp_issuance=None):
+def list_tx(db, block_index: int, tx_hash: str, tx_hex=None, stamp_issuance=None, current_block_index=None):
+    """
+    Decode a single transaction into the tuple consumed by process_tx.
+
+    The decode only depends on the chain, so the block look-ahead stage runs it
+    for blocks ahead of util.CURRENT_BLOCK_INDEX. It passes the block it is
+    decoding as ``current_block_index`` so the sanity check below compares
+    against the block being decoded rather than the global, which the main
+    loop owns.
+    """
 
     if not isinstance(tx_hash, str):
         raise TypeError("tx_hash must be a string")
@@ -663,6 +745,17 @@ def list_tx(db, block_index: int, tx_hash: str, tx_hex=None, stamp_issuance=None
         tx_hex = backend_instance.getrawtransaction(tx_hash, verbose=False, skip_missing=False, current_block=block_index)
 
     transaction_info = get_tx_info(tx_hex, block_index=block_index, db=db, stamp_issuance=stamp_issuance)
+
+    if current_block_index is None:
+        current_block_index = util.CURRENT_BLOCK_INDEX
+    if block_index != current_block_index:
+        raise ValueError(f"block_index does not match util.CURRENT_BLOCK_INDEX: {block_index} != {current_block_index}")
+
+    return list_tx_fields(tx_hash, transaction_info, stamp_issuance)
+
+
+def list_tx_fields(tx_hash, transaction_info, stamp_issuance=None):
+    """Turn a TransactionInfo into list_tx's 12-field tuple (all None if not a stamp candidate)."""
     source = getattr(transaction_info, "source", None)
     prev_tx_hash = getattr(transaction_info, "prev_tx_hash", None)
     destination = getattr(transaction_info, "destinations", None)
@@ -676,9 +769,6 @@ def list_tx(db, block_index: int, tx_hash: str, tx_hex=None, stamp_issuance=None
     p2wsh_data = getattr(transaction_info, "p2wsh_data", None)
     is_olga = getattr(transaction_info, "is_olga", False)
 
-    if block_index != util.CURRENT_BLOCK_INDEX:
-        raise ValueError(f"block_index does not match util.CURRENT_BLOCK_INDEX: {block_index} != {util.CURRENT_BLOCK_INDEX}")
-
     if stamp_issuance is not None:
         source = str(stamp_issuance["source"])
         destination = str(stamp_issuance["issuer"])
@@ -710,18 +800,21 @@ def list_tx(db, block_index: int, tx_hash: str, tx_hex=None, stamp_issuance=None
         return tuple(None for _ in range(12))
 
 
-def process_tx(db, tx_hash, block_index, stamp_issuances, raw_transactions):
-    """Process a single transaction and return its parsed information."""
+def process_tx(db, tx_hash, block_index, stamp_issuances, raw_transactions, current_block_index=None):
+    """Process a single transaction and return its parsed information.
+
+    ``current_block_index`` is forwarded to list_tx; see its docstring.
+    """
 
     # DEBUG: Log critical transaction
     if tx_hash == "95dca4dc27e50e7b26174a0ded7af3b26527def625670d058ae09200eeb3d735":
         logger.error(f"🔍 DEBUG TX 95dca4dc: Starting process_tx in block {block_index}")
         logger.error(f"🔍 DEBUG TX 95dca4dc: stamp_issuances count = {len(stamp_issuances) if stamp_issuances else 0}")
 
-    # Ensure stamp_issuances is a list before filtering
+    # Ensure stamp_issuances is a list (or a tx_hash index) before filtering
     if stamp_issuances is None:
         stamp_issuances = []
-    elif not isinstance(stamp_issuances, list):
+    elif not isinstance(stamp_issuances, (list, dict)):
         logger.error(f"Invalid stamp_issuances type: {type(stamp_issuances)}")
         stamp_issuances = []
 
@@ -750,60 +843,109 @@ def process_tx(db, tx_hash, block_index, stamp_issuances, raw_transactions):
             is_op_return,
             p2wsh_data,
             is_olga,
-        ) = list_tx(db, block_index, tx_hash, tx_hex, stamp_issuance=stamp_issuance)
-
-        # Calculate fee rate for this transaction
-        fee_rate_sat_vb = 0.0
-        if decoded_tx:
-            try:
-                virtual_size = calculate_virtual_size(decoded_tx)
-                if virtual_size > 0 and fee and fee > 0:
-                    fee_rate_sat_vb = round(fee / virtual_size, 2)
-            except Exception as e:
-                logger.debug(f"Error calculating fee rate for tx {tx_hash}: {e}")
-
-        return TxResult(
-            None,
-            source,
-            prev_tx_hash,
-            destination,
-            destination_nvalue,
-            btc_amount,
-            fee,
-            fee_rate_sat_vb,
-            data,
-            decoded_tx,
-            keyburn,
-            is_op_return,
-            tx_hash,
+        ) = list_tx(
+            db,
             block_index,
-            None,
-            None,
-            p2wsh_data,
-            is_olga,
+            tx_hash,
+            tx_hex,
+            stamp_issuance=stamp_issuance,
+            current_block_index=current_block_index,
         )
-    except Exception:
 
-        return TxResult(
-            None,
-            None,
-            None,
-            None,
-            None,
-            None,
-            None,
-            None,
-            None,
-            None,
-            None,
-            None,
+        return build_tx_result(
             tx_hash,
             block_index,
-            None,
-            None,
-            None,
-            None,
+            (
+                source,
+                prev_tx_hash,
+                destination,
+                destination_nvalue,
+                btc_amount,
+                fee,
+                data,
+                decoded_tx,
+                keyburn,
+                is_op_return,
+                p2wsh_data,
+                is_olga,
+            ),
         )
+    except Exception:
+
+        return empty_tx_result(tx_hash, block_index)
+
+
+def build_tx_result(tx_hash, block_index, list_tx_result):
+    """Build the TxResult for a list_tx tuple, adding the fee rate."""
+    (
+        source,
+        prev_tx_hash,
+        destination,
+        destination_nvalue,
+        btc_amount,
+        fee,
+        data,
+        decoded_tx,
+        keyburn,
+        is_op_return,
+        p2wsh_data,
+        is_olga,
+    ) = list_tx_result
+
+    # Calculate fee rate for this transaction
+    fee_rate_sat_vb = 0.0
+    if decoded_tx:
+        try:
+            virtual_size = calculate_virtual_size(decoded_tx)
+            if virtual_size > 0 and fee and fee > 0:
+                fee_rate_sat_vb = round(fee / virtual_size, 2)
+        except Exception as e:
+            logger.debug(f"Error calculating fee rate for tx {tx_hash}: {e}")
+
+    return TxResult(
+        None,
+        source,
+        prev_tx_hash,
+        destination,
+        destination_nvalue,
+        btc_amount,
+        fee,
+        fee_rate_sat_vb,
+        data,
+        decoded_tx,
+        keyburn,
+        is_op_return,
+        tx_hash,
+        block_index,
+        None,
+        None,
+        p2wsh_data,
+        is_olga,
+    )
+
+
+def empty_tx_result(tx_hash, block_index):
+    """TxResult for a transaction that failed to decode."""
+    return TxResult(
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        tx_hash,
+        block_index,
+        None,
+        None,
+        None,
+        None,
+    )
 
 
 def quick_filter_src20_transaction(ctx):
@@ -197,6 +197,22 @@ impl FastTransactionParser {
             PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Invalid hex: {}", e))
         })?;
 
+        self.parse_block_bytes(&block_bytes)
+    }
+
+    /// Same as `parse_block`, but takes the serialized block as raw bytes
+    /// (e.g. bitcoind's `/rest/block/<hash>.bin`), skipping the hex round trip.
+    #[allow(clippy::type_complexity)]
+    fn parse_block_bytes(
+        &self,
+        block_bytes: &[u8],
+    ) -> PyResult<(
+        Vec<String>,
+        HashMap<String, String>,
+        u32,
+        String,
+        Option<f64>,
+    )> {
         let block = Block::consensus_decode(&mut &block_bytes[..]).map_err(|e| {
             error!("Failed to decode block: {}", e);
             PyErr::new::<pyo3::exceptions::PyValueError, _>(format!("Invalid block: {}", e))
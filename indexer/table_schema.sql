@@ -491,6 +491,7 @@ CREATE TABLE IF NOT EXISTS `stamp_market_data` (
   -- Activity Level Optimization
   `activity_level` ENUM('HOT', 'WARM', 'COOL', 'DORMANT', 'COLD') DEFAULT 'COLD' COMMENT 'Activity level based on trading frequency for optimization',
   `last_activity_time` INT NULL COMMENT 'Unix timestamp of last trading activity',
+  `next_update_at` TIMESTAMP NULL COMMENT 'When the activity level makes this stamp due for a refresh',
   
   -- Metadata and Tracking
   `last_updated` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT 'Last cache update time',
@@ -516,7 +517,8 @@ CREATE TABLE IF NOT EXISTS `stamp_market_data` (
   INDEX `idx_volume_composite` (`volume_24h_btc` DESC, `volume_7d_btc` DESC, `holder_count` DESC) COMMENT 'For trending/popular stamps',
   INDEX `idx_market_overview` (`floor_price_btc`, `holder_count`, `volume_24h_btc`, `data_quality_score`) COMMENT 'For market overview pages',
   INDEX `idx_recent_sales` (`last_price_update` DESC, `volume_24h_btc` DESC) COMMENT 'For recent sales filtering and sorting',
-  INDEX `idx_activity_level` (`activity_level`, `last_updated`) COMMENT 'For activity-based update scheduling optimization'
+  INDEX `idx_activity_level` (`activity_level`, `last_updated`) COMMENT 'For activity-based update scheduling optimization',
+  INDEX `idx_next_update` (`activity_level`, `next_update_at`) COMMENT 'Due-time queue for activity-based update scheduling'
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_as_ci COMMENT='Cached market data for Bitcoin Stamps to eliminate external API calls';
 
 
@@ -618,6 +620,7 @@ CREATE TABLE IF NOT EXISTS `src20_market_data` (
   `progress_percentage` DECIMAL(5,2) DEFAULT 0.00 COMMENT 'Minting progress as percentage (0.00-100.00)',
   `total_minted` BIGINT DEFAULT 0 COMMENT 'Total amount minted from balances table sum',
   `total_mints` INTEGER DEFAULT 0 COMMENT 'Total count of MINT operations from SRC20Valid table',
+  `minted_supply` DECIMAL(38,18) DEFAULT 0 COMMENT 'Exact sum of positive balances, kept by the incremental holder counters',
   
   -- Multi-Source Attribution
   `primary_exchange` VARCHAR(50) NULL COMMENT 'Primary exchange for price data',
@@ -666,6 +669,7 @@ CREATE TABLE IF NOT EXISTS `collection_market_data` (
   -- Collection Statistics
   `total_stamps` INTEGER DEFAULT 0 COMMENT 'Total stamps in collection',
   `unique_holders` INTEGER DEFAULT 0 COMMENT 'Number of unique holders',
+  `top_holder_percentage` DECIMAL(5,2) DEFAULT 0 COMMENT 'Share of the held supply owned by the largest holder',
   `listed_stamps` INTEGER DEFAULT 0 COMMENT 'Number of stamps currently listed',
   `sold_stamps_24h` INTEGER DEFAULT 0 COMMENT 'Stamps sold in last 24 hours',
   
@@ -936,6 +940,67 @@ CREATE TABLE IF NOT EXISTS `reorg_events` (
   INDEX `idx_detected_at` (`detected_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_as_ci COMMENT='Tracks blockchain reorganization events for observability';
 
+-- =====================================================================
+-- SRC-20 BALANCE AND SRC-101 OWNER JOURNALS
+-- =====================================================================
+-- Per-block balance and owners changes with the prior row state (for rollback)
+-- and periodic (row count, checksum) snapshots of both tables (for startup checks).
+-- Used when BALANCE_JOURNAL_ENABLED=true.
+
+CREATE TABLE IF NOT EXISTS `balance_deltas` (
+  `block_index` INT NOT NULL,
+  `id` VARCHAR(255) NOT NULL COMMENT 'balances.id',
+  `address` varchar(64) COLLATE utf8mb4_bin NOT NULL,
+  `tick` varchar(32),
+  `tick_hash` varchar(64),
+  `prev_amt` decimal(38,18) NULL COMMENT 'NULL when the balance row did not exist',
+  `prev_locked_amt` decimal(38,18) NULL,
+  `prev_last_update` int NULL,
+  `prev_block_time` datetime NULL,
+  `new_amt` decimal(38,18) NOT NULL,
+  PRIMARY KEY (`block_index`, `id`),
+  INDEX `idx_id_block` (`id`, `block_index`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_as_ci COMMENT='Per-block SRC-20 balance changes for rollback';
+
+CREATE TABLE IF NOT EXISTS `balance_snapshots` (
+  `block_index` INT NOT NULL,
+  `row_count` BIGINT NOT NULL COMMENT 'Non-zero SRC-20 balance rows',
+  `checksum` BIGINT NOT NULL COMMENT 'SUM(CRC32(id|amt)) over the same rows',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`block_index`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_as_ci COMMENT='Balances table checksums keyed by block height';
+
+CREATE TABLE IF NOT EXISTS `owner_deltas` (
+  `block_index` INT NOT NULL,
+  `id` VARCHAR(255) NOT NULL COMMENT 'owners.id',
+  `prev_index` INT NULL,
+  `prev_p` varchar(32) NULL,
+  `prev_deploy_hash` VARCHAR(64) NULL,
+  `prev_tokenid` varchar(255) NULL,
+  `prev_tokenid_utf8` varchar(255) DEFAULT NULL COLLATE utf8mb4_bin,
+  `prev_img` varchar(255) DEFAULT NULL COLLATE utf8mb4_bin,
+  `prev_preowner` varchar(64) DEFAULT NULL COLLATE utf8mb4_bin,
+  `prev_owner` varchar(64) DEFAULT NULL COLLATE utf8mb4_bin,
+  `prev_prim` BOOLEAN DEFAULT NULL,
+  `prev_address_btc` varchar(255) DEFAULT NULL COLLATE utf8mb4_bin,
+  `prev_address_eth` varchar(255) DEFAULT NULL COLLATE utf8mb4_bin,
+  `prev_txt_data` TEXT DEFAULT NULL COLLATE utf8mb4_bin,
+  `prev_expire_timestamp` BIGINT UNSIGNED DEFAULT NULL,
+  `prev_last_update` int NULL,
+  `prev_crc` BIGINT UNSIGNED NULL COMMENT 'NULL when the owners row did not exist',
+  `new_crc` BIGINT UNSIGNED NOT NULL,
+  PRIMARY KEY (`block_index`, `id`),
+  INDEX `idx_id_block` (`id`, `block_index`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_as_ci COMMENT='Per-block SRC-101 owners row changes for rollback';
+
+CREATE TABLE IF NOT EXISTS `owner_snapshots` (
+  `block_index` INT NOT NULL,
+  `row_count` BIGINT NOT NULL COMMENT 'owners rows',
+  `checksum` BIGINT NOT NULL COMMENT 'SUM(CRC32) of every owners column over the same rows',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`block_index`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_as_ci COMMENT='Owners table checksums keyed by block height';
+
 -- =====================================================================
 -- END OF SCHEMA
 -- =====================================================================
\ No newline at end of file
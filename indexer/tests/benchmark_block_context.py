@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-block BlockContext indexes against the list scans they replace.
+
+Builds synthetic "mint storm" blocks (one hot tick minted to many addresses,
+with a share of transfers and stamps) and runs the per-transaction lookups of
+the block hot path both ways: running balances and mint totals, reissue checks,
+finalize-time balance entries and result ordering. No database is needed; DB
+fallbacks return empty results.
+
+Usage:
+    python tests/benchmark_block_context.py [n_ops ...]
+"""
+
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from decimal import Decimal as D
+from unittest.mock import MagicMock, patch
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from index_core.block_context import BlockContext  # noqa: E402
+from index_core.caching import clear_all_caches  # noqa: E402
+from index_core.database import check_reissue_in_block  # noqa: E402
+from index_core.src20 import (  # noqa: E402
+    _get_or_create_balance_entry,
+    get_running_mint_total,
+    get_running_user_balances,
+)
+
+Result = namedtuple("Result", ["tx_hash"])
+DEFAULT_SIZES = [1000, 4000, 10000]
+
+
+def build_block(n_ops, seed=0):
+    """Return (txhash_list, src20 ops, valid stamps) for a synthetic mint-storm block."""
+    rng = random.Random(seed)
+    addresses = [f"bc1q{i:038d}" for i in range(max(10, n_ops // 2))]
+    txhash_list = [f"{i:064x}" for i in range(n_ops)]
+    ops, stamps = [], []
+    for position, tx_hash in enumerate(txhash_list):
+        creator = rng.choice(addresses)
+        if rng.random() < 0.9:
+            op = {"op": "MINT", "creator": creator, "destination": creator}
+        else:
+            op = {"op": "TRANSFER", "creator": creator, "destination": rng.choice(addresses)}
+        op.update(tx_hash=tx_hash, tick="storm", tick_hash="storm_hash", amt=D(1))
+        ops.append(op)
+        stamps.append({"cpid": f"A{position}", "is_btc_stamp": False, "is_cursed": True})
+    return txhash_list, ops, stamps
+
+
+def run_block(txhash_list, ops, stamps, block_context=None):
+    """Drive the per-transaction lookups of one block, scanning when block_context is None."""
+    clear_all_caches()  # total_minted is cached across blocks
+    db = MagicMock()
+    db.cursor.return_value.fetchall.return_value = []
+    processed_src20_in_block, valid_stamps_in_block = [], []
+
+    for position, op in enumerate(ops):
+        if block_context is not None:
+            block_context.has_reissue(stamps[position]["cpid"])
+        else:
+            check_reissue_in_block(valid_stamps_in_block, stamps[position]["cpid"])
+        valid_stamps_in_block.append(stamps[position])
+
+        addresses = list(dict.fromkeys([op["creator"], op["destination"]]))
+        balances = get_running_user_balances(
+            db, op["tick"], op["tick_hash"], addresses, processed_src20_in_block, block_context=block_context
+        )
+        total_minted = get_running_mint_total(db, processed_src20_in_block, op["tick"], block_context=block_context)
+
+        balance = {b.address: D(b.total_balance) for b in balances}
+        src20_dict = dict(op, valid=1)
+        if op["op"] == "MINT":
+            src20_dict["total_minted"] = total_minted + op["amt"]
+            src20_dict["total_balance_destination"] = balance[op["destination"]] + op["amt"]
+        else:
+            src20_dict["total_balance_creator"] = balance[op["creator"]] - op["amt"]
+            src20_dict["total_balance_destination"] = balance[op["destination"]] + op["amt"]
+        processed_src20_in_block.append(src20_dict)
+        if block_context is not None:
+            block_context.record_stamp(stamps[position])
+            block_context.record_src20(src20_dict)
+
+    balance_updates = []
+    balance_index = {} if block_context is not None else None
+    for src20_dict in processed_src20_in_block:
+        entry = _get_or_create_balance_entry(
+            balance_updates, src20_dict["tick"], src20_dict["tick_hash"], src20_dict["destination"], balance_index
+        )
+        entry["credit"] += src20_dict["amt"]
+
+    results = [Result(tx_hash) for tx_hash in reversed(txhash_list)]
+    if block_context is not None:
+        ordered = block_context.sort_results(results)
+    else:
+        ordered = sorted(results, key=lambda x: txhash_list.index(x.tx_hash))
+    return processed_src20_in_block, balance_updates, ordered
+
+
+def benchmark(sizes):
+    print(f"{'ops':>8} {'scan (s)':>10} {'indexed (s)':>12} {'speedup':>8}")
+    with patch("index_core.src20.get_total_src20_minted_from_db", return_value=D(0)):
+        for n_ops in sizes:
+            block = build_block(n_ops)
+
+            start = time.perf_counter()
+            scanned = run_block(*block)
+            t_scan = time.perf_counter() - start
+
+            start = time.perf_counter()
+            indexed = run_block(*block, block_context=BlockContext(block[0]))
+            t_indexed = time.perf_counter() - start
+
+            assert indexed == scanned, f"indexed and scanned results differ for {n_ops} ops"
+            print(f"{n_ops:>8} {t_scan:>10.3f} {t_indexed:>12.3f} {t_scan / t_indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,314 @@
+"""Unit tests for the SRC-20 balance journal and snapshots (index_core.balance_journal)."""
+
+from decimal import Decimal as D
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import index_core.database as database
+from index_core.balance_journal import (
+    OWNER_COLUMNS,
+    read_owner_rows,
+    record_balance_deltas,
+    record_owner_deltas,
+    rollback_balance_journal,
+    rollback_owner_journal,
+    seed_balance_snapshot,
+    take_balance_snapshot,
+    take_owner_snapshot,
+    verify_balance_snapshot,
+    verify_owner_snapshot,
+)
+
+
+def _db(cursor):
+    db = MagicMock()
+    db.cursor.return_value.__enter__.return_value = cursor
+    return db
+
+
+def _executed(cursor):
+    return [" ".join(c.args[0].split()) for c in cursor.execute.call_args_list]
+
+
+@pytest.mark.unit
+def test_record_balance_deltas_nets_changes_per_row():
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [("kevin_bc1qaaa", D(10), D(0), 5, 1700000000)]
+    balance_updates = [
+        {"tick": "kevin", "tick_hash": "h", "address": "bc1qaaa", "credit": D(5), "debit": D(2)},
+        {"tick": "kevin", "tick_hash": "h", "address": "bc1qaaa", "credit": D(0), "debit": D(1)},
+        {"tick": "kevin", "tick_hash": "h", "address": "bc1qbbb", "credit": D(3), "debit": D(0)},
+    ]
+
+    record_balance_deltas(_db(cursor), 800000, balance_updates)
+
+    rows = cursor.executemany.call_args.args[1]
+    assert rows == [
+        (800000, "kevin_bc1qaaa", "bc1qaaa", "kevin", "h", D(10), D(0), 5, 1700000000, D(12)),
+        (800000, "kevin_bc1qbbb", "bc1qbbb", "kevin", "h", None, None, None, None, D(3)),
+    ]
+
+
+@pytest.mark.unit
+def test_record_balance_deltas_without_updates():
+    cursor = MagicMock()
+    record_balance_deltas(_db(cursor), 800000, [])
+    cursor.execute.assert_not_called()
+    cursor.executemany.assert_not_called()
+
+
+@pytest.mark.unit
+def test_take_balance_snapshot_adds_journal_to_previous():
+    cursor = MagicMock()
+    # previous snapshot, journal delta, no snapshot at the pruning horizon
+    cursor.fetchone.side_effect = [(800000, 100, 5000), (3, -200), None]
+
+    assert take_balance_snapshot(_db(cursor), 800100)
+
+    insert = cursor.execute.call_args_list[2]
+    assert insert.args[1] == (800100, 103, 4800)
+    assert not any(sql.startswith("DELETE") for sql in _executed(cursor))
+
+
+@pytest.mark.unit
+def test_take_balance_snapshot_prunes_below_horizon():
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [(801000, 100, 5000), (0, 0), (800000, 90, 4000)]
+
+    assert take_balance_snapshot(_db(cursor), 801100)
+
+    deletes = [c.args for c in cursor.execute.call_args_list if c.args[0].startswith("DELETE")]
+    assert [params for _, params in deletes] == [(800000,), (800000,)]
+
+
+@pytest.mark.unit
+def test_take_balance_snapshot_unseeded():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = None
+    assert not take_balance_snapshot(_db(cursor), 800100)
+    assert cursor.execute.call_count == 1
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("live, expected", [((103, 4800), True), ((103, 4801), False), ((102, 4800), False)])
+def test_verify_balance_snapshot(live, expected):
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [(800000, 100, 5000), (3, -200), live]
+    assert verify_balance_snapshot(_db(cursor)) is expected
+
+
+@pytest.mark.unit
+def test_verify_balance_snapshot_unseeded():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = None
+    assert verify_balance_snapshot(_db(cursor)) is False
+
+
+@pytest.mark.unit
+def test_seed_balance_snapshot_resets_journal():
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [(800123,), (42, 9999)]
+    db = _db(cursor)
+
+    seed_balance_snapshot(db)
+
+    executed = _executed(cursor)
+    assert "DELETE FROM balance_deltas" in executed
+    assert "DELETE FROM balance_snapshots" in executed
+    assert cursor.execute.call_args_list[-1].args[1] == (800123, 42, 9999)
+    db.commit.assert_called_once()
+
+
+@pytest.mark.unit
+def test_rollback_without_covering_snapshot_drops_journal():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = None
+
+    assert rollback_balance_journal(cursor, 800050) is False
+
+    executed = _executed(cursor)
+    assert executed[1:] == ["DELETE FROM balance_deltas", "DELETE FROM balance_snapshots"]
+    assert not any("INSERT INTO balances" in sql for sql in executed)
+
+
+@pytest.mark.unit
+def test_rollback_restores_rows_from_journal():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (800000, 100, 5000)
+
+    assert rollback_balance_journal(cursor, 800050) is True
+
+    executed = _executed(cursor)
+    assert executed[1].startswith("INSERT INTO balances")
+    assert executed[2].startswith("DELETE b FROM balances b")
+    assert "WHERE first_deltas.prev_amt IS NULL" in executed[2]
+    assert executed[3:] == [
+        "DELETE FROM balance_deltas WHERE block_index >= %s",
+        "DELETE FROM balance_snapshots WHERE block_index >= %s",
+    ]
+    assert all(c.args[1] == (800050,) for c in cursor.execute.call_args_list[1:])
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("verified", [True, False])
+def test_rebuild_balances_uses_snapshot(verified):
+    db = MagicMock()
+    with patch.object(database.config, "BALANCE_JOURNAL_ENABLED", True), patch.object(
+        database, "verify_balance_snapshot", return_value=verified
+    ), patch.object(database, "_rebuild_balances") as full_rebuild, patch.object(database, "seed_balance_snapshot") as seed:
+        database.rebuild_balances(db)
+
+    assert full_rebuild.called is not verified
+    assert seed.called is not verified
+
+
+@pytest.mark.unit
+def test_rebuild_balances_from_height_skips_snapshot():
+    db = MagicMock()
+    with patch.object(database.config, "BALANCE_JOURNAL_ENABLED", True), patch.object(
+        database, "verify_balance_snapshot"
+    ) as verify, patch.object(database, "_rebuild_balances") as full_rebuild:
+        database.rebuild_balances(db, 800000)
+
+    verify.assert_not_called()
+    full_rebuild.assert_called_once_with(db, 800000)
+
+
+def _owner_update(tokenid, owner="bc1qowner", prim=False, address_btc=None):
+    return {
+        "p": "SRC-101",
+        "deploy_hash": "dh",
+        "tokenid": tokenid,
+        "tokenid_utf8": tokenid.lower(),
+        "prim": prim,
+        "address_btc": address_btc,
+        "owner": owner,
+    }
+
+
+def _owner_row(owner_id, crc):
+    return (owner_id, *[f"{column}_value" for column in OWNER_COLUMNS], crc)
+
+
+@pytest.mark.unit
+def test_read_owner_rows_covers_ids_name_keys_and_cleared_prims():
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [_owner_row("SRC-101_dh_Alice", 11)]
+
+    rows = read_owner_rows(_db(cursor), [_owner_update("Alice", prim=True, address_btc="bc1qowner"), _owner_update("bob")])
+
+    sql, params = cursor.execute.call_args.args
+    sql = " ".join(sql.split())
+    assert "id IN (%s, %s)" in sql
+    assert "(p, deploy_hash, tokenid_utf8) IN ((%s, %s, %s), (%s, %s, %s))" in sql
+    assert "(prim = TRUE AND (address_btc, deploy_hash) IN ((%s, %s)))" in sql
+    assert params[:2] == ["SRC-101_dh_Alice", "SRC-101_dh_bob"] and params[-2:] == ["bc1qowner", "dh"]
+    assert rows == {"src-101_dh_alice": _owner_row("SRC-101_dh_Alice", 11)}
+
+
+@pytest.mark.unit
+def test_record_owner_deltas_journals_changed_and_new_rows():
+    cursor = MagicMock()
+    prior = {
+        "src-101_dh_alice": _owner_row("SRC-101_dh_Alice", 11),
+        "src-101_dh_carol": _owner_row("SRC-101_dh_carol", 33),  # prim cleared by the update
+        "src-101_dh_dave": _owner_row("SRC-101_dh_dave", 44),  # matched but left as it was
+    }
+    cursor.fetchall.return_value = [
+        ("SRC-101_dh_Alice", 12),
+        ("SRC-101_dh_bob", 22),
+        ("SRC-101_dh_carol", 34),
+        ("SRC-101_dh_dave", 44),
+    ]
+
+    record_owner_deltas(_db(cursor), 800000, prior, [_owner_update("Alice"), _owner_update("bob")])
+
+    selected = cursor.execute.call_args.args[1]
+    assert sorted(selected) == ["SRC-101_dh_Alice", "SRC-101_dh_bob", "SRC-101_dh_carol", "SRC-101_dh_dave"]
+    rows = cursor.executemany.call_args.args[1]
+    assert [(row[1], row[-2], row[-1]) for row in rows] == [
+        ("SRC-101_dh_Alice", 11, 12),
+        ("SRC-101_dh_bob", None, 22),
+        ("SRC-101_dh_carol", 33, 34),
+    ]
+    assert rows[0][2:-2] == tuple(f"{column}_value" for column in OWNER_COLUMNS)
+    assert rows[1][2:-2] == (None,) * len(OWNER_COLUMNS)
+
+
+@pytest.mark.unit
+def test_owner_snapshots_use_owner_tables():
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [(800000, 10, 500), (2, 70), None]
+    assert take_owner_snapshot(_db(cursor), 800100)
+    executed = _executed(cursor)
+    assert "FROM owner_snapshots" in executed[0] and "FROM owner_deltas" in executed[1]
+    assert executed[2].startswith("INSERT INTO owner_snapshots")
+    assert cursor.execute.call_args_list[2].args[1] == (800100, 12, 570)
+
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [(800000, 10, 500), (2, 70), (12, 570)]
+    assert verify_owner_snapshot(_db(cursor)) is True
+    assert "FROM owners" in _executed(cursor)[2]
+
+
+@pytest.mark.unit
+def test_owner_rollback_removes_new_rows_before_restoring():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (800000, 10, 500)
+
+    assert rollback_owner_journal(cursor, 800050) is True
+
+    executed = _executed(cursor)
+    assert executed[1].startswith("DELETE o FROM owners o") and "prev_crc IS NULL" in executed[1]
+    assert executed[2].startswith("INSERT INTO owners (id, owners.index, p,")
+    assert "owner = prev.prev_owner" in executed[2] and "owners.index = prev.prev_index" in executed[2]
+    assert executed[3:] == [
+        "DELETE FROM owner_deltas WHERE block_index >= %s",
+        "DELETE FROM owner_snapshots WHERE block_index >= %s",
+    ]
+
+    cursor = MagicMock()
+    cursor.fetchone.return_value = None
+    assert rollback_owner_journal(cursor, 800050) is False
+    assert _executed(cursor)[1:] == ["DELETE FROM owner_deltas", "DELETE FROM owner_snapshots"]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("verified", [True, False])
+def test_rebuild_owners_uses_snapshot(verified):
+    db = MagicMock()
+    with patch.object(database.config, "BALANCE_JOURNAL_ENABLED", True), patch.object(
+        database, "verify_owner_snapshot", return_value=verified
+    ), patch.object(database, "_rebuild_owners") as full_rebuild, patch.object(database, "seed_owner_snapshot") as seed:
+        database.rebuild_owners(db)
+
+    assert full_rebuild.called is not verified
+    assert seed.called is not verified
+
+
+@pytest.mark.unit
+def test_update_src101_owners_journals_around_the_owner_upsert():
+    from index_core import src101
+
+    calls = []
+    src101_dict = {
+        "valid": 1,
+        "op": "TRANSFER",
+        "p": "SRC-101",
+        "deploy_hash": "dh",
+        "tokenid": "alice",
+        "tokenid_utf8": "alice",
+        "src101_owner": "bc1qnew",
+        "src101_preowner": "bc1qold",
+        "expire_timestamp": 1,
+    }
+    with patch.object(database.config, "BALANCE_JOURNAL_ENABLED", True), patch.object(
+        src101, "read_owner_rows", side_effect=lambda *a: calls.append("read") or {}
+    ), patch.object(src101, "update_owner_table", side_effect=lambda *a: calls.append("update")), patch.object(
+        src101, "record_owner_deltas", side_effect=lambda *a: calls.append("record")
+    ) as record:
+        src101.update_src101_owners(MagicMock(), 800000, [src101_dict])
+
+    assert calls == ["read", "update", "record"]
+    assert record.call_args.args[1:3] == (800000, {})
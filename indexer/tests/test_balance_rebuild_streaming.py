@@ -0,0 +1,190 @@
+"""Unit tests for the streaming balance rebuild in index_core.database."""
+
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal as D
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import index_core.database as database
+
+ADDRESSES = ["bc1qaaa", "bc1qbbb", "bc1qccc", "bc1qddd", "bc1qeee"]
+TICKS = [("kevin", "hash_kevin"), ("stamp", "hash_stamp"), ("luffy", "hash_luffy")]
+
+
+def _history(seed, n_rows=500):
+    """Random MINT/TRANSFER rows in get_src20_valid_list format, kept within the 28 digits calculate_balances' Decimal arithmetic holds exactly."""
+    rng = random.Random(seed)
+    start = datetime(2023, 4, 1, tzinfo=timezone.utc)
+    rows, block_index = [], 790000
+    for _ in range(n_rows):
+        if rng.random() < 0.3:
+            block_index += rng.randint(1, 3)
+        tick, tick_hash = rng.choice(TICKS)
+        creator, destination = rng.choice(ADDRESSES), rng.choice(ADDRESSES)
+        amt = D(rng.randint(1, 10**12)).scaleb(-rng.choice([0, 8, 12]))
+        op = "MINT" if rng.random() < 0.5 else "TRANSFER"
+        block_time = start + timedelta(minutes=10 * (block_index - 790000))
+        rows.append((op, creator, destination, tick, tick_hash, amt, block_time, block_index))
+    return rows
+
+
+def _as_calculated(balances):
+    return {
+        row[0]: {
+            "tick": row[1],
+            "tick_hash": row[2],
+            "address": row[3],
+            "amt": row[4],
+            "last_update": row[5],
+            "block_time": row[6],
+        }
+        for row in database.iter_balance_rows(balances)
+    }
+
+
+def _ss_db(*result_sets):
+    """Connection whose unbuffered cursors return ``result_sets`` in order."""
+    db = MagicMock()
+    cursors = []
+    for rows in result_sets:
+        cursor = MagicMock()
+        cursor.fetchmany.side_effect = [list(rows), []]
+        cursors.append(cursor)
+    db.cursor.side_effect = cursors
+    db.ss_cursors = cursors
+    return db
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("seed", range(5))
+def test_streaming_matches_calculate_balances(seed):
+    history = _history(seed)
+    balances = database.calculate_balances_streaming(iter(history))
+
+    assert _as_calculated(balances) == database.calculate_balances(history)
+    assert database.count_live_balances(balances) == len(database.calculate_balances(history))
+
+
+@pytest.mark.unit
+def test_streaming_is_exact_at_full_scale():
+    """DECIMAL(38,18) sums need more than Decimal's default 28 digits; integer units don't round."""
+    history = [
+        ("MINT", "a", "a", "kevin", "h", D("18446744073709551615"), None, 1),
+        ("MINT", "a", "a", "kevin", "h", D("0.000000000000000001"), None, 2),
+    ]
+    balances = database.calculate_balances_streaming(iter(history))
+    assert _as_calculated(balances)["kevin_a"]["amt"] == D("18446744073709551615.000000000000000001")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("amt", ["0", "1", "0.000000000000000001", "12345678901234567890.123456789012345678", "-5.5", "1E+3"])
+def test_fixed_point_roundtrip(amt):
+    assert database._units_to_amt(database._amt_to_units(D(amt))) == D(amt)
+
+
+@pytest.mark.unit
+def test_streaming_interns_addresses():
+    history = [
+        ("MINT", "x", "".join(["bc1q", "aaa"]), "kevin", "h", D(1), None, 1),
+        ("MINT", "x", "".join(["bc1q", "aaa"]), "stamp", "h", D(1), None, 1),
+    ]
+    balances = database.calculate_balances_streaming(iter(history))
+    (kevin_address,), (stamp_address,) = balances["kevin"], balances["stamp"]
+    assert kevin_address is stamp_address
+
+
+@pytest.mark.unit
+def test_iter_src20_valid_rows_uses_server_side_cursor():
+    history = _history(0, 10)
+    db = _ss_db(history)
+    (cursor,) = db.ss_cursors
+
+    assert list(database.iter_src20_valid_rows(db, 790010)) == history
+
+    db.cursor.assert_called_once_with(database.SSCursor)
+    query, params = cursor.execute.call_args.args
+    assert "ORDER by block_index" in query
+    assert params == (790010,)
+    cursor.fetchall.assert_not_called()
+    cursor.close.assert_called_once()
+
+
+@pytest.mark.unit
+def test_streamed_balances_need_update():
+    history = _history(1)
+    balances = database.calculate_balances_streaming(iter(history))
+    existing = [(row[1], row[2], row[3], row[4]) for row in database.iter_balance_rows(balances)]
+
+    assert not database.streamed_balances_need_update(_ss_db(existing), balances)
+    assert database.streamed_balances_need_update(_ss_db(existing[1:]), balances)
+    changed = [existing[0][:3] + (existing[0][3] + D("0.0001"),)] + existing[1:]
+    assert database.streamed_balances_need_update(_ss_db(changed), balances)
+    assert database.streamed_balances_need_update(_ss_db(existing + [("kevin", "h", "bc1qzzz", D(1))]), balances)
+
+
+@pytest.mark.unit
+def test_rebuild_balances_streaming_path():
+    history = _history(2)
+    expected = database.calculate_balances(history)
+    cursor, ss_cursor = MagicMock(), MagicMock()
+    ss_cursor.fetchmany.return_value = []  # balances table is empty
+    long_db = MagicMock()
+    long_db.cursor.side_effect = lambda cursor_class=None: ss_cursor if cursor_class is database.SSCursor else cursor
+
+    with patch.object(database.config, "BALANCE_REBUILD_STREAMING", True), patch.object(
+        database.config, "BALANCE_JOURNAL_ENABLED", False
+    ), patch.object(database, "DEBUG_SKIP_REBUILD_BALANCES", False), patch.object(
+        database, "iter_src20_valid_rows", return_value=iter(history)
+    ), patch.object(
+        database, "get_src20_valid_list"
+    ) as get_list, patch.object(
+        database.db_manager, "get_long_running_connection", return_value=long_db
+    ), patch.object(
+        database.config, "DB_REBUILD_BATCH_SIZE", 7
+    ):
+        database.rebuild_balances(MagicMock())
+
+    get_list.assert_not_called()
+    inserted = [row for c in cursor.executemany.call_args_list for row in c.args[1]]
+    assert all(len(c.args[1]) <= 7 for c in cursor.executemany.call_args_list)
+    assert {row[0]: row[4] for row in inserted} == {key: value["amt"] for key, value in expected.items()}
+    assert any("RENAME TABLE balances" in c.args[0] for c in cursor.execute.call_args_list)
+
+
+@pytest.mark.unit
+def test_rebuild_balances_batches_count_only_non_zero_rows():
+    balances = {
+        f"kevin_{n}": {
+            "tick": "kevin",
+            "tick_hash": "h",
+            "address": str(n),
+            "amt": D(n % 2),  # every other balance is zero
+            "last_update": n,
+            "block_time": None,
+        }
+        for n in range(10)
+    }
+    cursor = MagicMock()
+    long_db = MagicMock()
+    long_db.cursor.return_value = cursor
+
+    with patch.object(database.config, "BALANCE_REBUILD_STREAMING", False), patch.object(
+        database.config, "BALANCE_JOURNAL_ENABLED", False
+    ), patch.object(database, "DEBUG_SKIP_REBUILD_BALANCES", False), patch.object(
+        database, "get_existing_balances", return_value={}
+    ), patch.object(
+        database, "get_src20_valid_list", return_value=[]
+    ), patch.object(
+        database, "calculate_balances", return_value=balances
+    ), patch.object(
+        database.db_manager, "get_long_running_connection", return_value=long_db
+    ), patch.object(
+        database.config, "DB_REBUILD_BATCH_SIZE", 2
+    ):
+        database.rebuild_balances(MagicMock())
+
+    batches = [c.args[1] for c in cursor.executemany.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert sorted(row[0] for batch in batches for row in batch) == [f"kevin_{n}" for n in (1, 3, 5, 7, 9)]
@@ -0,0 +1,115 @@
+"""Unit tests for the binary reparse snapshot format (index_core.reparse.binary_snapshot)."""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from index_core.reparse import binary_snapshot
+from index_core.reparse.binary_snapshot import (
+    BinarySnapshot,
+    Divergence,
+    SnapshotFormatError,
+    first_divergence,
+    write_snapshot,
+)
+from index_core.reparse.snapshot import SnapshotManager
+
+CI_HASHES = os.path.join(os.path.dirname(__file__), "..", "snapshots", "ci_consensus_hashes.json")
+
+
+def _entry(block_index, ledger=False):
+    return {
+        "block_hash": f"{block_index:064x}",
+        "ledger_hash": f"{block_index + 1:064x}" if ledger else "",
+        "txlist_hash": f"{block_index + 2:064x}",
+        "messages_hash": f"{block_index + 3:064x}",
+    }
+
+
+@pytest.mark.unit
+def test_json_round_trip_of_the_ci_hashes(tmp_path):
+    binary_path = tmp_path / "ci.bin"
+    json_path = tmp_path / "ci.json"
+    with open(CI_HASHES) as f:
+        reference = json.load(f)
+
+    assert binary_snapshot.from_json(CI_HASHES, binary_path) == len(reference["hashes"])
+    assert binary_snapshot.to_json(binary_path, json_path) == len(reference["hashes"])
+
+    with open(json_path) as f:
+        exported = json.load(f)
+    kept = set(binary_snapshot.HASH_FIELDS) | {"stamp_counter_before"}
+    assert exported["metadata"] == reference["metadata"]
+    assert exported["hashes"] == {
+        block_index: {k: v for k, v in entry.items() if k in kept} for block_index, entry in reference["hashes"].items()
+    }
+    assert os.path.getsize(binary_path) < os.path.getsize(CI_HASHES) / 3
+
+
+@pytest.mark.unit
+def test_sparse_index_lookups_and_ranges(tmp_path):
+    heights = [100 + 3 * n for n in range(50)]  # gaps between records
+    path = tmp_path / "snap.bin"
+    write_snapshot(path, {str(h): _entry(h, ledger=h % 2 == 0) for h in heights}, {"source": "test"}, index_stride=4)
+
+    with BinarySnapshot(path) as snapshot:
+        assert len(snapshot) == 50 and (snapshot.first_block, snapshot.last_block) == (100, 247)
+        assert snapshot.metadata == {"source": "test"}
+        assert all(snapshot.get(h) == _entry(h, ledger=h % 2 == 0) for h in heights)
+        assert snapshot.get(101) is None and snapshot.get(99) is None and snapshot.get(300) is None
+        assert 103 in snapshot and 104 not in snapshot
+        assert [h for h, _ in snapshot.iter_range(110, 125)] == [112, 115, 118, 121, 124]
+        assert snapshot.missing_blocks()[:4] == [101, 102, 104, 105]
+
+    with pytest.raises(SnapshotFormatError):
+        write_snapshot(tmp_path / "bad.bin", {1: {"txlist_hash": "abc"}})
+    with pytest.raises(SnapshotFormatError):
+        BinarySnapshot(CI_HASHES)
+    with pytest.raises(SnapshotFormatError, match="Duplicate block 5"):
+        write_snapshot(tmp_path / "dup.bin", [("5", _entry(5)), (5, _entry(6))])
+
+
+@pytest.mark.unit
+def test_first_divergence_stops_at_the_first_mismatch(tmp_path):
+    hashes = {h: _entry(h) for h in range(1000, 3000)}
+    write_snapshot(tmp_path / "left.bin", hashes)
+    write_snapshot(tmp_path / "same.bin", hashes)
+    changed = dict(hashes)
+    changed[2500] = {**hashes[2500], "messages_hash": "ff" * 32}
+    changed[2700] = {**hashes[2700], "txlist_hash": "ee" * 32}
+    write_snapshot(tmp_path / "changed.bin", changed)
+    write_snapshot(tmp_path / "short.bin", {h: e for h, e in hashes.items() if h != 1500})
+
+    with (
+        BinarySnapshot(tmp_path / "left.bin") as left,
+        BinarySnapshot(tmp_path / "same.bin") as same,
+        BinarySnapshot(tmp_path / "changed.bin") as changed_snapshot,
+        BinarySnapshot(tmp_path / "short.bin") as short,
+        patch.object(binary_snapshot, "COMPARE_RUN", 256),
+    ):
+        assert first_divergence(left, same) is None
+        with patch.object(BinarySnapshot, "record_at", autospec=True, side_effect=BinarySnapshot.record_at) as record_at:
+            divergence = first_divergence(left, changed_snapshot)
+        assert divergence == Divergence(2500, "messages_hash", hashes[2500]["messages_hash"], "ff" * 32)
+        # Only records inside the differing run up to the mismatch are decoded
+        assert record_at.call_count <= 2 * 256
+        assert first_divergence(left, changed_snapshot, start_block=2501).block_index == 2700
+        assert first_divergence(left, changed_snapshot, end_block=2499) is None
+        assert first_divergence(left, short) == Divergence(1500, "missing", "present", None)
+        assert first_divergence(short, left, start_block=1400) == Divergence(1500, "missing", None, "present")
+
+
+@pytest.mark.unit
+def test_snapshot_manager_reads_and_updates_binary_snapshots(tmp_path):
+    manager = SnapshotManager(str(tmp_path / "reference_hashes.bin"))
+    manager.save_snapshot({str(h): _entry(h) for h in range(10, 20)}, metadata={"description": "test"})
+
+    assert binary_snapshot.is_binary_snapshot(manager.snapshot_path)
+    assert manager.get_expected_hash(15) == _entry(15)
+    assert manager.get_expected_hash(25) is None
+
+    manager.update_metadata({"reparse_progress": {"last_validated_block": 12}})
+    assert manager.get_metadata() == {"description": "test", "reparse_progress": {"last_validated_block": 12}}
+    assert manager.load_snapshot()["hashes"]["19"] == _entry(19)
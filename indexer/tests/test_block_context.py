@@ -0,0 +1,165 @@
+"""Unit tests for the per-block lookup indexes (index_core.block_context).
+
+Each BlockContext lookup replaces a scan over the block's processed results, so
+every test drives the original scan and the indexed path over the same data and
+requires identical answers.
+"""
+
+import random
+from collections import namedtuple
+from decimal import Decimal as D
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import index_core.database as database
+from index_core.block_context import BlockContext
+from index_core.fetch_utils import find_issuance_by_tx_hash
+from index_core.src20 import _get_or_create_balance_entry, get_running_mint_total, get_running_user_balances
+from index_core.src101 import get_owner_expire_data_from_running
+
+TICKS = [("kevin", "hash_kevin"), ("stamp", "hash_stamp")]
+ADDRESSES = ["bc1qaaa", "bc1qbbb", "bc1qccc", "bc1qddd"]
+
+
+def _empty_db():
+    db = MagicMock()
+    db.cursor.return_value.fetchall.return_value = []
+    return db
+
+
+def _random_op(rng, position):
+    tick, tick_hash = rng.choice(TICKS)
+    creator = rng.choice(ADDRESSES)
+    destination = creator if rng.random() < 0.2 else rng.choice(ADDRESSES)
+    op = {"tx_hash": f"tx{position}", "tick": tick, "tick_hash": tick_hash, "creator": creator, "destination": destination}
+    if rng.random() < 0.5:
+        op["op"] = "MINT"
+        if rng.random() < 0.9:
+            op["valid"] = 1
+            op["total_minted"] = D(position)
+            op["total_balance_destination"] = D(rng.randint(0, 1000))
+    else:
+        op["op"] = "TRANSFER"
+        if rng.random() < 0.9:
+            op["valid"] = 1
+            op["total_balance_creator"] = D(rng.randint(0, 1000))
+            op["total_balance_destination"] = D(rng.randint(0, 1000))
+    return op
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("seed", range(5))
+def test_running_balances_match_block_scan(seed):
+    rng = random.Random(seed)
+    block_context = BlockContext()
+    processed_src20_in_block = []
+    db = _empty_db()
+
+    with patch("index_core.src20.get_total_src20_minted_from_db", return_value=D(0)):
+        for position in range(300):
+            tick, tick_hash = rng.choice(TICKS)
+            addresses = rng.sample(ADDRESSES, rng.randint(1, 3))
+
+            scanned = get_running_user_balances(db, tick, tick_hash, addresses, processed_src20_in_block)
+            indexed = get_running_user_balances(db, tick, tick_hash, addresses, [], block_context=block_context)
+            assert [(b.address, b.total_balance) for b in indexed] == [(b.address, b.total_balance) for b in scanned]
+
+            assert get_running_mint_total(db, [], tick, block_context=block_context) == get_running_mint_total(
+                db, processed_src20_in_block, tick
+            )
+
+            op = _random_op(rng, position)
+            processed_src20_in_block.append(op)
+            block_context.record_src20(op)
+
+
+@pytest.mark.unit
+def test_one_transaction_resolves_one_address():
+    """A transfer touching both queried addresses only answers the first; the other comes from earlier."""
+    block_context = BlockContext()
+    processed_src20_in_block = [
+        {"op": "MINT", "valid": 1, "tick": "kevin", "tick_hash": "h", "creator": "b", "destination": "b"},
+        {"op": "TRANSFER", "valid": 1, "tick": "kevin", "tick_hash": "h", "creator": "a", "destination": "b"},
+    ]
+    processed_src20_in_block[0]["total_balance_destination"] = D(5)
+    processed_src20_in_block[1].update(total_balance_creator=D(1), total_balance_destination=D(9))
+    for op in processed_src20_in_block:
+        block_context.record_src20(op)
+
+    assert block_context.get_src20_balances("kevin", "h", ["a", "b"]) == [("a", D(1)), ("b", D(5))]
+    scanned = get_running_user_balances(_empty_db(), "kevin", "h", ["a", "b"], processed_src20_in_block)
+    assert [(b.address, b.total_balance) for b in scanned] == [("a", D(1)), ("b", D(5))]
+
+
+@pytest.mark.unit
+def test_reissue_matches_block_scan():
+    block_context = BlockContext()
+    valid_stamps_in_block = []
+    for cpid, is_btc_stamp, is_cursed in [("A1", True, False), ("A2", False, True), ("A3", False, False)]:
+        stamp = {"cpid": cpid, "is_btc_stamp": is_btc_stamp, "is_cursed": is_cursed}
+        valid_stamps_in_block.append(stamp)
+        block_context.record_stamp(stamp)
+
+    for cpid in ["A1", "A2", "A3", "A4"]:
+        assert block_context.has_reissue(cpid) == bool(database.check_reissue_in_block(valid_stamps_in_block, cpid))
+
+
+@pytest.mark.unit
+def test_tx_order_and_issuances():
+    Result = namedtuple("Result", ["tx_hash"])
+    txhash_list = [f"tx{i}" for i in range(50)]
+    issuances = [{"tx_hash": "tx3", "cpid": "A1"}, None, {"tx_hash": "tx3", "cpid": "A2"}, {"tx_hash": "tx7", "cpid": "A3"}]
+    block_context = BlockContext(txhash_list, issuances)
+
+    shuffled = [Result(tx_hash) for tx_hash in random.Random(0).sample(txhash_list, len(txhash_list))]
+    assert block_context.sort_results(shuffled) == sorted(shuffled, key=lambda x: txhash_list.index(x.tx_hash))
+    for tx_hash in ["tx3", "tx7", "tx9"]:
+        assert find_issuance_by_tx_hash(block_context.issuances, tx_hash) == find_issuance_by_tx_hash(issuances, tx_hash)
+
+
+@pytest.mark.unit
+def test_balance_entry_index_matches_scan():
+    rng = random.Random(1)
+    scanned, indexed, balance_index = [], [], {}
+    for _ in range(200):
+        tick, tick_hash = rng.choice(TICKS)
+        address = rng.choice(ADDRESSES)
+        amt = D(rng.randint(1, 10))
+        _get_or_create_balance_entry(scanned, tick, tick_hash, address)["credit"] += amt
+        _get_or_create_balance_entry(indexed, tick, tick_hash, address, balance_index)["credit"] += amt
+    assert indexed == scanned
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("seed", range(3))
+def test_src101_owner_lookup_matches_block_scan(seed):
+    rng = random.Random(seed)
+    names = ["alice", "bob", "carol", "dave"]
+    block_context = BlockContext()
+    processed_src101_in_block = []
+    for position in range(60):
+        picked = rng.sample(names, rng.randint(1, 2))
+        op = {
+            "hash": rng.choice(["deploy_a", "deploy_b"]),
+            "tokenid_utf8": picked if rng.random() < 0.5 else picked[0],
+            "valid": 1 if rng.random() < 0.8 else 0,
+            "src101_owner": f"owner{position}" if rng.random() < 0.9 else None,
+            "src101_preowner": f"owner{position - 1}",
+            "expire_timestamp": 1700000000 + position if rng.random() < 0.9 else None,
+            "address_btc": rng.choice(["bc1qaaa", None]),
+            "address_eth": None,
+            "txt_data": {"n": position},
+            "prim": rng.random() < 0.5,
+        }
+        processed_src101_in_block.append(op)
+        block_context.record_src101(op)
+
+        with patch("index_core.src101.get_owner_expire_data_from_db", return_value="db"):
+            for deploy_hash in ["deploy_a", "deploy_b"]:
+                for name in names + ["erin"]:
+                    scanned = get_owner_expire_data_from_running(None, processed_src101_in_block, deploy_hash, name)
+                    indexed = get_owner_expire_data_from_running(
+                        None, processed_src101_in_block, deploy_hash, name, block_context=block_context
+                    )
+                    assert indexed == scanned
@@ -0,0 +1,209 @@
+"""Unit tests for the staged block look-ahead (index_core.block_lookahead).
+
+The look-ahead prepares fetch/filter/decode results for upcoming blocks on a
+background thread. These tests assert that a prepared block matches what
+follow() would compute inline (filter height N - 1, decode against block N,
+results in block order) and that a prepared block is only handed out when the
+block hash, CP issuances and filter height still match at consume time.
+
+DB-free and network-free: the backend, filter and decode steps are mocked.
+"""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import config
+import index_core.block_lookahead as block_lookahead
+import index_core.util as util
+from index_core.block_lookahead import BlockLookahead, issuances_for_block
+from index_core.block_validation import filter_block_transactions
+from index_core.transaction_utils import TxResult
+
+
+def _tx_result(tx_hash, data=b"stamp"):
+    return TxResult(None, "src", None, "dst", 0, 0, 0, 0.0, data, None, 1, False, tx_hash, None, None, None, None, False)
+
+
+class _FakePipeline:
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+    def peek_block(self, block_index):
+        return self.blocks.get(block_index)
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Mock backend/filter/decode for a small chain of three-tx blocks."""
+    block_hashes = {idx: f"hash{idx}" for idx in range(100, 110)}
+    txs = {f"hash{idx}": [f"{idx}a", f"{idx}b", f"{idx}c"] for idx in range(100, 110)}
+
+    backend = MagicMock()
+    backend.getblockcount.return_value = 109
+    backend.getblockhash.side_effect = lambda idx: block_hashes[idx]
+    backend.get_tx_list.side_effect = lambda block_hash: (
+        txs[block_hash],
+        {tx: f"hex-{tx}" for tx in txs[block_hash]},
+        1700000000,
+        "prev",
+        1.0,
+    )
+    monkeypatch.setattr(block_lookahead, "backend_instance", backend)
+
+    filter_calls = []
+
+    def fake_filter(block_data, stamp_issuances=None, current_block_index=None):
+        filter_calls.append(current_block_index)
+        tx_hash_list = [tx["txid"] for tx in block_data["tx"]]
+        # Keep every candidate but the first, like a coinbase being filtered out
+        return tx_hash_list, {tx["txid"]: tx["hex"] for tx in block_data["tx"][1:]}
+
+    decode_calls = []
+
+    def fake_process_tx(db, tx_hash, block_index, stamp_issuances, raw_transactions, current_block_index=None):
+        decode_calls.append((tx_hash, block_index, current_block_index))
+        # Finish out of order so the stage has to restore block order
+        time.sleep(0.01 if tx_hash.endswith("b") else 0)
+        return _tx_result(tx_hash)
+
+    monkeypatch.setattr(block_lookahead, "filter_block_transactions", fake_filter)
+    monkeypatch.setattr(block_lookahead, "process_tx", fake_process_tx)
+    monkeypatch.setattr(block_lookahead, "prefetch_source_prevouts", lambda raw: None)
+
+    return {"backend": backend, "hashes": block_hashes, "filter_calls": filter_calls, "decode_calls": decode_calls}
+
+
+def _lookahead(blocks, depth=2):
+    lookahead = BlockLookahead(_FakePipeline(blocks), depth=depth, decode_workers=2)
+    lookahead.decode_executor = block_lookahead.concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    return lookahead
+
+
+@pytest.mark.unit
+def test_prepare_block_matches_inline_processing(chain):
+    lookahead = _lookahead({101: {"issuances": []}})
+    try:
+        prepared = lookahead._prepare_block(101)
+    finally:
+        lookahead.decode_executor.shutdown(wait=True)
+
+    assert prepared.block_hash == "hash101"
+    assert prepared.n_txs == 3
+    assert prepared.n_candidates == 2
+    assert prepared.txhash_list == ["101a", "101b", "101c"]
+    # Filter runs at height N - 1 and decode against N, exactly like follow()
+    assert chain["filter_calls"] == [100]
+    assert prepared.filter_block_index == 100
+    assert {call[1:] for call in chain["decode_calls"]} == {(101, 101)}
+    assert [r.tx_hash for r in prepared.tx_results] == ["101b", "101c"]
+    assert all(r.block_hash == "hash101" and r.block_time == 1700000000 for r in prepared.tx_results)
+
+
+@pytest.mark.unit
+def test_prepare_block_waits_for_cp_data_and_tip(chain):
+    lookahead = _lookahead({101: {"issuances": []}, 110: {"issuances": []}})
+
+    assert lookahead._prepare_block(102) is None  # no CP data queued yet
+    assert lookahead._prepare_block(110) is None  # beyond the tip
+    chain["backend"].get_tx_list.assert_not_called()
+
+
+@pytest.mark.unit
+def test_take_hands_out_matching_block_and_advances_window(chain):
+    lookahead = _lookahead({101: {"issuances": []}, 102: {"issuances": []}})
+    try:
+        lookahead.next_block = 101
+        lookahead.prepared[101] = lookahead._prepare_block(101)
+        lookahead.prepared[102] = lookahead._prepare_block(102)
+    finally:
+        lookahead.decode_executor.shutdown(wait=True)
+
+    prepared = lookahead.take(101, "hash101", [], 100)
+
+    assert prepared is not None and prepared.block_index == 101
+    assert lookahead.next_block == 102
+    assert sorted(lookahead.prepared) == [102]
+    assert lookahead.hits == 1
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "block_hash,issuances,filter_block_index",
+    [
+        ("reorged", [], 100),
+        ("hash101", [{"tx_hash": "101a"}], 100),
+        ("hash101", [], 99),
+    ],
+)
+def test_take_discards_stale_prepared_blocks(chain, block_hash, issuances, filter_block_index):
+    lookahead = _lookahead({101: {"issuances": []}, 102: {"issuances": []}})
+    try:
+        lookahead.next_block = 101
+        lookahead.prepared[101] = lookahead._prepare_block(101)
+        lookahead.prepared[102] = lookahead._prepare_block(102)
+    finally:
+        lookahead.decode_executor.shutdown(wait=True)
+    generation = lookahead.generation
+
+    assert lookahead.take(101, block_hash, issuances, filter_block_index) is None
+    # Later heights were prepared on the same stale view and are dropped too
+    assert lookahead.prepared == {}
+    assert lookahead.generation == generation + 1
+    assert lookahead.invalidations == 1
+    assert lookahead.next_block == 102
+
+
+@pytest.mark.unit
+def test_worker_keeps_window_prepared(chain):
+    blocks = {idx: {"issuances": []} for idx in range(101, 106)}
+    lookahead = BlockLookahead(_FakePipeline(blocks), depth=2, decode_workers=2)
+    lookahead.start(101)
+    try:
+        deadline = time.time() + 5
+        while sorted(lookahead.get_stats()["prepared"]) != [101, 102] and time.time() < deadline:
+            time.sleep(0.01)
+        assert lookahead.get_stats()["prepared"] == [101, 102]
+
+        assert lookahead.take(101, "hash101", [], 100) is not None
+        deadline = time.time() + 5
+        while lookahead.get_stats()["prepared"] != [102, 103] and time.time() < deadline:
+            time.sleep(0.01)
+        assert lookahead.get_stats()["prepared"] == [102, 103]
+
+        # A rollback/reorg repositions the window
+        lookahead.reset(104)
+        deadline = time.time() + 5
+        while 104 not in lookahead.get_stats()["prepared"] and time.time() < deadline:
+            time.sleep(0.01)
+        assert lookahead.take(104, "hash104", [], 103) is not None
+    finally:
+        lookahead.stop()
+
+    assert not lookahead.worker_thread.is_alive()
+    assert lookahead.prepared == {}
+
+
+@pytest.mark.unit
+def test_issuances_for_block_mirrors_follow():
+    assert issuances_for_block(None) is None
+    assert issuances_for_block({"error": "Critical block missing from XCP API"}) is None
+    assert issuances_for_block({"fallback_mode": True, "issuances": [{"tx_hash": "x"}]}) == []
+    assert issuances_for_block({"issuances": None}) == []
+    assert issuances_for_block({"issuances": [{"tx_hash": "x"}]}) == [{"tx_hash": "x"}]
+
+
+@pytest.mark.unit
+def test_filter_block_transactions_uses_explicit_filter_height(monkeypatch):
+    """current_block_index overrides the global for the SRC-20 genesis check."""
+    monkeypatch.setattr(util, "CURRENT_BLOCK_INDEX", config.BTC_SRC20_GENESIS_BLOCK + 10)
+    block_data = {"tx": [{"txid": "issuance", "hex": "00"}, {"txid": "other", "hex": "zz"}]}
+    issuances = [{"tx_hash": "issuance"}]
+
+    _, raw_transactions = filter_block_transactions(
+        block_data, stamp_issuances=issuances, current_block_index=config.BTC_SRC20_GENESIS_BLOCK - 10
+    )
+
+    # Pre-genesis path: only the issuance is kept and the non-issuance is never parsed
+    assert raw_transactions == {"issuance": "00"}
@@ -0,0 +1,259 @@
+"""Tests for the Bitcoin block prefetch queue and the binary REST fetch path.
+
+Backend.getblock_raw is exercised against a local stub HTTP server standing in
+for bitcoind's ``/rest/block/<hash>.bin`` endpoint; BlockPrefetcher runs
+against a fake backend so the byte budget and reorg eviction are deterministic.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from bitcoin.core import CBlock, CMutableTransaction, CMutableTxIn, CMutableTxOut, COutPoint, CScript, b2lx, lx
+
+from index_core.backend import Backend
+from index_core.block_prefetch import BlockPrefetcher
+
+PREV_HASH = "00000000000000000002a7c4c1e48d76c5a37902165a270156b7a8d72728a054"
+
+
+def _make_block():
+    """Build a small serialized block: a coinbase plus one spending transaction."""
+    coinbase = CMutableTransaction(
+        [CMutableTxIn(COutPoint(), CScript(b"\x03\x01\x02\x03"))],
+        [CMutableTxOut(625000000, CScript(b"\x51"))],
+    )
+    spend = CMutableTransaction(
+        [CMutableTxIn(COutPoint(lx("11" * 32), 0), CScript(b"\x00"))],
+        [CMutableTxOut(1000, CScript(b"\x6a\x04stmp"))],
+    )
+    block = CBlock(
+        nVersion=0x20000000,
+        hashPrevBlock=lx(PREV_HASH),
+        nTime=1700000000,
+        nBits=0x1D00FFFF,
+        nNonce=0,
+        vtx=[coinbase, spend],
+    )
+    return block.serialize(), [b2lx(coinbase.GetTxid()), b2lx(spend.GetTxid())]
+
+
+RAW_BLOCK, TXIDS = _make_block()
+BLOCK_HASH = "00" * 31 + "aa"
+
+
+class _RestHandler(BaseHTTPRequestHandler):
+    blocks = {}
+    requests = []
+
+    def do_GET(self):
+        _RestHandler.requests.append(self.path)
+        prefix, suffix = "/rest/block/", ".bin"
+        block_hash = self.path[len(prefix) : -len(suffix)] if self.path.startswith(prefix) else None
+        body = _RestHandler.blocks.get(block_hash)
+        if body is None or not self.path.endswith(suffix):
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def rest_server():
+    _RestHandler.blocks = {BLOCK_HASH: RAW_BLOCK}
+    _RestHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backend():
+    Backend._instance = None
+    with patch("index_core.backend.RUST_PARSER_AVAILABLE", False):
+        instance = Backend()
+    yield instance
+    Backend._instance = None
+
+
+@pytest.mark.unit
+def test_getblock_raw_uses_rest_endpoint(backend, rest_server):
+    with patch("index_core.backend.config.BACKEND_REST_ENABLED", True), patch(
+        "index_core.backend.config.BACKEND_REST_URL", rest_server
+    ), patch.object(backend, "rpc") as mock_rpc:
+        raw_block = backend.getblock_raw(BLOCK_HASH)
+
+    assert raw_block == RAW_BLOCK
+    assert _RestHandler.requests == [f"/rest/block/{BLOCK_HASH}.bin"]
+    mock_rpc.assert_not_called()
+
+
+@pytest.mark.unit
+def test_getblock_raw_falls_back_to_rpc_and_gives_up_on_rest(backend, rest_server):
+    missing_hash = "00" * 31 + "bb"
+    with patch("index_core.backend.config.BACKEND_REST_ENABLED", True), patch(
+        "index_core.backend.config.BACKEND_REST_URL", rest_server
+    ), patch.object(backend, "rpc", return_value=RAW_BLOCK.hex()) as mock_rpc:
+        for _ in range(Backend.REST_MAX_FAILURES + 2):
+            assert backend.getblock_raw(missing_hash) == RAW_BLOCK
+
+    mock_rpc.assert_called_with("getblock", [missing_hash, 0])
+    # REST is skipped once it has failed REST_MAX_FAILURES times in a row
+    assert len(_RestHandler.requests) == Backend.REST_MAX_FAILURES
+
+
+@pytest.mark.unit
+def test_getblock_raw_uses_rpc_when_rest_disabled(backend):
+    with patch("index_core.backend.config.BACKEND_REST_ENABLED", False), patch.object(
+        backend, "rpc", return_value=RAW_BLOCK.hex()
+    ) as mock_rpc:
+        assert backend.getblock_raw(BLOCK_HASH) == RAW_BLOCK
+    mock_rpc.assert_called_once_with("getblock", [BLOCK_HASH, 0])
+
+
+@pytest.mark.unit
+def test_parse_raw_block_matches_verbose_getblock_shape(backend):
+    tx_hash_list, raw_transactions, block_time, prev_block_hash, difficulty = backend.parse_raw_block(RAW_BLOCK)
+
+    assert tx_hash_list == TXIDS
+    assert list(raw_transactions) == TXIDS
+    assert all(bytes.fromhex(raw_transactions[txid]) in RAW_BLOCK for txid in TXIDS)
+    assert block_time == 1700000000
+    assert prev_block_hash == PREV_HASH
+    assert difficulty == 1.0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "bits,expected",
+    [
+        (0x1D00FFFF, 1.0),
+        # Block 840000 as reported by getblock
+        (0x17034219, 86388558925171.02),
+    ],
+)
+def test_difficulty_from_bits_matches_bitcoind(bits, expected):
+    assert Backend._difficulty_from_bits(bits) == expected
+
+
+@pytest.mark.unit
+def test_get_tx_list_consumes_prefetched_block(backend):
+    prefetcher = BlockPrefetcher(depth=2, max_bytes=1 << 20, backend=backend)
+    prefetcher.position = 100
+    prefetcher._store(100, BLOCK_HASH, RAW_BLOCK)
+    backend.block_prefetcher = prefetcher
+
+    with patch.object(backend, "rpc") as mock_rpc:
+        tx_hash_list, _, _, prev_block_hash, _ = backend.get_tx_list(BLOCK_HASH)
+
+    assert tx_hash_list == TXIDS
+    assert prev_block_hash == PREV_HASH
+    mock_rpc.assert_not_called()
+    assert prefetcher.hits == 1 and prefetcher.buffered_bytes == 0
+
+
+class _FakeChain:
+    """Minimal backend: heights map to hashes, each block is ``size`` bytes."""
+
+    def __init__(self, tip=120, size=100):
+        self.tip = tip
+        self.size = size
+        self.hashes = {h: f"hash{h}" for h in range(tip + 1)}
+        self.fetched = []
+
+    def getblockcount(self):
+        return self.tip
+
+    def getblockhash(self, height):
+        return self.hashes[height]
+
+    def getblock_raw(self, block_hash):
+        self.fetched.append(block_hash)
+        return block_hash.encode().ljust(self.size, b"\x00")
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.mark.unit
+def test_prefetcher_fills_window_within_byte_budget():
+    chain = _FakeChain()
+    prefetcher = BlockPrefetcher(depth=8, max_bytes=350, backend=chain)
+    prefetcher.start(100)
+    try:
+        assert _wait_for(lambda: prefetcher.get_stats()["buffered_blocks"] == 3)
+        time.sleep(0.1)
+        stats = prefetcher.get_stats()
+        # The fourth block would overshoot the budget, so only three are held
+        assert stats["buffered_blocks"] == 3
+        assert sorted(prefetcher.hash_by_height) == [100, 101, 102]
+
+        assert prefetcher.pop("hash100") is not None
+        prefetcher.advance(101)
+        assert _wait_for(lambda: 103 in prefetcher.hash_by_height)
+        # A popped height is never fetched twice
+        assert chain.fetched.count("hash100") == 1
+        assert prefetcher.pop("unknown") is None
+    finally:
+        prefetcher.stop()
+
+    stats = prefetcher.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["buffered_bytes"] == 0
+
+
+@pytest.mark.unit
+def test_block_evicted_for_budget_is_not_refetched_while_processor_is_stalled():
+    chain = _FakeChain(size=100)
+    prefetcher = BlockPrefetcher(depth=8, max_bytes=350, backend=chain)
+    prefetcher.position = 100
+
+    # Drive the worker's fetch step directly; the processor never pops
+    for _ in range(20):
+        height = prefetcher._next_height(chain.tip)
+        if height is None:
+            continue
+        block_hash = chain.getblockhash(height)
+        prefetcher._store(height, block_hash, chain.getblock_raw(block_hash))
+
+    # 100-102 fit; 103 overshoots once, is dropped, and is not asked for again
+    assert chain.fetched == ["hash100", "hash101", "hash102", "hash103"]
+    assert sorted(prefetcher.blocks) == ["hash100", "hash101", "hash102"]
+
+    prefetcher.pop("hash100")
+    prefetcher.advance(101)
+    assert prefetcher._next_height(chain.tip) == 103
+
+
+@pytest.mark.unit
+def test_prefetcher_stops_at_tip_and_evicts_reorged_blocks():
+    chain = _FakeChain(tip=103)
+    prefetcher = BlockPrefetcher(depth=8, max_bytes=1 << 20, backend=chain)
+    prefetcher.start(100)
+    try:
+        assert _wait_for(lambda: sorted(prefetcher.hash_by_height) == [100, 101, 102, 103])
+
+        chain.hashes[103] = "hash103-reorg"
+        assert _wait_for(lambda: prefetcher.hash_by_height.get(103) == "hash103-reorg")
+        assert prefetcher.reorg_evictions == 1
+        # The stale block can never be handed out
+        assert prefetcher.pop("hash103") is None
+        assert prefetcher.pop("hash103-reorg") is not None
+    finally:
+        prefetcher.stop()
@@ -627,5 +627,108 @@ class TestBlockValidationEdgeCases:
             assert result == ("hash1", "hash2", "hash3")
 
 
+class _CountingSQLiteDB:
+    """sqlite3 stand-in for the MySQL connection that counts the statements create_check_hashes issues."""
+
+    def __init__(self):
+        import sqlite3
+
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(
+            "CREATE TABLE blocks (block_index INTEGER PRIMARY KEY, block_hash TEXT, block_time INTEGER, "
+            "previous_block_hash TEXT, difficulty REAL, ledger_hash TEXT, txlist_hash TEXT, messages_hash TEXT, "
+            "indexed INTEGER)"
+        )
+        self.statements = 0
+
+    def cursor(self):
+        db = self
+
+        class _Cursor:
+            def __init__(self):
+                self._cursor = db.conn.cursor()
+
+            def execute(self, query, args=()):
+                db.statements += 1
+                self._cursor.execute(query.replace("%s", "?"), args)
+
+            def fetchall(self):
+                return self._cursor.fetchall()
+
+            def fetchone(self):
+                return self._cursor.fetchone()
+
+            def close(self):
+                self._cursor.close()
+
+        return _Cursor()
+
+    def insert_block(self, block_index):
+        self.conn.execute("INSERT INTO blocks (block_index, block_hash) VALUES (?, ?)", (block_index, f"{block_index:064x}"))
+
+    def hashes(self):
+        return self.conn.execute("SELECT ledger_hash, txlist_hash, messages_hash FROM blocks ORDER BY block_index").fetchall()
+
+
+class TestBlockHashState:
+    """create_check_hashes with a BlockHashState must match the database-driven path exactly"""
+
+    @staticmethod
+    def _block_inputs(block_index):
+        stamps = [{"stamp_number": block_index * 10 + n, "cpid": f"A{block_index}{n}", "tx_hash": f"tx{n}"} for n in range(2)]
+        src20 = "" if block_index <= 1003 or block_index % 3 == 0 else str([{"tick": "TEST", "amt": block_index}])
+        return stamps, src20, [f"tx{block_index}"]
+
+    @pytest.mark.unit
+    def test_hash_state_matches_database_path_with_fewer_queries(self):
+        from index_core.block_validation import BlockHashState, create_check_hashes
+
+        blocks = range(1000, 1012)
+        with patch.object(config, "BLOCK_FIRST", 1000), patch.object(config, "CP_SRC20_GENESIS_BLOCK", 1003), patch.object(
+            config, "FORCE", False
+        ):
+            reference_db, state_db = _CountingSQLiteDB(), _CountingSQLiteDB()
+            state = BlockHashState()
+            for block_index in blocks:
+                reference_db.insert_block(block_index)
+                state_db.insert_block(block_index)
+                reference = create_check_hashes(reference_db, block_index, *self._block_inputs(block_index))
+                cached = create_check_hashes(state_db, block_index, *self._block_inputs(block_index), hash_state=state)
+                assert cached == reference
+                state.commit(block_index)
+
+        assert state_db.hashes() == reference_db.hashes()
+        assert state.seeds == 1
+        # One SELECT + one UPDATE per block after the two seeding queries
+        assert state_db.statements == 2 * len(blocks) + 2
+        assert reference_db.statements > 4 * len(blocks)
+
+    @pytest.mark.unit
+    def test_rolled_back_blocks_reseed_from_database(self):
+        from index_core.block_validation import BlockHashState, create_check_hashes
+
+        with patch.object(config, "BLOCK_FIRST", 1000), patch.object(config, "CP_SRC20_GENESIS_BLOCK", 1003):
+            reference_db, state_db = _CountingSQLiteDB(), _CountingSQLiteDB()
+            state = BlockHashState()
+            for block_index in range(1000, 1008):
+                for db in (reference_db, state_db):
+                    db.insert_block(block_index)
+                create_check_hashes(reference_db, block_index, *self._block_inputs(block_index))
+                create_check_hashes(state_db, block_index, *self._block_inputs(block_index), hash_state=state)
+                state.commit(block_index)
+
+            # A reorg purges 1005+ and the replacement 1005 carries different content
+            for db in (reference_db, state_db):
+                db.conn.execute("DELETE FROM blocks WHERE block_index >= 1005")
+                db.insert_block(1005)
+            replacement = self._block_inputs(1006)
+            from_database = create_check_hashes(reference_db, 1005, *replacement)
+            replayed = create_check_hashes(state_db, 1005, *replacement, hash_state=state)
+
+        assert state.seeds == 2
+        assert replayed == from_database
+        assert state_db.hashes() == reference_db.hashes()
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
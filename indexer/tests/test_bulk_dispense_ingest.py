@@ -0,0 +1,149 @@
+"""Unit tests for bulk historical dispense ingestion (BulkDispenseIngester)."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import config
+from index_core.sales_history_processor import BulkDispenseIngester, SalesHistoryProcessor
+
+
+def _dispense(tx_hash, asset, btc_amount=1000, quantity=1):
+    return {
+        "tx_hash": tx_hash,
+        "asset": asset,
+        "source": "bc1qbuyer",
+        "destination": "bc1qdispenser",
+        "dispense_quantity": quantity,
+        "btc_amount": btc_amount,
+        "dispenser_tx_hash": "d" * 64,
+        "block_time": 1700000000,
+    }
+
+
+@pytest.fixture
+def processor():
+    with patch("index_core.sales_history_processor.DatabaseManager"), patch("index_core.sales_history_processor.Backend"):
+        processor = SalesHistoryProcessor()
+    processor.update_checkpoint = MagicMock()
+    return processor
+
+
+def _db(processor, stamp_cpids=("A111",), stamps_through_block=900000):
+    db = processor.db_manager.connect.return_value
+    cursor = db.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = [(cpid, n) for n, cpid in enumerate(stamp_cpids)]
+    cursor.fetchone.return_value = (stamps_through_block,)
+    cursor.rowcount = 0
+    return db, cursor
+
+
+def _fetch(pages):
+    """A fetch_xcp stand-in serving ``pages[block]`` (a list of result pages) with next_cursor paging."""
+    calls = []
+
+    def fetch(endpoint, params):
+        calls.append((endpoint, dict(params)))
+        block = int(endpoint.split("/")[2])
+        if block not in pages:
+            return None
+        page = int(params.get("cursor", 0))
+        next_cursor = str(page + 1) if page + 1 < len(pages[block]) else None
+        return {"result": pages[block][page], "next_cursor": next_cursor}
+
+    return fetch, calls
+
+
+def _inserts(cursor):
+    return [c.args for c in cursor.execute.call_args_list if "INSERT IGNORE" in c.args[0]]
+
+
+@pytest.mark.unit
+def test_run_pages_blocks_and_checkpoints_every_chunk(processor):
+    db, cursor = _db(processor)
+    fetch, calls = _fetch({100: [[_dispense("t1", "A111")], [_dispense("t2", "A111")]], 101: [[]], 102: [[]]})
+
+    with patch("index_core.fetch_utils.fetch_xcp", side_effect=fetch):
+        assert BulkDispenseIngester(processor, workers=2, chunk_blocks=2).run(100, 102) is True
+
+    assert [params.get("cursor") for endpoint, params in calls if endpoint == "/blocks/100/dispenses"] == [None, "1"]
+    checkpoints = [c.args[:2] for c in processor.update_checkpoint.call_args_list]
+    assert checkpoints == [("dispenser_block", 101), ("dispenser_block", 102)]
+    ((sql, params),) = _inserts(cursor)
+    assert sql.count("NOW()") == 2
+    assert params[0] == "t1" and params[11] == "t2"
+    db.close.assert_called_once()
+
+
+@pytest.mark.unit
+def test_non_stamp_and_duplicate_dispenses_are_dropped_before_insert(processor):
+    db, cursor = _db(processor)
+    fetch, _ = _fetch({100: [[_dispense("t1", "A111", 3000, 3), _dispense("t2", "XCP"), _dispense("t1", "A111", 3000, 3)]]})
+
+    with patch("index_core.fetch_utils.fetch_xcp", side_effect=fetch):
+        ingester = BulkDispenseIngester(processor, workers=1, chunk_blocks=10)
+        assert ingester.run(100, 100) is True
+
+    ((sql, params),) = _inserts(cursor)
+    assert sql.count("NOW()") == 1
+    assert params[:4] == ["t1", 100, 1700000000, "A111"] and params[9] == 1000
+    assert ingester.stats["duplicates"] == 1 and ingester.stats["sales"] == 1 and ingester.stats["dispenses"] == 3
+
+
+@pytest.mark.unit
+def test_insert_batches_and_stamp_map_reload(processor):
+    db, cursor = _db(processor, stamps_through_block=100)
+    fetch, _ = _fetch({b: [[_dispense(f"t{b}{i}", "A111") for i in range(3)]] for b in (100, 101)})
+
+    with patch("index_core.fetch_utils.fetch_xcp", side_effect=fetch):
+        BulkDispenseIngester(processor, workers=1, chunk_blocks=1, insert_batch=2).run(100, 101)
+
+    assert [sql.count("NOW()") for sql, _ in _inserts(cursor)] == [2, 1, 2, 1]
+    stamp_loads = [c for c in cursor.execute.call_args_list if c.args[0].startswith("SELECT cpid, stamp")]
+    # Chunk 100 is covered by the first load; chunk 101 is past it and reloads
+    assert len(stamp_loads) == 2
+
+
+@pytest.mark.unit
+def test_failed_block_stops_before_its_chunk_commits(processor):
+    db, cursor = _db(processor)
+    fetch, _ = _fetch({100: [[_dispense("t1", "A111")]], 101: [[]]})
+
+    with patch("index_core.fetch_utils.fetch_xcp", side_effect=fetch):
+        with pytest.raises(RuntimeError, match="block 102"):
+            BulkDispenseIngester(processor, workers=2, chunk_blocks=2).run(100, 103)
+
+    # Only the first chunk is checkpointed, so a rerun resumes at block 102
+    assert [c.args[:2] for c in processor.update_checkpoint.call_args_list] == [("dispenser_block", 101)]
+    db.close.assert_called_once()
+
+
+@pytest.mark.unit
+def test_write_failure_rolls_back_the_chunk(processor):
+    db, cursor = _db(processor)
+    processor.update_checkpoint.side_effect = Exception("lock wait timeout")
+    fetch, _ = _fetch({100: [[_dispense("t1", "A111")]]})
+
+    with patch("index_core.fetch_utils.fetch_xcp", side_effect=fetch):
+        with pytest.raises(Exception, match="lock wait timeout"):
+            BulkDispenseIngester(processor, workers=1).run(100, 100)
+
+    db.rollback.assert_called_once()
+
+
+@pytest.mark.unit
+def test_catchup_uses_bulk_ingester_when_enabled(processor):
+    processor.get_checkpoint = MagicMock(return_value=900000)
+    processor.backend.getblockcount.return_value = 900010
+    processor.catchup_running = True
+
+    with (
+        patch.object(config, "SALES_HISTORY_BULK_INGEST_ENABLED", True),
+        patch("index_core.sales_history_processor.BulkDispenseIngester") as ingester,
+    ):
+        ingester.return_value.run.return_value = True
+        assert processor._fetch_all_dispenses() is True
+
+    start, end = ingester.return_value.run.call_args.args
+    assert (start, end) == (900001, 900010)
+    assert ingester.return_value.run.call_args.kwargs["should_continue"]() is True
@@ -0,0 +1,122 @@
+"""Unit tests for set-based collection market data aggregation (index_core.collection_aggregator)."""
+
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import config
+from index_core import collection_aggregator
+from index_core.collection_aggregator import (
+    CHANGED_COLLECTIONS_SQL,
+    COLLECTION_AGGREGATE_SQL,
+    aggregate_collections,
+    changed_collections,
+)
+from index_core.market_data_jobs import MarketDataJobScheduler
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+T1 = datetime(2026, 1, 1, 12, 30, 0)
+
+
+def _cursor_db(*results):
+    """A db whose cursor returns ``results`` from successive fetchall calls."""
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = list(results)
+    db = MagicMock()
+    db.cursor.return_value.__enter__.return_value = cursor
+    return db, cursor
+
+
+@pytest.mark.unit
+def test_aggregate_sql_computes_every_metric_in_one_statement():
+    sql = COLLECTION_AGGREGATE_SQL.format(collection_ids="UNHEX(%s)")
+
+    assert sql.count("%s") == 2 and "stamp_holder_cache" in sql and "stamp_market_data" in sql
+    for column in ("floor_price_btc", "avg_price_btc", "total_volume_btc", "unique_holders", "top_holder_percentage"):
+        assert f"{column} = agg.{column}" in sql
+    assert "MIN(CASE WHEN smd.floor_price_btc > 0" in sql
+    assert "MAX(held) * 100 / SUM(held)" in sql
+
+
+@pytest.mark.unit
+def test_aggregate_collections_chunks_ids_commits_once_and_invalidates_cache():
+    db, cursor = _cursor_db([("AA",), ("BB",), ("CC",)])
+
+    with (
+        patch.object(config, "COLLECTION_AGGREGATION_CHUNK", 2),
+        patch.object(collection_aggregator, "cache_manager") as cache,
+    ):
+        assert aggregate_collections(db) == 3
+
+    statements = [c.args for c in cursor.execute.call_args_list]
+    assert statements[0] == ("SELECT HEX(collection_id) FROM collections ORDER BY collection_id",)
+    (first_sql, first_params), (second_sql, second_params) = statements[1:]
+    assert first_sql.count("UNHEX(%s)") == 4 and first_params == ["AA", "BB", "AA", "BB"]
+    assert second_sql.count("UNHEX(%s)") == 2 and second_params == ["CC", "CC"]
+    assert db.commit.call_count == 1
+    cache.invalidate_cache_entries.assert_called_once_with(
+        "market_data", ["collection_market:AA", "collection_market:BB", "collection_market:CC"]
+    )
+
+    db.reset_mock()
+    assert aggregate_collections(db, []) == 0
+    assert not db.commit.called
+
+
+@pytest.mark.unit
+def test_changed_collections_follow_the_watermark():
+    db, cursor = _cursor_db([("BB",), ("AA",)])
+
+    assert changed_collections(db, T0) == ["AA", "BB"]
+    cursor.execute.assert_called_once_with(CHANGED_COLLECTIONS_SQL, (T0, T0))
+
+
+@pytest.mark.unit
+def test_member_count_check_matches_the_aggregate_total_stamps():
+    # total_stamps is COUNT(s.stamp) over StampTableV4; the change check must count the same way
+    assert "COUNT(s.stamp) AS total_stamps" in COLLECTION_AGGREGATE_SQL
+    assert "COUNT(s.stamp) AS members" in CHANGED_COLLECTIONS_SQL
+    assert "COUNT(*) AS members" not in CHANGED_COLLECTIONS_SQL
+
+
+@pytest.mark.unit
+def test_first_run_is_full_and_later_runs_only_cover_changed_collections():
+    scheduler = MarketDataJobScheduler()
+    db = MagicMock()
+
+    with (
+        patch("index_core.market_data_jobs.database_time", side_effect=[T0, T1, T1]),
+        patch("index_core.market_data_jobs.aggregate_collections", return_value=7) as aggregate,
+        patch("index_core.market_data_jobs.changed_collections", side_effect=[["AA"], []]) as changed,
+    ):
+        assert scheduler._aggregate_collection_market_data(db) == 7
+        assert aggregate.call_args[0] == (db, None)
+        assert scheduler._aggregate_collection_market_data(db) == 7
+        assert changed.call_args[0] == (db, T0) and aggregate.call_args[0] == (db, ["AA"])
+        assert scheduler._aggregate_collection_market_data(db) == 0
+
+    assert aggregate.call_count == 2
+    assert scheduler._collection_watermark == T1
+    metrics = scheduler.get_throughput_metrics()["collection_update"]
+    assert metrics["cycles"] == 2 and metrics["processed"] == 14 and metrics["batched"] is True
+
+
+@pytest.mark.unit
+def test_collection_job_uses_set_aggregation_when_enabled():
+    scheduler = MarketDataJobScheduler()
+    scheduler.database_manager = MagicMock()
+    coordinator = MagicMock()
+    coordinator.start_task.return_value = True
+
+    with (
+        patch.object(config, "COLLECTION_SET_AGGREGATION_ENABLED", True),
+        patch("index_core.background_coordinator.BackgroundCoordinator.get_instance", return_value=coordinator),
+        patch.object(scheduler, "_aggregate_collection_market_data") as aggregate,
+        patch.object(scheduler, "_process_collection_update") as per_collection,
+    ):
+        scheduler._update_collection_market_data_job()
+
+    aggregate.assert_called_once_with(scheduler.database_manager.connect.return_value)
+    assert not per_collection.called
+    scheduler.database_manager.connect.return_value.close.assert_called_once()
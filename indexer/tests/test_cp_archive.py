@@ -0,0 +1,113 @@
+"""Unit tests for the local CP response archive (index_core.cp_archive) and its fetch/pipeline hooks. Uses a temporary SQLite file."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from index_core import fetch_utils, pipeline_utils
+from index_core.cp_archive import CPArchive
+
+
+def _block(block_index, dispenses=None, tx_count=2):
+    block_hash = f"{block_index:064x}"
+    transactions = [
+        {"tx_hash": f"{block_index}-{i}", "block_hash": block_hash, "events": [{"event": "ASSET_ISSUANCE"}]}
+        for i in range(tx_count)
+    ]
+    block_data = {
+        "block_index": block_index,
+        "xcp_block_hash": block_hash if transactions else None,
+        "transactions": transactions,
+        "issuances": [{"cpid": f"A{block_index}", "quantity": 1, "divisible": False}],
+    }
+    if dispenses is not None:
+        block_data["dispenses"] = dispenses
+    return block_data
+
+
+@pytest.fixture
+def archive(tmp_path):
+    cp_archive = CPArchive(db_path=str(tmp_path / "cp_archive.db"))
+    yield cp_archive
+    cp_archive.close()
+
+
+@pytest.mark.unit
+def test_round_trip_and_content_addressed_blobs(archive):
+    blocks = {i: _block(i, dispenses=[]) for i in range(100, 105)}
+    blocks[105] = _block(105, dispenses=None)
+
+    assert archive.put_blocks(blocks) == 11
+    # Already archived responses are never rewritten
+    assert archive.put_blocks(blocks) == 0
+
+    found = archive.get_blocks(100, 105)
+    assert found[103] == {k: v for k, v in blocks[103].items() if k != "dispenses"}
+    assert set(found) == set(range(100, 106))
+
+    # Block 105 has no archived dispenses, so it is a miss when they are needed
+    with_dispenses = archive.get_blocks(100, 106, include_dispenses=True)
+    assert set(with_dispenses) == set(range(100, 105))
+    assert with_dispenses[100]["dispenses"] == []
+
+    # The five empty dispense lists share one blob
+    blob_count = archive.conn.execute("SELECT COUNT(*) FROM cp_blobs").fetchone()[0]
+    assert blob_count == 7
+    stats = archive.get_stats()
+    assert stats["hits"] == 11 and stats["misses"] == 2
+    assert stats["compression_ratio"] > 0
+
+
+@pytest.mark.unit
+def test_rollback_drops_responses_from_the_fork(archive):
+    archive.put_blocks({i: _block(i, dispenses=[{"tx_hash": f"d{i}"}]) for i in range(200, 210)})
+
+    archive.rollback(205)
+
+    assert set(archive.get_blocks(200, 209, include_dispenses=True)) == set(range(200, 205))
+    digests = archive.conn.execute("SELECT COUNT(*) FROM cp_blobs").fetchone()[0]
+    assert digests == 10
+
+    # A replacement branch can be archived after the rollback
+    reorged = _block(205, dispenses=[])
+    reorged["xcp_block_hash"] = "ff" * 32
+    assert archive.put_blocks({205: reorged}) == 2
+    assert archive.get_blocks(205, 205)[205]["xcp_block_hash"] == "ff" * 32
+
+
+@pytest.mark.unit
+def test_fetch_xcp_blocks_concurrent_reads_archive_first(archive):
+    archive.put_blocks({i: _block(i, dispenses=[]) for i in range(300, 304)})
+
+    async def fetch_from_api(block_index):
+        return _block(block_index, tx_count=1)
+
+    with (
+        patch.object(fetch_utils, "get_cp_archive", return_value=archive),
+        patch.object(fetch_utils, "fetch_block_transactions_with_pagination", side_effect=fetch_from_api) as fetch_block,
+    ):
+        cached = fetch_utils.fetch_xcp_blocks_concurrent(300, 303)
+        fetch_block.assert_not_called()
+        assert len(cached[302]["transactions"]) == 2
+
+        mixed = fetch_utils.fetch_xcp_blocks_concurrent(302, 305)
+
+    assert sorted(call.args[0] for call in fetch_block.call_args_list) == [304, 305]
+    assert len(mixed[303]["transactions"]) == 2
+    assert len(mixed[305]["transactions"]) == 1
+
+
+@pytest.mark.unit
+def test_pipeline_archives_only_buried_blocks(archive):
+    pipeline = pipeline_utils.CPBlocksPipeline.__new__(pipeline_utils.CPBlocksPipeline)
+    backend = MagicMock()
+    backend.getblockcount.return_value = 410
+
+    with (
+        patch.object(pipeline_utils, "get_cp_archive", return_value=archive),
+        patch.object(pipeline_utils, "backend_instance", backend),
+        patch.object(pipeline_utils.config, "CP_ARCHIVE_MIN_CONFIRMATIONS", 6),
+    ):
+        pipeline._archive_blocks({i: _block(i) for i in range(400, 411)})
+
+    assert sorted(archive.get_blocks(400, 410)) == list(range(400, 405))
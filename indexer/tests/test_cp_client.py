@@ -0,0 +1,144 @@
+"""Tests for the shared Counterparty HTTP client (index_core.cp_client) against a local aiohttp stub server."""
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+
+from index_core import fetch_utils
+from index_core.circuit_breaker import EndpointCircuitBreakers
+from index_core.cp_client import CircuitOpenError, CPClient
+
+
+class _StubCP:
+    """Minimal CP API on 127.0.0.1, served from its own event loop thread."""
+
+    def __init__(self):
+        self.hits = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.runner = None
+        self.url = asyncio.run_coroutine_threadsafe(self._start(), self.loop).result(10)
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get("/v2/blocks/{block_index}", self._block)
+        app.router.add_get("/v2/fail", self._fail)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v2"
+
+    async def _block(self, request):
+        self.hits += 1
+        return web.json_response({"result": {"block_index": int(request.match_info["block_index"])}})
+
+    async def _fail(self, request):
+        self.hits += 1
+        return web.Response(status=500, text="boom")
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+class _CountingLimiter:
+    def __init__(self):
+        self.calls = 0
+
+    async def acquire_async(self):
+        self.calls += 1
+        return 0.0
+
+
+@pytest.fixture
+def stub():
+    server = _StubCP()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client():
+    cp_client = CPClient(connections_per_node=4)
+    yield cp_client
+    cp_client.close()
+
+
+@pytest.mark.unit
+def test_sync_requests_reuse_one_pooled_connection(stub, client):
+    for block_index in range(5):
+        response = client.get(f"{stub.url}/blocks/{block_index}")
+        assert response.ok and response.json() == {"result": {"block_index": block_index}}
+
+    stats = client.get_stats()
+    assert stats["requests"] == 5
+    assert stats["connections_created"] == 1
+    assert stats["connections_reused"] == 4
+    assert stats["reuse_ratio"] == 80.0
+    assert stats["sessions"] == 1
+
+
+@pytest.mark.unit
+def test_get_async_from_foreign_and_client_loops(stub, client):
+    async def fetch_two():
+        first = await client.get_async(f"{stub.url}/blocks/1")
+        second = await client.get_async(f"{stub.url}/blocks/2")
+        return first.json(), second.json()
+
+    # From a caller's own event loop the request hops onto the client loop
+    assert asyncio.run(fetch_two()) == ({"result": {"block_index": 1}}, {"result": {"block_index": 2}})
+    # Running on the client loop itself awaits the pooled session directly
+    assert client.run(fetch_two())[1] == {"result": {"block_index": 2}}
+    assert client.get_stats()["connections_created"] == 1
+
+    async def sync_call_on_client_loop():
+        return client.run(fetch_two())
+
+    with pytest.raises(RuntimeError, match="deadlock"):
+        client.run(sync_call_on_client_loop())
+
+
+@pytest.mark.unit
+def test_circuit_breaker_and_rate_limiter_are_applied(stub):
+    breakers = EndpointCircuitBreakers(failure_threshold=2, recovery_timeout=60)
+    limiter = _CountingLimiter()
+    client = CPClient(rate_limiter_for=lambda url: limiter, circuit_breakers=breakers)
+    try:
+        assert client.get(f"{stub.url}/fail", breaker_key="node1").status == 500
+        assert client.get(f"{stub.url}/fail", breaker_key="node1").text == "boom"
+        assert breakers.get_state("node1") == "open"
+
+        with pytest.raises(CircuitOpenError):
+            client.get(f"{stub.url}/blocks/1", breaker_key="node1")
+        assert client.get(f"{stub.url}/blocks/1", breaker_key="node2").ok
+        assert breakers.get_state("node2") == "closed"
+
+        assert stub.hits == 3
+        assert limiter.calls == 3
+        assert client.get_stats()["rejected"] == 1
+    finally:
+        client.close()
+
+
+@pytest.mark.unit
+def test_fetch_xcp_paths_share_the_client(stub, client):
+    node = {"name": "stub", "url": stub.url}
+    with (
+        patch.object(fetch_utils, "cp_client", client),
+        patch.object(fetch_utils.config, "XCP_V2_NODES", [node]),
+        patch.object(fetch_utils, "get_healthy_nodes", return_value=[node]),
+    ):
+        assert fetch_utils.fetch_xcp("/blocks/7") == {"result": {"block_index": 7}}
+        assert asyncio.run(fetch_utils.fetch_xcp_async("/blocks/8")) == {"result": {"block_index": 8}}
+        assert fetch_utils.fetch_xcp("/fail") is None
+
+    stats = client.get_stats()
+    assert stats["requests"] == 3
+    assert stats["connections_created"] == 1
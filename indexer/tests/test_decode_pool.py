@@ -0,0 +1,138 @@
+"""Unit tests for process-pool candidate decoding (index_core.decode_pool).
+
+The pool path must produce exactly what process_tx produces on the thread-pool
+path. Both are run over the committed corpus of real stamp transactions in
+tests/fixtures/transaction_cache, with parent transactions synthesized from the
+recorded input values so no bitcoind is needed.
+"""
+
+import glob
+import json
+import os
+
+import pytest
+from bitcoin.core import CMutableTransaction, CMutableTxIn, CMutableTxOut, COutPoint, CScript, lx
+
+import index_core.util as util
+from index_core.decode_pool import DecodePool, decode_candidate, resolve_candidate_prevouts
+from index_core.transaction_utils import backend_instance, process_tx
+
+FIXTURES = [
+    path
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "transaction_cache", "*.json")))
+    if len(os.path.basename(path)) == 69  # <txid>.json; skips the cache's summary files
+]
+SOURCE_SCRIPT = CScript(b"\x00\x14" + bytes.fromhex("3cd6a3d3e0f8d0b1f1a0e9a6c51e4b7c0f7a5d21"))
+
+
+def _load(path):
+    with open(path) as f:
+        fixture = json.load(f)
+    return os.path.basename(path)[:-5], fixture
+
+
+def _parents(fixture):
+    """Synthesize one parent per input, paying ``output_value`` at ``output_index``."""
+    parents = {}
+    for vin in fixture["inputs"]:
+        outputs = [CMutableTxOut(1, CScript(b"\x51"))] * vin["output_index"]
+        outputs.append(CMutableTxOut(vin["output_value"], SOURCE_SCRIPT))
+        parent = CMutableTransaction([CMutableTxIn(COutPoint(lx("00" * 31 + "01"), 0))], outputs)
+        parents[vin["prev_hash"]] = parent.serialize().hex()
+    return parents
+
+
+@pytest.fixture
+def mock_parents(monkeypatch):
+    parents = {}
+
+    def getrawtransaction(tx_hash, *args, **kwargs):
+        return parents[tx_hash]
+
+    def getrawtransaction_batch(tx_hashes, *args, **kwargs):
+        return {tx_hash: parents.get(tx_hash) for tx_hash in tx_hashes}
+
+    monkeypatch.setattr(backend_instance, "getrawtransaction", getrawtransaction)
+    monkeypatch.setattr(backend_instance, "getrawtransaction_batch", getrawtransaction_batch)
+    return parents
+
+
+def _comparable(result):
+    return result._replace(decoded_tx=None)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda p: os.path.basename(p)[:12])
+def test_decode_candidate_matches_process_tx(path, mock_parents, monkeypatch):
+    tx_hash, fixture = _load(path)
+    block_index = fixture["block_height"]
+    mock_parents.update(_parents(fixture))
+    monkeypatch.setattr(util, "CURRENT_BLOCK_INDEX", block_index)
+    raw_transactions = {tx_hash: fixture["hex"]}
+
+    expected = process_tx(None, tx_hash, block_index, [], raw_transactions)
+    total_input_value, source_script = resolve_candidate_prevouts(raw_transactions)[tx_hash]
+    result = decode_candidate((tx_hash, fixture["hex"], block_index, None, total_input_value, source_script))
+
+    assert total_input_value == sum(vin["output_value"] for vin in fixture["inputs"])
+    assert result is not None
+    assert result.decoded_tx is None
+    assert _comparable(result) == _comparable(expected)
+
+
+@pytest.mark.unit
+def test_decode_candidate_defers_unresolved_source(mock_parents):
+    deferred = 0
+    for path in FIXTURES:
+        tx_hash, fixture = _load(path)
+        resolved = decode_candidate((tx_hash, fixture["hex"], fixture["block_height"], None, 0, bytes(SOURCE_SCRIPT)))
+        result = decode_candidate((tx_hash, fixture["hex"], fixture["block_height"], None, 0, None))
+        if resolved.data is not None:
+            # Carries stamp data but the source is unknown: the parent has to decode it inline
+            assert result is None
+            deferred += 1
+        else:
+            assert result == resolved
+    assert deferred > 0
+
+
+@pytest.mark.unit
+def test_resolve_candidate_prevouts_missing_parent(mock_parents):
+    tx_hash, fixture = _load(FIXTURES[0])
+    # No parents registered: batch returns None for every hash
+    assert resolve_candidate_prevouts({tx_hash: fixture["hex"]}) == {tx_hash: (0, None)}
+
+
+@pytest.mark.unit
+def test_decode_pool_block_matches_thread_path(mock_parents, monkeypatch):
+    fixtures = [_load(path) for path in FIXTURES[:4]]
+    block_index = fixtures[0][1]["block_height"]
+    monkeypatch.setattr(util, "CURRENT_BLOCK_INDEX", block_index)
+    raw_transactions = {tx_hash: fixture["hex"] for tx_hash, fixture in fixtures}
+    for tx_hash, fixture in fixtures:
+        mock_parents.update(_parents(fixture))
+    # Leave one source unresolvable so the inline fallback runs too
+    unresolved_hash, unresolved_fixture = fixtures[1]
+    inline_parents = _parents(unresolved_fixture)
+    for prev_hash in inline_parents:
+        del mock_parents[prev_hash]
+
+    expected = {tx_hash: process_tx(None, tx_hash, block_index, [], raw_transactions) for tx_hash in raw_transactions}
+    mock_parents.update(inline_parents)
+    monkeypatch.setattr(
+        backend_instance,
+        "getrawtransaction_batch",
+        lambda tx_hashes, *args, **kwargs: {h: None if h in inline_parents else mock_parents.get(h) for h in tx_hashes},
+    )
+    expected[unresolved_hash] = process_tx(None, unresolved_hash, block_index, [], raw_transactions)
+
+    decode_pool = DecodePool(workers=2, min_candidates=1)
+    try:
+        results = decode_pool.decode_block(None, block_index, [], raw_transactions)
+    finally:
+        decode_pool.shutdown()
+
+    assert {r.tx_hash: _comparable(r) for r in results} == {h: _comparable(r) for h, r in expected.items()}
+    assert all(r.decoded_tx is not None for r in results if r.data is not None)
+    assert decode_pool.get_stats()["inline"] == 1
+    assert decode_pool.get_stats()["pooled"] == len(raw_transactions) - 1
@@ -0,0 +1,191 @@
+"""Unit tests for off-critical-path dispense ingestion (DispenseWriter and the dispense-carrying CP fetch)."""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import config
+from index_core import block_validation, blocks
+from index_core.sales_history_processor import DispenseWriter, SalesHistoryProcessor
+
+
+def _dispense(tx_hash, asset, btc_amount=1000, quantity=1):
+    return {
+        "tx_hash": tx_hash,
+        "asset": asset,
+        "source": "bc1qbuyer",
+        "destination": "bc1qdispenser",
+        "dispense_quantity": quantity,
+        "btc_amount": btc_amount,
+        "dispenser_tx_hash": "d" * 64,
+        "block_time": 1700000000,
+    }
+
+
+@pytest.fixture
+def processor():
+    with patch("index_core.sales_history_processor.DatabaseManager"), patch("index_core.sales_history_processor.Backend"):
+        processor = SalesHistoryProcessor()
+    processor._insert_sale = MagicMock()
+    processor.update_checkpoint = MagicMock()
+    processor.get_checkpoint = MagicMock(return_value=0)
+    return processor
+
+
+def _db(stamp_cpids=()):
+    db = MagicMock()
+    cursor = db.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = [(cpid, n) for n, cpid in enumerate(stamp_cpids)]
+    return db, cursor
+
+
+@pytest.mark.unit
+def test_store_block_dispenses_looks_up_stamps_once(processor):
+    db, cursor = _db(["A111"])
+    dispenses = [_dispense("t1", "A111", 3000, 3), _dispense("t2", "XCP"), _dispense("t3", "A111")]
+
+    assert processor.store_block_dispenses(800000, dispenses, db) == 2
+
+    (query, params), _ = cursor.execute.call_args
+    assert cursor.execute.call_count == 1
+    assert "WHERE cpid IN (%s,%s)" in query
+    assert sorted(params) == ["A111", "XCP"]
+    first_sale = processor._insert_sale.call_args_list[0].args[1]
+    assert first_sale["cpid"] == "A111"
+    assert first_sale["unit_price_sats"] == 1000
+    assert [c.args[1]["tx_hash"] for c in processor._insert_sale.call_args_list] == ["t1", "t3"]
+    db.commit.assert_not_called()
+
+
+@pytest.mark.unit
+def test_writer_stores_prefetched_dispenses_with_checkpoint(processor):
+    db, _ = _db(["A111"])
+    processor.db_manager.connect.return_value = db
+    processor.fetch_block_dispenses = MagicMock()
+    writer = DispenseWriter(processor)
+    try:
+        writer.enqueue(800000, [_dispense("t1", "A111")])
+        writer.drain()
+    finally:
+        writer.stop()
+
+    processor.fetch_block_dispenses.assert_not_called()
+    processor._insert_sale.assert_called_once()
+    processor.update_checkpoint.assert_called_once_with(DispenseWriter.CHECKPOINT, 800000, db)
+    assert writer.stats["blocks"] == 1 and writer.stats["sales"] == 1
+
+
+@pytest.mark.unit
+def test_writer_fetches_missing_dispenses_and_backfills_gap(processor):
+    db, _ = _db(["A111"])
+    processor.db_manager.connect.return_value = db
+    processor.get_checkpoint.return_value = 799997
+    processor.fetch_block_dispenses = MagicMock(return_value=[])
+    writer = DispenseWriter(processor)
+    try:
+        writer.enqueue(800000, None)
+        writer.drain()
+    finally:
+        writer.stop()
+
+    assert [c.args[0] for c in processor.fetch_block_dispenses.call_args_list] == [799998, 799999, 800000]
+    assert [c.args[1] for c in processor.update_checkpoint.call_args_list] == [799998, 799999, 800000]
+    assert writer.stats["backfilled"] == 2
+
+
+@pytest.mark.unit
+def test_writer_backfill_is_capped(processor):
+    processor.db_manager.connect.return_value = _db()[0]
+    processor.get_checkpoint.return_value = 700000
+    processor.fetch_block_dispenses = MagicMock(return_value=[])
+    writer = DispenseWriter(processor, max_backfill=3)
+    writer._write(800000, [])
+
+    assert [c.args[1] for c in processor.update_checkpoint.call_args_list] == [799997, 799998, 799999, 800000]
+
+
+@pytest.mark.unit
+def test_writer_failure_keeps_checkpoint_and_counts_error(processor):
+    db, _ = _db()
+    processor.db_manager.connect.return_value = db
+    processor.fetch_block_dispenses = MagicMock(return_value=None)
+    writer = DispenseWriter(processor)
+    try:
+        writer.enqueue(800000)
+        writer.drain()
+    finally:
+        writer.stop()
+
+    processor.update_checkpoint.assert_not_called()
+    assert writer.stats["errors"] == 1
+    assert writer.last_block is None
+    db.close.assert_called()
+
+
+@pytest.mark.unit
+def test_writer_skips_blocks_during_catchup(processor):
+    processor.catchup_running = True
+    writer = DispenseWriter(processor)
+    writer._write(800000, [_dispense("t1", "A111")])
+
+    processor.db_manager.connect.assert_not_called()
+    processor.update_checkpoint.assert_not_called()
+
+
+@pytest.mark.unit
+def test_rollback_drains_writer_and_rewinds_checkpoint(processor):
+    processor.db_manager.connect.return_value = _db()[0]
+    sales = {}
+
+    def store(block_index, dispenses, db):
+        time.sleep(0.2)  # slower than the purge, so an undrained write would land after it
+        sales[block_index] = dispenses
+        return len(dispenses)
+
+    def purge(db, block_index):
+        for stored in [b for b in sales if b >= block_index]:
+            del sales[stored]
+
+    processor.store_block_dispenses = MagicMock(side_effect=store)
+    processor.get_checkpoint.return_value = 800000
+    writer = DispenseWriter(processor, max_backfill=0)
+    try:
+        with (
+            patch.object(config, "DISPENSE_PIPELINE_ENABLED", True),
+            patch.object(config, "ENABLE_MARKET_DATA_SCHEDULER", True),
+            patch.object(blocks, "dispense_writer", writer, create=True),
+            patch.object(blocks, "backend_instance"),
+            patch.object(blocks, "verify_cp_block_hash", return_value=True),
+            patch.object(blocks, "purge_block_db", side_effect=purge),
+            patch.object(blocks, "rebuild_balances"),
+            patch.object(blocks, "rebuild_owners"),
+            patch.object(blocks, "notify_api_cache_invalidation"),
+        ):
+            writer.enqueue(800001, [_dispense("t1", "A111")])
+            assert blocks.rollback_to_block(MagicMock(), 800000, "Chain reorganization detected") == 799990
+    finally:
+        writer.stop()
+
+    assert sales == {}
+    assert writer.last_block == 799989
+    assert processor.update_checkpoint.call_args_list[-1].args == (DispenseWriter.CHECKPOINT, 799989)
+
+
+@pytest.mark.unit
+def test_fetch_skipping_empty_attaches_dispenses(monkeypatch):
+    fetch = MagicMock(
+        side_effect=lambda start, end, progress_indicator=False, include_dispenses=False: {
+            idx: {"block_index": idx, "issuances": [], "dispenses": [{"asset": "A111"}]} for idx in range(start, end + 1)
+        }
+    )
+    monkeypatch.setattr("index_core.fetch_utils.fetch_xcp_blocks_concurrent", fetch)
+    monkeypatch.setattr(config, "CP_SKIP_NO_COUNTERPARTY_BLOCKS", True)
+    monkeypatch.setattr(block_validation, "block_has_counterparty_data", lambda idx: idx != 101)
+
+    result = block_validation.fetch_cp_blocks_skipping_empty(100, 102, include_dispenses=True)
+
+    assert result[101]["dispenses"] == []
+    assert result[100]["dispenses"] == result[102]["dispenses"] == [{"asset": "A111"}]
+    assert all(c.kwargs["include_dispenses"] for c in fetch.call_args_list)
+    assert "dispenses" not in block_validation._empty_cp_block_data(101)
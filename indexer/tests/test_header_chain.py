@@ -0,0 +1,144 @@
+"""Unit tests for the in-memory header chain used by follow()'s orphan check (index_core.header_chain)."""
+
+import ast
+import inspect
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import config
+from index_core import blocks
+from index_core.header_chain import HeaderChain
+
+
+def _chain(heights, prefix="h", max_length=100):
+    chain = HeaderChain(max_length=max_length)
+    for height in heights:
+        chain.append(height, f"{prefix}{height}", f"{prefix}{height - 1}")
+    return chain
+
+
+class _Bitcoind:
+    """Canonical chain where every height from ``fork`` up is on a different branch."""
+
+    def __init__(self, fork, tip):
+        self.hashes = {h: (f"h{h}" if h <= fork else f"x{h}") for h in range(0, tip + 1)}
+        self.parent_of = {self.hashes[h]: self.hashes[h - 1] for h in range(1, tip + 1)}
+        self.header_calls = 0
+
+    def previous_hash(self, block_hash):
+        self.header_calls += 1
+        return self.parent_of[block_hash]
+
+
+@pytest.mark.unit
+def test_seed_keeps_newest_headers_in_height_order():
+    db = MagicMock()
+    cursor = db.cursor.return_value
+    cursor.fetchall.return_value = [(12, "h12", "h11"), (11, "h11", "h10"), (10, "h10", "h9")]
+
+    chain = HeaderChain(max_length=3)
+    assert chain.seed(db) == 3
+
+    assert cursor.execute.call_args.args[1] == (3,)
+    assert list(chain.headers) == [10, 11, 12]
+    assert not chain.parent_mismatch(13, "h12")
+    assert chain.parent_mismatch(13, "x12")
+    assert not chain.parent_mismatch(20, "anything")  # parent not held
+    cursor.close.assert_called_once()
+
+
+@pytest.mark.unit
+def test_append_replaces_higher_headers_and_trims_oldest():
+    chain = _chain(range(1, 6), max_length=4)
+    assert list(chain.headers) == [2, 3, 4, 5]
+
+    chain.append(4, "x4", "h3")
+    assert list(chain.headers) == [2, 3, 4]
+    assert chain.hash_at(4) == "x4" and chain.hash_at(5) is None
+
+    chain.truncate(3)
+    assert list(chain.headers) == [2]
+
+    disabled = _chain(range(1, 6), max_length=0)
+    assert len(disabled) == 0
+
+
+@pytest.mark.unit
+def test_find_fork_walks_canonical_chain_back_to_common_block():
+    chain = _chain(range(1, 21))
+    bitcoind = _Bitcoind(fork=16, tip=21)
+    load_hash = MagicMock()
+
+    fork = chain.find_fork(21, bitcoind.hashes[20], bitcoind.previous_hash, load_hash, first_height=1)
+
+    assert fork == (16, "h20", "x20")
+    assert bitcoind.header_calls == 4
+    load_hash.assert_not_called()
+    assert chain.find_fork(21, "h20", bitcoind.previous_hash, load_hash) is None
+
+
+@pytest.mark.unit
+def test_find_fork_reads_heights_outside_the_chain_from_the_database():
+    chain = _chain(range(18, 21), max_length=3)
+    bitcoind = _Bitcoind(fork=15, tip=21)
+    stored = {h: f"h{h}" for h in range(1, 18)}
+
+    fork = chain.find_fork(21, bitcoind.hashes[20], bitcoind.previous_hash, stored.get, first_height=1)
+    assert fork == (15, "h20", "x20")
+
+    # Running out of stored blocks, or reaching first_height, ends the walk like the old loop did
+    assert chain.find_fork(21, bitcoind.hashes[20], bitcoind.previous_hash, lambda h: None, first_height=1) == (
+        17,
+        "h20",
+        "x20",
+    )
+    assert chain.find_fork(21, bitcoind.hashes[20], bitcoind.previous_hash, stored.get, first_height=19) == (
+        18,
+        "h20",
+        "x20",
+    )
+
+
+@pytest.mark.unit
+def test_empty_block_commit_extends_the_chain():
+    """A pre-SRC-20-genesis empty block commits with src20_in_block=0 and must still be recorded."""
+    chain = _chain(range(1, 100))
+    db = MagicMock()
+
+    with patch("index_core.blocks.update_parsed_block"), patch("index_core.blocks.notify_api_new_block"):
+        next_block = blocks.commit_and_update_block(db, 100, 200_000, 0, "h100", chain, "h99")
+
+    assert next_block == 101
+    assert chain.hash_at(100) == "h100"
+    assert not chain.parent_mismatch(101, "h100")
+
+
+@pytest.mark.unit
+def test_forced_commit_failure_does_not_extend_the_chain():
+    chain = _chain(range(1, 100))
+    db = MagicMock()
+    db.commit.side_effect = Exception("gone away")
+
+    with (
+        patch.object(config, "FORCE", True),
+        patch("index_core.blocks.check_db_connection", side_effect=lambda conn: conn),
+        patch("index_core.blocks.time.sleep"),
+    ):
+        assert blocks.commit_and_update_block(db, 100, 200_000, 0, "h100", chain, "h99") == 101
+
+    # Block 100 was rolled back, so the next orphan check falls back to bitcoind
+    assert chain.hash_at(100) is None
+
+
+@pytest.mark.unit
+def test_every_follow_commit_path_records_the_header():
+    calls = [
+        node
+        for node in ast.walk(ast.parse(inspect.getsource(blocks.follow).lstrip()))
+        if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "commit_and_update_block"
+    ]
+
+    assert len(calls) == 3
+    for call in calls:
+        assert [arg.id for arg in call.args[-2:]] == ["header_chain", "previous_block_hash"]
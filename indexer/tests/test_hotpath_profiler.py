@@ -0,0 +1,116 @@
+"""Unit tests for the hot-path profiler (index_core.hotpath_profiler) and its report tool."""
+
+import json
+import random
+import time
+
+import pytest
+from tools.hotpath_report import function_totals, merged_histograms, read_records
+
+from index_core.hotpath_profiler import HotPathProfiler, PhaseHistogram
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _records(path):
+    with open(path) as fh:
+        return [json.loads(line) for line in fh]
+
+
+@pytest.mark.unit
+def test_histogram_percentiles_within_bucket_resolution():
+    rng = random.Random(0)
+    samples = [rng.lognormvariate(2, 1) for _ in range(5000)]
+    histogram = PhaseHistogram()
+    for ms in samples:
+        histogram.record(ms)
+
+    ordered = sorted(samples)
+    for pct in (50, 95, 99):
+        exact = ordered[int(len(ordered) * pct / 100) - 1]
+        assert exact <= histogram.percentile(pct) <= exact * 2 ** (1 / 8) * 1.0001
+    assert histogram.percentile(100) == max(samples)
+
+
+@pytest.mark.unit
+def test_histogram_merge_roundtrip():
+    first, second, combined = PhaseHistogram(), PhaseHistogram(), PhaseHistogram()
+    for i, ms in enumerate([0.0, 0.5, 3, 7, 120, 4000, 12]):
+        (first if i % 2 else second).record(ms)
+        combined.record(ms)
+
+    merged = PhaseHistogram.from_dict(json.loads(json.dumps(first.to_dict())))
+    merged.merge(PhaseHistogram.from_dict(second.to_dict()))
+    assert merged.to_dict() == combined.to_dict()
+
+
+@pytest.mark.unit
+def test_profiler_records_phases_and_slowest_blocks(tmp_path):
+    path = str(tmp_path / "hotpath.jsonl")
+    profiler = HotPathProfiler(path=path, sample_interval_ms=1, slowest_blocks=2, window_seconds=3600)
+    try:
+        for block_index, seconds in [(1, 0.01), (2, 0.06), (3, 0.03), (4, 0.005)]:
+            profiler.begin_block(block_index)
+            with profiler.phase("decode"):
+                _busy(seconds)
+            profiler.start("commit")
+            profiler.stop("commit")
+            profiler.end_block()
+
+        # An abandoned block (rollback / retry) is discarded by the next begin_block
+        profiler.begin_block(5)
+        with profiler.phase("decode"):
+            pass
+    finally:
+        profiler.close()
+
+    records = _records(path)
+    blocks = [r for r in records if r["type"] == "block"]
+    assert [r["block_index"] for r in blocks] == [1, 2, 3, 4]
+    assert set(blocks[0]["phases_ms"]) == {"decode", "commit", "total"}
+
+    (histogram,) = [r for r in records if r["type"] == "histogram"]
+    assert histogram["phases"]["decode"]["count"] == 4
+    assert 60 <= histogram["phases"]["decode"]["max_ms"] <= histogram["phases"]["total"]["max_ms"]
+
+    flamegraphs = [r for r in records if r["type"] == "flamegraph"]
+    assert [r["block_index"] for r in flamegraphs] == [2, 3]
+    assert any(stack.endswith("test_hotpath_profiler:_busy") for stack in flamegraphs[0]["stacks"])
+
+
+@pytest.mark.unit
+def test_profiler_without_sampling_keeps_no_stacks(tmp_path):
+    path = str(tmp_path / "hotpath.jsonl")
+    profiler = HotPathProfiler(path=path, sample_interval_ms=0, slowest_blocks=3, window_seconds=3600)
+    profiler.begin_block(1)
+    profiler.end_block()
+    profiler.close()
+
+    assert profiler._sampler is None
+    assert [r["type"] for r in _records(path)] == ["block", "histogram"]
+
+
+@pytest.mark.unit
+def test_report_reads_rotated_files(tmp_path):
+    path = str(tmp_path / "hotpath.jsonl")
+    windows = []
+    for window_start, values in [(1000, [1, 2]), (2000, [3]), (3000, [4, 5])]:
+        histogram = PhaseHistogram()
+        for ms in values:
+            histogram.record(ms)
+        windows.append({"type": "histogram", "window_start": window_start, "phases": {"decode": histogram.to_dict()}})
+    flamegraph = {"type": "flamegraph", "window_start": 3000, "block_index": 9, "stacks": {"a:f;b:g": 3, "a:f": 1}}
+    for file_path, records in [(path + ".2", windows[:1]), (path + ".1", windows[1:2]), (path, [windows[2], flamegraph])]:
+        with open(file_path, "w") as fh:
+            fh.write("".join(json.dumps(r) + "\n" for r in records))
+
+    assert [r["window_start"] for r in read_records(path, "histogram")] == [1000, 2000, 3000]
+    assert merged_histograms(read_records(path, "histogram", since=2000))["decode"].count == 3
+
+    self_samples, inclusive_samples = function_totals(read_records(path, "flamegraph"))
+    assert self_samples == {"b:g": 3, "a:f": 1}
+    assert inclusive_samples == {"a:f": 4, "b:g": 3}
@@ -0,0 +1,151 @@
+"""Unit tests for the next_update_at due-time queue (activity_calculator.StampActivityCalculator.get_due_stamps)."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import config
+from index_core import database
+from index_core.activity_calculator import DUE_TIER_SQL, NEW_STAMPS_SQL, ActivityLevel, StampActivityCalculator
+from index_core.market_data_jobs import MarketDataJobScheduler
+from index_core.market_data_service import MarketDataService
+
+
+class _QueueCursor:
+    """Serves the due-queue queries from in-memory tiers and a list of stamps without market data."""
+
+    def __init__(self, tiers, new_stamps):
+        self.tiers = tiers
+        self.new_stamps = new_stamps
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+        if sql == DUE_TIER_SQL:
+            level, limit = params
+            self._rows = self.tiers.get(level, [])[:limit]
+        elif sql == NEW_STAMPS_SQL:
+            start, end, limit = params
+            self._rows = [(cpid, stamp) for cpid, stamp in self.new_stamps if start < stamp <= end][:limit]
+        else:
+            stamps = [stamp for _, stamp in self.new_stamps]
+            self._rows = [(min(stamps), max(stamps)) if stamps else (None, None)]
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _db(cursor):
+    db = MagicMock()
+    db.cursor.return_value = cursor
+    return db
+
+
+def _tier(prefix, count):
+    return [(f"{prefix}{n}", str(n)) for n in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def reset_new_stamp_cursor():
+    StampActivityCalculator._new_stamp_cursor = None
+    yield
+    StampActivityCalculator._new_stamp_cursor = None
+
+
+@pytest.mark.unit
+def test_next_update_sql_covers_every_level():
+    sql = StampActivityCalculator.next_update_sql(base="last_updated")
+
+    assert sql.startswith("DATE_ADD(last_updated, INTERVAL CASE activity_level")
+    for level, minutes in StampActivityCalculator.UPDATE_INTERVALS.items():
+        assert f"WHEN '{level.value}' THEN {minutes}" in sql
+
+
+@pytest.mark.unit
+def test_tiers_get_their_quota_and_spare_capacity_goes_to_full_tiers():
+    cursor = _QueueCursor(
+        tiers={"HOT": _tier("HOT", 100), "WARM": _tier("WARM", 5), "COLD": _tier("COLD", 100)},
+        new_stamps=[(f"NEW{n}", n) for n in range(3)],
+    )
+
+    results = StampActivityCalculator.get_due_stamps(_db(cursor), limit=100)
+
+    counts = {}
+    for _, level in results.values():
+        counts[level] = counts.get(level, 0) + 1
+    # Quotas: HOT 30, WARM 20 (5 due), COOL 15 (0), new 15 (3), DORMANT 10 (0), COLD 10;
+    # the quotas fill 48, so the 52 spare slots go to HOT, the first full tier
+    assert len(results) == 100
+    assert counts == {ActivityLevel.HOT: 82, ActivityLevel.WARM: 5, ActivityLevel.COLD: 13}
+    assert results["NEW0"] == (0, ActivityLevel.COLD)
+    # Every query is bounded by a LIMIT
+    assert all(params[-1] <= 100 for sql, params in cursor.executed if sql in (DUE_TIER_SQL, NEW_STAMPS_SQL))
+
+
+@pytest.mark.unit
+def test_new_stamps_are_walked_window_by_window():
+    cursor = _QueueCursor(tiers={}, new_stamps=[(f"A{n}", n) for n in (-5, 3, 15, 16, 17, 18)])
+
+    with patch.object(config, "MARKET_DATA_NEW_STAMP_WINDOW", 10):
+        assert StampActivityCalculator._fetch_tier(cursor, None, 5) == [("A-5", -5), ("A3", 3)]
+        assert StampActivityCalculator._new_stamp_cursor == 4
+        assert StampActivityCalculator._fetch_tier(cursor, None, 5) == []
+        assert StampActivityCalculator._fetch_tier(cursor, None, 2) == [("A15", 15), ("A16", 16)]
+        assert StampActivityCalculator._new_stamp_cursor == 16
+        assert StampActivityCalculator._fetch_tier(cursor, None, 5) == [("A17", 17), ("A18", 18)]
+        # Past the highest stamp: the next call starts over
+        assert StampActivityCalculator._new_stamp_cursor is None
+
+
+@pytest.mark.unit
+def test_flag_routes_selection_to_the_queue_and_latency_is_recorded():
+    scheduler = MarketDataJobScheduler()
+    due = {"A1": ("1", ActivityLevel.HOT)}
+
+    with (
+        patch.object(config, "MARKET_DATA_DUE_QUEUE_ENABLED", True),
+        patch.object(StampActivityCalculator, "get_due_stamps", return_value=due) as get_due_stamps,
+    ):
+        assert scheduler._get_stamps_needing_update(MagicMock()) == ["A1"]
+        scheduler._get_stamps_needing_update(MagicMock())
+
+    assert get_due_stamps.call_count == 2
+    metrics = scheduler.get_selection_metrics()["stamp_update"]
+    assert metrics["count"] == 2 and metrics["last_selected"] == 1
+    assert 0 <= metrics["avg_ms"] <= metrics["max_ms"]
+
+
+@pytest.mark.unit
+def test_market_data_writes_schedule_the_next_update():
+    db = MagicMock()
+    cursor = db.cursor.return_value.__enter__.return_value
+
+    database.insert_stamp_market_data(db, {"cpid": "A1", "holder_count": 3})
+
+    sql, values = cursor.execute.call_args[0]
+    assert "next_update_at" in sql.split("VALUES")[0]
+    assert "DATE_ADD(NOW(), INTERVAL 10080 MINUTE)" in sql
+    assert f"next_update_at = {StampActivityCalculator.next_update_sql()}" in sql
+    assert values == ["A1", 3]
+
+
+@pytest.mark.unit
+def test_market_data_service_writes_schedule_the_next_update():
+    db = MagicMock()
+    cursor = db.cursor.return_value.__enter__.return_value
+
+    MarketDataService().update_stamp_market_data("A1", {"holder_count": 3}, db)
+
+    sql = cursor.execute.call_args[0][0]
+    assert "DATE_ADD(NOW(), INTERVAL 10080 MINUTE)" in sql
+    assert f"next_update_at = {StampActivityCalculator.next_update_sql()}" in sql
@@ -5,7 +5,7 @@ import unittest
 from unittest import mock
 
 from index_core.cache_types import LRUCache
-from index_core.memory_manager import MemoryManager
+from index_core.memory_manager import PINNED_PRIORITY, MemoryManager
 
 
 class TestMemoryManager(unittest.TestCase):
@@ -140,6 +140,63 @@ class TestMemoryManager(unittest.TestCase):
                     self.assertEqual(mock_logger.warning.call_count, 1)
                     self.assertEqual(mock_logger.info.call_count, 1)
 
+    def _filled_cache(self, entries):
+        cache = LRUCache(max_size=1000)
+        for n in range(entries):
+            cache.set(f"key{n}", n)
+        return cache
+
+    def test_soft_pressure_opens_priority_tiers_and_favours_cheap_caches(self):
+        """Between the watermarks caches are trimmed by tier, in proportion to refill cost."""
+        manager = MemoryManager(memory_threshold=0.9, soft_watermark=0.6)
+        cheap = self._filled_cache(100)
+        costly = self._filled_cache(100)
+        later_tier = self._filled_cache(100)
+        pinned = self._filled_cache(2)
+        manager.register_cache("cheap", cheap, priority=1, refill_cost=1.0)
+        manager.register_cache("costly", costly, priority=1, refill_cost=4.0)
+        manager.register_cache("later_tier", later_tier, priority=3, refill_cost=1.0)
+        manager.register_cache("stamp", pinned)
+
+        # Pressure 1/3: only tier 1 is eligible
+        self.assertEqual(manager.trim_caches(0.7), {"cheap": 16, "costly": 4})
+        self.assertEqual(len(later_tier), 100)
+
+        # Full pressure: every tier except pinned caches
+        trimmed = manager.trim_caches(0.9)
+        self.assertEqual(trimmed["later_tier"], 50)
+        self.assertEqual(trimmed["cheap"], 42)
+        self.assertEqual(len(pinned), 2)
+        self.assertEqual(manager._cache_profiles["stamp"].priority, PINNED_PRIORITY)
+
+    def test_soft_pressure_does_not_clear(self):
+        """Usage between the watermarks trims instead of clearing."""
+        manager = MemoryManager(memory_threshold=0.9, soft_watermark=0.8)
+        cache = self._filled_cache(10)
+        manager.register_cache("address", cache)
+
+        with mock.patch.object(manager, "get_memory_usage", return_value=0.85):
+            with mock.patch.object(manager, "clear_all") as mock_clear:
+                manager.clear_caches_if_needed()
+                mock_clear.assert_not_called()
+        self.assertEqual(len(cache), 8)
+
+    def test_trim_events_are_written_to_the_perf_log(self):
+        """Each trimmed cache produces one cache_trim perf log record."""
+        manager = MemoryManager(memory_threshold=0.9, soft_watermark=0.8)
+        manager.register_cache("address", self._filled_cache(10))
+        manager.register_cache("balance", self._filled_cache(10))
+
+        with mock.patch("index_core.memory_manager.config.PERF_LOG", True):
+            with mock.patch("index_core.memory_manager.record_block_perf") as record:
+                manager.trim_caches(0.9)
+
+        events = [call.args[1] for call in record.call_args_list]
+        self.assertEqual([event["cache"] for event in events], ["address", "balance"])
+        self.assertEqual({event["event"] for event in events}, {"cache_trim"})
+        self.assertEqual(events[0]["evicted"], 5)
+        self.assertEqual(events[0]["level"], "soft")
+
     def test_memory_manager_init_with_custom_threshold(self):
         """Test MemoryManager initialization with custom threshold."""
         manager = MemoryManager(memory_threshold=0.95)
@@ -110,7 +110,7 @@ class TestNodeRoundRobin:
             {"name": "node3", "url": "http://node3.com:4000/v2"},
         ]
 
-        with patch("requests.get") as mock_requests:
+        with patch("index_core.fetch_utils.cp_client.get") as mock_requests:
             mock_response = Mock()
             mock_response.ok = True
             mock_response.json.return_value = {"result": [], "next_cursor": None}
@@ -158,7 +158,7 @@ class TestNodeRoundRobin:
         node_health_tracker["node1"] = NodeHealth("node1", "http://node1.com:4000/v2")
         node_health_tracker["node2"] = NodeHealth("node2", "http://node2.com:4000/v2")
 
-        with patch("requests.get") as mock_requests:
+        with patch("index_core.fetch_utils.cp_client.get") as mock_requests:
             mock_response = Mock()
             mock_response.ok = True
             mock_response.json.return_value = {"result": [], "next_cursor": None}
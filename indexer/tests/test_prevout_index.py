@@ -0,0 +1,169 @@
+"""Unit tests for the local prevout index (index_core.prevout_index).
+
+Covers the compact output/prevout parser against python-bitcoinlib, deferred
+spend application, rollback through the undo journal, and the RPC-free paths in
+calculate_total_inputs and prefetch_source_prevouts. Uses a temporary SQLite file.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from bitcoin.core import (
+    CMutableTransaction,
+    CMutableTxIn,
+    CMutableTxOut,
+    COutPoint,
+    CScript,
+    CScriptWitness,
+    CTxInWitness,
+    CTxWitness,
+    b2lx,
+    lx,
+)
+
+import index_core.prevout_index as prevout_index_module
+from index_core.prevout_index import PrevoutIndex, parse_prevouts_and_outputs
+from index_core.transaction_utils import calculate_total_inputs, prefetch_source_prevouts
+
+P2PKH = CScript(bytes.fromhex("76a914") + b"\x11" * 20 + bytes.fromhex("88ac"))
+P2WPKH = CScript(b"\x00\x14" + b"\x22" * 20)
+
+
+def _tx(prevouts, outputs, witness=False):
+    """Build a transaction spending ``prevouts`` [(txid_hex, n)] into ``outputs`` [(value, script)]."""
+    vin = [CMutableTxIn(COutPoint(lx(txid), n), CScript(b"\x00" * 71)) for txid, n in prevouts]
+    vout = [CMutableTxOut(value, script) for value, script in outputs]
+    if witness:
+        return CMutableTransaction(
+            vin, vout, witness=CTxWitness([CTxInWitness(CScriptWitness([b"\x01" * 72, b"\x02" * 33])) for _ in prevouts])
+        )
+    return CMutableTransaction(vin, vout)
+
+
+def _block(*txs):
+    return {b2lx(tx.GetTxid()): tx.serialize().hex() for tx in txs}
+
+
+@pytest.fixture
+def index(tmp_path):
+    prevout_index = PrevoutIndex(db_path=str(tmp_path / "prevouts.db"), undo_depth=5)
+    yield prevout_index
+    prevout_index.close()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("witness", [False, True])
+def test_parse_matches_bitcoinlib(witness):
+    tx = _tx(
+        [("aa" * 32, 3), ("bb" * 32, 0)],
+        [(1000, P2PKH), (0, CScript(b"\x6a\x04stmp")), (2**40, P2WPKH)],
+        witness=witness,
+    )
+    prevouts, outputs = parse_prevouts_and_outputs(tx.serialize())
+
+    assert [(b2lx(h), n) for h, n in prevouts] == [("aa" * 32, 3), ("bb" * 32, 0)]
+    assert outputs == [(i, out.nValue, bytes(out.scriptPubKey)) for i, out in enumerate(tx.vout)]
+
+
+@pytest.mark.unit
+def test_spends_apply_one_block_later(index):
+    funding = _tx([("cc" * 32, 0)], [(5000, P2PKH), (7000, P2WPKH), (0, CScript(b"\x6a\x00"))])
+    funding_txid = b2lx(funding.GetTxid())
+    index.ingest_block(100, _block(funding))
+
+    assert index.get(funding_txid, 0) == (5000, bytes(P2PKH))
+    assert index.get(funding_txid, 2) is None  # OP_RETURN is never indexed
+
+    spend = _tx([(funding_txid, 0)], [(4000, P2WPKH)])
+    index.ingest_block(101, _block(spend))
+    # Block 101 is still being decoded, so the output it spends must stay readable
+    assert index.get(funding_txid, 0) == (5000, bytes(P2PKH))
+
+    index.ingest_block(102, {})
+    assert index.get(funding_txid, 0) is None
+    assert index.get(funding_txid, 1) == (7000, bytes(P2WPKH))
+    assert index.get(b2lx(spend.GetTxid()), 0) == (4000, bytes(P2WPKH))
+
+
+@pytest.mark.unit
+def test_rollback_restores_spent_and_drops_created(index):
+    funding = _tx([("cc" * 32, 0)], [(5000, P2PKH)])
+    funding_txid = b2lx(funding.GetTxid())
+    spend = _tx([(funding_txid, 0)], [(4000, P2WPKH)])
+    index.ingest_block(100, _block(funding))
+    index.ingest_block(101, _block(spend))
+    index.ingest_block(102, {})
+    assert index.get(funding_txid, 0) is None
+
+    index.rollback(101)
+
+    assert index.get(funding_txid, 0) == (5000, bytes(P2PKH))
+    assert index.get(b2lx(spend.GetTxid()), 0) is None
+
+    # Re-ingesting the same height after a rollback behaves like the first time
+    index.ingest_block(101, _block(spend))
+    index.ingest_block(102, {})
+    assert index.get(funding_txid, 0) is None
+
+
+@pytest.mark.unit
+def test_undo_journal_is_pruned_past_depth(index):
+    funding = _tx([("cc" * 32, 0)], [(5000, P2PKH)])
+    funding_txid = b2lx(funding.GetTxid())
+    index.ingest_block(100, _block(funding))
+    index.ingest_block(101, _block(_tx([(funding_txid, 0)], [(4000, P2WPKH)])))
+    for height in range(102, 108):
+        index.ingest_block(height, {})
+
+    index.rollback(101)
+
+    # The spend fell out of the undo window: the outpoint is a miss (RPC fallback), never wrong
+    assert index.get(funding_txid, 0) is None
+
+
+@pytest.fixture
+def enabled_index(index, monkeypatch):
+    monkeypatch.setattr(prevout_index_module, "_prevout_index", index)
+    monkeypatch.setattr(prevout_index_module.config, "PREVOUT_INDEX_ENABLED", True)
+    return index
+
+
+@pytest.mark.unit
+def test_calculate_total_inputs_reads_local_prevouts(enabled_index):
+    funding = _tx([("cc" * 32, 0)], [(5000, P2PKH), (7000, P2WPKH)])
+    funding_txid = b2lx(funding.GetTxid())
+    enabled_index.ingest_block(100, _block(funding))
+    candidate = _tx([(funding_txid, 0), (funding_txid, 1)], [(11000, P2PKH)])
+
+    with patch("index_core.transaction_utils.backend_instance") as backend:
+        assert calculate_total_inputs(candidate) == 12000
+    backend.getrawtransaction_batch.assert_not_called()
+
+
+@pytest.mark.unit
+def test_calculate_total_inputs_fetches_only_missing_parents(enabled_index):
+    funding = _tx([("cc" * 32, 0)], [(5000, P2PKH)])
+    funding_txid = b2lx(funding.GetTxid())
+    enabled_index.ingest_block(100, _block(funding))
+    remote = _tx([("dd" * 32, 0)], [(3000, P2WPKH)])
+    remote_txid = b2lx(remote.GetTxid())
+    candidate = _tx([(funding_txid, 0), (remote_txid, 0)], [(7000, P2PKH)])
+
+    with patch("index_core.transaction_utils.backend_instance") as backend:
+        backend.getrawtransaction_batch.return_value = {remote_txid: remote.serialize().hex()}
+        backend.deserialize.side_effect = lambda tx_hex: CMutableTransaction.deserialize(bytes.fromhex(tx_hex))
+        assert calculate_total_inputs(candidate) == 8000
+    backend.getrawtransaction_batch.assert_called_once_with([remote_txid], verbose=False)
+
+
+@pytest.mark.unit
+def test_prefetch_skips_locally_indexed_sources(enabled_index):
+    funding = _tx([("cc" * 32, 0)], [(5000, P2PKH)])
+    enabled_index.ingest_block(100, _block(funding))
+    local_candidate = _tx([(b2lx(funding.GetTxid()), 0)], [(4000, P2PKH)])
+    remote_candidate = _tx([("dd" * 32, 1)], [(4000, P2PKH)])
+
+    with patch("index_core.transaction_utils.backend_instance") as backend:
+        backend.deserialize.side_effect = lambda tx_hex: CMutableTransaction.deserialize(bytes.fromhex(tx_hex))
+        prefetch_source_prevouts(_block(local_candidate, remote_candidate))
+    backend.getrawtransaction_batch.assert_called_once_with(["dd" * 32], skip_missing=True)
@@ -0,0 +1,125 @@
+"""Unit tests for the parallel, resumable range reparse (index_core.reparse.parallel)."""
+
+from unittest.mock import patch
+
+import pytest
+
+import index_core.reparse.parallel as parallel
+import index_core.reparse.validator as validator_module
+from index_core import check
+from index_core.reparse.validator import DecodedBlock, ReparseValidator
+from index_core.transaction_utils import TxResult
+
+
+def _hashes(block_index):
+    return {
+        "block_hash": f"b{block_index}",
+        "messages_hash": f"m{block_index}",
+        "txlist_hash": f"t{block_index}",
+        "ledger_hash": "",
+    }
+
+
+def _decode_chunk(calls):
+    def decode(block_indices):
+        calls.append(list(block_indices))
+        return [DecodedBlock(i, f"b{i}", 0, [], []) for i in block_indices]
+
+    return decode
+
+
+@pytest.fixture
+def reparse_validator(tmp_path):
+    rv = ReparseValidator(snapshot_path=str(tmp_path / "snap.json"))
+    rv.snapshot_manager.save_snapshot({str(i): _hashes(i) for i in range(100, 130)})
+    rv.snapshot_manager._hashes = None
+    return rv
+
+
+@pytest.mark.unit
+def test_decode_block_orders_results_on_chain(monkeypatch):
+    txhash_list = ["tx0", "tx1", "tx2", "tx3"]
+
+    def process_tx(db, tx_hash, block_index, stamp_issuances, raw_transactions):
+        fields = dict.fromkeys(TxResult._fields)
+        fields.update(tx_hash=tx_hash, block_index=block_index, data=None if tx_hash == "tx1" else "{}", decoded_tx=object())
+        return TxResult(**fields)
+
+    monkeypatch.setattr(validator_module.backend_instance, "getblockhash", lambda idx: "BHash")
+    monkeypatch.setattr(validator_module.backend_instance, "getblock", lambda bh, verbosity: {"time": 100})
+    monkeypatch.setattr(validator_module, "fetch_xcp_blocks_concurrent", lambda start, end: {})
+    monkeypatch.setattr(
+        validator_module,
+        "filter_block_transactions",
+        # CP issuances come back first, like the real filter
+        lambda block_data, stamp_issuances: (txhash_list, {"tx3": "", "tx1": "", "tx0": "", "tx2": ""}),
+    )
+    monkeypatch.setattr(validator_module, "prefetch_source_prevouts", lambda raw_transactions: None)
+    monkeypatch.setattr(validator_module, "process_tx", process_tx)
+
+    decoded = validator_module.decode_block(900100, cp_blocks={900100: {"issuances": []}})
+
+    assert [r.tx_hash for r in decoded.tx_results] == ["tx0", "tx2", "tx3"]
+    assert all(r.decoded_tx is None and r.block_hash == "BHash" for r in decoded.tx_results)
+    assert (decoded.block_hash, decoded.block_time, decoded.txhash_list) == ("BHash", 100, txhash_list)
+
+
+@pytest.mark.unit
+def test_range_is_validated_in_order_and_progress_recorded(reparse_validator):
+    calls, hashed = [], []
+
+    def hash_decoded_block(decoded, block_processor=None):
+        hashed.append(decoded.block_index)
+        return _hashes(decoded.block_index)
+
+    reparser = parallel.ParallelReparser(reparse_validator, workers=1, chunk_size=4, checkpoint_interval=5)
+    with (
+        patch.object(parallel, "decode_chunk", side_effect=_decode_chunk(calls)),
+        patch.object(reparse_validator, "hash_decoded_block", side_effect=hash_decoded_block),
+        patch.dict(check.CHECKPOINTS_MAINNET, {105: {"ledger_hash": "", "txlist_hash": ""}}),
+    ):
+        assert reparser.run(100, 111)
+
+    assert calls == [[100, 101, 102, 103], [104, 106, 107, 108], [109, 110, 111]]
+    assert hashed == [i for i in range(100, 112) if i != 105]
+
+    progress = reparse_validator.snapshot_manager.get_metadata()["reparse_progress"]
+    assert progress["status"] == "completed"
+    assert progress["last_validated_block"] == 111
+    assert progress["blocks_validated"] == 11
+    assert progress["blocks_per_sec"] > 0
+    # The hashes survive the metadata rewrites
+    assert reparse_validator.snapshot_manager.get_expected_hash(120) == _hashes(120)
+
+
+@pytest.mark.unit
+def test_mismatch_stops_the_run_and_a_rerun_resumes_there(reparse_validator):
+    calls = []
+    bad_block = {"index": 107}
+
+    def hash_decoded_block(decoded, block_processor=None):
+        hashes = _hashes(decoded.block_index)
+        if decoded.block_index == bad_block["index"]:
+            hashes["txlist_hash"] = "wrong"
+        return hashes
+
+    reparser = parallel.ParallelReparser(reparse_validator, workers=1, chunk_size=3)
+    with (
+        patch.object(parallel, "decode_chunk", side_effect=_decode_chunk(calls)),
+        patch.object(reparse_validator, "hash_decoded_block", side_effect=hash_decoded_block),
+    ):
+        assert not reparser.run(100, 115)
+        progress = reparse_validator.snapshot_manager.get_metadata()["reparse_progress"]
+        assert (progress["status"], progress["failed_block"], progress["last_validated_block"]) == ("failed", 107, 106)
+
+        bad_block["index"] = None
+        calls.clear()
+        assert parallel.ParallelReparser(reparse_validator, workers=1, chunk_size=3).run(100, 115)
+        assert calls[0][0] == 107
+
+        # A completed range is not validated again unless resume is off
+        calls.clear()
+        assert parallel.ParallelReparser(reparse_validator, workers=1).run(100, 115)
+        assert calls == []
+        assert parallel.ParallelReparser(reparse_validator, workers=1).run(100, 115, resume=False)
+        assert calls[0][0] == 100
@@ -0,0 +1,119 @@
+"""Unit tests for the sharded LRU cache (cache_types.ShardedLRUCache)."""
+
+import threading
+
+import pytest
+
+from index_core.cache_types import ShardedLRUCache
+from index_core.caching import CacheManager
+from index_core.memory_manager import MemoryManager
+
+
+@pytest.mark.unit
+def test_single_shard_behaves_like_lru_cache():
+    cache = ShardedLRUCache[int](max_size=3, shards=1)
+    for n in range(3):
+        cache.set(f"k{n}", n)
+    assert cache.get("k0") == 0  # k1 is now the coldest
+
+    cache.set("k3", 3)
+
+    assert cache.get("k1") is None
+    assert sorted(cache.keys()) == ["k0", "k2", "k3"]
+    assert "k3" in cache and cache.contains("k0")
+    assert cache.get_metrics() == (1, 1)
+    assert cache.evictions == 1
+
+    cache.invalidate("k0")
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.unit
+def test_capacity_is_split_across_shards():
+    cache = ShardedLRUCache[int](max_size=64, shards=4)
+    for n in range(1000):
+        cache.set(n, n)
+
+    # Integer keys hash to themselves, so every shard holds exactly its quarter
+    assert len(cache) == 64
+    assert cache.get_stats()["shards"] == 4
+    assert sorted(cache.keys()) == list(range(1000 - 64, 1000))
+
+    # Never more shards than slots
+    assert ShardedLRUCache[int](max_size=2, shards=16).get_stats()["shards"] == 2
+
+
+@pytest.mark.unit
+def test_byte_budget_and_shrink():
+    cache = ShardedLRUCache[bytes](max_size=100, shards=2, max_bytes=1000)
+    for n in range(10):
+        cache.set(n, b"\x00" * 100)
+    assert cache.current_bytes == 1000
+
+    cache.set(10, b"\x00" * 100)  # shard 0 is over its 500-byte share
+    assert cache.get(0) is None and cache.current_bytes == 1000
+
+    cache.set(11, b"\x00" * 600)  # larger than a shard's budget: not cached
+    assert cache.get(11) is None and cache.get(1) is not None
+
+    cache.set(1, b"\x00" * 50)  # replacing re-accounts the entry
+    assert cache.current_bytes == 950
+
+    # Each shard drops its coldest entries until it holds half its bytes
+    assert cache.shrink(0.5) == 6
+    assert cache.current_bytes == 350
+
+    # At full soft pressure a lone cache releases PRESSURE_SHRINK_FRACTION (half)
+    manager = MemoryManager(memory_threshold=0.9, soft_watermark=0.8)
+    manager.register_cache("sharded", cache, priority=1)
+    assert manager.trim_caches(0.9) == {"sharded": 2}
+    assert len(cache) == 2
+
+
+@pytest.mark.unit
+def test_get_many_and_put_many():
+    cache = ShardedLRUCache[str](max_size=100, shards=4)
+    cache.put_many({f"addr{n}": f"id{n}" for n in range(10)})
+    cache.put_many([("addr10", "id10")])
+
+    found = cache.get_many([f"addr{n}" for n in range(8, 14)])
+
+    assert found == {"addr8": "id8", "addr9": "id9", "addr10": "id10"}
+    assert cache.get_metrics() == (3, 3)
+
+
+@pytest.mark.unit
+def test_concurrent_access_keeps_counters_and_sizes_consistent():
+    cache = ShardedLRUCache[int](max_size=256, shards=8)
+    per_thread = 5000
+
+    def worker(offset):
+        for n in range(per_thread):
+            key = (offset * 7 + n) % 512
+            if cache.get(key) is None:
+                cache.set(key, n)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    hits, misses = cache.get_metrics()
+    assert hits + misses == 8 * per_thread
+    assert len(cache) <= 256
+    assert len(cache.items()) == len(cache)
+
+
+@pytest.mark.unit
+def test_cache_manager_registers_sharded_caches():
+    manager = CacheManager()
+    manager.set_cache_value("balance", "addr:TICK", 5)
+
+    assert isinstance(manager.get_cache("balance"), ShardedLRUCache)
+    assert manager.get_cache_value("balance", "addr:TICK") == 5
+    assert manager.get_stats()["balance"]["hits"] == 1
+    manager.invalidate_cache_entry("balance", "addr:TICK")
+    assert manager.get_cache_value("balance", "addr:TICK") is None
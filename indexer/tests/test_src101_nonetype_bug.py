@@ -115,7 +115,7 @@ class TestSRC101NoneTypeBug:
             }
 
             # Mock get_owner_expire_data_from_running to return expired token for first, valid for second
-            def mock_get_owner_expire(db, processed, deploy_hash, tokenid_utf8):
+            def mock_get_owner_expire(db, processed, deploy_hash, tokenid_utf8, block_context=None):
                 if tokenid_utf8 == "0000":  # First token is expired
                     return (
                         "oldowner",  # preowner
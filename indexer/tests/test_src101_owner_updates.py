@@ -0,0 +1,181 @@
+"""Unit tests for the set-based SRC-101 owner table writes (src101.update_src101_owners / update_owner_table).
+
+update_owner_table replays the former row-at-a-time statements in memory, so the
+tests run both against a small in-memory owners table and require identical rows.
+"""
+
+import random
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from index_core import src101
+from index_core.src101 import OWNER_UPDATE_COLUMNS, OWNER_UPSERT_COLUMNS, update_owner_table, update_src101_owners
+
+DEPLOYS = ["deploy_a", "deploy_b"]
+ADDRESSES = ["bc1qaaa", "bc1qbbb", None]
+
+
+def _upsert(table, row):
+    existing = table.get(row["id"])
+    if existing is None and row["p"] is not None and row["tokenid_utf8"] is not None:
+        existing = next(
+            (
+                r
+                for r in table.values()
+                if (r["p"], r["deploy_hash"], r["tokenid_utf8"]) == (row["p"], row["deploy_hash"], row["tokenid_utf8"])
+            ),
+            None,
+        )
+    if existing is None:
+        table[row["id"]] = dict(row)
+    else:
+        existing.update({column: row[column] for column in OWNER_UPDATE_COLUMNS})
+
+
+def _row(owner_dict, block_index, index):
+    return {
+        "index": index,
+        "id": owner_dict["p"] + "_" + owner_dict["deploy_hash"] + "_" + owner_dict["tokenid"],
+        "last_update": block_index,
+        "p": owner_dict["p"],
+        "deploy_hash": owner_dict["deploy_hash"],
+        "tokenid": owner_dict["tokenid"],
+        "tokenid_utf8": owner_dict["tokenid_utf8"],
+        "img": owner_dict["img"],
+        "preowner": owner_dict["preowner"],
+        "owner": owner_dict["owner"],
+        "txt_data": src101.json.dumps(owner_dict["txt_data"]) if owner_dict["txt_data"] else None,
+        "expire_timestamp": owner_dict["expire_timestamp"],
+        "address_btc": owner_dict["address_btc"],
+        "address_eth": owner_dict["address_eth"],
+        "prim": owner_dict["prim"],
+    }
+
+
+def _row_at_a_time(table, owner_updates, block_index):
+    """The statements update_owner_table used to run per row."""
+    for owner_dict in owner_updates:
+        max_index = max((r["index"] for r in table.values() if r["deploy_hash"] == owner_dict["deploy_hash"]), default=0)
+        if owner_dict["prim"]:
+            for r in table.values():
+                if (
+                    r["prim"]
+                    and r["address_btc"] is not None
+                    and (r["address_btc"], r["deploy_hash"]) == (owner_dict["address_btc"], owner_dict["deploy_hash"])
+                ):
+                    r["prim"] = False
+        _upsert(table, _row(owner_dict, block_index, max_index + 1))
+
+
+class _OwnersCursor:
+    def __init__(self, table):
+        self.table = table
+        self.statements = []
+        self._result = []
+
+    def execute(self, query, params=()):
+        query = " ".join(query.split())
+        self.statements.append(query.split()[0])
+        params = list(params)
+        if query.startswith("SELECT deploy_hash"):
+            maxima = {}
+            for r in self.table.values():
+                if r["deploy_hash"] in params:
+                    maxima[r["deploy_hash"]] = max(maxima.get(r["deploy_hash"], 0), r["index"])
+            self._result = list(maxima.items())
+        elif query.startswith("SELECT id"):
+            self._result = [(r["id"], r["p"], r["deploy_hash"], r["tokenid_utf8"]) for r in self.table.values()]
+        elif query.startswith("UPDATE"):
+            pairs = set(zip(params[::2], params[1::2]))
+            for r in self.table.values():
+                if r["prim"] and (r["address_btc"], r["deploy_hash"]) in pairs:
+                    r["prim"] = False
+        elif query.startswith("INSERT"):
+            width = len(OWNER_UPSERT_COLUMNS)
+            for start in range(0, len(params), width):
+                _upsert(self.table, dict(zip(OWNER_UPSERT_COLUMNS, params[start : start + width])))
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+def _owner_dict(rng, position):
+    tokenid = f"{rng.randint(0, 11):04x}"
+    return {
+        "p": "src-101",
+        "deploy_hash": rng.choice(DEPLOYS),
+        "tokenid": tokenid,
+        # Occasionally a second tokenid spelling of the same name hits the unique name key
+        "tokenid_utf8": f"name{int(tokenid, 16) % 10}",
+        "owner": f"owner{position}",
+        "preowner": f"owner{position - 1}",
+        "expire_timestamp": 1700000000 + position,
+        "txt_data": {"n": position} if rng.random() < 0.5 else None,
+        "address_btc": rng.choice(ADDRESSES),
+        "address_eth": None,
+        "prim": rng.random() < 0.4,
+        "img": None,
+    }
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("seed", range(8))
+def test_update_owner_table_matches_row_at_a_time(seed):
+    rng = random.Random(seed)
+    existing = {}
+    _row_at_a_time(existing, [_owner_dict(rng, -i) for i in range(1, 8)], 799999)
+    owner_updates = [_owner_dict(rng, i) for i in range(40)]
+
+    expected = {key: dict(row) for key, row in existing.items()}
+    _row_at_a_time(expected, owner_updates, 800000)
+
+    actual = {key: dict(row) for key, row in existing.items()}
+    cursor = _OwnersCursor(actual)
+    db = MagicMock()
+    db.cursor.return_value = cursor
+    with patch.object(src101, "OWNER_UPSERT_BATCH_SIZE", 7):
+        update_owner_table(db, owner_updates, 800000)
+
+    assert actual == expected
+    assert cursor.statements.count("SELECT") == 2
+    assert cursor.statements.count("UPDATE") <= 1
+
+
+@pytest.mark.unit
+def test_update_src101_owners_merges_ops_on_the_same_token():
+    mint = {
+        "valid": 1,
+        "op": "MINT",
+        "p": "src-101",
+        "deploy_hash": "deploy_a",
+        "tokenid": ["0001", "0002"],
+        "tokenid_utf8": ["a", "b"],
+        "src101_owner": "bc1qaaa",
+        "src101_preowner": [None, None],
+        "expire_timestamp": 1700000000,
+        "txt_data": None,
+        "prim": True,
+        "img": [None, None],
+    }
+    setrecord = {
+        "valid": 1,
+        "op": "SETRECORD",
+        "p": "src-101",
+        "deploy_hash": "deploy_a",
+        "tokenid": "0002",
+        "tokenid_utf8": "b",
+        "txt_data": {"k": "v"},
+        "address_btc": "bc1qbbb",
+        "address_eth": None,
+    }
+    with patch.object(src101, "update_owner_table") as update_table:
+        owner_updates = update_src101_owners(MagicMock(), 800000, [mint, setrecord])
+
+    update_table.assert_called_once()
+    assert [o["tokenid"] for o in owner_updates] == ["0001", "0002"]
+    assert owner_updates[1]["txt_data"] == {"k": "v"}
+    assert owner_updates[1]["address_btc"] == "bc1qbbb"
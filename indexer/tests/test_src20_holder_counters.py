@@ -0,0 +1,131 @@
+"""Unit tests for the incrementally maintained SRC-20 holder counters (index_core.src20_holder_updater)."""
+
+from decimal import Decimal as D
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import config
+from index_core.holder_count_catchup_job import HolderCountCatchupJob
+from index_core.src20_holder_updater import apply_holder_count_deltas, holder_count_deltas, reconcile_holder_counts
+
+
+def _balance(tick, address, original, credit=0, debit=0):
+    return {
+        "tick": tick,
+        "tick_hash": "h",
+        "address": address,
+        "original_amt": D(original),
+        "credit": D(credit),
+        "debit": D(debit),
+    }
+
+
+def _cursor_db(*results):
+    """A db whose cursor returns ``results`` from successive fetchall calls."""
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = list(results)
+    db = MagicMock()
+    db.cursor.return_value.__enter__.return_value = cursor
+    return db, cursor
+
+
+@pytest.mark.unit
+def test_deltas_follow_zero_crossings_supply_and_mints():
+    balance_updates = [
+        _balance("kevin", "a1", 0, credit="1000"),  # new holder via mint
+        _balance("kevin", "a2", "50", debit="50"),  # sends everything: holder lost
+        _balance("kevin", "a3", "10", credit="50"),  # existing holder receives
+        _balance("stamp", "a1", "5", credit="0.5"),  # fractional mint
+    ]
+    processed = [
+        {"op": "MINT", "tick": "kevin", "valid": 1},
+        {"op": "TRANSFER", "tick": "kevin", "valid": 1},
+        {"op": "MINT", "tick": "stamp", "valid": 1},
+        {"op": "MINT", "tick": "stamp", "valid": 0},
+        {"op": "DEPLOY", "tick": "newt", "valid": 1},
+        {"op": "DEPLOY", "tick": "dupe", "valid": 0},
+    ]
+
+    deltas = holder_count_deltas(balance_updates, processed)
+
+    assert deltas == {
+        "KEVIN": (0, D("1000"), 1),
+        "STAMP": (0, D("0.5"), 1),
+        "NEWT": (0, D(0), 0),
+    }
+
+
+@pytest.mark.unit
+def test_repeated_address_entries_are_netted_before_the_crossing_check():
+    balance_updates = [_balance("kevin", "a1", "0", credit="5"), _balance("KEVIN", "a1", "0", debit="5")]
+
+    assert holder_count_deltas(balance_updates, []) == {"KEVIN": (0, D(0), 0)}
+
+
+@pytest.mark.unit
+def test_apply_adds_deltas_and_derives_progress():
+    db, cursor = _cursor_db()
+
+    apply_holder_count_deltas(db, {"STAMP": (1, D("0.5"), 1), "KEVIN": (-2, D("100"), 0)})
+
+    sql, rows = cursor.executemany.call_args[0]
+    assert "holder_count = src20_market_data.holder_count + new_row.holder_count" in sql
+    assert "total_minted = ROUND(src20_market_data.minted_supply)" in sql
+    assert rows == [("KEVIN", -2, D("100"), D("100"), 0), ("STAMP", 1, D("0.5"), D("0.5"), 1)]
+    progress_sql, ticks = cursor.execute.call_args[0]
+    assert "progress_percentage" in progress_sql and ticks == ["KEVIN", "STAMP"]
+
+    cursor.reset_mock()
+    apply_holder_count_deltas(db, {})
+    assert not cursor.executemany.called and not cursor.execute.called
+
+
+@pytest.mark.unit
+def test_reconcile_rewrites_only_drifted_ticks():
+    stored = [
+        ("KEVIN", 10, D("1000.5"), 3),  # in sync
+        ("STAMP", 4, D("20"), 2),  # holder count drifted
+    ]
+    aggregates = [
+        ("kevin", 10, D("1000.5"), 3, D("21000000")),
+        ("stamp", 5, D("20"), 2, D("100")),
+        ("newt", 0, D(0), 0, D("1000")),  # no market data row yet
+    ]
+    db, cursor = _cursor_db(stored, aggregates)
+
+    repaired = reconcile_holder_counts(db, ["kevin", "stamp", "newt"])
+
+    assert repaired == ["STAMP", "NEWT"]
+    aggregate_sql, params = cursor.execute.call_args[0]
+    assert "COUNT(DISTINCT address)" in aggregate_sql and params == ["kevin", "stamp", "newt"] * 3
+    rows = cursor.executemany.call_args[0][1]
+    assert rows == [
+        ("STAMP", 5, D("20"), D("20"), 2, D("20"), D("100")),
+        ("NEWT", 0, D(0), D(0), 0, D(0), D("1000")),
+    ]
+
+    assert reconcile_holder_counts(db, []) == []
+
+
+@pytest.mark.unit
+def test_catchup_job_walks_the_ticks_in_pages_when_counters_are_enabled():
+    job = HolderCountCatchupJob()
+    pages = iter([[("a",), ("b",)], [("c",)]])
+    db = MagicMock()
+    db.cursor.return_value.__enter__.return_value.fetchall.side_effect = lambda: next(pages)
+    job.database_manager = MagicMock(connect=MagicMock(return_value=db))
+
+    with (
+        patch.object(config, "SRC20_HOLDER_COUNTERS_ENABLED", True),
+        patch.object(config, "SRC20_HOLDER_VERIFY_BATCH", 2),
+        patch("index_core.holder_count_catchup_job.reconcile_holder_counts", return_value=["B"]) as reconcile,
+    ):
+        assert job.run(current_block=100, tip_block=100) == 1
+        assert job._verify_cursor == "b"
+        job.last_run_time = None
+        job.run(current_block=100, tip_block=100)
+
+    assert [c.args[1] for c in reconcile.call_args_list] == [["a", "b"], ["c"]]
+    assert job._verify_cursor == ""
+    assert db.commit.call_count == 2
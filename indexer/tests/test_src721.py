@@ -449,3 +449,99 @@ def test_is_recursive_src721_deploy_basic():
     # Standard deploy (no version)
     standard_deploy = {"p": "src-721", "op": "deploy", "name": "Test Collection"}
     assert is_recursive_src721_deploy(standard_deploy) is False
+
+
+@pytest.fixture
+def fresh_caches():
+    from index_core.caching import CacheManager
+
+    with patch("index_core.src721.cache_manager", CacheManager()) as caches:
+        yield caches
+
+
+def _stamp_table_db(rows):
+    mock_db = MagicMock()
+    mock_cursor = MagicMock()
+    mock_db.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = rows
+    return mock_db, mock_cursor
+
+
+def test_resolve_src721_subassets_single_query(fresh_caches):
+    """Cache, first in-block match, then one IN query for everything else."""
+    from index_core.src721 import resolve_src721_subassets
+
+    fresh_caches.set_cache_value("subasset", "CACHED", "cached_base64")
+    valid_src721_in_block = [
+        {"cpid": "INBLOCK", "stamp_base64": "block_base64"},
+        {"cpid": "INBLOCK", "stamp_base64": "later_base64"},
+        {"cpid": "NOBASE64", "stamp_base64": None},
+    ]
+    mock_db, mock_cursor = _stamp_table_db([("DB1", "db_base64_1"), ("nobase64", "db_base64_2"), ("DB1", "duplicate")])
+
+    result = resolve_src721_subassets(
+        ["CACHED", "INBLOCK", "DB1", "NOBASE64", "MISSING", "DB1"], valid_src721_in_block, mock_db
+    )
+
+    assert result == {
+        "CACHED": "cached_base64",
+        "INBLOCK": "block_base64",
+        "DB1": "db_base64_1",
+        "NOBASE64": "db_base64_2",
+    }
+    mock_cursor.execute.assert_called_once()
+    sql, params = mock_cursor.execute.call_args.args
+    assert "WHERE cpid IN (%s,%s,%s)" in sql
+    assert params == ["DB1", "NOBASE64", "MISSING"]
+    assert fresh_caches.get_cache_value("subasset", "DB1") == "db_base64_1"
+
+
+def test_fetch_src721_collection_resolves_layers_in_bulk(fresh_caches):
+    """Every layer of a collection costs one query in total, and the input object is left as is."""
+    from index_core.src721 import fetch_src721_collection
+
+    collection_object = {"t0": ["A1", "A2"], "t1": ["A3", "A1"], "name": "C"}
+    mock_db, mock_cursor = _stamp_table_db([("A1", "b1"), ("A2", "b2"), ("A3", "b3")])
+
+    result = fetch_src721_collection(collection_object, [], mock_db)
+    assert result["t0-img"] == ["b1", "b2"]
+    assert result["t1-img"] == ["b3", "b1"]
+    assert "t0-img" not in collection_object
+    assert mock_cursor.execute.call_count == 1
+
+    fetch_src721_collection(collection_object, [], mock_db)
+    assert mock_cursor.execute.call_count == 1
+
+    mock_cursor.fetchone.return_value = None
+    with pytest.raises(RuntimeError, match=r"Unable to load t0\[0\]"):
+        fetch_src721_collection({"t0": ["GONE"]}, [], mock_db)
+
+
+def test_validate_base64_image_cached_decodes_once(fresh_caches):
+    """Large images are validated once per content; small ones go straight to validate_base64_image."""
+    import base64
+
+    from index_core import src721
+
+    image = base64.b64encode(b"\x89PNG" + bytes(4000)).decode()
+    with patch("index_core.src721.validate_base64_image", wraps=src721.validate_base64_image) as mock_validate:
+        first = src721.validate_base64_image_cached(image)
+        second = src721.validate_base64_image_cached(image)
+        src721.validate_base64_image_cached("aGVsbG8=")
+        src721.validate_base64_image_cached("aGVsbG8=")
+
+    assert first == second == (True, f"data:image/png;base64,{image}")
+    assert mock_validate.call_count == 3
+
+
+def test_get_src721_svg_string_loads_background_once(fresh_caches):
+    """The SRC-721 background row is read once and reused across mints."""
+    from index_core.src721 import get_src721_svg_string
+
+    with patch("index_core.src721.get_srcbackground_data", return_value=("aGVsbG8=", "30px", "white")) as mock_background:
+        first = get_src721_svg_string("SRC-721", "stampchain.io", MagicMock())
+        second = get_src721_svg_string("SRC-721", "stampchain.io", MagicMock())
+
+    assert first == second
+    assert 'href="data:image/png;base64,aGVsbG8="' in first
+    mock_background.assert_called_once()
@@ -0,0 +1,188 @@
+"""Unit tests for batched stamp market data collection (StampWorker.collect_market_data and its batched write)."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import config
+from index_core import stamp_worker as stamp_worker_module
+from index_core.market_data_jobs import MarketDataJobScheduler
+from index_core.market_data_service import MarketDataService
+from index_core.sales_history_processor import SalesHistoryProcessor
+from index_core.stamp_worker import StampWorker
+
+CPID = "A95428956661682177"
+HOURS = [24, 24 * 7, 24 * 30, 24 * 365 * 10]
+DISPENSERS = {CPID: [{"status": 0, "satoshirate": 50000, "give_quantity": 1, "give_remaining": 1}]}
+BALANCES = {
+    CPID: [{"address": "bc1a", "quantity": 3}, {"address": "bc1b", "quantity": 1}],
+    "STAMPY": [{"address": "bc1c", "quantity": 5}],
+}
+VOLUMES_SATS = {CPID: [1e6, 2e6, 3e6, 4e6]}
+LATEST_SALE = {
+    CPID: {
+        "tx_hash": "ab" * 32,
+        "block_index": 900000,
+        "block_time": 1700000000,
+        "buyer_address": "bc1buyer",
+        "seller_address": "bc1seller",
+        "btc_amount": 50000.0,
+    }
+}
+
+
+@pytest.fixture
+def sources():
+    """Serve dispensers, balances and sales history from the fixtures above."""
+    fetcher = MagicMock(dispenser_cache=DISPENSERS)
+    fetcher.should_fetch.return_value = True
+    history = MagicMock()
+    history.calculate_volume_from_history.side_effect = lambda cpid, hours: VOLUMES_SATS.get(cpid, [0.0] * 4)[
+        HOURS.index(hours)
+    ]
+    history.get_recent_sales.side_effect = lambda limit, cpid: [LATEST_SALE[cpid]] if cpid in LATEST_SALE else []
+    history.calculate_volumes_for_cpids.side_effect = lambda cpids, hours: {
+        c: VOLUMES_SATS[c] for c in cpids if c in VOLUMES_SATS
+    }
+    history.get_latest_sales.side_effect = lambda cpids: {c: LATEST_SALE[c] for c in cpids if c in LATEST_SALE}
+
+    with (
+        patch.object(stamp_worker_module, "dispenser_bulk_fetcher", fetcher),
+        patch.object(stamp_worker_module, "sales_history_processor", history),
+        patch.object(StampWorker, "_fetch_balances", side_effect=lambda cpid: BALANCES.get(cpid, [])) as fetch_balances,
+    ):
+        yield fetcher, history, fetch_balances
+
+
+def _without_timing(market_data):
+    return {k: v for k, v in market_data.items() if k not in ("processing_time_ms", "last_updated")}
+
+
+@pytest.mark.unit
+def test_batch_collection_matches_per_stamp_processing(sources):
+    fetcher, history, fetch_balances = sources
+    worker = StampWorker()
+
+    batched = worker.collect_market_data([CPID, "STAMPY", "bad-cpid"], max_workers=3)
+
+    # One snapshot refresh and two grouped history queries for the whole batch
+    assert fetcher.fetch_all_open_dispensers.call_count == 1
+    assert history.calculate_volumes_for_cpids.call_args[0] == ([CPID, "STAMPY"], HOURS)
+    assert not history.calculate_volume_from_history.called and not history.get_recent_sales.called
+    assert sorted(c.args[0] for c in fetch_balances.call_args_list) == [CPID, "STAMPY"]
+    assert batched["bad-cpid"] is None
+
+    fetcher.should_fetch.return_value = False
+    for cpid in (CPID, "STAMPY"):
+        assert _without_timing(batched[cpid]) == _without_timing(worker.process_stamp_market_data(cpid))
+    assert float(batched[CPID]["volume_24h_btc"]) == 0.01
+    assert batched["STAMPY"]["total_volume_btc"] == 0.0
+
+
+@pytest.mark.unit
+def test_failed_snapshot_and_history_fall_back_per_stamp(sources):
+    fetcher, history, _ = sources
+    fetcher.fetch_all_open_dispensers.side_effect = RuntimeError("api down")
+    history.calculate_volumes_for_cpids.side_effect = RuntimeError("db down")
+
+    with patch.object(StampWorker, "_fetch_dispensers", return_value=[]) as fetch_dispensers:
+        batched = StampWorker().collect_market_data([CPID])
+
+    fetch_dispensers.assert_called_once_with(CPID)
+    assert history.calculate_volume_from_history.call_count == 4
+    assert float(batched[CPID]["volume_7d_btc"]) == 0.02
+
+
+@pytest.mark.unit
+def test_batch_write_uses_one_upsert_per_row_shape_and_one_commit():
+    db = MagicMock()
+    cursor = db.cursor.return_value.__enter__.return_value
+    rows = {
+        "A1": {"holder_count": 2, "volume_sources": {"dispenser": 1.0}},
+        "A2": {"holder_count": 5, "volume_sources": {"counterparty": 1.0}},
+        "A3": {"holder_count": 1},
+        "A4": {"_holder_cache_data": []},  # nothing to write
+    }
+
+    with patch("index_core.market_data_service.cache_manager") as cache:
+        assert MarketDataService().update_stamp_market_data_batch(rows, db) == 3
+
+    (pair_sql, pair_values), (single_sql, single_values) = [c.args for c in cursor.execute.call_args_list]
+    assert pair_sql.count("NOW(), NOW(), DATE_ADD") == 2 and "AS new_row ON DUPLICATE KEY UPDATE" in pair_sql
+    assert pair_values == ["A1", 2, json.dumps({"dispenser": 1.0}), "A2", 5, json.dumps({"counterparty": 1.0})]
+    assert single_sql.count("NOW(), NOW(), DATE_ADD") == 1 and single_values == ["A3", 1]
+    assert db.commit.call_count == 1
+    assert cache.invalidate_cache_entry.call_count == 3
+
+
+@pytest.mark.unit
+def test_failed_batch_write_rolls_back_and_retries_per_row():
+    db = MagicMock()
+    cursor = db.cursor.return_value.__enter__.return_value
+    rows = {"A1": {"holder_count": 2}, "A2": {"holder_count": "bad"}, "A3": {"volume_sources": {"dispenser": 1.0}}}
+
+    def execute(sql, values):
+        if "bad" in values:
+            raise Exception("Incorrect integer value: 'bad'")
+
+    cursor.execute.side_effect = execute
+
+    with patch("index_core.market_data_service.cache_manager") as cache:
+        assert MarketDataService().update_stamp_market_data_batch(rows, db) == 2
+
+    # The first upsert's rows were rolled back before the per-row retry committed them again
+    assert [c.args[1][0] for c in cursor.execute.call_args_list] == ["A1", "A1", "A2", "A3"]
+    assert db.rollback.call_count == 2
+    assert db.commit.call_count == 2
+    assert [c.args[1] for c in cache.invalidate_cache_entry.call_args_list] == ["stamp_market:A1", "stamp_market:A3"]
+
+
+@pytest.mark.unit
+def test_history_batch_queries_group_by_cpid():
+    db = MagicMock()
+    cursor = db.cursor.return_value.__enter__.return_value
+    cursor.fetchall.side_effect = [
+        [("A1", 100, 200, None)],
+        [("A1", "tx1", 10, 1000, "buyer", "seller", 100), ("A1", "tx2", 10, 1000, "buyer", "seller", 5)],
+    ]
+    processor = SalesHistoryProcessor.__new__(SalesHistoryProcessor)
+    processor.db_manager = MagicMock(connect=MagicMock(return_value=db))
+
+    assert processor.calculate_volumes_for_cpids(["A1", "A2"], [24, 168, 720]) == {"A1": [100.0, 200.0, 0.0]}
+    sql, params = cursor.execute.call_args[0]
+    assert "GROUP BY cpid" in sql and params == [24, 168, 720, "A1", "A2", 720]
+
+    latest = processor.get_latest_sales(["A1"])
+    assert latest["A1"]["tx_hash"] == "tx1" and latest["A1"]["btc_amount"] == 100.0
+    assert processor.calculate_volumes_for_cpids([], [24]) == {} and processor.get_latest_sales([]) == {}
+
+
+@pytest.mark.unit
+def test_scheduler_writes_collected_batch_and_reports_throughput():
+    scheduler = MarketDataJobScheduler()
+    holders = [{"address": "bc1a", "quantity": 3}]
+    collected = {"A1": {"holder_count": 1, "_holder_cache_data": holders}, "A2": None}
+
+    with (
+        patch.object(config, "MARKET_DATA_BATCH_COLLECTION_ENABLED", True),
+        patch.object(StampWorker, "collect_market_data", return_value=collected) as collect,
+        patch("index_core.market_data_jobs.market_data_service") as service,
+        patch.object(scheduler, "_populate_holder_cache") as populate,
+    ):
+        service.update_stamp_market_data_batch.return_value = 1
+        assert scheduler._process_stamp_batch(MagicMock(), ["A1", "A2"]) == 1
+        scheduler._record_throughput("stamp_update", 30.0, 100, batched=True)
+        scheduler._record_throughput("stamp_update", 90.0, 100, batched=True)
+
+    assert collect.call_args.kwargs["max_workers"] == config.MARKET_DATA_STAMP_FETCH_WORKERS
+    assert service.update_stamp_market_data_batch.call_args[0][0] == {"A1": {"holder_count": 1}}
+    populate.assert_called_once()
+    assert populate.call_args[0][1:] == ("A1", holders)
+    assert scheduler.get_throughput_metrics()["stamp_update"] == {
+        "cycles": 2,
+        "processed": 200,
+        "last_per_minute": 66.7,
+        "avg_per_minute": 100.0,
+        "batched": True,
+    }
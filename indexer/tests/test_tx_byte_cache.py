@@ -0,0 +1,137 @@
+"""Unit tests for the byte-budgeted transaction cache (cache_types.TxByteCache) and its use in Backend."""
+
+import hashlib
+from unittest import mock
+
+import pytest
+
+from index_core.backend import Backend
+from index_core.cache_types import LRUCache, TxByteCache
+from index_core.memory_manager import MemoryManager
+
+OVERHEAD = TxByteCache.ENTRY_OVERHEAD
+
+
+def _txid(n: int) -> bytes:
+    return n.to_bytes(32, "big")
+
+
+@pytest.mark.unit
+def test_evicts_least_recently_used_to_stay_within_budget():
+    cache = TxByteCache[bytes](max_bytes=3 * (100 + OVERHEAD))
+    for n in range(3):
+        cache.set(_txid(n), b"\x00" * 100)
+    assert cache.get(_txid(0)) is not None  # 1 is now the coldest
+
+    cache.set(_txid(3), b"\x00" * 100)
+
+    assert cache.get(_txid(1)) is None
+    assert [cache.contains(_txid(n)) for n in (0, 2, 3)] == [True, True, True]
+    assert cache.current_bytes == 3 * (100 + OVERHEAD)
+    assert cache.evictions == 1
+
+
+@pytest.mark.unit
+def test_large_entry_evicts_several_and_oversized_entry_is_not_cached():
+    cache = TxByteCache[bytes](max_bytes=1000 + OVERHEAD)
+    for n in range(4):
+        cache.set(_txid(n), b"\x00" * 50)
+
+    cache.set(_txid(9), b"\x00" * 900)
+    assert len(cache) == 1 and cache.contains(_txid(9))
+
+    cache.set(_txid(10), b"\x00" * 5000)
+    assert not cache.contains(_txid(10))
+    assert cache.contains(_txid(9))
+
+
+@pytest.mark.unit
+def test_replacing_and_invalidating_keep_byte_count():
+    cache = TxByteCache[bytes](max_bytes=10_000, max_entries=2)
+    cache.set(_txid(1), b"\x00" * 100)
+    cache.set(_txid(1), b"\x00" * 300)
+    assert cache.current_bytes == 300 + OVERHEAD
+
+    cache.set(_txid(2), b"\x00", size=1000)
+    cache.set(_txid(3), b"\x00" * 10)
+    assert not cache.contains(_txid(1))  # max_entries=2
+
+    cache.invalidate(_txid(2))
+    assert cache.current_bytes == 10 + OVERHEAD
+    cache.clear()
+    assert cache.current_bytes == 0 and len(cache) == 0
+
+
+@pytest.mark.unit
+def test_shrink_and_stats():
+    cache = TxByteCache[bytes](max_bytes=1_000_000)
+    for n in range(10):
+        cache.set(_txid(n), b"\x00" * 100)
+    cache.get(_txid(9))
+    cache.get(_txid(42))
+
+    assert cache.shrink(0.5) == 5
+    assert [cache.contains(_txid(n)) for n in range(10)] == [False] * 5 + [True] * 5
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 5
+    assert stats["bytes"] == 5 * (100 + OVERHEAD)
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"], stats["evictions"]) == (1, 1, 50.0, 5)
+
+
+@pytest.mark.unit
+def test_memory_pressure_trims_byte_caches_before_clearing():
+    manager = MemoryManager(memory_threshold=0.9, soft_watermark=0.8)
+    tx_cache = TxByteCache[bytes](max_bytes=1_000_000)
+    for n in range(8):
+        tx_cache.set(_txid(n), b"\x00" * 100)
+    lru = LRUCache(max_size=10)
+    lru.set("k", "v")
+    manager.register_cache("tx", tx_cache, priority=1, refill_cost=1.0)
+    manager.register_cache("lru", lru, priority=1, refill_cost=4.0)
+
+    # Full soft pressure: the cheap cache gives up half its bytes, the costly one an eighth
+    with mock.patch.object(manager, "get_memory_usage", return_value=0.9):
+        manager.clear_caches_if_needed()
+    assert len(tx_cache) == 4
+    assert len(lru) == 1
+
+    manager._last_check = 0
+    with mock.patch.object(manager, "get_memory_usage", return_value=0.95):
+        manager.clear_caches_if_needed()
+    assert len(tx_cache) == 0 and len(lru) == 0
+
+
+@pytest.mark.unit
+def test_backend_caches_raw_transactions_as_bytes():
+    Backend._instance = None
+    try:
+        with mock.patch("index_core.backend.Backend._create_optimized_session"):
+            backend = Backend()
+        tx_hash, tx_hex = "ab" * 32, "0100000000000000000000"
+        with mock.patch.object(backend, "rpc_batch", return_value=[{"id": backend.monotonic_call_id + 1, "result": tx_hex}]):
+            assert backend.getrawtransaction_batch([tx_hash]) == {tx_hash: tx_hex}
+        assert backend.raw_transactions_cache.get(bytes.fromhex(tx_hash)) == bytes.fromhex(tx_hex)
+
+        with mock.patch.object(backend, "rpc_batch") as rpc_batch:
+            assert backend.getrawtransaction_batch([tx_hash]) == {tx_hash: tx_hex}
+        rpc_batch.assert_not_called()
+    finally:
+        Backend._instance = None
+
+
+@pytest.mark.unit
+def test_backend_deserialize_cache_keyed_by_digest():
+    Backend._instance = None
+    try:
+        with mock.patch("index_core.backend.Backend._create_optimized_session"):
+            backend = Backend()
+        backend._parser = None
+        # version, one null-prevout input with an empty script, one empty output, locktime
+        tx_hex = "01000000" + "01" + "00" * 32 + "ffffffff" + "00" + "ffffffff" + "01" + "00" * 8 + "00" + "00000000"
+
+        first = backend.deserialize(tx_hex)
+        assert backend.deserialize(tx_hex) is first
+        assert backend.deserialized_tx_cache.contains(hashlib.sha256(bytes.fromhex(tx_hex)).digest())
+    finally:
+        Backend._instance = None
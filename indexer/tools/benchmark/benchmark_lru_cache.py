@@ -1,8 +1,11 @@
+import argparse
 import datetime
 import logging
 import os
+import random
 import statistics
 import sys
+import threading
 import time
 from typing import Any, Dict, List, Tuple
 
@@ -14,14 +17,16 @@ logger = logging.getLogger("lru_cache_benchmark")
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+# The indexer sources, for the Python cache comparison
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
 
 try:
     from btc_stamps_parser import FastTransactionParser
 
     logger.info("Successfully imported FastTransactionParser")
 except ImportError as e:
-    logger.error(f"Failed to import FastTransactionParser: {e}")
-    sys.exit(1)
+    logger.warning(f"Failed to import FastTransactionParser, parser benchmark unavailable: {e}")
+    FastTransactionParser = None
 
 # A valid Bitcoin transaction hex
 VALID_TX_HEX = "0100000001c997a5e56e104102fa209c6a852dd90660a20b2d9c352423edce25857fcd3704000000004847304402204e45e16932b8af514961a1d3a1a25fdf3f4f7732e9d624c6c61548ab5fb8cd410220181522ec8eca07de4860a4acdd12909d831cc56cbbac4622082221a8768d1d0901ffffffff0200ca9a3b00000000434104ae1a62fe09c5f51b13905f07f06b99a2f7159b2225f374cd378d71302fa28414e7aab37397f554a7df5f142c21c1b7303b8a0626f1baded5c72a704f7e6cd84cac00286bee0000000043410411db93e1dcdb8a016b49840f8c53bc1eb68a382e97b1482ecad7b148a6909a5cb2e0eaddfb84ccf9744464f82e160bfa9b8b64f9d4c03f999b8643f656b412a3ac00000000"
@@ -159,5 +164,79 @@ def run_benchmark():
     }
 
 
+def _cache_worker(cache, keys: List[str], operations: int, write_ratio: float, seed: int, timings: List[float]) -> None:
+    """Mixed get/set load on one cache: a miss is filled, and a share of hits are rewritten."""
+    rng = random.Random(seed)
+    picks = [rng.choice(keys) for _ in range(operations)]
+    writes = [rng.random() < write_ratio for _ in range(operations)]
+    start = time.perf_counter()
+    for key, write in zip(picks, writes):
+        if cache.get(key) is None or write:
+            cache.set(key, key)
+    timings.append(time.perf_counter() - start)
+
+
+def benchmark_python_caches(
+    thread_counts: Tuple[int, ...] = (1, 4, 8, 16),
+    operations_per_thread: int = 100_000,
+    max_size: int = 5000,
+    key_space: int = 8000,
+    write_ratio: float = 0.1,
+    shards: int = 16,
+) -> Dict[str, Dict[int, float]]:
+    """Compare LRUCache and ShardedLRUCache throughput (ops/s) under multi-threaded load."""
+    from index_core.cache_types import LRUCache, ShardedLRUCache
+
+    factories = {
+        "LRUCache": lambda: LRUCache(max_size=max_size),
+        f"ShardedLRUCache({shards})": lambda: ShardedLRUCache(max_size=max_size, shards=shards),
+    }
+    keys = [f"bc1q{n:038d}:STAMP" for n in range(key_space)]
+    results: Dict[str, Dict[int, float]] = {name: {} for name in factories}
+
+    for threads in thread_counts:
+        for name, factory in factories.items():
+            cache = factory()
+            timings: List[float] = []
+            workers = [
+                threading.Thread(target=_cache_worker, args=(cache, keys, operations_per_thread, write_ratio, seed, timings))
+                for seed in range(threads)
+            ]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            results[name][threads] = threads * operations_per_thread / elapsed
+            hits, misses = cache.get_metrics()
+            logger.info(
+                f"{name:<22} threads={threads:<3} {results[name][threads]:>12,.0f} ops/s  "
+                f"hit_ratio={hits / (hits + misses) * 100:.1f}%"
+            )
+
+    baseline = results["LRUCache"]
+    for name, by_threads in results.items():
+        if name != "LRUCache":
+            for threads, ops in by_threads.items():
+                logger.info(f"{name} vs LRUCache at {threads} threads: {ops / baseline[threads]:.2f}x")
+    return results
+
+
 if __name__ == "__main__":
-    run_benchmark()
+    parser = argparse.ArgumentParser(description="LRU cache benchmarks")
+    parser.add_argument("--suite", choices=["parser", "python", "all"], default="all")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--ops", type=int, default=100_000, help="operations per thread for the Python cache comparison")
+    parser.add_argument("--shards", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.suite in ("parser", "all"):
+        if FastTransactionParser is None:
+            logger.error("Rust parser not built; skipping parser cache benchmark")
+            if args.suite == "parser":
+                sys.exit(1)
+        else:
+            run_benchmark()
+    if args.suite in ("python", "all"):
+        benchmark_python_caches(tuple(args.threads), args.ops, shards=args.shards)
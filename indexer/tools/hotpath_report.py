@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Read the hot-path profiler output (HOTPATH_PROFILER_PATH and its rotated backups).
+
+Examples:
+    python tools/hotpath_report.py phases --hours 24
+    python tools/hotpath_report.py slow
+    python tools/hotpath_report.py top --hours 6
+    python tools/hotpath_report.py flamegraph --block 840000 > 840000.folded
+
+``flamegraph`` prints collapsed stacks ("frame;frame;frame count"), the input
+format of flamegraph.pl and speedscope.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from index_core.hotpath_profiler import PhaseHistogram  # noqa: E402
+
+
+def profile_files(path: str) -> List[str]:
+    """Return the profile file and its rotated backups, oldest first."""
+    backups = sorted(glob.glob(f"{glob.escape(path)}.[0-9]*"), key=lambda p: int(p.rsplit(".", 1)[1]), reverse=True)
+    return backups + ([path] if os.path.exists(path) else [])
+
+
+def read_records(path: str, record_type: str, since: Optional[float] = None) -> Iterator[dict]:
+    for file_path in profile_files(path):
+        with open(file_path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("type") != record_type:
+                    continue
+                if since is not None and record.get("window_start", record.get("ts", 0)) < since:
+                    continue
+                yield record
+
+
+def merged_histograms(records) -> Dict[str, PhaseHistogram]:
+    histograms: Dict[str, PhaseHistogram] = defaultdict(PhaseHistogram)
+    for record in records:
+        for name, data in record["phases"].items():
+            histograms[name].merge(PhaseHistogram.from_dict(data))
+    return histograms
+
+
+def print_phases(histograms: Dict[str, PhaseHistogram]) -> None:
+    if not histograms:
+        print("No histogram windows found")
+        return
+    print(f"{'phase':<30} {'count':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} {'total s':>10}")
+    for name, histogram in sorted(histograms.items(), key=lambda item: -item[1].total_ms):
+        print(
+            f"{name:<30} {histogram.count:>8} {histogram.percentile(50):>10.2f} {histogram.percentile(95):>10.2f} "
+            f"{histogram.percentile(99):>10.2f} {histogram.max_ms:>10.2f} {histogram.total_ms / 1000:>10.2f}"
+        )
+
+
+def function_totals(flamegraphs) -> Tuple[Counter, Counter]:
+    """Sample counts per function: self (innermost frame) and inclusive (anywhere on the stack)."""
+    self_samples, inclusive_samples = Counter(), Counter()
+    for record in flamegraphs:
+        for stack, count in record["stacks"].items():
+            frames = stack.split(";")
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                inclusive_samples[frame] += count
+    return self_samples, inclusive_samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report on hot-path profiler output")
+    parser.add_argument("--path", default=os.environ.get("HOTPATH_PROFILER_PATH", "hotpath_profile.jsonl"))
+    parser.add_argument("--hours", type=float, default=None, help="Only windows from the last N hours")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("phases", help="Per-phase p50/p95/p99 merged over the selected windows")
+    subparsers.add_parser("slow", help="Slowest blocks with stack samples")
+    top = subparsers.add_parser("top", help="Functions with the most samples in the slowest blocks")
+    top.add_argument("--block", type=int, default=None)
+    top.add_argument("--limit", type=int, default=25)
+    flamegraph = subparsers.add_parser("flamegraph", help="Collapsed stacks for flamegraph.pl / speedscope")
+    flamegraph.add_argument("--block", type=int, default=None, help="Block to export (default: all slow blocks merged)")
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours is not None else None
+
+    if args.command == "phases":
+        print_phases(merged_histograms(read_records(args.path, "histogram", since)))
+        return
+
+    flamegraphs = [
+        record
+        for record in read_records(args.path, "flamegraph", since)
+        if getattr(args, "block", None) is None or record["block_index"] == args.block
+    ]
+    if args.command == "slow":
+        print(f"{'window':<20} {'rank':>4} {'block':>8} {'total ms':>10} {'samples':>8}")
+        for record in flamegraphs:
+            window = time.strftime("%Y-%m-%d %H:%M", time.gmtime(record["window_start"]))
+            print(
+                f"{window:<20} {record['rank']:>4} {record['block_index']:>8} {record['total_ms']:>10.1f} "
+                f"{sum(record['stacks'].values()):>8}"
+            )
+    elif args.command == "top":
+        self_samples, inclusive_samples = function_totals(flamegraphs)
+        total = sum(self_samples.values()) or 1
+        print(f"{'function':<60} {'self %':>7} {'incl %':>7}")
+        for frame, count in self_samples.most_common(args.limit):
+            print(f"{frame:<60} {100 * count / total:>7.1f} {100 * inclusive_samples[frame] / total:>7.1f}")
+    elif args.command == "flamegraph":
+        stacks: Counter = Counter()
+        for record in flamegraphs:
+            stacks.update(record["stacks"])
+        for stack, count in stacks.most_common():
+            print(f"{stack} {count}")
+
+
+if __name__ == "__main__":
+    main()